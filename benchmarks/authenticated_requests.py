@@ -0,0 +1,103 @@
+"""Аутентифицированные запросы через get_current_user: пропускная способность и запросы к БД с кэшем и без.
+
+Нужны PostgreSQL со схемой account и Redis. Приложение вызывается через ASGI без сети,
+так что время уходит на разбор JWT, Redis и БД. Тестовые пользователи — номера bench-auth-*.
+Запуск: python -m benchmarks.authenticated_requests --requests 5000 --users 50 --concurrency 50
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import timedelta
+from typing import Annotated
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import event, text
+
+from src.core.dependencies import get_current_user
+from src.core.security import create_access_token
+from src.database import async_session, engine
+from src.infrastructure.models.user import User
+from src.infrastructure.services.user_cache import token_cache, user_cache
+
+
+async def seed(count: int) -> list[int]:
+    async with async_session() as session:
+        await session.execute(text("DELETE FROM account.users WHERE number_phone LIKE 'bench-auth-%'"))
+        user_ids = (await session.execute(text("""
+            INSERT INTO account.users (number_phone, hashed_password, is_admin, is_phone_verified)
+            SELECT 'bench-auth-' || n, '', false, true FROM generate_series(1, :count) n
+            RETURNING id
+        """), {"count": count})).scalars().all()
+        await session.commit()
+    return list(user_ids)
+
+
+async def cleanup(user_ids: list[int]) -> None:
+    async with async_session() as session:
+        await session.execute(text("DELETE FROM account.users WHERE number_phone LIKE 'bench-auth-%'"))
+        await session.commit()
+    for user_id in user_ids:
+        await user_cache.invalidate(user_id)
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/me")
+    async def me(user: Annotated[User, Depends(get_current_user)]):
+        return {"id": user.id}
+
+    return app
+
+
+async def run(name: str, app: FastAPI, tokens: list[str], requests: int, concurrency: int) -> None:
+    statements = 0
+
+    def count_statement(*_):
+        nonlocal statements
+        statements += 1
+
+    rng = random.Random(42)
+    plan = [rng.choice(tokens) for _ in range(requests)]
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def call(token: str):
+            async with semaphore:
+                response = await client.get("/me", headers={"Authorization": f"Bearer {token}"})
+                assert response.status_code == 200, response.text
+
+        event.listen(engine.sync_engine, "before_cursor_execute", count_statement)
+        started = time.perf_counter()
+        await asyncio.gather(*(call(token) for token in plan))
+        elapsed = time.perf_counter() - started
+        event.remove(engine.sync_engine, "before_cursor_execute", count_statement)
+    print(f"{name:<9} {requests / elapsed:7,.0f} req/s, {statements} DB statements for {requests} requests")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    user_ids = await seed(args.users)
+    tokens = [create_access_token({"sub": str(user_id)}, timedelta(minutes=30)) for user_id in user_ids]
+    app = build_app()
+
+    cache_size, cache_ttl = token_cache.max_size, user_cache.ttl
+    token_cache.max_size, user_cache.ttl = 0, 0
+    await run("no cache", app, tokens, args.requests, args.concurrency)
+    token_cache.max_size, user_cache.ttl = cache_size, cache_ttl
+    await run("cached", app, tokens, args.requests, args.concurrency)
+
+    await cleanup(user_ids)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+"""Сравнение хвостовых задержек межсервисных GET с хеджированием и без.
+
+Запуск: python -m benchmarks.hedged_requests --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+from src.infrastructure.services.hedging import HedgePolicy
+from src.infrastructure.services.retry import RetryService
+
+PRIMARY = "http://menu-1.local"
+REPLICA = "http://menu-2.local"
+
+
+def make_upstream(slow_ratio: float, fast_ms: tuple[int, int], slow_ms: tuple[int, int], seed: int) -> httpx.MockTransport:
+    rng = random.Random(seed)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        low, high = slow_ms if rng.random() < slow_ratio else fast_ms
+        await asyncio.sleep(rng.uniform(low, high) / 1000)
+        dish_id = int(request.url.path.rsplit("/", 1)[-1])
+        return httpx.Response(200, json={"id": dish_id, "price": 100, "is_available": True})
+
+    return httpx.MockTransport(handler)
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(service: RetryService, requests: int, concurrency: int) -> list[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await service.get(f"{PRIMARY}/dishes/{i % 100}")
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies
+
+
+def report(name: str, latencies: list[float], policy: HedgePolicy | None = None) -> None:
+    line = (
+        f"{name:<10} p50={percentile(latencies, 0.50):7.1f}ms "
+        f"p95={percentile(latencies, 0.95):7.1f}ms "
+        f"p99={percentile(latencies, 0.99):7.1f}ms "
+        f"mean={statistics.mean(latencies):7.1f}ms"
+    )
+    if policy is not None:
+        line += f" hedges={policy.hedges_sent} ({policy.hedges_sent / max(policy.requests, 1):.1%}), won={policy.hedges_won}"
+    print(line)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--slow-ratio", type=float, default=0.05)
+    parser.add_argument("--budget", type=float, default=0.1)
+    args = parser.parse_args()
+
+    upstream = make_upstream(args.slow_ratio, (5, 15), (150, 400), seed=42)
+
+    async with httpx.AsyncClient(transport=upstream) as client:
+        plain = RetryService(client=client)
+        report("baseline", await run(plain, args.requests, args.concurrency))
+
+    upstream = make_upstream(args.slow_ratio, (5, 15), (150, 400), seed=42)
+    async with httpx.AsyncClient(transport=upstream) as client:
+        policy = HedgePolicy(replicas={PRIMARY: [REPLICA]}, budget_ratio=args.budget)
+        hedged = RetryService(client=client, hedge_policy=policy)
+        report("hedged", await run(hedged, args.requests, args.concurrency), policy)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,131 @@
+"""Симуляция кухни: пропускная способность планировщика и опоздания по сравнению с FIFO.
+
+Запуск: python -m benchmarks.kitchen_simulation --orders 20000 --cooks 12
+"""
+import argparse
+import heapq
+import random
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from src.infrastructure.services.kitchen import KitchenScheduler
+
+STATIONS = {1: "grill", 2: "bar", 3: "cold"}
+PREP_MINUTES = {"grill": 8, "bar": 2, "cold": 4}
+START = datetime(2025, 1, 1, 12, 0)
+
+
+def make_orders(count: int, seed: int, arrival_seconds: float = 150.0) -> list[tuple[int, datetime, datetime, list[dict]]]:
+    rng = random.Random(seed)
+    orders = []
+    arrival = START
+    for order_id in range(1, count + 1):
+        arrival += timedelta(seconds=rng.expovariate(1 / arrival_seconds))
+        # Доставка обещана позже, чем заказ в зале
+        promise = timedelta(minutes=rng.choice((15, 15, 25, 40)))
+        items = [
+            {"dish_id": rng.randint(1, 50), "quantity": 1, "category_id": rng.choice((1, 1, 2, 3))}
+            for _ in range(rng.randint(1, 4))
+        ]
+        orders.append((order_id, arrival, arrival + promise, items))
+    return orders
+
+
+def throughput(orders, cooks: int) -> None:
+    kitchen = KitchenScheduler(STATIONS)
+    for i in range(cooks):
+        kitchen.register_cook(f"cook-{i}", [STATIONS[i % 3 + 1]])
+
+    started = time.perf_counter()
+    for order_id, _, promised_at, items in orders:
+        kitchen.submit_order(order_id, items, promised_at)
+    submitted = time.perf_counter()
+    for order_id, _, promised_at, _ in orders[::10]:
+        kitchen.reprioritize(order_id, promised_at - timedelta(minutes=5))
+    for order_id, *_ in orders[5::20]:
+        kitchen.cancel_order(order_id)
+    updated = time.perf_counter()
+
+    taken = 0
+    while True:
+        progress = False
+        for i in range(cooks):
+            ticket = kitchen.next_ticket(f"cook-{i}")
+            if ticket is not None:
+                kitchen.complete(ticket.id)
+                taken += 1
+                progress = True
+        if not progress:
+            break
+    drained = time.perf_counter()
+
+    print(
+        f"submit {len(orders)} orders: {(submitted - started) * 1e6 / len(orders):.1f} us/order, "
+        f"updates: {(updated - submitted) * 1e6 / (len(orders) // 10 + len(orders) // 20):.1f} us/op, "
+        f"dispatch {taken} tickets: {(drained - updated) * 1e6 / max(taken, 1):.1f} us/ticket"
+    )
+
+
+def simulate(orders, cooks: int, policy: str) -> tuple[float, float]:
+    """Дискретная симуляция: освободившийся повар берёт следующий тикет своей станции."""
+    kitchen = KitchenScheduler(STATIONS)
+    fifo: dict[str, deque] = {station: deque() for station in PREP_MINUTES}
+    cook_stations = [STATIONS[i % 3 + 1] for i in range(cooks)]
+    for i, station in enumerate(cook_stations):
+        kitchen.register_cook(f"cook-{i}", [station])
+
+    def take(cook: int):
+        if policy == "heap":
+            return kitchen.next_ticket(f"cook-{cook}")
+        queue = fifo[cook_stations[cook]]
+        return queue.popleft() if queue else None
+
+    free = [(START, cook) for cook in range(cooks)]
+    heapq.heapify(free)
+    pending = deque(orders)
+    late = total = 0
+    lateness = 0.0
+    while free:
+        clock, cook = heapq.heappop(free)
+        while pending and pending[0][1] <= clock:
+            order_id, _, promised_at, items = pending.popleft()
+            for ticket in kitchen.submit_order(order_id, items, promised_at):
+                fifo[ticket.station].append(ticket)
+
+        ticket = take(cook)
+        if ticket is None:
+            # Станция пуста: ждём следующий заказ, а если заказов больше нет — повар свободен
+            if pending:
+                heapq.heappush(free, (pending[0][1], cook))
+            continue
+
+        if policy == "heap":
+            kitchen.complete(ticket.id)
+        done = clock + timedelta(minutes=PREP_MINUTES[ticket.station] * (1 + len(ticket.items)) / 2)
+        heapq.heappush(free, (done, cook))
+        total += 1
+        if done > ticket.promised_at:
+            late += 1
+            lateness += (done - ticket.promised_at).total_seconds() / 60
+    return late / max(total, 1), lateness / max(total, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--cooks", type=int, default=12)
+    parser.add_argument("--sim-orders", type=int, default=2000)
+    parser.add_argument("--arrival-seconds", type=float, default=150.0)
+    args = parser.parse_args()
+
+    throughput(make_orders(args.orders, seed=1), args.cooks)
+
+    sim_orders = make_orders(args.sim_orders, seed=2, arrival_seconds=args.arrival_seconds)
+    for policy in ("fifo", "heap"):
+        late, avg = simulate(sim_orders, args.cooks, policy)
+        print(f"{policy:<5} late tickets={late:.1%} avg lateness={avg:.1f} min")
+
+
+if __name__ == "__main__":
+    main()
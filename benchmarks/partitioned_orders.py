@@ -0,0 +1,125 @@
+"""Обычная таблица заказов против помесячно секционированной на одинаковых данных.
+
+Нужен PostgreSQL с функцией public.create_monthly_partitions из init-scripts/init_db.sql.
+Таблицы создаются в схеме bench_partitions и удаляются в конце.
+Запуск: python -m benchmarks.partitioned_orders --rows 30000000 --months 36
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from src.database import engine
+
+SCHEMA = "bench_partitions"
+
+COLUMNS = """
+    id BIGINT NOT NULL,
+    user_id INTEGER NOT NULL,
+    total_price INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL
+"""
+
+QUERIES = {
+    "month revenue": """
+        SELECT count(*), sum(total_price) FROM {table}
+        WHERE created_at >= date_trunc('month', now()) - interval '2 months'
+          AND created_at < date_trunc('month', now()) - interval '1 month'
+    """,
+    "user history, 30 days": """
+        SELECT id, total_price FROM {table}
+        WHERE user_id = 4242 AND created_at >= now() - interval '30 days'
+        ORDER BY created_at DESC, id DESC LIMIT 20
+    """,
+    "lookup by id": "SELECT * FROM {table} WHERE id = 123457",
+    "lookup by id + month": """
+        SELECT * FROM {table} WHERE id = 123457
+          AND created_at >= (SELECT created_at FROM {table} WHERE id = 123457) - interval '1 day'
+          AND created_at < (SELECT created_at FROM {table} WHERE id = 123457) + interval '1 day'
+    """,
+}
+
+
+async def timed(conn, sql: str) -> float:
+    started = time.perf_counter()
+    await conn.execute(text(sql))
+    return time.perf_counter() - started
+
+
+async def setup(conn, rows: int, months: int, users: int) -> None:
+    await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    await conn.execute(text(f"CREATE TABLE {SCHEMA}.heap ({COLUMNS}, PRIMARY KEY (id))"))
+    await conn.execute(text(
+        f"CREATE TABLE {SCHEMA}.parted ({COLUMNS}, PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)"
+    ))
+    await conn.execute(text(f"CREATE TABLE {SCHEMA}.parted_default PARTITION OF {SCHEMA}.parted DEFAULT"))
+    await conn.execute(text(
+        "SELECT public.create_monthly_partitions(CAST(:table AS regclass), "
+        "(date_trunc('month', now()) - make_interval(months => :months))::date, :count)"
+    ), {"table": f"{SCHEMA}.parted", "months": months, "count": months + 2})
+
+    # Заказы равномерно распределены по месяцам, id растёт вместе с created_at
+    fill = f"""
+        INSERT INTO {SCHEMA}.{{table}} (id, user_id, total_price, status, created_at)
+        SELECT g, (g::bigint * 7919) % {users} + 1, 500 + g % 3000,
+               CASE WHEN g % 20 = 0 THEN 'cancelled' ELSE 'completed' END,
+               date_trunc('month', now()) - make_interval(months => {months})
+                   + (g::float / {rows}) * (now() - (date_trunc('month', now()) - make_interval(months => {months})))
+        FROM generate_series(1, {rows}) g
+    """
+    for table in ("heap", "parted"):
+        elapsed = await timed(conn, fill.format(table=table))
+        await conn.execute(text(
+            f"CREATE INDEX ON {SCHEMA}.{table} (user_id, created_at DESC, id DESC)"
+        ))
+        await conn.execute(text(f"ANALYZE {SCHEMA}.{table}"))
+        print(f"load {table}: {rows} rows in {elapsed:.1f}s")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--months", type=int, default=36)
+    parser.add_argument("--users", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    async with engine.begin() as conn:
+        await setup(conn, args.rows, args.months, args.users)
+
+    async with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            results = []
+            for table in ("heap", "parted"):
+                query = sql.format(table=f"{SCHEMA}.{table}")
+                await timed(conn, query)
+                best = min([await timed(conn, query) for _ in range(args.repeat)])
+                results.append(f"{table}={best * 1000:.2f}ms")
+            print(f"{name:<24} {' '.join(results)}")
+
+    # Удаление самого старого месяца: DELETE по обычной таблице против DROP секции
+    async with engine.begin() as conn:
+        oldest = f"""
+            created_at < date_trunc('month', now()) - make_interval(months => {args.months - 1})
+        """
+        deleted = await timed(conn, f"DELETE FROM {SCHEMA}.heap WHERE {oldest}")
+        partition = (await conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            f"JOIN pg_namespace n ON n.oid = p.relnamespace "
+            f"WHERE n.nspname = '{SCHEMA}' AND p.relname = 'parted' AND c.relname <> 'parted_default' "
+            "ORDER BY c.relname LIMIT 1"
+        ))).scalar_one()
+        dropped = await timed(conn, f"DROP TABLE {SCHEMA}.{partition}")
+        print(f"drop oldest month: heap DELETE {deleted * 1000:.0f}ms, parted DROP {partition} {dropped * 1000:.1f}ms")
+
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
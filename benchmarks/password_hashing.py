@@ -0,0 +1,63 @@
+"""Проверка паролей при входе: пропускная способность и задержка посторонних запросов того же воркера.
+
+Режим inline — проверка прямо в event loop, как было; executor — в пуле password_executor.
+Пока идут входы, фоновая задача каждые 5 мс делает «лёгкий запрос» и меряет, насколько он опоздал.
+Рост пропускной способности с числом потоков виден только на нескольких ядрах.
+Запуск: python -m benchmarks.password_hashing --logins 200 --concurrency 32 --mode executor
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.hedged_requests import percentile
+from src.core.security import check_password, get_password_hash, password_executor, verify_and_update_password
+
+
+async def probe(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.005)
+        lags.append((time.perf_counter() - started - 0.005) * 1000)
+
+
+async def run(mode: str, logins: int, concurrency: int, hashed: str) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            if mode == "inline":
+                valid, _ = verify_and_update_password("secret", hashed)
+            else:
+                valid, _ = await check_password("secret", hashed)
+            assert valid
+
+    lags = []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await prober
+    print(
+        f"{mode:<8} {logins / elapsed:6.1f} logins/s, lag of unrelated requests "
+        f"p50={percentile(lags, 0.50):6.1f}ms p99={percentile(lags, 0.99):6.1f}ms max={max(lags):6.1f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mode", choices=["inline", "executor", "both"], default="both")
+    args = parser.parse_args()
+
+    hashed = get_password_hash("secret")
+    print(f"scheme={hashed.split('$')[1]}, workers={password_executor._max_workers}")
+    for mode in (["inline", "executor"] if args.mode == "both" else [args.mode]):
+        await run(mode, args.logins, args.concurrency, hashed)
+    password_executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+"""Путь платежа через симулятор шлюза: создание, доставка webhook, запрос статуса.
+
+Симулятор и приёмник webhook поднимаются в этом же процессе на localhost через uvicorn,
+клиент — GatewayClient с общим пулом соединений, как в payment-service. Всё делит одно ядро,
+поэтому при большой конкурентности задержки упираются в CPU, а не в распределение симулятора.
+Запуск: python -m benchmarks.payment_gateway --payments 2000 --concurrency 20 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+from benchmarks.hedged_requests import percentile
+from src.infrastructure.services.gateway_payment import GatewayClient, verify_webhook_signature
+from src.infrastructure.services.gateway_simulator import GatewaySimulator, Latency
+from src.interfaces.routers.gateway_sim import get_simulator, router as gateway_router
+
+
+def webhook_receiver(received: Counter) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/webhook")
+    async def webhook(request: Request):
+        body = await request.body()
+        if not verify_webhook_signature(body, request.headers.get("Content-HMAC")):
+            received["bad_signature"] += 1
+            return Response(status_code=401)
+        received["total"] += 1
+        received[f"tx:{(await request.json())['transaction_id']}"] += 1
+        return {"code": 0}
+
+    return app
+
+
+async def serve(app: FastAPI, port: int) -> uvicorn.Server:
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False, timeout_keep_alive=30)
+    server = uvicorn.Server(config)
+    asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server
+
+
+def report(name: str, latencies: list[float]) -> None:
+    print(
+        f"{name:<8} p50={percentile(latencies, 0.50):7.1f}ms "
+        f"p95={percentile(latencies, 0.95):7.1f}ms "
+        f"p99={percentile(latencies, 0.99):7.1f}ms "
+        f"mean={statistics.mean(latencies):7.1f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--payments", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, nargs=2, default=[80, 400], metavar=("P50", "P99"))
+    parser.add_argument("--webhook-delay-ms", type=float, nargs=2, default=[200, 1000], metavar=("P50", "P99"))
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--decline-rate", type=float, default=0.05)
+    parser.add_argument("--duplicate-rate", type=float, default=0.02)
+    parser.add_argument("--port", type=int, default=8710)
+    args = parser.parse_args()
+
+    received = Counter()
+    simulator = GatewaySimulator(
+        latency=Latency(*args.latency_ms),
+        webhook_delay=Latency(*args.webhook_delay_ms),
+        webhook_url=f"http://127.0.0.1:{args.port + 1}/webhook",
+        error_rate=args.error_rate,
+        decline_rate=args.decline_rate,
+        duplicate_webhook_rate=args.duplicate_rate,
+        seed=42
+    )
+    gateway_app = FastAPI()
+    gateway_app.include_router(gateway_router)
+    gateway_app.dependency_overrides[get_simulator] = lambda: simulator
+    servers = [await serve(gateway_app, args.port), await serve(webhook_receiver(received), args.port + 1)]
+
+    client = GatewayClient(f"http://127.0.0.1:{args.port}", max_connections=args.concurrency)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    create_latencies, status_latencies = [], []
+    transactions = []
+
+    async def create(invoice_id: int):
+        async with semaphore:
+            started = time.perf_counter()
+            result = await client.create_payment(1000, invoice_id)
+            create_latencies.append((time.perf_counter() - started) * 1000)
+            if result.get("success"):
+                transactions.append(result["transaction_id"])
+
+    async def status(transaction_id: str):
+        async with semaphore:
+            started = time.perf_counter()
+            await client.fetch(transaction_id)
+            status_latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(create(invoice_id) for invoice_id in range(1, args.payments + 1)))
+    elapsed = time.perf_counter() - started
+    print(f"created {len(transactions)}/{args.payments} in {elapsed:.1f}s ({args.payments / elapsed:,.0f}/s), "
+          f"gateway errors {args.payments - len(transactions)}")
+    report("create", create_latencies)
+
+    await asyncio.gather(*(status(transaction_id) for transaction_id in transactions))
+    report("status", status_latencies)
+
+    # Ждём, пока симулятор разошлёт итоговые статусы (с повторами)
+    deadline = time.monotonic() + 30
+    while simulator._deliveries and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    duplicated = sum(1 for key, count in received.items() if key.startswith("tx:") and count > 1)
+    print(f"webhooks received={received['total']} for {len(transactions)} payments, "
+          f"duplicated transactions={duplicated}, bad signatures={received['bad_signature']}")
+    print("simulator:", dict(simulator.stats))
+
+    await client.close()
+    await simulator.close()
+    for server in servers:
+        server.should_exit = True
+    await asyncio.sleep(0.2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
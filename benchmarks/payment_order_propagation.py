@@ -0,0 +1,110 @@
+"""Результаты оплаты -> статусы заказов: число запросов к БД и время на всплеск подтверждений.
+
+Нужен PostgreSQL со схемой orders. Тестовые заказы создаются с total_price = -1 и удаляются в конце.
+Сравнивается обработка по одному событию (--batch-size 1) и пачками, как в consume_batch.
+Запуск: DATABASE_SCHEMA=orders python -m benchmarks.payment_order_propagation --events 10000 --batch-size 200
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy import event, text
+
+from src.database import async_session, engine
+from src.infrastructure.services.order_saga import OrderSagaOrchestrator
+from src.rabbitmq import EventType
+
+CLEANUP = (
+    "DELETE FROM orders.order_events WHERE order_id IN (SELECT id FROM orders.orders WHERE total_price = -1)",
+    "DELETE FROM orders.order_current_status WHERE order_id IN (SELECT id FROM orders.orders WHERE total_price = -1)",
+    "DELETE FROM orders.sagas WHERE order_id IN (SELECT id FROM orders.orders WHERE total_price = -1)",
+    "DELETE FROM public.outbox WHERE event_type LIKE 'order.%' AND (payload->>'order_id')::int "
+    "IN (SELECT id FROM orders.orders WHERE total_price = -1)",
+    "DELETE FROM orders.orders WHERE total_price = -1",
+)
+
+
+async def cleanup() -> None:
+    async with async_session() as session:
+        for statement in CLEANUP:
+            await session.execute(text(statement))
+        await session.commit()
+
+
+async def seed(count: int) -> list[int]:
+    async with async_session() as session:
+        order_ids = (await session.execute(text("""
+            INSERT INTO orders.orders (user_id, total_price, status, created_at, updated_at)
+            SELECT 1, -1, 'pending', now(), now() FROM generate_series(1, :count)
+            RETURNING id
+        """), {"count": count})).scalars().all()
+        await session.execute(text("""
+            INSERT INTO orders.sagas (order_id, step, status, compensations, payload)
+            SELECT id, 'await_payment', 'running', '["menu.release"]', '{"user_id": 1, "items": []}'
+            FROM orders.orders WHERE total_price = -1
+        """))
+        await session.execute(text("""
+            INSERT INTO orders.order_current_status (order_id, user_id, status, updated_at)
+            SELECT id, 1, 'pending', now() FROM orders.orders WHERE total_price = -1
+        """))
+        await session.commit()
+    return list(order_ids)
+
+
+def payment_events(order_ids: list[int], failed_ratio: float, duplicate_ratio: float) -> list:
+    rng = random.Random(42)
+    events = []
+    for order_id in order_ids:
+        event_type = EventType.PAYMENT_FAILED if rng.random() < failed_ratio else EventType.PAYMENT_COMPLETED
+        data = {"order_id": order_id, "payment_id": order_id, "status": "COMPLETED"}
+        events.append((data, event_type))
+        if rng.random() < duplicate_ratio:
+            events.append((data, event_type))
+    return events
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--failed-ratio", type=float, default=0.05)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.02)
+    args = parser.parse_args()
+
+    statements = 0
+
+    def count_statement(*_):
+        nonlocal statements
+        statements += 1
+
+    await cleanup()
+    order_ids = await seed(args.events)
+    events = payment_events(order_ids, args.failed_ratio, args.duplicate_ratio)
+    orchestrator = OrderSagaOrchestrator()
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_statement)
+    started = time.perf_counter()
+    for i in range(0, len(events), args.batch_size):
+        await orchestrator.handle_payment_batch(events[i:i + args.batch_size])
+    elapsed = time.perf_counter() - started
+    event.remove(engine.sync_engine, "before_cursor_execute", count_statement)
+
+    print(f"batch_size={args.batch_size}: {len(events)} events in {elapsed:.1f}s "
+          f"({len(events) / elapsed:,.0f}/s), {statements} statements")
+    async with async_session() as session:
+        rows = (await session.execute(text(
+            "SELECT status, count(*) FROM orders.orders WHERE total_price = -1 GROUP BY status ORDER BY status"
+        ))).all()
+        outbox = (await session.execute(text(
+            "SELECT event_type, count(*) FROM public.outbox WHERE event_type LIKE 'order.%' "
+            "AND (payload->>'order_id')::int IN (SELECT id FROM orders.orders WHERE total_price = -1) GROUP BY event_type"
+        ))).all()
+    print("orders:", {str(status): count for status, count in rows}, "outbox:", dict(outbox))
+
+    await cleanup()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""Сверка зависших PENDING-платежей со шлюзом: время на 100k платежей.
+
+Нужен PostgreSQL со схемой payments. Тестовые платежи создаются с отрицательным invoice_id и удаляются в конце.
+Без --gateway-url шлюз заменяет заглушка в процессе с задержкой --latency-ms на запрос.
+Запуск: DATABASE_SCHEMA=payments python -m benchmarks.payment_reconciliation --payments 100000 --concurrency 100
+"""
+import argparse
+import asyncio
+import datetime
+import time
+
+from sqlalchemy import text
+
+import src.infrastructure.services.payment_reconciler as payment_reconciler
+from src.database import async_session, engine
+from src.infrastructure.services.gateway_payment import GatewayClient
+from src.infrastructure.services.payment_reconciler import PaymentReconciler
+
+
+async def no_cache(*args, **kwargs):
+    return None
+
+
+def stub_gateway(latency: float):
+    # Детерминированный ответ по номеру транзакции: 70% оплачено, 20% отклонено, 10% ещё ждёт
+    async def fetch(transaction_id: str) -> dict:
+        await asyncio.sleep(latency)
+        number = int(transaction_id.rsplit("-", 1)[1])
+        status = "completed" if number % 10 < 7 else "declined" if number % 10 < 9 else "pending"
+        return {"transaction_id": transaction_id, "status": status}
+    return fetch
+
+
+async def cleanup() -> None:
+    async with async_session() as session:
+        await session.execute(text("DELETE FROM payments.payments WHERE invoice_id < 0"))
+        await session.execute(text(
+            "DELETE FROM public.outbox WHERE event_type LIKE 'payment.%' AND (payload->>'order_id')::int < 0"
+        ))
+        await session.commit()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--payments", type=int, default=100000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--gateway-url", default="")
+    args = parser.parse_args()
+
+    payment_reconciler.invalidate_cache = no_cache
+    await cleanup()
+    async with async_session() as session:
+        await session.execute(text("""
+            INSERT INTO payments.payments (invoice_id, amount, status, transaction_id, created_at, updated_at)
+            SELECT -g, 1000 + g % 5000, 'PENDING', 'bench-' || g, now() - interval '1 day', now() - interval '1 day'
+            FROM generate_series(1, :count) g
+        """), {"count": args.payments})
+        await session.commit()
+    print(f"seeded {args.payments} pending payments")
+
+    client = GatewayClient(args.gateway_url, max_connections=args.concurrency)
+    fetch = client.fetch if args.gateway_url else stub_gateway(args.latency_ms / 1000)
+    reconciler = PaymentReconciler(
+        fetch,
+        page_size=args.page_size,
+        concurrency=args.concurrency,
+        stale_after=3600
+    )
+    started = time.perf_counter()
+    report = await reconciler.reconcile_once()
+    elapsed = time.perf_counter() - started
+    print(f"reconcile: checked={report.checked} corrected={report.corrected} "
+          f"pending={report.still_pending} errors={report.errors} "
+          f"in {elapsed:.1f}s ({report.checked / elapsed:,.0f}/s)")
+
+    async with async_session() as session:
+        rows = (await session.execute(text(
+            "SELECT status, count(*) FROM payments.payments WHERE invoice_id < 0 GROUP BY status ORDER BY status"
+        ))).all()
+    print("statuses:", {str(status): count for status, count in rows})
+
+    await client.close()
+    await cleanup()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
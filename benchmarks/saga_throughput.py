@@ -0,0 +1,164 @@
+"""Пропускная способность саги оформления заказа и восстановление после рестарта.
+
+Брокер заменён очередью asyncio: «меню» и «платёжка» отвечают на события саги,
+часть ответов теряется, и такие саги закрывает проверка дедлайнов.
+Нужен PostgreSQL со схемой из init-scripts; заказы и саги остаются в базе,
+поэтому запускайте на отдельной базе.
+Запуск: python -m benchmarks.saga_throughput --sagas 5000 --workers 32
+"""
+import argparse
+import asyncio
+import datetime
+import random
+import time
+
+from sqlalchemy import func, insert, select
+
+from src.database import async_session
+from src.infrastructure.models.order import Order, OrderStatus
+from src.infrastructure.models.saga import Saga, SagaStatus
+from src.infrastructure.repositories.saga import SagaRepository
+from src.infrastructure.services.order_saga import OrderSagaOrchestrator
+from src.rabbitmq import EventType
+
+
+async def seed(count: int, user_id: int, timeout: float) -> list[int]:
+    now = datetime.datetime.now()
+    order_ids = []
+    async with async_session() as session:
+        for chunk in range(0, count, 1000):
+            size = min(1000, count - chunk)
+            ids = (await session.execute(
+                insert(Order).returning(Order.id),
+                [
+                    {"user_id": user_id, "total_price": 1000, "status": OrderStatus.PENDING,
+                     "created_at": now, "updated_at": now}
+                    for _ in range(size)
+                ]
+            )).scalars().all()
+            repo = SagaRepository(session)
+            for order_id in ids:
+                await repo.start(order_id, {"user_id": user_id, "items": [{"dish_id": 1, "quantity": 1}]}, timeout)
+            await session.commit()
+            order_ids.extend(ids)
+    return order_ids
+
+
+class Broker:
+    """Очередь с подтверждением: необработанное сообщение возвращается при остановке воркера."""
+
+    def __init__(self, drop_rate: float, fail_rate: float, seed: int):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.rng = random.Random(seed)
+        self.drop_rate = drop_rate
+        self.fail_rate = fail_rate
+        self.handled = 0
+
+    def reply(self, success: EventType, failure: EventType, order_id: int) -> None:
+        if self.rng.random() < self.drop_rate:
+            return
+        event = failure if self.rng.random() < self.fail_rate else success
+        self.queue.put_nowait((event, order_id))
+
+    async def worker(self, orchestrator: OrderSagaOrchestrator) -> None:
+        while True:
+            event, order_id = await self.queue.get()
+            try:
+                await orchestrator.handle_event({"order_id": order_id}, event)
+            except asyncio.CancelledError:
+                # Неподтверждённое сообщение брокер доставит повторно
+                self.queue.put_nowait((event, order_id))
+                self.queue.task_done()
+                raise
+            self.handled += 1
+            if event == EventType.MENU_RESERVED:
+                self.reply(EventType.PAYMENT_COMPLETED, EventType.PAYMENT_FAILED, order_id)
+            self.queue.task_done()
+
+
+async def running_sagas(order_ids: list[int]) -> int:
+    async with async_session() as session:
+        return (await session.execute(
+            select(func.count())
+            .select_from(Saga)
+            .where(Saga.order_id.in_(order_ids), Saga.status == SagaStatus.RUNNING.value)
+        )).scalar_one()
+
+
+async def run_until_done(
+    broker: Broker,
+    orchestrator: OrderSagaOrchestrator,
+    workers: int,
+    order_ids: list[int]
+) -> tuple[float, float]:
+    """Возвращает время разбора очереди событий и время до закрытия последней саги."""
+    started = time.perf_counter()
+    handled = broker.handled
+    tasks = [asyncio.create_task(broker.worker(orchestrator)) for _ in range(workers)]
+    tasks.append(asyncio.create_task(orchestrator.run_sweeper()))
+    await broker.queue.join()
+    drained = time.perf_counter() - started
+    while await running_sagas(order_ids):
+        await asyncio.sleep(0.2)
+    elapsed = time.perf_counter() - started
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    print(f"  events: {broker.handled - handled} in {drained:.2f}s "
+          f"({(broker.handled - handled) / max(drained, 1e-9):,.0f}/s)")
+    return drained, elapsed
+
+
+async def summary(order_ids: list[int]) -> str:
+    async with async_session() as session:
+        rows = (await session.execute(
+            select(Saga.status, func.count())
+            .where(Saga.order_id.in_(order_ids))
+            .group_by(Saga.status)
+        )).all()
+    return ", ".join(f"{status}={count}" for status, count in sorted(rows))
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sagas", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--drop-rate", type=float, default=0.02)
+    parser.add_argument("--fail-rate", type=float, default=0.05)
+    parser.add_argument("--crash-after", type=float, default=0.5,
+                        help="доля обработанных событий до остановки воркеров во втором прогоне")
+    args = parser.parse_args()
+
+    def orchestrator():
+        return OrderSagaOrchestrator(payment_timeout=args.timeout, sweep_batch_size=500, sweep_interval=0.2)
+
+    order_ids = await seed(args.sagas, args.user_id, args.timeout)
+    broker = Broker(args.drop_rate, args.fail_rate, seed=1)
+    for order_id in order_ids:
+        broker.reply(EventType.MENU_RESERVED, EventType.MENU_FAILED, order_id)
+    _, elapsed = await run_until_done(broker, orchestrator(), args.workers, order_ids)
+    print(f"steady: {args.sagas} sagas closed in {elapsed:.2f}s incl. {args.timeout:.0f}s timeouts; "
+          f"{await summary(order_ids)}")
+
+    order_ids = await seed(args.sagas, args.user_id, args.timeout)
+    broker = Broker(args.drop_rate, args.fail_rate, seed=2)
+    for order_id in order_ids:
+        broker.reply(EventType.MENU_RESERVED, EventType.MENU_FAILED, order_id)
+    tasks = [asyncio.create_task(broker.worker(orchestrator())) for _ in range(args.workers)]
+    while broker.handled < args.sagas * args.crash_after:
+        await asyncio.sleep(0.01)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    left = await running_sagas(order_ids)
+    print(f"crash: stopped after {broker.handled} events, running sagas={left}, queued events={broker.queue.qsize()}")
+
+    # Новый процесс ничего не знает о прежнем: состояние берётся только из таблицы саг
+    _, elapsed = await run_until_done(broker, orchestrator(), args.workers, order_ids)
+    print(f"recovery: all sagas closed in {elapsed:.2f}s; {await summary(order_ids)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
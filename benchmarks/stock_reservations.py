@@ -0,0 +1,90 @@
+"""Резервирование остатков в час пик: скорость Lua-резерва и отсутствие перепродаж.
+
+Нужен запущенный Redis; ключи stock:* в выбранной базе будут удалены.
+Запуск: python -m benchmarks.stock_reservations --redis-url redis://localhost:6379/15 --orders 50000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from redis.asyncio import Redis
+
+from src.infrastructure.services.stock import RedisStockStore
+
+
+async def clear(redis: Redis) -> None:
+    keys = [key async for key in redis.scan_iter("stock:*")]
+    if keys:
+        await redis.delete(*keys)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--orders", type=int, default=50000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--dishes", type=int, default=40)
+    parser.add_argument("--hot-dishes", type=int, default=5)
+    parser.add_argument("--stock", type=int, default=2000)
+    parser.add_argument("--abandon-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    redis = Redis.from_url(args.redis_url, decode_responses=True)
+    await clear(redis)
+    store = RedisStockStore(redis, reservation_ttl=3600)
+    # Ограничены только «горячие» позиции, на них и приходится вся конкуренция
+    initial = {dish_id: args.stock for dish_id in range(1, args.hot_dishes + 1)}
+    await store.load(initial)
+
+    rng = random.Random(3)
+    orders = [
+        {rng.randint(1, args.dishes) if rng.random() > 0.5 else rng.randint(1, args.hot_dishes): rng.randint(1, 3)
+         for _ in range(rng.randint(1, 4))}
+        for _ in range(args.orders)
+    ]
+    semaphore = asyncio.Semaphore(args.concurrency)
+    reserved: dict[int, dict[int, int]] = {}
+    rejected = 0
+
+    async def one(order_id: int, items: dict[int, int]):
+        nonlocal rejected
+        async with semaphore:
+            if await store.reserve(order_id, items) is None:
+                reserved[order_id] = items
+            else:
+                rejected += 1
+
+    started = time.perf_counter()
+    for chunk in range(0, args.orders, 10000):
+        await asyncio.gather(*(one(i, orders[i]) for i in range(chunk, min(chunk + 10000, args.orders))))
+    elapsed = time.perf_counter() - started
+    print(f"reserve: {args.orders} orders in {elapsed:.2f}s ({args.orders / elapsed:,.0f}/s), "
+          f"reserved={len(reserved)} rejected={rejected}")
+
+    abandoned = [order_id for order_id in reserved if rng.random() < args.abandon_rate]
+    abandoned_set = set(abandoned)
+    started = time.perf_counter()
+    await asyncio.gather(*(store.release(order_id) for order_id in abandoned))
+    await asyncio.gather(*(store.commit(order_id) for order_id in reserved if order_id not in abandoned_set))
+    elapsed = time.perf_counter() - started
+    print(f"settle: {len(reserved)} reservations in {elapsed:.2f}s ({len(reserved) / max(elapsed, 1e-9):,.0f}/s)")
+
+    # Проданное плюс остаток должно в точности совпасть с исходным запасом
+    sold = {dish_id: 0 for dish_id in initial}
+    for order_id, items in reserved.items():
+        if order_id in abandoned_set:
+            continue
+        for dish_id, quantity in items.items():
+            if dish_id in sold:
+                sold[dish_id] += quantity
+    levels = await store.levels()
+    oversold = [dish_id for dish_id in initial if sold[dish_id] + levels[dish_id] != initial[dish_id] or levels[dish_id] < 0]
+    print(f"check: sold={sold} left={levels} mismatched={oversold or 'none'}")
+
+    await clear(redis)
+    await redis.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
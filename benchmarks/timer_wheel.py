@@ -0,0 +1,75 @@
+"""Нагрузка на таймеры отложенных событий: вставка и пакетная выборка наступивших.
+
+Нужен запущенный Redis; ключи timers:* в выбранной базе будут удалены.
+Запуск: python -m benchmarks.timer_wheel --redis-url redis://localhost:6379/15 --timers 1000000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from redis.asyncio import Redis
+
+from src.infrastructure.services.delayed_scheduler import DelayedDispatcher, RedisTimerWheel
+from src.rabbitmq import EventType
+
+
+class NullPublisher:
+    def __init__(self):
+        self.published = 0
+
+    async def publish_event(self, event_type, data, exchange_name, routing_key, message_id):
+        self.published += 1
+
+
+async def fill(wheel: RedisTimerWheel, timers: int, concurrency: int, horizon: float) -> float:
+    rng = random.Random(7)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            # Половина таймеров уже наступила, остальные разбросаны по горизонту
+            delay = -1.0 if i % 2 else rng.uniform(0, horizon)
+            await wheel.schedule(EventType.ORDER_DELAYED, {"order_id": i}, delay=delay)
+
+    started = time.perf_counter()
+    for chunk in range(0, timers, 10000):
+        await asyncio.gather(*(one(i) for i in range(chunk, min(chunk + 10000, timers))))
+    return time.perf_counter() - started
+
+
+async def drain(wheel: RedisTimerWheel, batch_size: int) -> tuple[int, float]:
+    publisher = NullPublisher()
+    dispatcher = DelayedDispatcher(wheel, publisher, batch_size=batch_size)
+    started = time.perf_counter()
+    while await dispatcher.dispatch_once():
+        pass
+    return publisher.published, time.perf_counter() - started
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--timers", type=int, default=200000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--horizon", type=float, default=3600.0)
+    args = parser.parse_args()
+
+    redis = Redis.from_url(args.redis_url, decode_responses=True)
+    await redis.delete(RedisTimerWheel.DUE_KEY, RedisTimerWheel.INFLIGHT_KEY, RedisTimerWheel.PAYLOAD_KEY)
+    wheel = RedisTimerWheel(redis)
+
+    elapsed = await fill(wheel, args.timers, args.concurrency, args.horizon)
+    print(f"schedule: {args.timers} timers in {elapsed:.2f}s ({args.timers / elapsed:,.0f}/s)")
+
+    published, elapsed = await drain(wheel, args.batch_size)
+    print(f"dispatch: {published} due timers in {elapsed:.2f}s ({published / max(elapsed, 1e-9):,.0f}/s), "
+          f"still pending: {await wheel.pending()}")
+
+    await redis.delete(RedisTimerWheel.DUE_KEY, RedisTimerWheel.INFLIGHT_KEY, RedisTimerWheel.PAYLOAD_KEY)
+    await redis.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
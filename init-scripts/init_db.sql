@@ -4,14 +4,90 @@ DROP SCHEMA IF EXISTS account CASCADE;
 DROP SCHEMA IF EXISTS menu CASCADE;
 DROP SCHEMA IF EXISTS orders CASCADE;
 DROP SCHEMA IF EXISTS payments CASCADE;
+DROP SCHEMA IF EXISTS analytics CASCADE;
 
 -- Создаем новые схемы
 CREATE SCHEMA account;
 CREATE SCHEMA menu;
 CREATE SCHEMA orders;
 CREATE SCHEMA payments;
+CREATE SCHEMA analytics;
 CREATE SCHEMA public;
 
+-- Создаёт помесячные секции [start_month, start_month + months) секционированной таблицы.
+-- Существующие секции пропускаются, границы месяцев считаются в UTC
+CREATE FUNCTION public.create_monthly_partitions(parent regclass, start_month date, months integer)
+RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    parent_schema text;
+    parent_name text;
+    month_start timestamp;
+    partition_name text;
+    created integer := 0;
+BEGIN
+    -- Несколько сервисов могут создавать секции одновременно
+    PERFORM pg_advisory_xact_lock(hashtext(parent::text));
+    SELECT n.nspname, c.relname INTO parent_schema, parent_name
+    FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.oid = parent;
+
+    FOR i IN 0 .. months - 1 LOOP
+        month_start := date_trunc('month', start_month) + make_interval(months => i);
+        partition_name := parent_name || '_' || to_char(month_start, 'YYYY_MM');
+        CONTINUE WHEN to_regclass(format('%I.%I', parent_schema, partition_name)) IS NOT NULL;
+        EXECUTE format(
+            'CREATE TABLE %I.%I PARTITION OF %s FOR VALUES FROM (%L) TO (%L)',
+            parent_schema, partition_name, parent,
+            month_start AT TIME ZONE 'UTC',
+            (month_start + interval '1 month') AT TIME ZONE 'UTC'
+        );
+        created := created + 1;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+-- Удаляет пустые помесячные секции, целиком лежащие раньше before: после архивации
+-- старые месяцы не остаются пустыми таблицами в горячей схеме
+CREATE FUNCTION public.drop_empty_partitions(parent regclass, before timestamp with time zone)
+RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    child regclass;
+    upper_bound timestamp with time zone;
+    has_rows boolean;
+    locked boolean := false;
+    dropped integer := 0;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext(parent::text));
+    -- DEFAULT-секция не имеет верхней границы и не удаляется
+    FOR child, upper_bound IN
+        SELECT i.inhrelid::regclass,
+               substring(pg_get_expr(c.relpartbound, c.oid) FROM 'TO \(''([^'']+)''\)')::timestamptz
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = parent
+        ORDER BY 2
+    LOOP
+        CONTINUE WHEN upper_bound IS NULL OR upper_bound > before;
+        EXECUTE format('SELECT EXISTS (SELECT 1 FROM %s)', child) INTO has_rows;
+        CONTINUE WHEN has_rows;
+        -- Родитель блокируется только когда есть что удалять и ненадолго: при очереди на блокировку
+        -- транзакция падает по lock_timeout и повторится при следующем запуске
+        IF NOT locked THEN
+            PERFORM set_config('lock_timeout', '2s', true);
+            EXECUTE format('LOCK TABLE %s IN ACCESS EXCLUSIVE MODE', parent);
+            locked := true;
+            EXECUTE format('SELECT EXISTS (SELECT 1 FROM %s)', child) INTO has_rows;
+            CONTINUE WHEN has_rows;
+        END IF;
+        EXECUTE format('DROP TABLE %s', child);
+        dropped := dropped + 1;
+    END LOOP;
+    RETURN dropped;
+END;
+$$;
+
 -- Создаем таблицу пользователей в схеме account
 CREATE TABLE account.users (
     id SERIAL PRIMARY KEY,
@@ -45,6 +121,7 @@ CREATE TABLE menu.dishes (
     description TEXT,
     price INTEGER NOT NULL,
     is_available BOOLEAN DEFAULT TRUE,
+    stock INTEGER CHECK (stock >= 0),
     category_id INTEGER REFERENCES menu.categories(id),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
@@ -58,14 +135,18 @@ CREATE TABLE menu.dish_tags (
 -- Создаем таблицы заказов в схеме orders
 CREATE TYPE orders.order_status AS ENUM ('pending', 'processing', 'completed', 'cancelled');
 
+-- Заказы, позиции и платежи секционированы по месяцам created_at.
+-- Ключ секционирования входит в PK, поэтому внешние ключи на orders.orders(id) невозможны:
+-- целостность держит приложение, id уникален по последовательности
 CREATE TABLE orders.orders (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     user_id INTEGER REFERENCES account.users(id),
     total_price INTEGER NOT NULL,
     status orders.order_status NOT NULL,
     created_at TIMESTAMP WITH TIME ZONE NOT NULL,
-    updated_at TIMESTAMP WITH TIME ZONE NOT NULL
-);
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
 
 CREATE TABLE orders.baskets (
     id SERIAL PRIMARY KEY,
@@ -76,13 +157,57 @@ CREATE TABLE orders.baskets (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- created_at позиции совпадает с created_at заказа: позиции лежат в секции того же месяца
 CREATE TABLE orders.order_items (
-    id SERIAL PRIMARY KEY,
-    order_id INTEGER REFERENCES orders.orders(id),
+    id SERIAL,
+    order_id INTEGER NOT NULL,
     dish_id INTEGER REFERENCES menu.dishes(id),
     quantity INTEGER NOT NULL,
     price INTEGER NOT NULL,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Журнал переходов статусов заказа (только вставки)
+CREATE TABLE orders.order_events (
+    id BIGSERIAL PRIMARY KEY,
+    order_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    from_status orders.order_status,
+    to_status orders.order_status NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    -- Транзакция, записавшая событие: по ней агрегаты продаж идут только за закоммиченным фронтом
+    txid BIGINT NOT NULL DEFAULT pg_current_xact_id()::text::bigint
+);
+
+-- Проекции журнала, обновляются в той же транзакции, что и событие
+CREATE TABLE orders.order_current_status (
+    order_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    status orders.order_status NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- Счётчик разбит на шарды, чтобы параллельные заказы не ждали одну строку
+CREATE TABLE orders.order_status_counts (
+    status orders.order_status NOT NULL,
+    shard SMALLINT NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (status, shard)
+);
+
+-- Состояние саги оформления заказа: текущий шаг, дедлайн и накопленные компенсации
+CREATE TABLE orders.sagas (
+    id BIGSERIAL PRIMARY KEY,
+    order_id INTEGER NOT NULL UNIQUE,
+    step VARCHAR(32) NOT NULL,
+    status VARCHAR(16) NOT NULL,
+    deadline_at TIMESTAMP WITH TIME ZONE,
+    compensations JSONB NOT NULL DEFAULT '[]',
+    payload JSONB NOT NULL DEFAULT '{}',
+    error VARCHAR(255),
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Создаем тип ENUM для статуса платежа
@@ -90,19 +215,117 @@ CREATE TYPE payments.paymentstatus AS ENUM ('PENDING', 'COMPLETED', 'FAILED', 'C
 
 -- Создаем таблицы платежей в схеме payments
 CREATE TABLE payments.payments (
-    id SERIAL PRIMARY KEY,
-    invoice_id INTEGER REFERENCES orders.orders(id),
+    id SERIAL,
+    invoice_id INTEGER NOT NULL,
     amount INTEGER NOT NULL,
     status payments.paymentstatus NOT NULL,
     transaction_id VARCHAR(255),
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- DEFAULT-секции ловят строки вне созданных месяцев и должны оставаться пустыми:
+-- секции на год назад и несколько месяцев вперёд, дальше их досоздаёт PartitionManager
+CREATE TABLE orders.orders_default PARTITION OF orders.orders DEFAULT;
+CREATE TABLE orders.order_items_default PARTITION OF orders.order_items DEFAULT;
+CREATE TABLE payments.payments_default PARTITION OF payments.payments DEFAULT;
+SELECT public.create_monthly_partitions('orders.orders', (CURRENT_DATE - INTERVAL '12 months')::date, 16);
+SELECT public.create_monthly_partitions('orders.order_items', (CURRENT_DATE - INTERVAL '12 months')::date, 16);
+SELECT public.create_monthly_partitions('payments.payments', (CURRENT_DATE - INTERVAL '12 months')::date, 16);
+
+-- Уникальность платежа на заказ: на секционированной payments.payments уникальный ключ
+-- без created_at невозможен, поэтому заказ «занимается» строкой здесь в том же запросе, что создаёт платёж
+CREATE TABLE payments.payment_invoices (
+    invoice_id INTEGER PRIMARY KEY,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Входящие webhook платёжного шлюза: запись по transaction_id отбрасывает повторные доставки,
+-- статусы платежей применяет фоновый обработчик пачками
+CREATE TABLE payments.webhook_inbox (
+    transaction_id VARCHAR(255) PRIMARY KEY,
+    invoice_id INTEGER,
+    status VARCHAR(32) NOT NULL,
+    payload JSONB NOT NULL,
+    received_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    processed_at TIMESTAMP WITH TIME ZONE,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error VARCHAR(255)
 );
 
+-- Архив завершённых заказов и платежей: строка целиком (с позициями и журналом статусов) в JSONB-документе.
+-- Горячие таблицы не растут с возрастом бизнеса, а архивный заказ находится по PK
+CREATE TABLE orders.orders_archive (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    status orders.order_status NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    archived_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    document JSONB NOT NULL
+);
+
+CREATE TABLE payments.payments_archive (
+    id INTEGER PRIMARY KEY,
+    invoice_id INTEGER NOT NULL,
+    status payments.paymentstatus NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    archived_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    document JSONB NOT NULL
+);
+
+-- Transactional outbox: события пишутся в одной транзакции с изменениями
+-- и публикуются в RabbitMQ фоновым relay
+CREATE TABLE public.outbox (
+    id BIGSERIAL PRIMARY KEY,
+    exchange VARCHAR(255) NOT NULL,
+    routing_key VARCHAR(255) NOT NULL,
+    event_type VARCHAR(255) NOT NULL,
+    payload JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Агрегаты продаж, пополняются инкрементально из orders.order_events
+CREATE TABLE analytics.sales_hourly (
+    bucket TIMESTAMP WITH TIME ZONE PRIMARY KEY,
+    orders_count BIGINT NOT NULL DEFAULT 0,
+    revenue BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE analytics.sales_daily_dish (
+    day DATE NOT NULL,
+    dish_id INTEGER NOT NULL,
+    category_id INTEGER,
+    quantity BIGINT NOT NULL DEFAULT 0,
+    revenue BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, dish_id)
+);
+
+CREATE TABLE analytics.watermarks (
+    name VARCHAR(64) PRIMARY KEY,
+    last_id BIGINT NOT NULL DEFAULT 0,
+    last_txid BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO analytics.watermarks (name, last_id) VALUES ('sales', 0);
+
 -- Добавляем индексы для оптимизации
 CREATE INDEX idx_users_email ON account.users(email);
 CREATE INDEX idx_users_phone ON account.users(number_phone);
 CREATE INDEX idx_dishes_category ON menu.dishes(category_id);
-CREATE INDEX idx_orders_user ON orders.orders(user_id);
+-- История заказов пользователя: фильтр по user_id и keyset-пагинация по (created_at, id)
+CREATE INDEX idx_orders_user_created ON orders.orders(user_id, created_at DESC, id DESC);
+-- Индексы на секционированных таблицах создаются в каждой секции
 CREATE INDEX idx_order_items_order ON orders.order_items(order_id);
+CREATE INDEX idx_order_events_order ON orders.order_events(order_id, id);
+CREATE INDEX idx_order_events_txid ON orders.order_events(txid, id);
+CREATE INDEX idx_order_current_status_open ON orders.order_current_status(user_id, order_id)
+    WHERE status IN ('pending', 'processing');
+CREATE INDEX idx_sagas_deadline ON orders.sagas(deadline_at) WHERE status = 'running';
 CREATE INDEX idx_payments_invoice ON payments.payments(invoice_id);
+-- Сверка зависших платежей идёт по id keyset-страницами только среди PENDING
+CREATE INDEX idx_payments_pending ON payments.payments(id) WHERE status = 'PENDING';
+CREATE INDEX idx_payments_archive_invoice ON payments.payments_archive(invoice_id);
+CREATE INDEX idx_webhook_inbox_pending ON payments.webhook_inbox(received_at) WHERE processed_at IS NULL;
+CREATE INDEX idx_sales_daily_dish_category ON analytics.sales_daily_dish(day, category_id);
@@ -0,0 +1,162 @@
+-- Перевод orders.orders, orders.order_items и payments.payments на помесячное секционирование по created_at.
+-- Данные копируются в новые таблицы в одной транзакции; старые остаются как *_legacy до ручной проверки.
+-- Таблицы на время переноса заблокированы, запускать в окно обслуживания при остановленных сервисах:
+--   psql -v ON_ERROR_STOP=1 -f init-scripts/migrations/039_partition_orders_payments.sql
+BEGIN;
+
+-- Создаёт помесячные секции [start_month, start_month + months) секционированной таблицы.
+-- Существующие секции пропускаются, границы месяцев считаются в UTC
+CREATE OR REPLACE FUNCTION public.create_monthly_partitions(parent regclass, start_month date, months integer)
+RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    parent_schema text;
+    parent_name text;
+    month_start timestamp;
+    partition_name text;
+    created integer := 0;
+BEGIN
+    -- Несколько сервисов могут создавать секции одновременно
+    PERFORM pg_advisory_xact_lock(hashtext(parent::text));
+    SELECT n.nspname, c.relname INTO parent_schema, parent_name
+    FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.oid = parent;
+
+    FOR i IN 0 .. months - 1 LOOP
+        month_start := date_trunc('month', start_month) + make_interval(months => i);
+        partition_name := parent_name || '_' || to_char(month_start, 'YYYY_MM');
+        CONTINUE WHEN to_regclass(format('%I.%I', parent_schema, partition_name)) IS NOT NULL;
+        EXECUTE format(
+            'CREATE TABLE %I.%I PARTITION OF %s FOR VALUES FROM (%L) TO (%L)',
+            parent_schema, partition_name, parent,
+            month_start AT TIME ZONE 'UTC',
+            (month_start + interval '1 month') AT TIME ZONE 'UTC'
+        );
+        created := created + 1;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+-- Внешние ключи на orders.orders(id) несовместимы с PK (id, created_at)
+ALTER TABLE orders.order_items DROP CONSTRAINT IF EXISTS order_items_order_id_fkey;
+ALTER TABLE orders.order_events DROP CONSTRAINT IF EXISTS order_events_order_id_fkey;
+ALTER TABLE orders.order_current_status DROP CONSTRAINT IF EXISTS order_current_status_order_id_fkey;
+ALTER TABLE orders.sagas DROP CONSTRAINT IF EXISTS sagas_order_id_fkey;
+ALTER TABLE payments.payments DROP CONSTRAINT IF EXISTS payments_invoice_id_fkey;
+
+ALTER TABLE orders.orders RENAME TO orders_legacy;
+ALTER TABLE orders.orders_legacy RENAME CONSTRAINT orders_pkey TO orders_legacy_pkey;
+ALTER INDEX orders.idx_orders_user_created RENAME TO idx_orders_user_created_legacy;
+ALTER TABLE orders.order_items RENAME TO order_items_legacy;
+ALTER TABLE orders.order_items_legacy RENAME CONSTRAINT order_items_pkey TO order_items_legacy_pkey;
+ALTER INDEX orders.idx_order_items_order RENAME TO idx_order_items_order_legacy;
+ALTER TABLE payments.payments RENAME TO payments_legacy;
+ALTER TABLE payments.payments_legacy RENAME CONSTRAINT payments_pkey TO payments_legacy_pkey;
+ALTER INDEX payments.idx_payments_invoice RENAME TO idx_payments_invoice_legacy;
+
+-- Последовательности переходят к новым таблицам, id продолжают прежнюю нумерацию
+ALTER TABLE orders.orders_legacy ALTER COLUMN id DROP DEFAULT;
+ALTER TABLE orders.order_items_legacy ALTER COLUMN id DROP DEFAULT;
+ALTER TABLE payments.payments_legacy ALTER COLUMN id DROP DEFAULT;
+ALTER SEQUENCE orders.orders_id_seq OWNED BY NONE;
+ALTER SEQUENCE orders.order_items_id_seq OWNED BY NONE;
+ALTER SEQUENCE payments.payments_id_seq OWNED BY NONE;
+
+CREATE TABLE orders.orders (
+    id INTEGER NOT NULL DEFAULT nextval('orders.orders_id_seq'),
+    user_id INTEGER REFERENCES account.users(id),
+    total_price INTEGER NOT NULL,
+    status orders.order_status NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE orders.order_items (
+    id INTEGER NOT NULL DEFAULT nextval('orders.order_items_id_seq'),
+    order_id INTEGER NOT NULL,
+    dish_id INTEGER REFERENCES menu.dishes(id),
+    quantity INTEGER NOT NULL,
+    price INTEGER NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE payments.payments (
+    id INTEGER NOT NULL DEFAULT nextval('payments.payments_id_seq'),
+    invoice_id INTEGER NOT NULL,
+    amount INTEGER NOT NULL,
+    status payments.paymentstatus NOT NULL,
+    transaction_id VARCHAR(255),
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+ALTER SEQUENCE orders.orders_id_seq OWNED BY orders.orders.id;
+ALTER SEQUENCE orders.order_items_id_seq OWNED BY orders.order_items.id;
+ALTER SEQUENCE payments.payments_id_seq OWNED BY payments.payments.id;
+
+CREATE TABLE orders.orders_default PARTITION OF orders.orders DEFAULT;
+CREATE TABLE orders.order_items_default PARTITION OF orders.order_items DEFAULT;
+CREATE TABLE payments.payments_default PARTITION OF payments.payments DEFAULT;
+
+-- Секции от самого старого месяца в данных и на три месяца вперёд
+SELECT t.parent, public.create_monthly_partitions(t.parent::regclass, t.first_month, t.months)
+FROM (
+    SELECT parent, first_month,
+           ((extract(year FROM age(date_trunc('month', now() AT TIME ZONE 'UTC'), first_month)) * 12
+             + extract(month FROM age(date_trunc('month', now() AT TIME ZONE 'UTC'), first_month)))::integer + 4) AS months
+    FROM (
+        SELECT 'orders.orders' AS parent,
+               date_trunc('month', COALESCE(min(created_at), now()) AT TIME ZONE 'UTC')::date AS first_month
+        FROM orders.orders_legacy
+        UNION ALL
+        SELECT 'orders.order_items',
+               date_trunc('month', COALESCE(min(created_at), now()) AT TIME ZONE 'UTC')::date
+        FROM orders.orders_legacy
+        UNION ALL
+        SELECT 'payments.payments',
+               date_trunc('month', COALESCE(min(COALESCE(created_at, updated_at)), now()) AT TIME ZONE 'UTC')::date
+        FROM payments.payments_legacy
+    ) bounds
+) t;
+
+INSERT INTO orders.orders (id, user_id, total_price, status, created_at, updated_at)
+SELECT id, user_id, total_price, status, created_at, updated_at
+FROM orders.orders_legacy;
+
+-- Позиция получает created_at своего заказа, чтобы лежать в секции того же месяца
+INSERT INTO orders.order_items (id, order_id, dish_id, quantity, price, created_at)
+SELECT i.id, i.order_id, i.dish_id, i.quantity, i.price, COALESCE(o.created_at, i.created_at, now())
+FROM orders.order_items_legacy i
+LEFT JOIN orders.orders_legacy o ON o.id = i.order_id;
+
+INSERT INTO payments.payments (id, invoice_id, amount, status, transaction_id, created_at, updated_at)
+SELECT id, invoice_id, amount, status, transaction_id, COALESCE(created_at, updated_at, now()), updated_at
+FROM payments.payments_legacy
+WHERE invoice_id IS NOT NULL;
+
+CREATE INDEX idx_orders_user_created ON orders.orders(user_id, created_at DESC, id DESC);
+CREATE INDEX idx_order_items_order ON orders.order_items(order_id);
+CREATE INDEX idx_payments_invoice ON payments.payments(invoice_id);
+
+-- Перенос должен быть полным: иначе транзакция откатывается
+DO $$
+BEGIN
+    IF (SELECT count(*) FROM orders.orders) <> (SELECT count(*) FROM orders.orders_legacy)
+       OR (SELECT count(*) FROM orders.order_items) <> (SELECT count(*) FROM orders.order_items_legacy) THEN
+        RAISE EXCEPTION 'partition migration: row counts do not match';
+    END IF;
+END;
+$$;
+
+COMMIT;
+
+ANALYZE orders.orders;
+ANALYZE orders.order_items;
+ANALYZE payments.payments;
+
+-- После проверки приложения старые таблицы удаляются вручную:
+-- DROP TABLE orders.orders_legacy, orders.order_items_legacy, payments.payments_legacy;
@@ -0,0 +1,68 @@
+-- Архивные таблицы и функция удаления опустевших секций для ColdDataArchiver.
+-- Только добавляет объекты, можно применять на работающей базе:
+--   psql -v ON_ERROR_STOP=1 -f init-scripts/migrations/040_cold_archive.sql
+BEGIN;
+
+-- Удаляет пустые помесячные секции, целиком лежащие раньше before: после архивации
+-- старые месяцы не остаются пустыми таблицами в горячей схеме
+CREATE OR REPLACE FUNCTION public.drop_empty_partitions(parent regclass, before timestamp with time zone)
+RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    child regclass;
+    upper_bound timestamp with time zone;
+    has_rows boolean;
+    locked boolean := false;
+    dropped integer := 0;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext(parent::text));
+    -- DEFAULT-секция не имеет верхней границы и не удаляется
+    FOR child, upper_bound IN
+        SELECT i.inhrelid::regclass,
+               substring(pg_get_expr(c.relpartbound, c.oid) FROM 'TO \(''([^'']+)''\)')::timestamptz
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = parent
+        ORDER BY 2
+    LOOP
+        CONTINUE WHEN upper_bound IS NULL OR upper_bound > before;
+        EXECUTE format('SELECT EXISTS (SELECT 1 FROM %s)', child) INTO has_rows;
+        CONTINUE WHEN has_rows;
+        -- Родитель блокируется только когда есть что удалять и ненадолго: при очереди на блокировку
+        -- транзакция падает по lock_timeout и повторится при следующем запуске
+        IF NOT locked THEN
+            PERFORM set_config('lock_timeout', '2s', true);
+            EXECUTE format('LOCK TABLE %s IN ACCESS EXCLUSIVE MODE', parent);
+            locked := true;
+            EXECUTE format('SELECT EXISTS (SELECT 1 FROM %s)', child) INTO has_rows;
+            CONTINUE WHEN has_rows;
+        END IF;
+        EXECUTE format('DROP TABLE %s', child);
+        dropped := dropped + 1;
+    END LOOP;
+    RETURN dropped;
+END;
+$$;
+
+-- Архив завершённых заказов и платежей: строка целиком (с позициями и журналом статусов) в JSONB-документе.
+-- Горячие таблицы не растут с возрастом бизнеса, а архивный заказ находится по PK
+CREATE TABLE IF NOT EXISTS orders.orders_archive (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    status orders.order_status NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    archived_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    document JSONB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS payments.payments_archive (
+    id INTEGER PRIMARY KEY,
+    invoice_id INTEGER NOT NULL,
+    status payments.paymentstatus NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    archived_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    document JSONB NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_payments_archive_invoice ON payments.payments_archive(invoice_id);
+
+COMMIT;
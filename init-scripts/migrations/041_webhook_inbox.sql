@@ -0,0 +1,19 @@
+-- Таблица входящих webhook платёжного шлюза для WebhookInboxWorker.
+--   psql -v ON_ERROR_STOP=1 -f init-scripts/migrations/041_webhook_inbox.sql
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS payments.webhook_inbox (
+    transaction_id VARCHAR(255) PRIMARY KEY,
+    invoice_id INTEGER,
+    status VARCHAR(32) NOT NULL,
+    payload JSONB NOT NULL,
+    received_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    processed_at TIMESTAMP WITH TIME ZONE,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error VARCHAR(255)
+);
+
+CREATE INDEX IF NOT EXISTS idx_webhook_inbox_pending ON payments.webhook_inbox(received_at)
+    WHERE processed_at IS NULL;
+
+COMMIT;
@@ -0,0 +1,4 @@
+-- Частичный индекс для PaymentReconciler: keyset-обход PENDING-платежей по id.
+-- На секционированной таблице CONCURRENTLY недоступен, индекс строится с блокировкой записи:
+--   psql -v ON_ERROR_STOP=1 -f init-scripts/migrations/042_payments_pending_index.sql
+CREATE INDEX IF NOT EXISTS idx_payments_pending ON payments.payments(id) WHERE status = 'PENDING';
@@ -0,0 +1,20 @@
+-- Уникальность платежа на заказ для PaymentRepository.create_payment_once.
+-- Существующие платежи (и архивные) сразу занимают свои заказы:
+--   psql -v ON_ERROR_STOP=1 -f init-scripts/migrations/043_payment_invoices.sql
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS payments.payment_invoices (
+    invoice_id INTEGER PRIMARY KEY,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO payments.payment_invoices (invoice_id, created_at)
+SELECT invoice_id, min(created_at) FROM (
+    SELECT invoice_id, created_at FROM payments.payments
+    UNION ALL
+    SELECT invoice_id, created_at FROM payments.payments_archive
+) existing
+GROUP BY invoice_id
+ON CONFLICT (invoice_id) DO NOTHING;
+
+COMMIT;
@@ -0,0 +1,7 @@
+-- Агрегаты продаж читают журнал по (txid, id) ниже самой старой незавершённой транзакции.
+-- Старые события получают txid = 0 и дочитываются после водяного знака last_id:
+--   psql -v ON_ERROR_STOP=1 -f init-scripts/migrations/044_sales_commit_frontier.sql
+ALTER TABLE orders.order_events ADD COLUMN IF NOT EXISTS txid BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE orders.order_events ALTER COLUMN txid SET DEFAULT pg_current_xact_id()::text::bigint;
+CREATE INDEX IF NOT EXISTS idx_order_events_txid ON orders.order_events(txid, id);
+ALTER TABLE analytics.watermarks ADD COLUMN IF NOT EXISTS last_txid BIGINT NOT NULL DEFAULT 0;
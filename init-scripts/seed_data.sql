@@ -55,6 +55,16 @@ CROSS JOIN (
     SELECT id, price FROM menu.dishes WHERE id IN (1, 3)
 ) d;
 
+-- Журнал и проекции статусов для тестовых заказов
+INSERT INTO orders.order_events (order_id, user_id, from_status, to_status, created_at)
+SELECT id, user_id, NULL, status, created_at FROM orders.orders;
+
+INSERT INTO orders.order_current_status (order_id, user_id, status, updated_at)
+SELECT id, user_id, status, updated_at FROM orders.orders;
+
+INSERT INTO orders.order_status_counts (status, shard, count)
+SELECT status, id % 16, COUNT(*) FROM orders.orders GROUP BY status, id % 16;
+
 -- Создаем транзакцию для заказа
 INSERT INTO payments.payments (invoice_id, amount, status, created_at, updated_at)
 SELECT 
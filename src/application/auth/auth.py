@@ -1,14 +1,22 @@
+from typing import Optional
 from src.domain.user import User, UserCreate
-from src.core.security import get_password_hash, verify_password
+from src.core.security import check_password, hash_password
 from src.core.config import settings
 from src.infrastructure.repositories.user import UserRepository
 
 
 class AuthService:
+    # Хэш пароля администратора общий для всех экземпляров: считается один раз при старте users_main
+    admin_password_hash: Optional[str] = None
+
     def __init__(self, user_repository: UserRepository, sms_service):
         self.user_repository = user_repository
         self.sms_service = sms_service
-        self.admin_password_hash = get_password_hash(settings.SUPERUSER_PASSWORD)
+
+    @classmethod
+    async def init_admin_password(cls) -> None:
+        if cls.admin_password_hash is None:
+            cls.admin_password_hash = await hash_password(settings.SUPERUSER_PASSWORD)
         
     async def verification(self, number_phone: str):
         try:
@@ -43,7 +51,9 @@ class AuthService:
 
     async def create_superuser(self, number_phone: str, password: str): 
         try:
-            if not verify_password(password, self.admin_password_hash):
+            await self.init_admin_password()
+            valid, _ = await check_password(password, self.admin_password_hash)
+            if not valid:
                 raise ValueError("Неверный пароль администратора")
             
             user = await self.user_repository.get_by_phone(number_phone)
@@ -64,7 +74,7 @@ class AuthService:
 
             user = UserCreate(
                 number_phone=number_phone,
-                hashed_password=get_password_hash(password)
+                password=password
             )
             return await self.user_repository.create(user)
         except ValueError as e:
@@ -79,8 +89,12 @@ class AuthService:
             if not user:
                 raise ValueError("Пользователь не найден")
 
-            if not verify_password(password, user.hashed_password): 
+            valid, new_hash = await check_password(password, user.hashed_password)
+            if not valid:
                 raise ValueError("Неверный пароль")
+            if new_hash:
+                # Старый bcrypt или устаревшие параметры: пароль известен только сейчас, перехэшируем
+                await self.user_repository.update_password_hash(user.id, new_hash)
 
             return user
         except ValueError as e:
@@ -11,9 +11,23 @@ class Settings(BaseSettings):
     POSTGRES_PORT: str
     DATABASE_URL: str
     SECRET_KEY: str
-    JWT_ALGORITHM: str = "HS256"
+    JWT_ALGORITHM: str = "RS256"
+    JWT_PRIVATE_KEY_FILE: str = ""
+    JWT_PUBLISHED_KEY_FILES: str = ""
+    JWT_ACCEPT_HS256: bool = False
+    JWKS_URL: str = ""
+    JWKS_REFRESH_INTERVAL: int = 300
+    JWKS_MIN_REFRESH_INTERVAL: int = 10
     ACCESS_TOKEN_EXPIRE: int = 30
     SUPERUSER_PASSWORD: str
+    PASSWORD_HASH_SCHEME: str = "argon2"
+    PASSWORD_HASH_WORKERS: int = 0
+    PASSWORD_ARGON2_TIME_COST: int = 3
+    PASSWORD_ARGON2_MEMORY_KIB: int = 65536
+    PASSWORD_ARGON2_PARALLELISM: int = 4
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    TOKEN_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL: int = 30
     DB_ECHO_LOG: bool = False
     REDIS_HOST: str
     REDIS_PORT: int
@@ -27,5 +41,73 @@ class Settings(BaseSettings):
     CLOUDPAYMENTS_PUBLIC_ID: str
     CLOUDPAYMENTS_API_SECRET: str
     PAYMENT_SERVICE_URL: str
+    HEDGE_REQUESTS_ENABLED: bool = False
+    HEDGE_QUANTILE: float = 0.95
+    HEDGE_BUDGET_RATIO: float = 0.1
+    HEDGE_DEFAULT_DELAY_MS: int = 50
+    MENU_SERVICE_REPLICAS: str = ""
+    USER_SERVICE_REPLICAS: str = ""
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL: float = 0.5
+    BASKET_ENGINE: str = "postgres"
+    BASKET_TTL_SECONDS: int = 259200
+    BASKET_FLUSH_INTERVAL: float = 30.0
+    BASKET_FLUSH_BATCH_SIZE: int = 500
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_LOCK_TTL_SECONDS: int = 60
+    IDEMPOTENCY_WAIT_TIMEOUT: float = 10.0
+    ANALYTICS_REFRESH_INTERVAL: float = 5.0
+    ANALYTICS_BATCH_SIZE: int = 5000
+    KITCHEN_STATIONS: str = "1:grill,2:bar,3:cold"
+    KITCHEN_DEFAULT_STATION: str = "grill"
+    KITCHEN_PROMISE_MINUTES: int = 30
+    DELAYED_BATCH_SIZE: int = 500
+    DELAYED_POLL_INTERVAL: float = 0.5
+    DELAYED_LEASE_SECONDS: float = 30.0
+    SAGA_MENU_TIMEOUT_SECONDS: float = 30.0
+    SAGA_PAYMENT_TIMEOUT_SECONDS: float = 900.0
+    SAGA_PREFETCH: int = 32
+    SAGA_SWEEP_INTERVAL: float = 1.0
+    SAGA_SWEEP_BATCH_SIZE: int = 100
+    ORDER_PAYMENT_BATCH_SIZE: int = 200
+    ORDER_PAYMENT_BATCH_WAIT: float = 0.05
+    ORDER_PAYMENT_MAX_ATTEMPTS: int = 5
+    STOCK_RESERVATION_TTL_SECONDS: float = 960.0
+    STOCK_REAP_INTERVAL: float = 1.0
+    STOCK_REAP_BATCH_SIZE: int = 500
+    STOCK_RECONCILE_INTERVAL: float = 30.0
+    STOCK_PREFETCH: int = 64
+    MENU_PRICE_CACHE_TTL_SECONDS: float = 300.0
+    MENU_FETCH_TIMEOUT_SECONDS: float = 2.0
+    MENU_FETCH_RETRIES: int = 1
+    PARTITION_MONTHS_AHEAD: int = 3
+    PARTITION_CHECK_INTERVAL: float = 3600.0
+    ARCHIVE_AFTER_DAYS: int = 180
+    ARCHIVE_BATCH_SIZE: int = 500
+    ARCHIVE_BATCH_PAUSE: float = 0.2
+    ARCHIVE_MAX_REPLICATION_LAG_SECONDS: float = 5.0
+    ARCHIVE_INTERVAL: float = 3600.0
+    WEBHOOK_BATCH_SIZE: int = 100
+    WEBHOOK_WORKERS: int = 2
+    WEBHOOK_POLL_INTERVAL: float = 0.5
+    WEBHOOK_MAX_ATTEMPTS: int = 5
+    WEBHOOK_RETENTION_DAYS: int = 7
+    PAYMENT_GATEWAY_URL: str = ""
+    PAYMENT_GATEWAY_TIMEOUT: float = 5.0
+    PAYMENT_GATEWAY_MAX_CONNECTIONS: int = 100
+    RECONCILE_PAGE_SIZE: int = 1000
+    RECONCILE_CONCURRENCY: int = 50
+    RECONCILE_STALE_AFTER_SECONDS: float = 900.0
+    RECONCILE_INTERVAL: float = 300.0
+    PAYMENT_STATUS_WAIT_TIMEOUT: float = 25.0
+    GATEWAY_SIM_LATENCY_MEDIAN_MS: float = 80.0
+    GATEWAY_SIM_LATENCY_P99_MS: float = 400.0
+    GATEWAY_SIM_WEBHOOK_DELAY_MEDIAN_MS: float = 500.0
+    GATEWAY_SIM_WEBHOOK_DELAY_P99_MS: float = 3000.0
+    GATEWAY_SIM_ERROR_RATE: float = 0.01
+    GATEWAY_SIM_DECLINE_RATE: float = 0.05
+    GATEWAY_SIM_DUPLICATE_WEBHOOK_RATE: float = 0.02
+    GATEWAY_SIM_WEBHOOK_URL: str = ""
+    GATEWAY_SIM_SEED: int | None = None
 
 settings = Settings()
\ No newline at end of file
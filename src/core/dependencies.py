@@ -1,14 +1,19 @@
+import logging
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from src.core.config import settings
+from src.core.jwks import UnknownKeyError, jwks_fetcher
+from src.core.security import Principal, decode_principal
 from src.infrastructure.models.user import User
 from src.infrastructure.repositories.user import UserRepository
 from src.infrastructure.services.menu_events import MenuEventService
+from src.infrastructure.services.token_revocation import token_revocations
+from src.infrastructure.services.user_cache import token_cache, user_cache
 from typing import Annotated, AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.database import get_db
 
+logger = logging.getLogger(__name__)
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 async def get_user_repository(
@@ -16,40 +21,67 @@ async def get_user_repository(
 ) -> AsyncGenerator[UserRepository, None]:
     yield UserRepository(db)
 
-async def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)],
-    user_repository: Annotated[UserRepository, Depends(get_user_repository)]
-) -> User:
-    credentials_exception = HTTPException(
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+async def _decode(token: str) -> Principal:
+    try:
+        return decode_principal(token)
+    except UnknownKeyError:
+        # Токен подписан ключом, которого ещё нет в кэше JWKS (ротация): перечитываем набор и пробуем снова
+        if jwks_fetcher is None or not await jwks_fetcher.refresh_for_unknown_key():
+            raise credentials_exception()
+    except ValueError:
+        raise credentials_exception()
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-        user_id = int(user_id)
-    except JWTError:
-        raise credentials_exception
+        return decode_principal(token)
     except ValueError:
-        raise credentials_exception
-    
-    user = await user_repository.get_by_id(user_id)
+        raise credentials_exception()
+
+async def get_current_principal(
+    token: Annotated[str, Depends(oauth2_scheme)]
+) -> Principal:
+    # id и роль берутся из подписанного токена: ни БД, ни users-service на запрос не нужны
+    principal = token_cache.get(token)
+    if principal is None:
+        principal = await _decode(token)
+        token_cache.put(token, principal)
+    try:
+        revoked = await token_revocations.is_revoked(principal)
+    except Exception as e:
+        logger.error(f"Не удалось проверить отзыв токена пользователя {principal.id}: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Authorization is temporarily unavailable")
+    if revoked:
+        raise credentials_exception()
+    return principal
+
+async def get_current_user(
+    principal: Annotated[Principal, Depends(get_current_principal)],
+    user_repository: Annotated[UserRepository, Depends(get_user_repository)]
+) -> User:
+    # Полная запись пользователя нужна только users-service; горячие берутся из Redis
+    user = await user_cache.get(principal.id)
+    if user is not None:
+        return user
+    user = await user_repository.get_by_id(principal.id)
     if user is None:
-        raise credentials_exception
+        raise credentials_exception()
+    await user_cache.set(user)
     return user
 
 async def get_current_admin_user(
-    current_user: Annotated[User, Depends(get_current_user)]
-) -> User:
-    if not current_user.is_admin:
+    principal: Annotated[Principal, Depends(get_current_principal)]
+) -> Principal:
+    if not principal.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="The user doesn't have enough privileges"
         )
-    return current_user
+    return principal
 
 async def get_menu_event_service(request: Request) -> MenuEventService:
     service = getattr(request.app.state, "menu_event_service", None)
@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from redis.asyncio import Redis
+
+from src.core.config import settings
+from src.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+
+# Удаляем маркер только если он всё ещё наш: после истечения lock_ttl ключ мог занять другой запрос
+RELEASE_SCRIPT = """
+local record = redis.call('GET', KEYS[1])
+if record and cjson.decode(record)['token'] == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Продлеваем маркер, пока запрос выполняется, и только пока он наш
+RENEW_SCRIPT = """
+local record = redis.call('GET', KEYS[1])
+if record and cjson.decode(record)['token'] == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Результат записывается поверх только своего маркера, чужой не затирается
+COMPLETE_SCRIPT = """
+local record = redis.call('GET', KEYS[1])
+if record and cjson.decode(record)['token'] == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+
+def fingerprint(payload: Any) -> str:
+    body = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(
+        self,
+        redis: Redis,
+        ttl: int = 86400,
+        lock_ttl: float = 60,
+        wait_timeout: float = 10.0,
+        poll_interval: float = 0.05
+    ):
+        self.redis = redis
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._release = redis.register_script(RELEASE_SCRIPT)
+        self._renew = redis.register_script(RENEW_SCRIPT)
+        self._complete = redis.register_script(COMPLETE_SCRIPT)
+
+    @staticmethod
+    def key(scope: str, idempotency_key: str) -> str:
+        return f"idempotency:{scope}:{idempotency_key}"
+
+    async def execute(
+        self,
+        scope: str,
+        idempotency_key: Optional[str],
+        request_fingerprint: str,
+        handler: Callable[[], Awaitable[Any]],
+        status_code: int = status.HTTP_200_OK
+    ) -> Any:
+        if not idempotency_key:
+            return await handler()
+
+        key = self.key(scope, idempotency_key)
+        token = uuid.uuid4().hex
+        pending = json.dumps({"state": "pending", "token": token, "fingerprint": request_fingerprint})
+        while not await self.redis.set(key, pending, nx=True, px=int(self.lock_ttl * 1000)):
+            record = await self._wait(key, request_fingerprint)
+            if record is not None:
+                logger.info(f"[Idempotency] Повтор запроса {scope}:{idempotency_key}")
+                return JSONResponse(
+                    content=record["body"],
+                    status_code=record["status_code"],
+                    headers={REPLAY_HEADER: "true"}
+                )
+            # Первая попытка упала и сняла маркер — выполняем запрос сами
+
+        heartbeat = asyncio.create_task(self._heartbeat(key, token))
+        try:
+            body = jsonable_encoder(await handler())
+        except BaseException:
+            heartbeat.cancel()
+            await self._release(keys=[key], args=[token])
+            raise
+        heartbeat.cancel()
+
+        stored = await self._complete(keys=[key], args=[token, json.dumps({
+            "state": "done",
+            "token": token,
+            "fingerprint": request_fingerprint,
+            "status_code": status_code,
+            "body": body
+        }), self.ttl])
+        if not stored:
+            logger.warning(f"[Idempotency] Маркер {key} потерян до завершения запроса, результат не сохранён")
+        return body
+
+    async def _heartbeat(self, key: str, token: str) -> None:
+        while True:
+            await asyncio.sleep(self.lock_ttl / 3)
+            if not await self._renew(keys=[key], args=[token, int(self.lock_ttl * 1000)]):
+                logger.warning(f"[Idempotency] Маркер {key} потерян, продление остановлено")
+                return
+
+    async def _wait(self, key: str, request_fingerprint: str) -> Optional[dict]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_timeout
+        while True:
+            raw = await self.redis.get(key)
+            if raw is None:
+                return None
+            record = json.loads(raw)
+            if record["fingerprint"] != request_fingerprint:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Ключ идемпотентности уже использован с другим запросом"
+                )
+            if record["state"] == "done":
+                return record
+            if loop.time() >= deadline:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Запрос с этим ключом идемпотентности ещё выполняется"
+                )
+            await asyncio.sleep(self.poll_interval)
+
+
+idempotency = IdempotencyStore(
+    redis_client,
+    ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+    lock_ttl=settings.IDEMPOTENCY_LOCK_TTL_SECONDS,
+    wait_timeout=settings.IDEMPOTENCY_WAIT_TIMEOUT
+)
@@ -0,0 +1,177 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+import httpx
+import rsa
+from jose import jwk
+from jose.backends.base import Key
+from jose.exceptions import JOSEError
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Поля открытого ключа, из которых по RFC 7638 считается kid
+THUMBPRINT_FIELDS = {"RSA": ("e", "kty", "n"), "EC": ("crv", "kty", "x", "y")}
+
+
+class UnknownKeyError(ValueError):
+    pass
+
+
+def key_id(public: Dict[str, Any]) -> str:
+    fields = THUMBPRINT_FIELDS[public["kty"]]
+    canonical = json.dumps({field: public[field] for field in fields}, separators=(",", ":"), sort_keys=True)
+    return base64.urlsafe_b64encode(hashlib.sha256(canonical.encode()).digest()).rstrip(b"=").decode()
+
+
+def public_jwk(key: Key) -> Dict[str, Any]:
+    public = key.public_key().to_dict()
+    public.update({"kid": key_id(public), "use": "sig", "alg": settings.JWT_ALGORITHM})
+    return public
+
+
+# Ключи проверки подписи по kid; в users-service заполняется из файлов, в остальных — из JWKS
+class KeySet:
+    def __init__(self):
+        self._keys: Dict[str, Key] = {}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def jwks(self) -> Dict[str, Any]:
+        return {"keys": list(self._entries.values())}
+
+    def get(self, kid: Optional[str]) -> Key:
+        key = self._keys.get(kid)
+        if key is None:
+            raise UnknownKeyError(f"Unknown signing key: {kid}")
+        return key
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        self._keys[entry["kid"]] = jwk.construct(entry, entry.get("alg", settings.JWT_ALGORITHM))
+        self._entries[entry["kid"]] = entry
+
+    def load(self, jwks: Dict[str, Any]) -> int:
+        keys, entries = {}, {}
+        for entry in jwks.get("keys", []):
+            if entry.get("use", "sig") != "sig" or "kid" not in entry:
+                continue
+            try:
+                keys[entry["kid"]] = jwk.construct(entry, entry.get("alg", settings.JWT_ALGORITHM))
+                entries[entry["kid"]] = entry
+            except (JOSEError, KeyError, TypeError, ValueError) as e:
+                logger.warning(f"[JWKS] Ключ {entry.get('kid')} пропущен: {e}")
+        # Пустой набор почти наверняка ошибка публикации: с ним не прошёл бы ни один токен
+        if keys:
+            self._keys, self._entries = keys, entries
+        return len(keys)
+
+
+class SigningKey:
+    def __init__(self, pem: str):
+        self.key = jwk.construct(pem, settings.JWT_ALGORITHM)
+        self.public = public_jwk(self.key)
+        self.kid = self.public["kid"]
+
+
+_signing_key: Optional[SigningKey] = None
+
+
+def get_signing_key() -> SigningKey:
+    global _signing_key
+    if _signing_key is None:
+        if settings.JWT_PRIVATE_KEY_FILE:
+            with open(settings.JWT_PRIVATE_KEY_FILE) as file:
+                _signing_key = SigningKey(file.read())
+        elif settings.JWT_ALGORITHM.startswith("RS"):
+            # Только для разработки: ключ живёт до перезапуска и у каждой реплики свой
+            logger.warning("[JWKS] JWT_PRIVATE_KEY_FILE не задан, токены подписываются временным ключом")
+            _, private_key = rsa.newkeys(2048)
+            _signing_key = SigningKey(private_key.save_pkcs1().decode())
+        else:
+            raise ValueError(f"JWT_PRIVATE_KEY_FILE is required for {settings.JWT_ALGORITHM}")
+        key_set.add(_signing_key.public)
+    return _signing_key
+
+
+def load_local_keys() -> None:
+    # Дополнительные открытые ключи: следующий перед переключением подписи и предыдущий после него
+    for path in filter(None, (path.strip() for path in settings.JWT_PUBLISHED_KEY_FILES.split(","))):
+        with open(path) as file:
+            key_set.add(public_jwk(jwk.construct(file.read(), settings.JWT_ALGORITHM)))
+    if settings.JWT_PRIVATE_KEY_FILE:
+        get_signing_key()
+
+
+# Кэш JWKS users-service в остальных сервисах: плановое обновление раз в refresh_interval
+# и внеочередное, когда пришёл токен с незнакомым kid (не чаще min_refresh_interval).
+# При ошибке загрузки остаются прежние ключи
+class JWKSFetcher:
+    def __init__(
+        self,
+        key_set: KeySet,
+        url: str,
+        refresh_interval: float = 300.0,
+        min_refresh_interval: float = 10.0,
+        timeout: float = 5.0
+    ):
+        self.key_set = key_set
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.healthy = False
+        self._client = httpx.AsyncClient(timeout=timeout)
+        self._lock = asyncio.Lock()
+        self._last_refresh = float("-inf")
+
+    async def refresh(self) -> bool:
+        try:
+            response = await self._client.get(self.url)
+            response.raise_for_status()
+            loaded = self.key_set.load(response.json())
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning(f"[JWKS] Не удалось обновить ключи с {self.url}, остаются прежние ({len(self.key_set)}): {e}")
+            self.healthy = False
+            return False
+        finally:
+            self._last_refresh = time.monotonic()
+        if not loaded:
+            logger.warning(f"[JWKS] {self.url} не вернул ни одного ключа, остаются прежние ({len(self.key_set)})")
+        self.healthy = bool(loaded)
+        return self.healthy
+
+    async def refresh_for_unknown_key(self) -> bool:
+        requested = time.monotonic()
+        async with self._lock:
+            if self._last_refresh >= requested:
+                # Пока ждали блокировку, набор перечитал другой запрос
+                return True
+            if requested - self._last_refresh < self.min_refresh_interval:
+                return False
+            return await self.refresh()
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval if self.healthy else self.min_refresh_interval)
+            await self.refresh()
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+key_set = KeySet()
+jwks_fetcher = JWKSFetcher(
+    key_set,
+    settings.JWKS_URL,
+    refresh_interval=settings.JWKS_REFRESH_INTERVAL,
+    min_refresh_interval=settings.JWKS_MIN_REFRESH_INTERVAL
+) if settings.JWKS_URL else None
+
+if not settings.JWKS_URL and not settings.JWT_ALGORITHM.startswith("HS"):
+    load_local_keys()
@@ -1,52 +1,135 @@
+import asyncio
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Optional
 from jose import jwt
 from jose.exceptions import ExpiredSignatureError, JWTError
 from passlib.context import CryptContext
-import bcrypt
 from src.core.config import settings
+from src.core.jwks import get_signing_key, key_set
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Первая схема — для новых хэшей, остальные только проверяются и при входе перехэшируются
+PASSWORD_SCHEMES = [settings.PASSWORD_HASH_SCHEME] + [
+    scheme for scheme in ("argon2", "bcrypt") if scheme != settings.PASSWORD_HASH_SCHEME
+]
+
+pwd_context = CryptContext(
+    schemes=PASSWORD_SCHEMES,
+    deprecated="auto",
+    argon2__type="ID",
+    argon2__time_cost=settings.PASSWORD_ARGON2_TIME_COST,
+    argon2__memory_cost=settings.PASSWORD_ARGON2_MEMORY_KIB,
+    argon2__parallelism=settings.PASSWORD_ARGON2_PARALLELISM,
+    bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS
+)
+
+# argon2-cffi и bcrypt отпускают GIL, поэтому хватает потоков; размер пула ограничивает
+# число одновременных хэшей, остальные ждут в очереди, не занимая event loop.
+# Здесь же подписываются токены
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1,
+    thread_name_prefix="password-hash"
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return verify_and_update_password(plain_password, hashed_password)[0]
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    # Возвращает (пароль верный, новый хэш, если старый устарел по схеме или параметрам)
     try:
-        return bcrypt.checkpw(
-            plain_password.encode('utf-8'),
-            hashed_password.encode('utf-8')
-        )
-    except Exception as e:
-        print(f"Password verification error: {str(e)}")
-        return False
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except (ValueError, TypeError):
+        return False, None
 
 def get_password_hash(password: str) -> str:
     try:
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        return pwd_context.hash(password)
     except Exception as e:
         raise ValueError(f"Password hashing error: {str(e)}")
 
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(password_executor, get_password_hash, password)
+
+async def check_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return await asyncio.get_running_loop().run_in_executor(
+        password_executor, verify_and_update_password, plain_password, hashed_password
+    )
+
+# Кто делает запрос, по одним claims токена — без обращения к users-service и БД
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    is_admin: bool
+    jti: Optional[str]
+    issued_at: float
+    expires_at: float
+
+def access_token_claims(user) -> dict:
+    return {"sub": str(user.id), "is_admin": bool(user.is_admin)}
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=30)
-    to_encode.update({"exp": expire})
+        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE)
+    # iat дробный: отзыв всех токенов пользователя не должен задеть токен, выпущенный в ту же секунду после него
+    to_encode.update({"exp": expire, "iat": time.time()})
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     try:
-        encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
-        return encoded_jwt
+        if settings.JWT_ALGORITHM.startswith("HS"):
+            return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+        signing_key = get_signing_key()
+        return jwt.encode(to_encode, signing_key.key, algorithm=settings.JWT_ALGORITHM, headers={"kid": signing_key.kid})
     except Exception as e:
         raise ValueError(f"Token creation error: {str(e)}")
 
+async def sign_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    # RSA-подпись без cryptography считается на чистом Python (~30 мс): уводим её с event loop
+    return await asyncio.get_running_loop().run_in_executor(password_executor, create_access_token, data, expires_delta)
+
+def _verification_key(token: str) -> tuple[Any, list[str]]:
+    if settings.JWT_ALGORITHM.startswith("HS"):
+        return settings.SECRET_KEY, [settings.JWT_ALGORITHM]
+    try:
+        header = jwt.get_unverified_header(token)
+    except JWTError as e:
+        raise ValueError(f"Invalid token: {str(e)}")
+    if header.get("alg") == "HS256" and settings.JWT_ACCEPT_HS256:
+        # Переходный период: токены, выпущенные до перехода на асимметричную подпись
+        return settings.SECRET_KEY, ["HS256"]
+    # Алгоритм фиксирован настройкой, а не заголовком токена
+    return key_set.get(header.get("kid")), [settings.JWT_ALGORITHM]
+
 def decode_token(token: str) -> dict:
+    key, algorithms = _verification_key(token)
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        payload = jwt.decode(token, key, algorithms=algorithms)
         return payload
     except ExpiredSignatureError:
         raise ValueError("Token has expired")
     except JWTError as e:
         raise ValueError(f"Invalid token: {str(e)}")
 
+def decode_principal(token: str) -> Principal:
+    payload = decode_token(token)
+    try:
+        user_id = int(payload["sub"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Invalid token: missing subject")
+    # Токены, выпущенные до появления ролей и jti, действуют как токены обычного пользователя
+    return Principal(
+        id=user_id,
+        is_admin=payload.get("is_admin") is True,
+        jti=payload.get("jti"),
+        issued_at=float(payload.get("iat", 0)),
+        expires_at=float(payload.get("exp", 0))
+    )
+
 def generate_token_future(sub: str, future_time: Optional[datetime] = None, days: int = 1) -> str:
 
     if future_time is None:
@@ -20,6 +20,7 @@ class Dish(BaseModel):
     description: str
     price: int
     category_id: int
+    is_available: bool = True
 
 class DishCreate(Dish):
     pass
@@ -39,4 +39,25 @@ class Order(BaseModel):
     created_at: datetime.datetime
     updated_at: datetime.datetime
     items: list[OrderItem]
-    
\ No newline at end of file
+    
+
+class InvalidTransition(ValueError):
+    def __init__(self, current: OrderStatus, new: OrderStatus):
+        self.current = current
+        self.new = new
+        super().__init__(f"Недопустимый переход статуса заказа: {current.value} -> {new.value}")
+
+
+ORDER_TRANSITIONS: dict[OrderStatus, frozenset[OrderStatus]] = {
+    OrderStatus.PENDING: frozenset({OrderStatus.PROCESSING, OrderStatus.CANCELLED}),
+    OrderStatus.PROCESSING: frozenset({OrderStatus.COMPLETED, OrderStatus.CANCELLED}),
+    OrderStatus.COMPLETED: frozenset(),
+    OrderStatus.CANCELLED: frozenset(),
+}
+
+OPEN_STATUSES = (OrderStatus.PENDING, OrderStatus.PROCESSING)
+
+
+def ensure_transition(current: OrderStatus, new: OrderStatus) -> None:
+    if new not in ORDER_TRANSITIONS[current]:
+        raise InvalidTransition(current, new)
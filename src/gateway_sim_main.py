@@ -0,0 +1,53 @@
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from src.interfaces.routers.gateway_sim import router as gateway_router, simulator
+from src.core.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info(
+        f"Симулятор шлюза: задержка {settings.GATEWAY_SIM_LATENCY_MEDIAN_MS}/{settings.GATEWAY_SIM_LATENCY_P99_MS} мс (p50/p99), "
+        f"ошибок {settings.GATEWAY_SIM_ERROR_RATE:.0%}, webhook -> {settings.GATEWAY_SIM_WEBHOOK_URL or 'не отправляются'}"
+    )
+
+    yield
+
+    await simulator.close()
+
+
+app = FastAPI(
+    title="Payment Gateway Simulator",
+    description="Локальная замена CloudPayments для нагрузочных тестов",
+    version="1.0.0",
+    lifespan=lifespan)
+
+app.include_router(gateway_router)
+
+
+@app.get("/")
+async def root():
+    return {
+        "service": "Payment Gateway Simulator",
+        "version": "1.0.0",
+        "status": "running",
+        "endpoints": [
+            "/payments",
+            "/payments/{transaction_id}",
+            "/stats"
+        ]
+    }
+
+
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy", "service": "gateway-sim"}
+
+
+@app.get("/stats")
+async def get_stats():
+    return dict(simulator.stats)
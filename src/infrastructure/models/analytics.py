@@ -0,0 +1,33 @@
+from sqlalchemy import BigInteger, Column, Date, DateTime, Integer, String
+from sqlalchemy.sql import func
+from src.database import Base
+
+
+class SalesHourly(Base):
+    __tablename__ = "sales_hourly"
+    __table_args__ = {"schema": "analytics"}
+
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    orders_count = Column(BigInteger, nullable=False, default=0)
+    revenue = Column(BigInteger, nullable=False, default=0)
+
+
+class SalesDailyDish(Base):
+    __tablename__ = "sales_daily_dish"
+    __table_args__ = {"schema": "analytics"}
+
+    day = Column(Date, primary_key=True)
+    dish_id = Column(Integer, primary_key=True)
+    category_id = Column(Integer, nullable=True)
+    quantity = Column(BigInteger, nullable=False, default=0)
+    revenue = Column(BigInteger, nullable=False, default=0)
+
+
+class Watermark(Base):
+    __tablename__ = "watermarks"
+    __table_args__ = {"schema": "analytics"}
+
+    name = Column(String(64), primary_key=True)
+    last_id = Column(BigInteger, nullable=False, default=0)
+    last_txid = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -21,6 +21,8 @@ class Dish(Base):
     description = Column(String, index=True)
     price = Column(Integer, index=True)
     is_available = Column(Boolean, default=True, index=True)
+    # Свободный остаток по последней сверке с Redis; NULL — без ограничения
+    stock = Column(Integer, nullable=True)
     category_id = Column(Integer, ForeignKey("menu.categories.id"))
     category = relationship("Category", back_populates="dishes")
     tags = relationship("Tag", secondary="menu.dish_tags", back_populates="dishes")
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, DateTime, Enum as SQLEnum, ForeignKey, Integer
+from sqlalchemy import BigInteger, Column, DateTime, Enum as SQLEnum, ForeignKey, Integer, SmallInteger
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 from src.database import Base
 from enum import Enum
@@ -11,17 +13,30 @@ class OrderStatus(str, Enum):
     CANCELLED = "cancelled"
 
 
+ORDER_STATUS_ENUM = SQLEnum(
+    OrderStatus,
+    name="order_status",
+    schema="orders",
+    values_callable=lambda statuses: [s.value for s in statuses]
+)
+
+
 class Order(Base):
     __tablename__ = "orders"
     __table_args__ = {"schema": "orders"}
     
+    # В базе PK (id, created_at) из-за секционирования; для ORM хватает id — он уникален по последовательности
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("account.users.id"), nullable=False)
     total_price = Column(Integer, nullable=False)
-    status = Column(SQLEnum(OrderStatus), nullable=False)
-    created_at = Column(DateTime, nullable=False)
-    updated_at = Column(DateTime, nullable=False)
-    items = relationship("OrderItem", back_populates="order")
+    status = Column(ORDER_STATUS_ENUM, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+    items = relationship(
+        "OrderItem",
+        primaryjoin="Order.id == foreign(OrderItem.order_id)",
+        back_populates="order"
+    )
     
     
 class Basket(Base):
@@ -40,9 +55,60 @@ class OrderItem(Base):
     __table_args__ = {"schema": "orders"}
     
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.orders.id"), nullable=False)
+    order_id = Column(Integer, nullable=False)
     dish_id = Column(Integer, ForeignKey("menu.dishes.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
     price = Column(Integer, nullable=False)
-    order = relationship("Order", back_populates="items")
-    
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    order = relationship(
+        "Order",
+        primaryjoin="foreign(OrderItem.order_id) == Order.id",
+        back_populates="items"
+    )
+    
+
+class OrderEvent(Base):
+    __tablename__ = "order_events"
+    __table_args__ = {"schema": "orders"}
+
+    id = Column(BigInteger, primary_key=True)
+    order_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    from_status = Column(ORDER_STATUS_ENUM, nullable=True)
+    to_status = Column(ORDER_STATUS_ENUM, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    txid = Column(BigInteger, server_default=text("pg_current_xact_id()::text::bigint"), nullable=False)
+
+
+class OrderCurrentStatus(Base):
+    __tablename__ = "order_current_status"
+    __table_args__ = {"schema": "orders"}
+
+    order_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    status = Column(ORDER_STATUS_ENUM, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class OrderStatusCount(Base):
+    __tablename__ = "order_status_counts"
+    __table_args__ = {"schema": "orders"}
+
+    STATUS_SHARDS = 16
+
+    status = Column(ORDER_STATUS_ENUM, primary_key=True)
+    shard = Column(SmallInteger, primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+
+
+# Заказ, перенесённый из горячих таблиц: document хранит заказ с позициями и журналом статусов
+class ArchivedOrder(Base):
+    __tablename__ = "orders_archive"
+    __table_args__ = {"schema": "orders"}
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    status = Column(ORDER_STATUS_ENUM, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    document = Column(JSONB, nullable=False)
@@ -0,0 +1,16 @@
+from sqlalchemy import BigInteger, Column, DateTime, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from src.database import Base
+
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox"
+    __table_args__ = {"schema": "public"}
+
+    id = Column(BigInteger, primary_key=True)
+    exchange = Column(String(255), nullable=False)
+    routing_key = Column(String(255), nullable=False)
+    event_type = Column(String(255), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
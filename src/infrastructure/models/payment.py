@@ -1,5 +1,7 @@
-from sqlalchemy import Column, DateTime, Enum as SQLEnum, ForeignKey, Integer, String
+from sqlalchemy import Column, DateTime, Enum as SQLEnum, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from src.database import Base
 from enum import Enum
 
@@ -16,13 +18,45 @@ class Payment(Base):
     __table_args__ = {"schema": "payments"}
 
     id = Column(Integer, primary_key=True, index=True)
-    invoice_id = Column(Integer, ForeignKey("orders.orders.id"), nullable=False, index=True)
+    # Без FK: orders.orders секционирована и не имеет уникального ключа по одному id
+    invoice_id = Column(Integer, nullable=False, index=True)
     amount = Column(Integer, nullable=False)  
     status = Column(SQLEnum(PaymentStatus), nullable=False, default=PaymentStatus.PENDING)
     transaction_id = Column(String(255), nullable=True)  
-    created_at = Column(DateTime, nullable=False)
-    updated_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
 
 
+class PaymentInvoice(Base):
+    __tablename__ = "payment_invoices"
+    __table_args__ = {"schema": "payments"}
+
+    invoice_id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class ArchivedPayment(Base):
+    __tablename__ = "payments_archive"
+    __table_args__ = {"schema": "payments"}
+
+    id = Column(Integer, primary_key=True)
+    invoice_id = Column(Integer, nullable=False, index=True)
+    status = Column(SQLEnum(PaymentStatus), nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    document = Column(JSONB, nullable=False)
 
 
+# Сырые webhook шлюза; PK по transaction_id делает повторную доставку no-op
+class WebhookInbox(Base):
+    __tablename__ = "webhook_inbox"
+    __table_args__ = {"schema": "payments"}
+
+    transaction_id = Column(String(255), primary_key=True)
+    invoice_id = Column(Integer, nullable=True)
+    status = Column(String(32), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    received_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(String(255), nullable=True)
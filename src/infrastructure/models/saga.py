@@ -0,0 +1,33 @@
+from enum import Enum
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from src.database import Base
+
+
+class SagaStep(str, Enum):
+    RESERVE_MENU = "reserve_menu"
+    AWAIT_PAYMENT = "await_payment"
+    DONE = "done"
+
+
+class SagaStatus(str, Enum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class Saga(Base):
+    __tablename__ = "sagas"
+    __table_args__ = {"schema": "orders"}
+
+    id = Column(BigInteger, primary_key=True)
+    order_id = Column(Integer, nullable=False, unique=True)
+    step = Column(String(32), nullable=False)
+    status = Column(String(16), nullable=False)
+    deadline_at = Column(DateTime(timezone=True), nullable=True)
+    compensations = Column(JSONB, nullable=False, default=list)
+    payload = Column(JSONB, nullable=False, default=dict)
+    error = Column(String(255), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
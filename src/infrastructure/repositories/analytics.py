@@ -0,0 +1,151 @@
+import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import BigInteger, Date, Text, case, cast, exists, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from src.infrastructure.models.analytics import SalesDailyDish, SalesHourly, Watermark
+from src.infrastructure.models.menu import Dish
+from src.infrastructure.models.order import Order, OrderEvent, OrderItem, OrderStatus
+
+
+class AnalyticsRepository:
+    SALES_WATERMARK = "sales"
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def refresh_sales(self, batch_size: int = 5000) -> int:
+        # Блокировка водяного знака не даёт двум обновителям посчитать одну пачку дважды
+        last_txid, last_id = (await self.session.execute(
+            select(Watermark.last_txid, Watermark.last_id)
+            .where(Watermark.name == self.SALES_WATERMARK)
+            .with_for_update()
+        )).one()
+
+        # Ни id, ни время события не говорят, закоммичено ли всё до него: транзакция с меньшим id
+        # может закоммититься позже. Журнал читается по (txid, id) только ниже самой старой
+        # незавершённой транзакции — все транзакции до этого фронта уже закоммичены или откачены
+        frontier = cast(cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text), BigInteger)
+        batch = (
+            select(
+                OrderEvent.txid,
+                OrderEvent.id,
+                OrderEvent.order_id,
+                case(
+                    (OrderEvent.from_status.is_(None), 1),
+                    (OrderEvent.to_status == OrderStatus.CANCELLED, -1),
+                    else_=0
+                ).label("sign")
+            )
+            .where(
+                tuple_(OrderEvent.txid, OrderEvent.id) > tuple_(last_txid, last_id),
+                OrderEvent.txid < frontier
+            )
+            .order_by(OrderEvent.txid, OrderEvent.id)
+            .limit(batch_size)
+            .cte("batch")
+        )
+
+        bucket = func.date_trunc("hour", Order.created_at)
+        hourly = pg_insert(SalesHourly).from_select(
+            ["bucket", "orders_count", "revenue"],
+            select(bucket, func.sum(batch.c.sign), func.sum(batch.c.sign * Order.total_price))
+            .select_from(batch)
+            .join(Order, Order.id == batch.c.order_id)
+            .where(batch.c.sign != 0)
+            .group_by(bucket)
+        )
+        hourly = hourly.on_conflict_do_update(
+            index_elements=[SalesHourly.bucket],
+            set_={
+                "orders_count": SalesHourly.orders_count + hourly.excluded.orders_count,
+                "revenue": SalesHourly.revenue + hourly.excluded.revenue
+            }
+        ).cte("hourly")
+
+        day = cast(Order.created_at, Date)
+        daily = pg_insert(SalesDailyDish).from_select(
+            ["day", "dish_id", "category_id", "quantity", "revenue"],
+            select(
+                day,
+                OrderItem.dish_id,
+                Dish.category_id,
+                func.sum(batch.c.sign * OrderItem.quantity),
+                func.sum(batch.c.sign * OrderItem.quantity * OrderItem.price)
+            )
+            .select_from(batch)
+            .join(Order, Order.id == batch.c.order_id)
+            .join(OrderItem, OrderItem.order_id == Order.id)
+            .outerjoin(Dish, Dish.id == OrderItem.dish_id)
+            .where(batch.c.sign != 0)
+            .group_by(day, OrderItem.dish_id, Dish.category_id)
+        )
+        daily = daily.on_conflict_do_update(
+            index_elements=[SalesDailyDish.day, SalesDailyDish.dish_id],
+            set_={
+                "quantity": SalesDailyDish.quantity + daily.excluded.quantity,
+                "revenue": SalesDailyDish.revenue + daily.excluded.revenue
+            }
+        ).cte("daily")
+
+        # Обе вставки и сдвиг водяного знака — один оператор
+        last = select(batch).order_by(batch.c.txid.desc(), batch.c.id.desc()).limit(1).subquery()
+        processed = (await self.session.execute(
+            update(Watermark)
+            .where(Watermark.name == self.SALES_WATERMARK, exists(select(batch.c.id)))
+            .values(
+                last_txid=select(last.c.txid).scalar_subquery(),
+                last_id=select(last.c.id).scalar_subquery(),
+                updated_at=func.now()
+            )
+            .returning(select(func.count()).select_from(batch).scalar_subquery())
+            .add_cte(hourly, daily)
+            .execution_options(synchronize_session=False)
+        )).scalar_one_or_none()
+        return processed or 0
+
+    async def sales_series(
+        self,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        granularity: str = "hour"
+    ) -> list[tuple[datetime.datetime, int, int]]:
+        bucket = func.date_trunc(granularity, SalesHourly.bucket).label("bucket")
+        result = await self.session.execute(
+            select(bucket, func.sum(SalesHourly.orders_count), func.sum(SalesHourly.revenue))
+            .where(SalesHourly.bucket >= start, SalesHourly.bucket < end)
+            .group_by(bucket)
+            .order_by(bucket)
+        )
+        return result.all()
+
+    async def top_dishes(
+        self,
+        start: datetime.date,
+        end: datetime.date,
+        limit: int = 10,
+        by: str = "revenue"
+    ) -> list[tuple[int, int | None, int, int]]:
+        quantity = func.sum(SalesDailyDish.quantity).label("quantity")
+        revenue = func.sum(SalesDailyDish.revenue).label("revenue")
+        result = await self.session.execute(
+            select(SalesDailyDish.dish_id, SalesDailyDish.category_id, quantity, revenue)
+            .where(SalesDailyDish.day >= start, SalesDailyDish.day < end)
+            .group_by(SalesDailyDish.dish_id, SalesDailyDish.category_id)
+            .order_by((quantity if by == "quantity" else revenue).desc())
+            .limit(limit)
+        )
+        return result.all()
+
+    async def category_sales(
+        self,
+        start: datetime.date,
+        end: datetime.date
+    ) -> list[tuple[int | None, int, int]]:
+        revenue = func.sum(SalesDailyDish.revenue).label("revenue")
+        result = await self.session.execute(
+            select(SalesDailyDish.category_id, func.sum(SalesDailyDish.quantity), revenue)
+            .where(SalesDailyDish.day >= start, SalesDailyDish.day < end)
+            .group_by(SalesDailyDish.category_id)
+            .order_by(revenue.desc())
+        )
+        return result.all()
@@ -0,0 +1,113 @@
+import datetime
+from typing import Any, Dict, Optional
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.infrastructure.models.order import ArchivedOrder
+from src.infrastructure.models.payment import ArchivedPayment
+
+# Перенос одной пачки одним запросом: удалённое из горячих таблиц через RETURNING сразу пишется в архив,
+# поэтому заказ не может оказаться ни в двух местах, ни нигде. SKIP LOCKED не даёт ждать строки,
+# которые прямо сейчас меняет сервис
+ARCHIVE_ORDERS_SQL = text("""
+WITH batch AS (
+    SELECT id, created_at FROM orders.orders
+    WHERE status IN ('completed', 'cancelled') AND created_at < :cutoff
+    ORDER BY created_at, id
+    LIMIT :limit
+    FOR UPDATE SKIP LOCKED
+),
+moved AS (
+    DELETE FROM orders.orders o USING batch b
+    WHERE o.id = b.id AND o.created_at = b.created_at
+    RETURNING o.*
+),
+items AS (
+    DELETE FROM orders.order_items i USING batch b
+    WHERE i.order_id = b.id AND i.created_at = b.created_at
+    RETURNING i.*
+),
+events AS (
+    DELETE FROM orders.order_events e USING batch b
+    WHERE e.order_id = b.id
+    RETURNING e.*
+),
+statuses AS (
+    DELETE FROM orders.order_current_status s USING batch b
+    WHERE s.order_id = b.id
+    RETURNING s.order_id
+),
+sagas AS (
+    DELETE FROM orders.sagas s USING batch b
+    WHERE s.order_id = b.id
+    RETURNING s.order_id
+),
+item_docs AS (
+    SELECT order_id, jsonb_agg(to_jsonb(items) ORDER BY id) AS items
+    FROM items GROUP BY order_id
+),
+event_docs AS (
+    SELECT order_id, jsonb_agg(to_jsonb(events) ORDER BY id) AS events
+    FROM events GROUP BY order_id
+)
+INSERT INTO orders.orders_archive (id, user_id, status, created_at, document)
+SELECT m.id, m.user_id, m.status, m.created_at,
+       to_jsonb(m) || jsonb_build_object(
+           'items', COALESCE(i.items, '[]'::jsonb),
+           'events', COALESCE(e.events, '[]'::jsonb)
+       )
+FROM moved m
+LEFT JOIN item_docs i ON i.order_id = m.id
+LEFT JOIN event_docs e ON e.order_id = m.id
+""")
+
+ARCHIVE_PAYMENTS_SQL = text("""
+WITH moved AS (
+    DELETE FROM payments.payments p
+    USING (
+        SELECT id, created_at FROM payments.payments
+        WHERE status IN ('COMPLETED', 'FAILED', 'CANCELLED') AND created_at < :cutoff
+        ORDER BY created_at, id
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    ) b
+    WHERE p.id = b.id AND p.created_at = b.created_at
+    RETURNING p.*
+)
+INSERT INTO payments.payments_archive (id, invoice_id, status, created_at, document)
+SELECT id, invoice_id, status, created_at, to_jsonb(moved) FROM moved
+""")
+
+
+class ArchiveRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def archive_orders(self, cutoff: datetime.datetime, limit: int) -> int:
+        result = await self.session.execute(ARCHIVE_ORDERS_SQL, {"cutoff": cutoff, "limit": limit})
+        return result.rowcount
+
+    async def archive_payments(self, cutoff: datetime.datetime, limit: int) -> int:
+        result = await self.session.execute(ARCHIVE_PAYMENTS_SQL, {"cutoff": cutoff, "limit": limit})
+        return result.rowcount
+
+    async def replication_lag(self) -> float:
+        # Отставание самой медленной реплики; без реплик или без прав pg_monitor — 0
+        result = await self.session.execute(text(
+            "SELECT COALESCE(EXTRACT(EPOCH FROM max(replay_lag)), 0) FROM pg_stat_replication"
+        ))
+        return float(result.scalar_one())
+
+    async def get_order(self, order_id: int) -> Optional[Dict[str, Any]]:
+        result = await self.session.execute(
+            select(ArchivedOrder.document).where(ArchivedOrder.id == order_id)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_payment_by_order_id(self, order_id: int) -> Optional[Dict[str, Any]]:
+        result = await self.session.execute(
+            select(ArchivedPayment.document)
+            .where(ArchivedPayment.invoice_id == order_id)
+            .order_by(ArchivedPayment.id.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
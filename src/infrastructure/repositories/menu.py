@@ -1,14 +1,17 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import Integer, column, select, update, values
 from sqlalchemy.orm import selectinload
 from src.infrastructure.models.menu import Category, Dish, Tag, ComboSet
 from src.domain.menu import CategoryCreate, DishCreate, CategoryUpdate, DishUpdate, TagCreate, TagUpdate, ComboSetCreate, ComboSetUpdate
 from src.redis import cache, invalidate_cache
+from src.infrastructure.repositories.outbox import OutboxRepository
+from src.infrastructure.services.menu_events import MenuEventService
 
 
 class MenuRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
+        self.events = MenuEventService(OutboxRepository(session))
         
     @cache()
     async def get_categories(self, limit: int = 10, offset: int = 0) -> list[Category]:
@@ -70,14 +73,23 @@ class MenuRepository:
         )
         return result.scalar_one_or_none()
     
+    async def get_dishes_by_ids(self, dish_ids: list[int]) -> list[Dish]:
+        result = await self.session.execute(
+            select(Dish).where(Dish.id.in_(dish_ids))
+        )
+        return result.scalars().all()
+
     async def create_dish(self, dish: DishCreate) -> Dish:
         db_dish = Dish(
             name=dish.name,
             description=dish.description,
             price=dish.price,
-            category_id=dish.category_id
+            category_id=dish.category_id,
+            is_available=dish.is_available
         )
         self.session.add(db_dish)
+        await self.session.flush()
+        await self.events.publish_dish_created(db_dish)
         await self.session.commit()
         await self.session.refresh(db_dish)
         await invalidate_cache("get_dishes*")
@@ -88,10 +100,17 @@ class MenuRepository:
         db_dish = await self.get_dish_id(dish_id)
         if not db_dish:
             return None
+        old_price = db_dish.price
+        old_availability = db_dish.is_available
         db_dish.name = dish.name
         db_dish.description = dish.description
         db_dish.price = dish.price
         db_dish.category_id = dish.category_id
+        db_dish.is_available = dish.is_available
+        if old_price != db_dish.price:
+            await self.events.publish_price_changed(db_dish, old_price)
+        if old_availability != db_dish.is_available:
+            await self.events.publish_availability_changed(db_dish, old_availability)
         await self.session.commit()
         await self.session.refresh(db_dish)
         await invalidate_cache("get_dishes*")
@@ -108,6 +127,41 @@ class MenuRepository:
         await invalidate_cache(f"get_dish_id*{dish_id}*")
         await invalidate_cache("get_dish_id*")
         return True
+
+    async def get_stock_levels(self) -> dict[int, int]:
+        result = await self.session.execute(
+            select(Dish.id, Dish.stock).where(Dish.stock.is_not(None))
+        )
+        return {dish_id: stock for dish_id, stock in result.all()}
+
+    async def set_stock(self, dish_id: int, stock: int | None) -> bool:
+        result = await self.session.execute(
+            update(Dish)
+            .where(Dish.id == dish_id)
+            .values(stock=stock)
+            .returning(Dish.id)
+        )
+        updated = result.scalar_one_or_none() is not None
+        await self.session.commit()
+        return updated
+
+    async def sync_stock(self, levels: dict[int, int]) -> int:
+        # Один UPDATE ... FROM (VALUES ...) на всю сверку: горячий путь резервов строки не блокирует,
+        # а неизменившиеся остатки не перезаписываются
+        snapshot = values(
+            column("id", Integer), column("stock", Integer), name="snapshot"
+        ).data(list(levels.items()))
+        result = await self.session.execute(
+            update(Dish)
+            .where(
+                Dish.id == snapshot.c.id,
+                Dish.stock.is_not(None),
+                Dish.stock.is_distinct_from(snapshot.c.stock)
+            )
+            .values(stock=snapshot.c.stock)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
     
     @cache()
     async def get_dishes_category_id(self, category_id: int) -> list[Dish]:
@@ -1,8 +1,17 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import DateTime, Integer, column, delete, func, insert, literal, select, tuple_, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import selectinload
 from src.schemas.order_schemas import OrderItemCreate, OrderItemUpdate, OrderCreate, OrderUpdate, BasketCreate, BasketUpdate
-from src.infrastructure.models.order import Order, OrderItem, Basket, OrderStatus
+from src.infrastructure.models.order import (
+    Order, OrderItem, Basket, OrderStatus, OrderEvent, OrderCurrentStatus, OrderStatusCount
+)
+from src.infrastructure.models.menu import Dish
+from src.domain.order import OPEN_STATUSES, ORDER_TRANSITIONS, ensure_transition
+from src.infrastructure.repositories.outbox import OutboxRepository
+from src.infrastructure.repositories.saga import SagaRepository
+from src.core.config import settings
+from src.rabbitmq import EventType
 from src.redis import cache, invalidate_cache
 import datetime
 
@@ -10,6 +19,7 @@ import datetime
 class OrderRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
+        self.outbox = OutboxRepository(session)
         
     async def get_order_id(self, order_id: int) -> Order | None:
         result = await self.session.execute(
@@ -19,15 +29,90 @@ class OrderRepository:
         )
         return result.scalar_one_or_none()
     
-    async def get_orders(self, limit: int = 10, offset: int = 0) -> list[Order]:    
-        result = await self.session.execute(
+    async def get_orders(
+        self,
+        limit: int = 10,
+        offset: int = 0,
+        created_from: datetime.datetime | None = None,
+        created_to: datetime.datetime | None = None
+    ) -> list[Order]:
+        query = (
             select(Order)
-            .options(selectinload(Order.items))
+            .options(selectinload(self._items(created_from, created_to)))
             .offset(offset)
             .limit(limit)
         )
+        result = await self.session.execute(self._created_between(query, Order, created_from, created_to))
         return result.scalars().all()
+
+    @staticmethod
+    def _created_between(query, model, created_from, created_to):
+        # Условие на ключ секционирования: планировщик отбрасывает секции вне диапазона
+        if created_from is not None:
+            query = query.where(model.created_at >= created_from)
+        if created_to is not None:
+            query = query.where(model.created_at < created_to)
+        return query
+
+    @staticmethod
+    def _items(created_from, created_to):
+        # Позиции лежат в секции месяца своего заказа, тот же диапазон отсекает и их секции
+        if created_from is None and created_to is None:
+            return Order.items
+        conditions = []
+        if created_from is not None:
+            conditions.append(OrderItem.created_at >= created_from)
+        if created_to is not None:
+            conditions.append(OrderItem.created_at < created_to)
+        return Order.items.and_(*conditions)
     
+    async def get_user_orders(
+        self,
+        user_id: int,
+        limit: int = 20,
+        after: tuple[datetime.datetime, int] | None = None,
+        status: OrderStatus | None = None,
+        created_from: datetime.datetime | None = None,
+        created_to: datetime.datetime | None = None
+    ) -> list[Order]:
+        query = (
+            select(Order)
+            .options(selectinload(self._items(created_from, created_to)))
+            .where(Order.user_id == user_id)
+            .order_by(Order.created_at.desc(), Order.id.desc())
+            .limit(limit)
+        )
+        if after is not None:
+            query = query.where(tuple_(Order.created_at, Order.id) < tuple_(*after))
+        if status is not None:
+            query = query.where(Order.status == status)
+        result = await self.session.execute(self._created_between(query, Order, created_from, created_to))
+        return result.scalars().all()
+
+    async def get_kitchen_items(self, order_id: int) -> list[dict]:
+        result = await self.session.execute(
+            select(OrderItem.dish_id, OrderItem.quantity, Dish.name, Dish.category_id)
+            .outerjoin(Dish, Dish.id == OrderItem.dish_id)
+            .where(OrderItem.order_id == order_id)
+            .order_by(OrderItem.id)
+        )
+        return [dict(row._mapping) for row in result.all()]
+
+    async def get_kitchen_backlog(self) -> dict[int, tuple[datetime.datetime, list[dict]]]:
+        # Оплаченные, но не приготовленные заказы с позициями — из них кухня пересобирает очереди
+        result = await self.session.execute(
+            select(Order.id, Order.created_at, OrderItem.dish_id, OrderItem.quantity, Dish.name, Dish.category_id)
+            .join(OrderItem, OrderItem.order_id == Order.id)
+            .outerjoin(Dish, Dish.id == OrderItem.dish_id)
+            .where(Order.status == OrderStatus.PROCESSING)
+            .order_by(Order.id, OrderItem.id)
+        )
+        backlog: dict[int, tuple[datetime.datetime, list[dict]]] = {}
+        for order_id, created_at, *item in result.all():
+            _, items = backlog.setdefault(order_id, (created_at, []))
+            items.append(dict(zip(("dish_id", "quantity", "name", "category_id"), item)))
+        return backlog
+
     async def create_order(self, order: OrderCreate) -> Order:
         db_order = Order(
             user_id=order.user_id,
@@ -47,8 +132,9 @@ class OrderRepository:
         db_order = await self.get_order_id(order_id)
         if not db_order:
             return None
+        if order.status != db_order.status:
+            await self.transition(order_id, order.status)
         db_order.total_price = order.total_price
-        db_order.status = order.status
         db_order.updated_at = order.updated_at
         await self.session.commit()
         await invalidate_cache("get_order_id*")
@@ -58,6 +144,23 @@ class OrderRepository:
         db_order = await self.get_order_id(order_id)
         if not db_order:
             return False
+        # Журнал и проекции удаляются в той же транзакции, что и заказ, иначе счётчики статусов разойдутся с заказами
+        await self.session.execute(delete(OrderEvent).where(OrderEvent.order_id == order_id))
+        status = (await self.session.execute(
+            delete(OrderCurrentStatus)
+            .where(OrderCurrentStatus.order_id == order_id)
+            .returning(OrderCurrentStatus.status)
+        )).scalar_one_or_none()
+        if status is not None:
+            counts = pg_insert(OrderStatusCount).values(
+                status=status, shard=order_id % OrderStatusCount.STATUS_SHARDS, count=-1
+            )
+            await self.session.execute(
+                counts.on_conflict_do_update(
+                    index_elements=[OrderStatusCount.status, OrderStatusCount.shard],
+                    set_={"count": OrderStatusCount.count + counts.excluded.count}
+                )
+            )
         await self.session.delete(db_order)
         await self.session.commit()
         await invalidate_cache("get_order_id*")
@@ -124,7 +227,7 @@ class OrderRepository:
             user_id=basket.user_id,
             item_id=basket.dish_id,  
             quantity=basket.quantity,
-            price=0  
+            price=basket.price
         )
         self.session.add(db_basket)
         await self.session.commit()
@@ -156,45 +259,270 @@ class OrderRepository:
         )
         return result.scalars().all()
 
+    async def get_basket_dish_ids(self, user_id: int) -> list[int]:
+        result = await self.session.execute(
+            select(Basket.item_id).where(Basket.user_id == user_id).distinct()
+        )
+        return result.scalars().all()
+
+    async def reprice_basket(self, user_id: int, prices: dict[int, int]) -> int:
+        if not prices:
+            return 0
+        # Вся корзина переоценивается одним UPDATE ... FROM (VALUES ...)
+        current = values(
+            column("dish_id", Integer), column("price", Integer), name="current_prices"
+        ).data(list(prices.items()))
+        result = await self.session.execute(
+            update(Basket)
+            .where(
+                Basket.user_id == user_id,
+                Basket.item_id == current.c.dish_id,
+                Basket.price.is_distinct_from(current.c.price)
+            )
+            .values(price=current.c.price)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    async def replace_baskets(self, baskets: dict[int, list[BasketCreate]]) -> None:
+        if not baskets:
+            return
+        await self.session.execute(
+            delete(Basket).where(Basket.user_id.in_(list(baskets)))
+        )
+        rows = [
+            {"user_id": item.user_id, "item_id": item.dish_id, "quantity": item.quantity, "price": item.price}
+            for items in baskets.values() for item in items
+        ]
+        if rows:
+            await self.session.execute(insert(Basket), rows)
+
     async def basket_to_order(self, user_id: int) -> Order:
-        basket_items = await self.get_user_basket(user_id)
-        if not basket_items:
+        # Строки корзины блокируются до конца транзакции: повторный checkout
+        # того же пользователя дождётся коммита и увидит пустую корзину
+        locked = (
+            select(Basket.price, Basket.quantity)
+            .where(Basket.user_id == user_id)
+            .with_for_update()
+            .cte("locked")
+        )
+        items_count, total_price = (await self.session.execute(
+            select(
+                func.count(),
+                func.coalesce(func.sum(locked.c.price * locked.c.quantity), 0)
+            ).select_from(locked)
+        )).one()
+        if not items_count:
             raise ValueError("Корзина пуста")
 
-        total_price = sum(item.price * item.quantity for item in basket_items)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        order_id = (await self.session.execute(
+            insert(Order)
+            .values(
+                user_id=user_id,
+                total_price=total_price,
+                status=OrderStatus.PENDING,
+                created_at=now,
+                updated_at=now
+            )
+            .returning(Order.id)
+        )).scalar_one()
 
-        db_order = Order(
-            user_id=user_id,
-            total_price=total_price,
-            status=OrderStatus.PENDING,
-            created_at=datetime.datetime.now(),
-            updated_at=datetime.datetime.now()
+        moved = (
+            delete(Basket)
+            .where(Basket.user_id == user_id)
+            .returning(Basket.item_id, Basket.quantity, Basket.price)
+            .cte("moved")
         )
-        self.session.add(db_order)
-        await self.session.flush()
-
-        order_items = []
-        for basket_item in basket_items:
-            order_item = OrderItem(
-                order_id=db_order.id,
-                dish_id=basket_item.item_id,
-                quantity=basket_item.quantity,
-                price=basket_item.price
+        order_items = (await self.session.execute(
+            insert(OrderItem)
+            .from_select(
+                ["order_id", "dish_id", "quantity", "price", "created_at"],
+                # created_at как у заказа: позиции попадают в секцию того же месяца
+                select(
+                    literal(order_id, Integer), moved.c.item_id, moved.c.quantity, moved.c.price,
+                    literal(now, DateTime(timezone=True))
+                )
             )
-            order_items.append(order_item)
-            self.session.add(order_item)
-
-        for basket_item in basket_items:
-            await self.delete_basket(basket_item.id)
+            .returning(OrderItem.dish_id, OrderItem.quantity, OrderItem.price)
+        )).all()
 
+        items = [
+            {"dish_id": item.dish_id, "quantity": item.quantity, "price": item.price}
+            for item in order_items
+        ]
+        # Сумма по фактически перенесённым строкам: между блокировкой и DELETE
+        # в корзину мог попасть новый товар, который блокировка не видела
+        moved_total = sum(item["price"] * item["quantity"] for item in items)
+        if moved_total != total_price:
+            total_price = moved_total
+            await self.session.execute(
+                update(Order)
+                .where(Order.id == order_id, Order.created_at == now)
+                .values(total_price=total_price)
+            )
+        await self.append_event(order_id, user_id, None, OrderStatus.PENDING, now)
+        # Сага стартует в той же транзакции: ORDER_CREATED — команда на резервирование для меню
+        await SagaRepository(self.session).start(
+            order_id,
+            {"user_id": user_id, "total_price": total_price, "items": items},
+            timeout=settings.SAGA_MENU_TIMEOUT_SECONDS
+        )
+        await self.outbox.publish_event(EventType.ORDER_CREATED, {
+            "order_id": order_id,
+            "user_id": user_id,
+            "total_price": total_price,
+            "items": items,
+            "created_at": now.isoformat()
+        })
         await self.session.commit()
-        await self.session.refresh(db_order)
-        await invalidate_cache("get_order_id*")
-        return db_order
+        return await self.get_order_id(order_id)
     
-    async def cancel_order(self, order_id: str):
+    async def cancel_order(self, order_id: int):
         order = await self.get_order_id(order_id)
-        if order:
-            order.status = OrderStatus.CANCELLED
-            await self.db.commit()
+        if not order or order.status == OrderStatus.CANCELLED:
+            return
+        await self.cancel(order.id, order.user_id)
+        await self.session.commit()
+
+    async def cancel(self, order_id: int, user_id: int) -> None:
+        await self.transition(order_id, OrderStatus.CANCELLED)
+        await self.outbox.publish_event(EventType.ORDER_CANCELLED, {
+            "order_id": order_id,
+            "user_id": user_id
+        })
+
+    async def transition(self, order_id: int, new_status: OrderStatus) -> OrderStatus:
+        # Строка заказа блокируется, чтобы два перехода не прочитали один и тот же исходный статус
+        row = (await self.session.execute(
+            select(Order.user_id, Order.status)
+            .where(Order.id == order_id)
+            .with_for_update()
+        )).one_or_none()
+        if row is None:
+            raise ValueError(f"Заказ {order_id} не найден")
+        user_id, current = row
+        ensure_transition(current, new_status)
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        await self.session.execute(
+            update(Order)
+            .where(Order.id == order_id)
+            .values(status=new_status, updated_at=now)
+            .execution_options(synchronize_session="fetch")
+        )
+        await self.append_event(order_id, user_id, current, new_status, now)
+        return current
+
+    async def transition_many(self, order_ids: list[int], new_status: OrderStatus) -> list[tuple[int, int, OrderStatus]]:
+        # Пакетный переход одним UPDATE: заказы, из статуса которых перейти нельзя, просто не попадают в результат.
+        # Возвращает (order_id, user_id, прежний статус) для изменённых заказов
+        sources = [status for status, targets in ORDER_TRANSITIONS.items() if new_status in targets]
+        locked = (
+            select(Order.id, Order.user_id, Order.status)
+            .where(Order.id.in_(order_ids), Order.status.in_(sources))
+            .order_by(Order.id)
+            .with_for_update()
+            .cte("locked")
+        )
+        now = datetime.datetime.now(datetime.timezone.utc)
+        moved = (await self.session.execute(
+            update(Order)
+            .where(Order.id == locked.c.id)
+            .values(status=new_status, updated_at=now)
+            .returning(Order.id, locked.c.user_id, locked.c.status)
+            .execution_options(synchronize_session=False)
+        )).all()
+        transitions = [(order_id, user_id, current) for order_id, user_id, current in moved]
+        await self.append_events(transitions, new_status, now)
+        return transitions
+
+    async def append_event(
+        self,
+        order_id: int,
+        user_id: int,
+        from_status: OrderStatus | None,
+        to_status: OrderStatus,
+        created_at: datetime.datetime
+    ) -> None:
+        await self.append_events([(order_id, user_id, from_status)], to_status, created_at)
+
+    async def append_events(
+        self,
+        transitions: list[tuple[int, int, OrderStatus | None]],
+        to_status: OrderStatus,
+        created_at: datetime.datetime
+    ) -> None:
+        # Журнал и проекции пишутся тремя запросами на любое число заказов
+        if not transitions:
+            return
+        await self.session.execute(
+            insert(OrderEvent).values([
+                {
+                    "order_id": order_id,
+                    "user_id": user_id,
+                    "from_status": from_status,
+                    "to_status": to_status,
+                    "created_at": created_at
+                }
+                for order_id, user_id, from_status in transitions
+            ])
+        )
+        current = pg_insert(OrderCurrentStatus).values([
+            {"order_id": order_id, "user_id": user_id, "status": to_status, "updated_at": created_at}
+            for order_id, user_id, _ in transitions
+        ])
+        await self.session.execute(
+            current.on_conflict_do_update(
+                index_elements=[OrderCurrentStatus.order_id],
+                set_={"status": current.excluded.status, "updated_at": current.excluded.updated_at}
+            )
+        )
+        deltas = {}
+        for order_id, _, from_status in transitions:
+            shard = order_id % OrderStatusCount.STATUS_SHARDS
+            deltas[(to_status, shard)] = deltas.get((to_status, shard), 0) + 1
+            if from_status is not None:
+                deltas[(from_status, shard)] = deltas.get((from_status, shard), 0) - 1
+        counts = pg_insert(OrderStatusCount).values([
+            {"status": status, "shard": shard, "count": count}
+            for (status, shard), count in deltas.items()
+        ])
+        await self.session.execute(
+            counts.on_conflict_do_update(
+                index_elements=[OrderStatusCount.status, OrderStatusCount.shard],
+                set_={"count": OrderStatusCount.count + counts.excluded.count}
+            )
+        )
+
+    async def get_order_status(self, order_id: int) -> OrderCurrentStatus | None:
+        return await self.session.get(OrderCurrentStatus, order_id)
+
+    async def get_open_orders(self, user_id: int) -> list[OrderCurrentStatus]:
+        result = await self.session.execute(
+            select(OrderCurrentStatus)
+            .where(
+                OrderCurrentStatus.user_id == user_id,
+                OrderCurrentStatus.status.in_(OPEN_STATUSES)
+            )
+            .order_by(OrderCurrentStatus.order_id.desc())
+        )
+        return result.scalars().all()
+
+    async def get_status_counts(self) -> dict[OrderStatus, int]:
+        result = await self.session.execute(
+            select(OrderStatusCount.status, func.sum(OrderStatusCount.count))
+            .group_by(OrderStatusCount.status)
+        )
+        counts = {status: 0 for status in OrderStatus}
+        counts.update({status: int(count) for status, count in result.all()})
+        return counts
+
+    async def get_order_events(self, order_id: int) -> list[OrderEvent]:
+        result = await self.session.execute(
+            select(OrderEvent)
+            .where(OrderEvent.order_id == order_id)
+            .order_by(OrderEvent.id)
+        )
+        return result.scalars().all()
 
@@ -0,0 +1,41 @@
+from typing import Any, Dict, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
+from src.infrastructure.models.outbox import OutboxEvent
+from src.rabbitmq import EventType
+
+
+class OutboxRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    # Та же сигнатура, что у RabbitMQClient.publish_event: событие попадает в outbox
+    # и уходит в брокер только после коммита транзакции вызывающего кода
+    async def publish_event(
+        self,
+        event_type: EventType,
+        data: Dict[str, Any],
+        exchange_name: str = "amq.topic",
+        routing_key: Optional[str] = None
+    ) -> None:
+        event_type = EventType(event_type)
+        self.session.add(OutboxEvent(
+            exchange=exchange_name,
+            routing_key=routing_key or event_type.value,
+            event_type=event_type.value,
+            payload=data
+        ))
+
+    async def fetch_batch(self, limit: int = 100) -> list[OutboxEvent]:
+        result = await self.session.execute(
+            select(OutboxEvent)
+            .order_by(OutboxEvent.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return result.scalars().all()
+
+    async def delete(self, event_ids: list[int]) -> None:
+        await self.session.execute(
+            delete(OutboxEvent).where(OutboxEvent.id.in_(event_ids))
+        )
@@ -0,0 +1,30 @@
+import datetime
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class PartitionRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def ensure_monthly(self, table: str, start: datetime.date, months: int) -> int:
+        result = await self.session.execute(
+            text("SELECT public.create_monthly_partitions(CAST(:table AS regclass), :start, :months)"),
+            {"table": table, "start": start, "months": months}
+        )
+        return result.scalar_one()
+
+    async def default_rows(self, table: str) -> int:
+        # Строки в DEFAULT-секции мешают создать секцию их месяца, поэтому за ними следим
+        schema, name = table.split(".")
+        result = await self.session.execute(
+            text(f'SELECT count(*) FROM "{schema}"."{name}_default"')
+        )
+        return result.scalar_one()
+
+    async def drop_empty_before(self, table: str, before: datetime.datetime) -> int:
+        result = await self.session.execute(
+            text("SELECT public.drop_empty_partitions(CAST(:table AS regclass), :before)"),
+            {"table": table, "before": before}
+        )
+        return result.scalar_one()
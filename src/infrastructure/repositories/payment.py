@@ -1,8 +1,11 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import DateTime, Integer, String, bindparam, cast, func, select, text, update
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import selectinload
 from src.schemas.payment_schemas import PaymentCreate, PaymentUpdate
 from src.infrastructure.models.payment import Payment, PaymentStatus
+from src.infrastructure.repositories.outbox import OutboxRepository
+from src.rabbitmq import EventType
 from src.redis import cache, invalidate_cache
 import datetime
 import logging
@@ -10,19 +13,45 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Заказ занимается в payment_invoices и платёж создаётся одним запросом: при гонке второй INSERT
+# дожидается коммита первого и ничего не возвращает
+CREATE_PAYMENT_ONCE_SQL = text("""
+WITH claim AS (
+    INSERT INTO payments.payment_invoices (invoice_id) VALUES (:invoice_id)
+    ON CONFLICT (invoice_id) DO NOTHING
+    RETURNING invoice_id
+)
+INSERT INTO payments.payments (invoice_id, amount, status, created_at, updated_at)
+SELECT invoice_id, :amount, 'PENDING', :now, :now FROM claim
+RETURNING *
+""").bindparams(bindparam("now", type_=DateTime(timezone=True)))
+
 
 class PaymentRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
+        self.outbox = OutboxRepository(session)
         
-    async def get_payments(self, limit: int = 10, offset: int = 0) -> list[Payment]:
+    async def get_payments(
+        self,
+        limit: int = 10,
+        offset: int = 0,
+        created_from: datetime.datetime | None = None,
+        created_to: datetime.datetime | None = None
+    ) -> list[Payment]:
         try:
-            result = await self.session.execute(
+            query = (
                 select(Payment)
                 .offset(offset)
                 .limit(limit)
                 .order_by(Payment.created_at.desc())
             )
+            # Диапазон по created_at ограничивает выборку секциями нужных месяцев
+            if created_from is not None:
+                query = query.where(Payment.created_at >= created_from)
+            if created_to is not None:
+                query = query.where(Payment.created_at < created_to)
+            result = await self.session.execute(query)
             return result.scalars().all()
         except Exception as e:
             logger.error(f"Ошибка получения списка платежей: {e}")
@@ -51,9 +80,102 @@ class PaymentRepository:
             logger.error(f"Ошибка получения платежа по order_id {order_id}: {e}")
             raise
 
+    async def get_payments_by_order_ids(self, order_ids: set[int]) -> dict[int, Payment]:
+        if not order_ids:
+            return {}
+        result = await self.session.execute(
+            select(Payment).where(Payment.invoice_id.in_(order_ids))
+        )
+        return {payment.invoice_id: payment for payment in result.scalars().all()}
+
+    async def get_pending_page(
+        self,
+        after_id: int,
+        limit: int,
+        updated_before: datetime.datetime
+    ) -> list[Payment]:
+        # Keyset по id: каждая страница — короткий индексный проход без OFFSET
+        result = await self.session.execute(
+            select(Payment)
+            .where(
+                Payment.status == PaymentStatus.PENDING,
+                Payment.id > after_id,
+                Payment.updated_at < updated_before
+            )
+            .order_by(Payment.id)
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    async def apply_statuses(self, statuses: dict[int, PaymentStatus]) -> list[tuple[int, int, PaymentStatus]]:
+        if not statuses:
+            return []
+        # Все исправления страницы одним UPDATE ... FROM: строки приходят двумя массивами через unnest,
+        # а не VALUES со своими параметрами на каждую строку — запрос не перекомпилируется под размер страницы.
+        # Платёж, который успел обновить webhook, уже не PENDING и не перезаписывается. Диапазон id
+        # страницы оставляет планировщику индексный проход вместо полного чтения секций
+        corrections = func.unnest(
+            bindparam("ids", list(statuses), type_=ARRAY(Integer)),
+            bindparam("statuses", [status.value for status in statuses.values()], type_=ARRAY(String))
+        ).table_valued("id", "status").render_derived(name="corrections")
+        result = await self.session.execute(
+            update(Payment)
+            .where(
+                Payment.id == corrections.c.id,
+                Payment.id.between(min(statuses), max(statuses)),
+                Payment.status == PaymentStatus.PENDING
+            )
+            .values(
+                status=cast(corrections.c.status, Payment.__table__.c.status.type),
+                updated_at=datetime.datetime.now(datetime.timezone.utc)
+            )
+            .returning(Payment.id, Payment.invoice_id, Payment.status)
+            .execution_options(synchronize_session=False)
+        )
+        return [tuple(row) for row in result.all()]
+
+    async def create_payment_once(self, payment: PaymentCreate, now: datetime.datetime) -> Payment | None:
+        # None — платёж по этому заказу уже создан. Событие PAYMENT_CREATED коммитится вместе с платежом,
+        # refresh не нужен: RETURNING уже вернул строку целиком
+        result = await self.session.execute(
+            select(Payment).from_statement(CREATE_PAYMENT_ONCE_SQL),
+            {"invoice_id": payment.invoice_id, "amount": payment.amount, "now": now}
+        )
+        db_payment = result.scalar_one_or_none()
+        if db_payment is None:
+            await self.session.rollback()
+            return None
+        await self.outbox.publish_event(EventType.PAYMENT_CREATED, {
+            "payment_id": db_payment.id,
+            "invoice_id": db_payment.invoice_id,
+            "amount": db_payment.amount
+        })
+        await self.session.commit()
+        return db_payment
+
+    async def apply_gateway_result(
+        self,
+        payment_id: int,
+        created_at: datetime.datetime,
+        status: PaymentStatus,
+        transaction_id: str | None
+    ) -> Payment:
+        # created_at — значение, с которым платёж вставлен: условие на ключ оставляет одну секцию
+        result = await self.session.execute(
+            update(Payment)
+            .where(Payment.id == payment_id, Payment.created_at == created_at)
+            .values(status=status, transaction_id=transaction_id, updated_at=datetime.datetime.now(datetime.timezone.utc))
+            .returning(Payment)
+            .execution_options(populate_existing=True)
+        )
+        db_payment = result.scalar_one()
+        await self.session.commit()
+        await invalidate_cache("get_payment_by_id*")
+        return db_payment
+
     async def create_payment(self, payment: PaymentCreate) -> Payment:
         try:
-            now = datetime.datetime.now()
+            now = datetime.datetime.now(datetime.timezone.utc)
             db_payment = Payment(
                 invoice_id=payment.invoice_id,
                 amount=payment.amount,
@@ -62,6 +184,12 @@ class PaymentRepository:
                 updated_at=now
             )
             self.session.add(db_payment)
+            await self.session.flush()
+            await self.outbox.publish_event(EventType.PAYMENT_CREATED, {
+                "payment_id": db_payment.id,
+                "invoice_id": db_payment.invoice_id,
+                "amount": db_payment.amount
+            })
             await self.session.commit()
             await self.session.refresh(db_payment)
             await invalidate_cache("get_payment_by_id*")
@@ -83,7 +211,7 @@ class PaymentRepository:
                 if value is not None:
                     setattr(db_payment, key, value)
             
-            db_payment.updated_at = datetime.datetime.utcnow()
+            db_payment.updated_at = datetime.datetime.now(datetime.timezone.utc)
             await self.session.commit()
             await self.session.refresh(db_payment)
             await invalidate_cache("get_payment_by_id*")
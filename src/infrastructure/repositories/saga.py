@@ -0,0 +1,107 @@
+import datetime
+from typing import Any, Dict, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, update
+from src.infrastructure.models.saga import Saga, SagaStatus, SagaStep
+
+
+class SagaRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def start(self, order_id: int, payload: Dict[str, Any], timeout: float) -> Saga:
+        saga = Saga(
+            order_id=order_id,
+            step=SagaStep.RESERVE_MENU.value,
+            status=SagaStatus.RUNNING.value,
+            deadline_at=self._deadline(timeout),
+            compensations=[],
+            payload=payload
+        )
+        self.session.add(saga)
+        return saga
+
+    async def get_for_update(self, order_id: int) -> Optional[Saga]:
+        # Событие и таймаут по одной саге не должны обрабатываться одновременно
+        result = await self.session.execute(
+            select(Saga)
+            .where(Saga.order_id == order_id)
+            .with_for_update()
+        )
+        return result.scalar_one_or_none()
+
+    async def get_many_for_update(self, order_ids: list[int]) -> Dict[int, Saga]:
+        # Блокировки берутся в порядке order_id, чтобы параллельные пачки не ловили взаимоблокировку
+        result = await self.session.execute(
+            select(Saga)
+            .where(Saga.order_id.in_(order_ids))
+            .order_by(Saga.order_id)
+            .with_for_update()
+        )
+        return {saga.order_id: saga for saga in result.scalars().all()}
+
+    async def get(self, order_id: int) -> Optional[Saga]:
+        result = await self.session.execute(
+            select(Saga).where(Saga.order_id == order_id)
+        )
+        return result.scalar_one_or_none()
+
+    async def fetch_expired(self, limit: int = 100) -> list[Saga]:
+        result = await self.session.execute(
+            select(Saga)
+            .where(Saga.status == SagaStatus.RUNNING.value, Saga.deadline_at < func.now())
+            .order_by(Saga.deadline_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return result.scalars().all()
+
+    def advance(
+        self,
+        saga: Saga,
+        step: SagaStep,
+        timeout: Optional[float] = None,
+        compensation: Optional[str] = None
+    ) -> None:
+        saga.step = step.value
+        saga.deadline_at = self._deadline(timeout) if timeout is not None else None
+        if compensation is not None:
+            # JSONB-колонку переприсваиваем целиком, иначе ORM не заметит изменения
+            saga.compensations = [*saga.compensations, compensation]
+        saga.updated_at = func.now()
+
+    def remember(self, saga: Saga, **values: Any) -> None:
+        # JSONB-колонку переприсваиваем целиком, иначе ORM не заметит изменения
+        saga.payload = {**saga.payload, **values}
+        saga.updated_at = func.now()
+
+    def finish(self, saga: Saga, status: SagaStatus, error: Optional[str] = None) -> None:
+        saga.status = status.value
+        saga.deadline_at = None
+        saga.error = error[:255] if error else None
+        if status == SagaStatus.COMPLETED:
+            saga.step = SagaStep.DONE.value
+        saga.updated_at = func.now()
+
+    async def finish_many(self, saga_ids: list[int], status: SagaStatus, error: Optional[str] = None) -> None:
+        # То же, что finish, одним UPDATE на пачку саг
+        if not saga_ids:
+            return
+        values = {
+            "status": status.value,
+            "deadline_at": None,
+            "error": error[:255] if error else None,
+            "updated_at": func.now()
+        }
+        if status == SagaStatus.COMPLETED:
+            values["step"] = SagaStep.DONE.value
+        await self.session.execute(
+            update(Saga)
+            .where(Saga.id.in_(saga_ids))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def _deadline(timeout: float) -> datetime.datetime:
+        return datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=timeout)
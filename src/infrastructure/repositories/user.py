@@ -1,8 +1,10 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from src.infrastructure.models.user import User
 from src.domain.user import UserCreate, UserUpdate
-from src.core.security import get_password_hash
+from src.core.security import hash_password
+from src.infrastructure.services.token_revocation import token_revocations
+from src.infrastructure.services.user_cache import user_cache
 
 class UserRepository:
     def __init__(self, session: AsyncSession):
@@ -13,7 +15,7 @@ class UserRepository:
             name=user.name,
             email=user.email,
             number_phone=user.number_phone,
-            hashed_password=get_password_hash(user.password),
+            hashed_password=await hash_password(user.password),
             is_admin=user.is_admin,
             is_phone_verified=user.is_phone_verified
         )
@@ -48,14 +50,24 @@ class UserRepository:
         update_data = user_update.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             if field == "password":
-                setattr(db_user, "hashed_password", value) 
+                setattr(db_user, "hashed_password", await hash_password(value))
             else:
                 setattr(db_user, field, value)
 
         await self.session.commit()
+        await user_cache.invalidate(user_id)
+        if "is_admin" in update_data or "password" in update_data:
+            # Роль зашита в токены, а смена пароля должна разлогинить: старые токены отзываются
+            await token_revocations.revoke_user(user_id)
         await self.session.refresh(db_user)
         return db_user
 
+    async def update_password_hash(self, user_id: int, hashed_password: str) -> None:
+        await self.session.execute(
+            update(User).where(User.id == user_id).values(hashed_password=hashed_password)
+        )
+        await self.session.commit()
+
     async def make_admin(self, phone: str) -> User:
         user = await self.get_by_phone(phone)
         if not user:
@@ -63,5 +75,7 @@ class UserRepository:
         
         user.is_admin = True
         await self.session.commit()
+        await user_cache.invalidate(user.id)
+        await token_revocations.revoke_user(user.id)
         await self.session.refresh(user)
         return user
\ No newline at end of file
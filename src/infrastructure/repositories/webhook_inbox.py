@@ -0,0 +1,67 @@
+import datetime
+from typing import Any, Dict, Optional
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.infrastructure.models.payment import WebhookInbox
+
+
+class WebhookInboxRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def append(
+        self,
+        transaction_id: str,
+        invoice_id: Optional[int],
+        status: str,
+        payload: Dict[str, Any]
+    ) -> bool:
+        # False — эту транзакцию шлюз уже присылал
+        result = await self.session.execute(
+            pg_insert(WebhookInbox)
+            .values(
+                transaction_id=transaction_id,
+                invoice_id=invoice_id,
+                status=status,
+                payload=payload
+            )
+            .on_conflict_do_nothing(index_elements=[WebhookInbox.transaction_id])
+            .returning(WebhookInbox.transaction_id)
+        )
+        return result.scalar_one_or_none() is not None
+
+    async def claim_batch(self, limit: int, max_attempts: int) -> list[WebhookInbox]:
+        result = await self.session.execute(
+            select(WebhookInbox)
+            .where(WebhookInbox.processed_at.is_(None), WebhookInbox.attempts < max_attempts)
+            .order_by(WebhookInbox.received_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return result.scalars().all()
+
+    async def mark_processed(self, transaction_ids: list[str]) -> None:
+        await self.session.execute(
+            update(WebhookInbox)
+            .where(WebhookInbox.transaction_id.in_(transaction_ids))
+            .values(processed_at=func.now(), error=None)
+        )
+
+    async def record_failure(self, transaction_ids: list[str], error: str, max_attempts: int) -> None:
+        # После max_attempts запись закрывается с ошибкой и больше не забирается
+        await self.session.execute(
+            update(WebhookInbox)
+            .where(WebhookInbox.transaction_id.in_(transaction_ids))
+            .values(
+                attempts=WebhookInbox.attempts + 1,
+                error=error[:255],
+                processed_at=case((WebhookInbox.attempts + 1 >= max_attempts, func.now()), else_=None)
+            )
+        )
+
+    async def purge_processed(self, before: datetime.datetime) -> int:
+        result = await self.session.execute(
+            delete(WebhookInbox).where(WebhookInbox.processed_at < before)
+        )
+        return result.rowcount
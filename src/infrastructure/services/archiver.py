@@ -0,0 +1,93 @@
+import asyncio
+import datetime
+import logging
+from typing import Awaitable, Callable, NamedTuple
+from src.database import async_session
+from src.infrastructure.repositories.archive import ArchiveRepository
+from src.infrastructure.repositories.partition import PartitionRepository
+from src.infrastructure.services.partitions import ORDER_TABLES, PAYMENT_TABLES
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveJob(NamedTuple):
+    name: str
+    archive: Callable[[ArchiveRepository, datetime.datetime, int], Awaitable[int]]
+    tables: tuple[str, ...]
+
+
+ORDER_ARCHIVE = ArchiveJob("orders", ArchiveRepository.archive_orders, ORDER_TABLES)
+PAYMENT_ARCHIVE = ArchiveJob("payments", ArchiveRepository.archive_payments, PAYMENT_TABLES)
+
+
+# Переносит завершённые записи старше archive_after_days в архивные таблицы небольшими пачками:
+# каждая пачка — отдельная короткая транзакция, между ними пауза и ожидание реплик
+class ColdDataArchiver:
+    def __init__(
+        self,
+        job: ArchiveJob,
+        session_factory=async_session,
+        archive_after_days: int = 180,
+        batch_size: int = 500,
+        batch_pause: float = 0.2,
+        max_replication_lag: float = 5.0,
+        interval: float = 3600.0
+    ):
+        self.job = job
+        self.session_factory = session_factory
+        self.archive_after_days = archive_after_days
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.max_replication_lag = max_replication_lag
+        self.interval = interval
+
+    async def archive_once(self, now: datetime.datetime | None = None) -> int:
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        cutoff = now - datetime.timedelta(days=self.archive_after_days)
+        archived = 0
+        while True:
+            await self._wait_for_replicas()
+            async with self.session_factory() as session:
+                moved = await self.job.archive(ArchiveRepository(session), cutoff, self.batch_size)
+                await session.commit()
+            archived += moved
+            if moved < self.batch_size:
+                break
+            await asyncio.sleep(self.batch_pause)
+        dropped = await self._drop_empty_partitions(cutoff)
+        if archived or dropped:
+            logger.info(
+                f"[Archive] {self.job.name}: перенесено {archived} записей старше {cutoff:%Y-%m-%d}, "
+                f"удалено пустых секций: {dropped}"
+            )
+        return archived
+
+    async def _wait_for_replicas(self) -> None:
+        # Массовые удаления раздувают WAL: пока реплики отстают, следующая пачка ждёт
+        while True:
+            async with self.session_factory() as session:
+                lag = await ArchiveRepository(session).replication_lag()
+            if lag <= self.max_replication_lag:
+                return
+            logger.warning(f"[Archive] {self.job.name}: отставание реплик {lag:.1f}s, архивация приостановлена")
+            await asyncio.sleep(max(lag, self.batch_pause))
+
+    async def _drop_empty_partitions(self, cutoff: datetime.datetime) -> int:
+        dropped = 0
+        async with self.session_factory() as session:
+            repository = PartitionRepository(session)
+            for table in self.job.tables:
+                dropped += await repository.drop_empty_before(table, cutoff)
+            await session.commit()
+        return dropped
+
+    async def run(self) -> None:
+        logger.info(f"[Archive] Архивация {self.job.name} запущена: старше {self.archive_after_days} дней")
+        while True:
+            try:
+                await self.archive_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Archive] Ошибка архивации {self.job.name}: {e}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import time
+from redis.asyncio import Redis
+from src.database import async_session
+from src.infrastructure.repositories.order import OrderRepository
+from src.schemas.order_schemas import BasketCreate
+
+logger = logging.getLogger(__name__)
+
+# Меняет количество только у уже лежащей в корзине позиции
+SET_QUANTITY_SCRIPT = """
+if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('SADD', KEYS[2], ARGV[4])
+redis.call('ZADD', KEYS[3], ARGV[5], ARGV[4])
+return 1
+"""
+
+# Забирает корзину на оформление: ключ переименовывается, поэтому позиции, добавленные
+# во время оформления, попадут уже в новую корзину. Эпоха пользователя растёт,
+# чтобы write-behind не записал в Postgres снимок, прочитанный до оформления
+TAKE_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return false
+end
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {}
+end
+redis.call('RENAME', KEYS[1], KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+redis.call('HINCRBY', KEYS[3], ARGV[1], 1)
+redis.call('SREM', KEYS[4], ARGV[1])
+return redis.call('HGETALL', KEYS[2])
+"""
+
+# Возвращает не оформленную корзину, складывая с тем, что добавили за время оформления
+RESTORE_SCRIPT = """
+local fields = redis.call('HGETALL', KEYS[2])
+if #fields == 0 then
+    return 0
+end
+for i = 1, #fields, 2 do
+    if string.sub(fields[i], 1, 2) == 'q:' then
+        redis.call('HINCRBY', KEYS[1], fields[i], fields[i + 1])
+    else
+        redis.call('HSETNX', KEYS[1], fields[i], fields[i + 1])
+    end
+end
+redis.call('DEL', KEYS[2])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('SADD', KEYS[3], ARGV[1])
+redis.call('ZADD', KEYS[4], ARGV[3], ARGV[1])
+return 1
+"""
+
+# Корзины, истёкшие по TTL, помечаются грязными, чтобы write-behind удалил их строки из Postgres
+EXPIRED_SCRIPT = """
+local user_ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, user_id in ipairs(user_ids) do
+    redis.call('ZREM', KEYS[1], user_id)
+    redis.call('SADD', KEYS[2], user_id)
+end
+return #user_ids
+"""
+
+
+class RedisBasketStore:
+    DIRTY_KEY = "basket:dirty"
+    EPOCH_KEY = "basket:epoch"
+    EXPIRY_KEY = "basket:expiry"
+
+    def __init__(self, redis: Redis, ttl: int = 3 * 24 * 3600, checkout_ttl: int = 600):
+        self.redis = redis
+        self.ttl = ttl
+        self.checkout_ttl = checkout_ttl
+        self._set_quantity = redis.register_script(SET_QUANTITY_SCRIPT)
+        self._take = redis.register_script(TAKE_SCRIPT)
+        self._restore = redis.register_script(RESTORE_SCRIPT)
+        self._expired = redis.register_script(EXPIRED_SCRIPT)
+
+    @staticmethod
+    def key(user_id: int) -> str:
+        return f"basket:{user_id}"
+
+    @staticmethod
+    def checkout_key(user_id: int) -> str:
+        return f"basket:checkout:{user_id}"
+
+    def _expires_at(self) -> float:
+        return time.time() + self.ttl
+
+    async def add(self, user_id: int, dish_id: int, quantity: int, price: int) -> int:
+        key = self.key(user_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hincrby(key, f"q:{dish_id}", quantity)
+            pipe.hset(key, f"p:{dish_id}", price)
+            pipe.expire(key, self.ttl)
+            pipe.sadd(self.DIRTY_KEY, user_id)
+            pipe.zadd(self.EXPIRY_KEY, {user_id: self._expires_at()})
+            new_quantity, *_ = await pipe.execute()
+        return int(new_quantity)
+
+    async def set_quantity(self, user_id: int, dish_id: int, quantity: int) -> bool:
+        if quantity <= 0:
+            return await self.remove(user_id, dish_id)
+        updated = await self._set_quantity(
+            keys=[self.key(user_id), self.DIRTY_KEY, self.EXPIRY_KEY],
+            args=[f"q:{dish_id}", quantity, self.ttl, user_id, self._expires_at()]
+        )
+        return bool(updated)
+
+    async def remove(self, user_id: int, dish_id: int) -> bool:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hdel(self.key(user_id), f"q:{dish_id}", f"p:{dish_id}")
+            pipe.sadd(self.DIRTY_KEY, user_id)
+            removed, _ = await pipe.execute()
+        return bool(removed)
+
+    async def items(self, user_id: int) -> list[BasketCreate]:
+        return self._parse(user_id, await self.redis.hgetall(self.key(user_id)))
+
+    async def snapshot(self, user_ids: list[int]) -> tuple[dict[int, list[BasketCreate]], dict[int, int]]:
+        # Корзины вместе с эпохами одной транзакцией; оформляемые сейчас пропускаются —
+        # их строки в Postgres переносит в заказ сам checkout
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for user_id in user_ids:
+                pipe.hgetall(self.key(user_id))
+                pipe.exists(self.checkout_key(user_id))
+            pipe.hmget(self.EPOCH_KEY, user_ids)
+            *raw, epochs = await pipe.execute()
+        baskets = {
+            user_id: self._parse(user_id, fields)
+            for user_id, fields, checking_out in zip(user_ids, raw[::2], raw[1::2])
+            if not checking_out
+        }
+        return baskets, {user_id: int(epoch or 0) for user_id, epoch in zip(user_ids, epochs)}
+
+    async def epochs(self, user_ids: list[int]) -> dict[int, int]:
+        if not user_ids:
+            return {}
+        epochs = await self.redis.hmget(self.EPOCH_KEY, user_ids)
+        return {user_id: int(epoch or 0) for user_id, epoch in zip(user_ids, epochs)}
+
+    async def take(self, user_id: int) -> list[BasketCreate]:
+        raw = await self._take(
+            keys=[self.key(user_id), self.checkout_key(user_id), self.EPOCH_KEY, self.DIRTY_KEY],
+            args=[user_id, self.checkout_ttl]
+        )
+        if raw is None:
+            raise ValueError("Корзина уже оформляется")
+        return self._parse(user_id, dict(zip(raw[::2], raw[1::2])))
+
+    async def restore(self, user_id: int) -> None:
+        await self._restore(
+            keys=[self.key(user_id), self.checkout_key(user_id), self.DIRTY_KEY, self.EXPIRY_KEY],
+            args=[user_id, self.ttl, self._expires_at()]
+        )
+
+    async def finish_checkout(self, user_id: int) -> None:
+        await self.redis.delete(self.checkout_key(user_id))
+
+    async def mark_expired(self, count: int) -> int:
+        return await self._expired(keys=[self.EXPIRY_KEY, self.DIRTY_KEY], args=[time.time(), count])
+
+    async def pop_dirty(self, count: int) -> list[int]:
+        return [int(user_id) for user_id in await self.redis.spop(self.DIRTY_KEY, count) or []]
+
+    async def mark_dirty(self, user_ids: list[int]) -> None:
+        if user_ids:
+            await self.redis.sadd(self.DIRTY_KEY, *user_ids)
+
+    @staticmethod
+    def _parse(user_id: int, fields: dict) -> list[BasketCreate]:
+        items = []
+        for field, quantity in fields.items():
+            if not field.startswith("q:"):
+                continue
+            dish_id = field[2:]
+            items.append(BasketCreate(
+                user_id=user_id,
+                dish_id=int(dish_id),
+                quantity=int(quantity),
+                price=int(fields.get(f"p:{dish_id}", 0))
+            ))
+        return items
+
+
+class BasketWriteBehind:
+    def __init__(
+        self,
+        store: RedisBasketStore,
+        session_factory=async_session,
+        interval: float = 30.0,
+        batch_size: int = 500
+    ):
+        self.store = store
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+
+    async def flush_once(self) -> int:
+        # Истёкшая по TTL корзина читается как пустая и удаляется из Postgres
+        await self.store.mark_expired(self.batch_size)
+        user_ids = await self.store.pop_dirty(self.batch_size)
+        if not user_ids:
+            return 0
+        try:
+            baskets, epochs = await self.store.snapshot(user_ids)
+            async with self.session_factory() as session:
+                await OrderRepository(session).replace_baskets(baskets)
+                await session.commit()
+        except Exception:
+            await self.store.mark_dirty(user_ids)
+            raise
+        # Если пользователь оформил заказ, пока снимок писался, в Postgres могли вернуться
+        # уже перенесённые в заказ строки: перезаписываем их текущим состоянием Redis
+        current = await self.store.epochs(list(baskets))
+        await self.store.mark_dirty([user_id for user_id in baskets if current[user_id] != epochs[user_id]])
+        logger.info(f"[Basket] Сброшено корзин в Postgres: {len(baskets)}")
+        return len(user_ids)
+
+    async def run(self) -> None:
+        logger.info("[Basket] Write-behind запущен")
+        while True:
+            try:
+                flushed = await self.flush_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Basket] Ошибка сброса корзин: {e}")
+                flushed = 0
+            if flushed < self.batch_size:
+                await asyncio.sleep(self.interval)
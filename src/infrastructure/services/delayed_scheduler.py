@@ -0,0 +1,182 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from redis.asyncio import Redis
+from src.rabbitmq import EventType, RabbitMQClient
+
+logger = logging.getLogger(__name__)
+
+# Возвращает просроченные аренды в очередь и атомарно забирает пачку наступивших таймеров
+CLAIM_SCRIPT = """
+local now = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local lease_until = now + tonumber(ARGV[3])
+
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now, 'LIMIT', 0, limit)
+if #expired > 0 then
+    local requeue = {}
+    for _, id in ipairs(expired) do
+        requeue[#requeue + 1] = now
+        requeue[#requeue + 1] = id
+    end
+    redis.call('ZADD', KEYS[1], unpack(requeue))
+    redis.call('ZREM', KEYS[2], unpack(expired))
+end
+
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'LIMIT', 0, limit)
+if #ids == 0 then
+    return {}
+end
+local leased = {}
+for _, id in ipairs(ids) do
+    leased[#leased + 1] = lease_until
+    leased[#leased + 1] = id
+end
+redis.call('ZREM', KEYS[1], unpack(ids))
+redis.call('ZADD', KEYS[2], unpack(leased))
+
+local payloads = redis.call('HMGET', KEYS[3], unpack(ids))
+local result = {}
+for i, id in ipairs(ids) do
+    result[#result + 1] = id
+    result[#result + 1] = payloads[i] or ''
+end
+return result
+"""
+
+
+class RedisTimerWheel:
+    DUE_KEY = "timers:due"
+    INFLIGHT_KEY = "timers:inflight"
+    PAYLOAD_KEY = "timers:payload"
+
+    def __init__(self, redis: Redis, lease_seconds: float = 30.0):
+        self.redis = redis
+        self.lease_ms = int(lease_seconds * 1000)
+        self._claim = redis.register_script(CLAIM_SCRIPT)
+
+    async def schedule(
+        self,
+        event_type: EventType,
+        data: Dict[str, Any],
+        delay: Optional[float | timedelta] = None,
+        run_at: Optional[datetime] = None,
+        exchange_name: str = "amq.topic",
+        routing_key: Optional[str] = None,
+        timer_id: Optional[str] = None
+    ) -> str:
+        if run_at is not None:
+            due_ms = int(run_at.timestamp() * 1000)
+        else:
+            if isinstance(delay, timedelta):
+                delay = delay.total_seconds()
+            due_ms = int((time.time() + (delay or 0)) * 1000)
+
+        event_type = EventType(event_type)
+        timer_id = timer_id or uuid.uuid4().hex
+        payload = json.dumps({
+            "event_type": event_type.value,
+            "exchange": exchange_name,
+            "routing_key": routing_key or event_type.value,
+            "data": data
+        })
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.PAYLOAD_KEY, timer_id, payload)
+            pipe.zadd(self.DUE_KEY, {timer_id: due_ms})
+            await pipe.execute()
+        return timer_id
+
+    async def cancel(self, timer_id: str) -> bool:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.DUE_KEY, timer_id)
+            pipe.zrem(self.INFLIGHT_KEY, timer_id)
+            pipe.hdel(self.PAYLOAD_KEY, timer_id)
+            removed, _, _ = await pipe.execute()
+        return bool(removed)
+
+    async def claim_due(self, limit: int = 500, now: Optional[float] = None) -> list[tuple[str, Optional[dict]]]:
+        now_ms = int((now if now is not None else time.time()) * 1000)
+        raw = await self._claim(
+            keys=[self.DUE_KEY, self.INFLIGHT_KEY, self.PAYLOAD_KEY],
+            args=[now_ms, limit, self.lease_ms]
+        )
+        return [
+            (raw[i], json.loads(raw[i + 1]) if raw[i + 1] else None)
+            for i in range(0, len(raw), 2)
+        ]
+
+    async def ack(self, timer_ids: list[str]) -> None:
+        if not timer_ids:
+            return
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.INFLIGHT_KEY, *timer_ids)
+            pipe.hdel(self.PAYLOAD_KEY, *timer_ids)
+            await pipe.execute()
+
+    async def next_due_in(self) -> Optional[float]:
+        head = await self.redis.zrange(self.DUE_KEY, 0, 0, withscores=True)
+        if not head:
+            return None
+        return max(0.0, head[0][1] / 1000 - time.time())
+
+    async def pending(self) -> int:
+        return await self.redis.zcard(self.DUE_KEY)
+
+
+class DelayedDispatcher:
+    def __init__(
+        self,
+        timer_wheel: RedisTimerWheel,
+        rabbitmq_client: RabbitMQClient,
+        batch_size: int = 500,
+        poll_interval: float = 0.5
+    ):
+        self.timers = timer_wheel
+        self.rabbitmq = rabbitmq_client
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+
+    async def dispatch_once(self) -> int:
+        claimed = await self.timers.claim_due(self.batch_size)
+        if not claimed:
+            return 0
+        due = [(timer_id, payload) for timer_id, payload in claimed if payload is not None]
+        # Таймер без payload был отменён между ZADD и HSET — просто снимаем аренду
+        orphaned = [timer_id for timer_id, payload in claimed if payload is None]
+
+        results = await asyncio.gather(*(
+            self.rabbitmq.publish_event(
+                EventType(payload["event_type"]),
+                payload["data"],
+                exchange_name=payload["exchange"],
+                routing_key=payload["routing_key"],
+                message_id=timer_id
+            )
+            for timer_id, payload in due
+        ), return_exceptions=True)
+
+        # Неподтверждённые брокером таймеры останутся в аренде и вернутся в очередь по её истечении
+        published = [timer_id for (timer_id, _), result in zip(due, results) if not isinstance(result, BaseException)]
+        await self.timers.ack(published + orphaned)
+        if len(published) < len(due):
+            logger.warning(f"[Timers] Не опубликовано таймеров: {len(due) - len(published)}")
+        return len(claimed)
+
+    async def run(self) -> None:
+        logger.info("[Timers] Диспетчер отложенных событий запущен")
+        while True:
+            try:
+                dispatched = await self.dispatch_once()
+                if dispatched >= self.batch_size:
+                    continue
+                next_due = await self.timers.next_due_in()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Timers] Ошибка отправки отложенных событий: {e}")
+                next_due = None
+            await asyncio.sleep(self.poll_interval if next_due is None else min(next_due, self.poll_interval))
@@ -3,12 +3,26 @@ import hashlib
 import base64
 import os
 import logging
-from typing import Dict, Any
+import httpx
+from typing import Dict, Any, Optional
+from src.core.config import settings
+from src.infrastructure.models.payment import PaymentStatus
 
 logger = logging.getLogger(__name__)
 
 SECRET_KEY = os.getenv("SECRET_KEY", "default_secret_key")
 
+WEBHOOK_STATUSES = {
+    "success": PaymentStatus.COMPLETED,
+    "completed": PaymentStatus.COMPLETED,
+    "paid": PaymentStatus.COMPLETED,
+    "failed": PaymentStatus.FAILED,
+    "error": PaymentStatus.FAILED,
+    "declined": PaymentStatus.FAILED,
+    "cancelled": PaymentStatus.CANCELLED,
+    "canceled": PaymentStatus.CANCELLED,
+}
+
 
 def generate_token(order_id: str) -> str:
     message = f"{order_id}{SECRET_KEY}"
@@ -21,117 +35,94 @@ def verify_token(invoice_id: str, token: str) -> bool:
     return hmac.compare_digest(expected_token, token)
 
 
+def sign_webhook(body: bytes) -> str:
+    # Как у CloudPayments: заголовок Content-HMAC = base64(HMAC-SHA256 тела запроса)
+    digest = hmac.new(settings.CLOUDPAYMENTS_API_SECRET.encode(), body, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode()
+
+
+def verify_webhook_signature(body: bytes, signature: Optional[str]) -> bool:
+    if not signature:
+        return False
+    return hmac.compare_digest(sign_webhook(body), signature)
+
+
+def webhook_status(status: str) -> Optional[PaymentStatus]:
+    return WEBHOOK_STATUSES.get(status.lower())
+
+
 async def create_payment(amount: int, invoice_id: int) -> Dict[str, Any]:
-    try:
-        token = generate_token(str(invoice_id))
-        print(f"Токен: {token[:20]}...")
-        
-        mock_response = {
-            "success": True,
-            "transaction_id": f"test_txn_{invoice_id}_{hash(str(amount))%10000}",
-            "amount": amount,
-            "order_id": invoice_id,
-            "status": "pending",
-            "payment_url": f"https://test-payment.local/pay?token={token}",
-            "message": "Платеж создан успешно (ТЕСТ)"
-        }
-        
-        print(f"Результат: {mock_response}")
-        logger.info(f"Создан тестовый платеж для заказа {invoice_id} на сумму {amount}")
-
-        return mock_response
-        
-    except Exception as e:
-        error_response = {
-            "success": False,
-            "error": "Ошибка создания платежа",
-            "details": str(e)
-        }
-        print(f"Ошибка: {error_response}")
-        logger.error(f"Ошибка создания платежа: {e}")
-        return error_response
-
-
-async def handle_cloudpayments_webhook(payload: Dict[str, Any]) -> Dict[str, Any]:
-    try:
-        print(f"Получен webhook:")
-        print(f"Payload: {payload}")
-        
-        transaction_id = payload.get("transaction_id", "unknown")
-        status = payload.get("status", "unknown")
-        invoice_id = payload.get("invoice_id", "unknown")
-        amount = payload.get("amount", 0)
-        
-        print(f"Transaction ID: {transaction_id}")
-        print(f"Статус: {status}")
-        print(f"Заказ ID: {invoice_id}")
-        print(f"Сумма: {amount}")
-        
-        if status.lower() in ["success", "completed", "paid"]:
-            result = {
-                "status": "processed",
-                "message": "Платеж успешно завершен",
-                "transaction_id": transaction_id,
-                "invoice_id": invoice_id
-            }
-            print(f"Платеж успешен!")
-            logger.info(f"Webhook: успешный платеж {transaction_id} для заказа {invoice_id}")
-
-        elif status.lower() in ["failed", "error", "declined"]:
-            result = {
-                "status": "processed", 
-                "message": "Платеж отклонен",
-                "transaction_id": transaction_id,
-                "invoice_id": invoice_id
-            }
-            print(f"Платеж отклонен!")
-            logger.warning(f"Webhook: отклоненный платеж {transaction_id} для заказа {invoice_id}")
-
-        elif status.lower() in ["cancelled", "canceled"]:
-            result = {
-                "status": "processed",
-                "message": "Платеж отменен",
-                "transaction_id": transaction_id,
-                "invoice_id": invoice_id
-            }
-            print(f"Платеж отменен!")
-            logger.info(f"Webhook: отмененный платеж {transaction_id} для заказа {invoice_id}")
-
-        else:
-            result = {
-                "status": "ignored",
-                "message": f"Неизвестный статус: {status}",
-                "transaction_id": transaction_id,
-                "invoice_id": invoice_id
-            }
-            print(f"Неизвестный статус: {status}")
-            logger.warning(f"Webhook: неизвестный статус {status} для транзакции {transaction_id}")
-        
-        print(f"Ответ: {result}")
-        return result
-        
-    except Exception as e:
-        error_result = {
-            "status": "error",
-            "message": f"Ошибка обработки webhook: {str(e)}"
-        }
-        print(f"Ошибка обработки webhook: {e}")
-        logger.error(f"Ошибка обработки webhook: {e}")
-        return error_result
+    return await gateway_client.create_payment(amount, invoice_id)
+
+
+def mock_create_payment(amount: int, invoice_id: int) -> Dict[str, Any]:
+    token = generate_token(str(invoice_id))
+    mock_response = {
+        "success": True,
+        "transaction_id": f"test_txn_{invoice_id}_{hash(str(amount))%10000}",
+        "amount": amount,
+        "order_id": invoice_id,
+        "status": "pending",
+        "payment_url": f"https://test-payment.local/pay?token={token}",
+        "message": "Платеж создан успешно (ТЕСТ)"
+    }
+    logger.info(f"Создан тестовый платеж для заказа {invoice_id} на сумму {amount}")
+    return mock_response
 
 
 def get_payment_status(transaction_id: str) -> Dict[str, Any]:
-    print(f"Проверка статуса платежа:")
-    print(f"Transaction ID: {transaction_id}")
-    
     mock_status = {
         "transaction_id": transaction_id,
         "status": "completed" if "test_txn" in transaction_id else "pending",
-        "amount": 150000,  
+        "amount": 150000,
         "message": "Статус получен (ТЕСТ)"
     }
-    
-    print(f"Статус: {mock_status}")
-    logger.info(f"Проверен статус платежа {transaction_id}")
-    
-    return mock_status
\ No newline at end of file
+    logger.debug(f"Проверен статус платежа {transaction_id}: {mock_status['status']}")
+    return mock_status
+
+
+class GatewayClient:
+    # Без base_url платежи тестовые (mock_create_payment / get_payment_status), иначе запросы идут в шлюз
+    # через общий пул соединений: POST {base_url}/payments и GET {base_url}/payments/{transaction_id}
+    def __init__(self, base_url: str = "", timeout: float = 5.0, max_connections: int = 100):
+        self.base_url = base_url.rstrip("/")
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        ) if self.base_url else None
+
+    async def create_payment(self, amount: int, invoice_id: int) -> Dict[str, Any]:
+        if self._client is None:
+            return mock_create_payment(amount, invoice_id)
+        try:
+            response = await self._client.post(
+                f"{self.base_url}/payments",
+                json={"amount": amount, "invoice_id": invoice_id}
+            )
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            logger.error(f"Ошибка создания платежа для заказа {invoice_id} в шлюзе: {e!r}")
+            return {
+                "success": False,
+                "error": "Ошибка создания платежа",
+                "details": str(e)
+            }
+
+    async def fetch(self, transaction_id: str) -> Dict[str, Any]:
+        if self._client is None:
+            return get_payment_status(transaction_id)
+        response = await self._client.get(f"{self.base_url}/payments/{transaction_id}")
+        response.raise_for_status()
+        return response.json()
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+
+
+gateway_client = GatewayClient(
+    settings.PAYMENT_GATEWAY_URL,
+    timeout=settings.PAYMENT_GATEWAY_TIMEOUT,
+    max_connections=settings.PAYMENT_GATEWAY_MAX_CONNECTIONS
+)
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import logging
+import math
+import random
+import uuid
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+import httpx
+from src.infrastructure.services.gateway_payment import generate_token, sign_webhook
+
+logger = logging.getLogger(__name__)
+
+# z-оценка 99-го перцентиля нормального распределения
+P99_Z = 2.326
+
+
+@dataclass
+class Latency:
+    # Логнормальное распределение, заданное медианой и p99 в миллисекундах: хвост как у реальной сети
+    median_ms: float
+    p99_ms: float
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        if self.p99_ms <= self.median_ms:
+            return self.median_ms / 1000
+        sigma = math.log(self.p99_ms / self.median_ms) / P99_Z
+        return rng.lognormvariate(math.log(self.median_ms), sigma) / 1000
+
+
+# Локальная замена CloudPayments для нагрузочных тестов: создание платежа и статус с задержкой,
+# отказы шлюза, итоговый статус приходит подписанным webhook, иногда повторно
+class GatewaySimulator:
+    def __init__(
+        self,
+        latency: Latency,
+        webhook_delay: Latency,
+        webhook_url: str = "",
+        error_rate: float = 0.0,
+        decline_rate: float = 0.0,
+        duplicate_webhook_rate: float = 0.0,
+        webhook_attempts: int = 3,
+        max_transactions: int = 100_000,
+        seed: Optional[int] = None
+    ):
+        self.latency = latency
+        self.webhook_delay = webhook_delay
+        self.webhook_url = webhook_url
+        self.error_rate = error_rate
+        self.decline_rate = decline_rate
+        self.duplicate_webhook_rate = duplicate_webhook_rate
+        self.webhook_attempts = webhook_attempts
+        self.max_transactions = max_transactions
+        self.rng = random.Random(seed)
+        self.stats = Counter()
+        self._transactions: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._deliveries: set[asyncio.Task] = set()
+        self._client = httpx.AsyncClient(timeout=5.0) if webhook_url else None
+
+    async def create_payment(self, amount: int, invoice_id: int) -> Optional[Dict[str, Any]]:
+        # None — шлюз недоступен, маршрут отвечает 503
+        await asyncio.sleep(self.latency.sample(self.rng))
+        if self.rng.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return None
+        transaction_id = f"sim_{invoice_id}_{uuid.uuid4().hex[:12]}"
+        self._transactions[transaction_id] = {
+            "transaction_id": transaction_id,
+            "order_id": invoice_id,
+            "amount": amount,
+            "status": "pending"
+        }
+        while len(self._transactions) > self.max_transactions:
+            self._transactions.popitem(last=False)
+        self.stats["created"] += 1
+        task = asyncio.create_task(self._complete(transaction_id))
+        self._deliveries.add(task)
+        task.add_done_callback(self._deliveries.discard)
+        return {
+            "success": True,
+            "transaction_id": transaction_id,
+            "amount": amount,
+            "order_id": invoice_id,
+            "status": "pending",
+            "payment_url": f"https://gateway-sim.local/pay?token={generate_token(str(invoice_id))}",
+            "message": "Платеж создан (симулятор)"
+        }
+
+    async def get_status(self, transaction_id: str) -> Optional[Dict[str, Any]]:
+        await asyncio.sleep(self.latency.sample(self.rng))
+        self.stats["status_requests"] += 1
+        return self._transactions.get(transaction_id)
+
+    async def _complete(self, transaction_id: str) -> None:
+        await asyncio.sleep(self.webhook_delay.sample(self.rng))
+        transaction = self._transactions.get(transaction_id)
+        if transaction is None:
+            return
+        transaction["status"] = "declined" if self.rng.random() < self.decline_rate else "completed"
+        self.stats[transaction["status"]] += 1
+        if self._client is None:
+            return
+        body = json.dumps(transaction).encode()
+        await self._deliver(transaction_id, body)
+        if self.rng.random() < self.duplicate_webhook_rate:
+            self.stats["duplicates"] += 1
+            await self._deliver(transaction_id, body)
+
+    async def _deliver(self, transaction_id: str, body: bytes) -> None:
+        headers = {"Content-Type": "application/json", "Content-HMAC": sign_webhook(body)}
+        for attempt in range(self.webhook_attempts):
+            try:
+                response = await self._client.post(self.webhook_url, content=body, headers=headers)
+                if response.status_code < 300:
+                    self.stats["webhooks_sent"] += 1
+                    return
+                error = f"HTTP {response.status_code}"
+            except httpx.HTTPError as e:
+                error = str(e) or type(e).__name__
+            if attempt + 1 < self.webhook_attempts:
+                # Как настоящий шлюз: повтор с растущей паузой
+                await asyncio.sleep(0.5 * 2 ** attempt)
+        self.stats["webhooks_failed"] += 1
+        logger.warning(f"[GatewaySim] Webhook {transaction_id} не доставлен после {self.webhook_attempts} попыток: {error}")
+
+    async def close(self) -> None:
+        for task in list(self._deliveries):
+            task.cancel()
+        await asyncio.gather(*self._deliveries, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
@@ -0,0 +1,169 @@
+import asyncio
+import itertools
+import logging
+from collections import deque
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyTracker:
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        window: int = 512,
+        min_samples: int = 20,
+        default_delay: float = 0.05,
+        min_delay: float = 0.005,
+        refresh_every: int = 16
+    ):
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.refresh_every = refresh_every
+        self._samples: deque[float] = deque(maxlen=window)
+        self._since_refresh = 0
+        self._threshold: Optional[float] = None
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self._since_refresh += 1
+
+    def threshold(self) -> float:
+        if len(self._samples) < self.min_samples:
+            return self.default_delay
+        # Квантиль пересчитываем не на каждый запрос, а раз в refresh_every замеров
+        if self._threshold is None or self._since_refresh >= self.refresh_every:
+            ordered = sorted(self._samples)
+            index = min(len(ordered) - 1, int(self.quantile * len(ordered)))
+            self._threshold = max(self.min_delay, ordered[index])
+            self._since_refresh = 0
+        return self._threshold
+
+
+class HedgeBudget:
+    def __init__(self, ratio: float = 0.1, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+
+    def on_request(self) -> None:
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_acquire(self) -> bool:
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+
+class HedgePolicy:
+    def __init__(
+        self,
+        replicas: dict[str, list[str]],
+        quantile: float = 0.95,
+        budget_ratio: float = 0.1,
+        max_budget: float = 10.0,
+        default_delay: float = 0.05,
+        min_delay: float = 0.005
+    ):
+        self.replicas = {
+            base.rstrip("/"): [alt.rstrip("/") for alt in alternates]
+            for base, alternates in replicas.items() if base
+        }
+        self.budget = HedgeBudget(budget_ratio, max_budget)
+        self._trackers = {
+            base: LatencyTracker(quantile=quantile, default_delay=default_delay, min_delay=min_delay)
+            for base in self.replicas
+        }
+        self._rotation = {
+            base: itertools.cycle(alternates or [base])
+            for base, alternates in self.replicas.items()
+        }
+        self.requests = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+
+    def match(self, url: str) -> Optional[str]:
+        for base in self.replicas:
+            if url.startswith(base):
+                return base
+        return None
+
+    def threshold(self, base: str) -> float:
+        return self._trackers[base].threshold()
+
+    async def get(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        headers: Optional[dict] = None
+    ) -> httpx.Response:
+        base = self.match(url)
+        if base is None:
+            return await client.get(url, headers=headers)
+
+        self.requests += 1
+        self.budget.on_request()
+        tracker = self._trackers[base]
+
+        primary = asyncio.create_task(self._timed(client, url, headers, tracker))
+        done, _ = await asyncio.wait({primary}, timeout=tracker.threshold())
+        if done or not self.budget.try_acquire():
+            return await primary
+
+        hedge_url = next(self._rotation[base]) + url[len(base):]
+        self.hedges_sent += 1
+        logger.debug(f"Hedged GET {url} -> {hedge_url}")
+        hedge = asyncio.create_task(self._timed(client, hedge_url, headers, tracker))
+
+        response = await self._first_successful([primary, hedge])
+        if hedge.done() and not hedge.cancelled() and hedge.exception() is None and hedge.result() is response:
+            self.hedges_won += 1
+        return response
+
+    async def _timed(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        headers: Optional[dict],
+        tracker: LatencyTracker
+    ) -> httpx.Response:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            response = await client.get(url, headers=headers)
+        except asyncio.CancelledError:
+            # Отменяют как раз медленные попытки: без них квантиль сползает вниз и хеджи уходят слишком рано.
+            # Время до отмены — нижняя граница их задержки
+            tracker.record(loop.time() - started)
+            raise
+        tracker.record(loop.time() - started)
+        return response
+
+    async def _first_successful(self, tasks: list[asyncio.Task]) -> httpx.Response:
+        pending = set(tasks)
+        fallback: Optional[httpx.Response] = None
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    response = task.result()
+                    if response.status_code < 500:
+                        return response
+                    fallback = response
+            if fallback is not None:
+                return fallback
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,189 @@
+import heapq
+import itertools
+import logging
+from collections import defaultdict
+from datetime import datetime
+from enum import Enum
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TicketStatus(str, Enum):
+    QUEUED = "queued"
+    COOKING = "cooking"
+    DONE = "done"
+    CANCELLED = "cancelled"
+
+
+class Ticket:
+    __slots__ = ("id", "order_id", "station", "items", "promised_at", "status", "cook_id", "version")
+
+    def __init__(self, ticket_id: int, order_id: int, station: str, items: list[dict], promised_at: datetime):
+        self.id = ticket_id
+        self.order_id = order_id
+        self.station = station
+        self.items = items
+        self.promised_at = promised_at
+        self.status = TicketStatus.QUEUED
+        self.cook_id: Optional[str] = None
+        self.version = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "order_id": self.order_id,
+            "station": self.station,
+            "items": self.items,
+            "promised_at": self.promised_at,
+            "status": self.status,
+            "cook_id": self.cook_id,
+        }
+
+
+def parse_stations(value: str) -> dict[int, str]:
+    stations = {}
+    for pair in value.split(","):
+        if ":" in pair:
+            category_id, station = pair.split(":", 1)
+            stations[int(category_id)] = station.strip()
+    return stations
+
+
+class KitchenScheduler:
+    def __init__(self, station_for_category: dict[int, str], default_station: str = "grill"):
+        self.station_for_category = station_for_category
+        self.default_station = default_station
+        # В кучах лежат (promised_at, seq, version, ticket_id); устаревшие записи
+        # не удаляются сразу, а пропускаются при извлечении
+        self._queues: dict[str, list[tuple]] = defaultdict(list)
+        self._tickets: dict[int, Ticket] = {}
+        self._by_order: dict[int, list[int]] = defaultdict(list)
+        self._cooks: dict[str, tuple[str, ...]] = {}
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+        self._stale = 0
+
+    def station(self, category_id: Optional[int]) -> str:
+        return self.station_for_category.get(category_id, self.default_station)
+
+    def submit_order(self, order_id: int, items: Iterable[dict], promised_at: datetime) -> list[Ticket]:
+        if order_id in self._by_order:
+            return [self._tickets[ticket_id] for ticket_id in self._by_order[order_id]]
+        by_station: dict[str, list[dict]] = defaultdict(list)
+        for item in items:
+            by_station[self.station(item.get("category_id"))].append(item)
+
+        tickets = []
+        for station, station_items in by_station.items():
+            ticket = Ticket(next(self._ids), order_id, station, station_items, promised_at)
+            self._tickets[ticket.id] = ticket
+            self._by_order[order_id].append(ticket.id)
+            self._push(ticket)
+            tickets.append(ticket)
+        return tickets
+
+    def reprioritize(self, order_id: int, promised_at: datetime) -> None:
+        for ticket_id in self._by_order.get(order_id, ()):
+            ticket = self._tickets[ticket_id]
+            if ticket.status == TicketStatus.QUEUED:
+                ticket.promised_at = promised_at
+                ticket.version += 1
+                self._stale += 1
+                self._push(ticket)
+        self._compact_if_needed()
+
+    def cancel_order(self, order_id: int) -> None:
+        self.forget_order(order_id)
+        self._compact_if_needed()
+
+    def register_cook(self, cook_id: str, stations: Iterable[str]) -> None:
+        self._cooks[cook_id] = tuple(stations)
+
+    def next_ticket(self, cook_id: str) -> Optional[Ticket]:
+        stations = self._cooks.get(cook_id)
+        if stations is None:
+            raise ValueError(f"Повар {cook_id} не зарегистрирован")
+
+        best_station = None
+        best_entry = None
+        for station in stations:
+            entry = self._peek(station)
+            if entry is not None and (best_entry is None or entry < best_entry):
+                best_station, best_entry = station, entry
+        if best_station is None:
+            return None
+
+        heapq.heappop(self._queues[best_station])
+        ticket = self._tickets[best_entry[3]]
+        ticket.status = TicketStatus.COOKING
+        ticket.cook_id = cook_id
+        return ticket
+
+    def complete(self, ticket_id: int) -> Optional[int]:
+        ticket = self._tickets.get(ticket_id)
+        if ticket is None or ticket.status != TicketStatus.COOKING:
+            raise ValueError(f"Тикет {ticket_id} не готовится")
+        ticket.status = TicketStatus.DONE
+
+        # Заказ готов, когда закрыты тикеты всех станций
+        order_tickets = [self._tickets[i] for i in self._by_order[ticket.order_id]]
+        if all(t.status == TicketStatus.DONE for t in order_tickets):
+            self.forget_order(ticket.order_id)
+            return ticket.order_id
+        return None
+
+    def forget_order(self, order_id: int) -> None:
+        for ticket_id in self._by_order.pop(order_id, ()):
+            ticket = self._tickets.pop(ticket_id)
+            if ticket.status == TicketStatus.QUEUED:
+                ticket.status = TicketStatus.CANCELLED
+                self._stale += 1
+
+    def feed(self, station: Optional[str] = None, limit: int = 50) -> dict:
+        stations = [station] if station else list(self._queues)
+        queued = []
+        for name in stations:
+            entries = (entry for entry in self._queues.get(name, ()) if self._is_live(entry))
+            queued.extend(heapq.nsmallest(limit, entries))
+        queued = [self._tickets[entry[3]].to_dict() for entry in heapq.nsmallest(limit, queued)]
+        cooking = [
+            ticket.to_dict() for ticket in self._tickets.values()
+            if ticket.status == TicketStatus.COOKING and (station is None or ticket.station == station)
+        ]
+        return {"queued": queued, "cooking": cooking}
+
+    def queue_sizes(self) -> dict[str, int]:
+        sizes = defaultdict(int)
+        for ticket in self._tickets.values():
+            if ticket.status == TicketStatus.QUEUED:
+                sizes[ticket.station] += 1
+        return dict(sizes)
+
+    def _push(self, ticket: Ticket) -> None:
+        heapq.heappush(
+            self._queues[ticket.station],
+            (ticket.promised_at, next(self._seq), ticket.version, ticket.id)
+        )
+
+    def _is_live(self, entry: tuple) -> bool:
+        ticket = self._tickets.get(entry[3])
+        return ticket is not None and ticket.status == TicketStatus.QUEUED and ticket.version == entry[2]
+
+    def _peek(self, station: str) -> Optional[tuple]:
+        queue = self._queues.get(station)
+        while queue:
+            if self._is_live(queue[0]):
+                return queue[0]
+            heapq.heappop(queue)
+            self._stale -= 1
+        return None
+
+    def _compact_if_needed(self) -> None:
+        # Если мусора в кучах больше, чем живых записей, пересобираем их за O(n)
+        live = sum(len(queue) for queue in self._queues.values()) - self._stale
+        if self._stale > 1024 and self._stale > live:
+            for station, queue in self._queues.items():
+                self._queues[station] = [entry for entry in queue if self._is_live(entry)]
+                heapq.heapify(self._queues[station])
+            self._stale = 0
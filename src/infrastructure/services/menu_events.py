@@ -2,13 +2,18 @@ from typing import Dict, Any, Optional
 from src.rabbitmq import RabbitMQClient, EventType
 from src.infrastructure.models.menu import Dish, Category
 from src.infrastructure.repositories.order import OrderRepository
+from src.infrastructure.repositories.outbox import OutboxRepository
 import logging
 
 logger = logging.getLogger(__name__)
 
 class MenuEventService:
-    def __init__(self, rabbitmq_client: RabbitMQClient, order_repository: OrderRepository):
-        self.rabbitmq = rabbitmq_client
+    def __init__(
+        self,
+        publisher: RabbitMQClient | OutboxRepository,
+        order_repository: Optional[OrderRepository] = None
+    ):
+        self.publisher = publisher
         self.order_repository = order_repository
 
     async def publish_dish_created(self, dish: Dish) -> None:
@@ -20,7 +25,7 @@ class MenuEventService:
             "category_id": dish.category_id,
             "is_available": dish.is_available
         }
-        await self.rabbitmq.publish_event(
+        await self.publisher.publish_event(
             EventType.MENU_DISH_CREATED,
             event_data,
             exchange_name="menu_events"
@@ -33,7 +38,7 @@ class MenuEventService:
             "description": category.description,
             "dishes_count": len(category.dishes) if hasattr(category, 'dishes') else 0
         }
-        await self.rabbitmq.publish_event(
+        await self.publisher.publish_event(
             EventType.MENU_UPDATED,
             event_data,
             exchange_name="menu_events"
@@ -45,9 +50,9 @@ class MenuEventService:
             "name": dish.name,
             "old_price": old_price,
             "new_price": dish.price,
-            "price_change_percent": ((dish.price - old_price) / old_price) * 100
+            "price_change_percent": ((dish.price - old_price) / old_price) * 100 if old_price else 0.0
         }
-        await self.rabbitmq.publish_event(
+        await self.publisher.publish_event(
             EventType.MENU_PRICE_CHANGED,
             event_data,
             exchange_name="menu_events"
@@ -61,7 +66,7 @@ class MenuEventService:
             "new_availability": dish.is_available,
             "category_id": dish.category_id
         }
-        await self.rabbitmq.publish_event(
+        await self.publisher.publish_event(
             EventType.MENU_ITEM_AVAILABILITY,
             event_data,
             exchange_name="menu_events"
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, NamedTuple, Optional
+import httpx
+from src.infrastructure.services.hedging import HedgePolicy
+from src.rabbitmq import EventType
+
+logger = logging.getLogger(__name__)
+
+MENU_PRICE_EVENTS = (
+    EventType.MENU_DISH_CREATED,
+    EventType.MENU_PRICE_CHANGED,
+    EventType.MENU_ITEM_AVAILABILITY,
+)
+
+
+class DishPrice(NamedTuple):
+    price: int
+    is_available: bool
+    updated_at: float
+
+
+# Запрос блюд к меню для кэша цен. В отличие от RetryService, быстро сдаётся: оформление
+# корзины не должно минутами ждать упавший menu-service. 4xx не повторяются,
+# 5xx и сетевые ошибки — не больше retries раз
+class MenuDishFetcher:
+    def __init__(
+        self,
+        base_url: str,
+        hedge_policy: Optional[HedgePolicy] = None,
+        timeout: float = 2.0,
+        retries: int = 1,
+        retry_delay: float = 0.1,
+        batch_size: int = 500,
+        max_connections: int = 50
+    ):
+        self.base_url = base_url.rstrip("/") if base_url else base_url
+        self.hedge_policy = hedge_policy
+        self.retries = retries
+        self.retry_delay = retry_delay
+        # Ручка /dishes?ids= принимает не больше 500 id за раз
+        self.batch_size = batch_size
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+
+    async def __call__(self, dish_ids: list[int]) -> list[Dict[str, Any]]:
+        chunks = [dish_ids[i:i + self.batch_size] for i in range(0, len(dish_ids), self.batch_size)]
+        results = await asyncio.gather(*(self._fetch(chunk) for chunk in chunks))
+        return [dish for dishes in results for dish in dishes]
+
+    async def _fetch(self, dish_ids: list[int]) -> list[Dict[str, Any]]:
+        url = f"{self.base_url}/dishes?ids={','.join(map(str, dish_ids))}"
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                if self.hedge_policy is not None:
+                    response = await self.hedge_policy.get(self._client, url)
+                else:
+                    response = await self._client.get(url)
+            except httpx.TransportError as e:
+                if last:
+                    raise
+                logger.info(f"[MenuPrices] Меню недоступно ({e}), повтор {attempt + 1}/{self.retries}")
+            else:
+                if response.status_code < 500 or last:
+                    response.raise_for_status()
+                    return response.json()
+                logger.info(f"[MenuPrices] Меню ответило {response.status_code}, повтор {attempt + 1}/{self.retries}")
+            await asyncio.sleep(self.retry_delay * 2 ** attempt)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+# Локальная копия цен и доступности блюд для order-service: держится актуальной по событиям меню,
+# промахи и устаревшие записи добираются одним пакетным запросом к меню
+class MenuPriceCache:
+    def __init__(
+        self,
+        fetcher: Callable[[list[int]], Awaitable[list[Dict[str, Any]]]],
+        ttl: float = 300.0
+    ):
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self._dishes: Dict[int, DishPrice] = {}
+        # Запросы в полёте по блюдам: конкурентный промах по тому же блюду ждёт уже
+        # отправленный запрос, а промахи по другим блюдам друг друга не ждут
+        self._inflight: Dict[int, asyncio.Future] = {}
+
+    async def get_many(self, dish_ids: Iterable[int]) -> Dict[int, DishPrice]:
+        dish_ids = set(dish_ids)
+        result = self._fresh(dish_ids)
+        missing = dish_ids - result.keys()
+        if not missing:
+            return result
+        waiting = {self._inflight[dish_id] for dish_id in missing if dish_id in self._inflight}
+        to_fetch = sorted(dish_id for dish_id in missing if dish_id not in self._inflight)
+        if to_fetch:
+            await self._fetch(to_fetch)
+        for flight in waiting:
+            await flight
+        return self._fresh(dish_ids)
+
+    async def _fetch(self, dish_ids: list[int]) -> None:
+        flight = asyncio.get_running_loop().create_future()
+        for dish_id in dish_ids:
+            self._inflight[dish_id] = flight
+        try:
+            for dish in await self.fetcher(dish_ids):
+                self._put(dish["id"], dish["price"], dish.get("is_available", True))
+            flight.set_result(None)
+        except BaseException as e:
+            # Ожидающие получают ту же ошибку; отмену нашего запроса им не передаём
+            flight.set_exception(e if isinstance(e, Exception) else ConnectionError("Запрос цен отменён"))
+            # Ошибка уже получена здесь: без ожидающих asyncio не должен ругаться на неё
+            flight.exception()
+            raise
+        finally:
+            for dish_id in dish_ids:
+                if self._inflight.get(dish_id) is flight:
+                    del self._inflight[dish_id]
+
+    async def get(self, dish_id: int) -> DishPrice | None:
+        return (await self.get_many([dish_id])).get(dish_id)
+
+    def _fresh(self, dish_ids: set[int]) -> Dict[int, DishPrice]:
+        deadline = time.monotonic() - self.ttl
+        return {
+            dish_id: dish
+            for dish_id in dish_ids
+            if (dish := self._dishes.get(dish_id)) is not None and dish.updated_at >= deadline
+        }
+
+    def _put(self, dish_id: int, price: int, is_available: bool) -> None:
+        self._dishes[int(dish_id)] = DishPrice(int(price), bool(is_available), time.monotonic())
+
+    async def handle_event(self, data: Dict[str, Any], event_type: EventType) -> None:
+        dish_id = int(data["dish_id"])
+        if event_type == EventType.MENU_DISH_CREATED:
+            self._put(dish_id, data["price"], data.get("is_available", True))
+            return
+        cached = self._dishes.get(dish_id)
+        if cached is None:
+            # Неизвестное блюдо подтянется целиком при первом обращении
+            return
+        if event_type == EventType.MENU_PRICE_CHANGED:
+            self._put(dish_id, data["new_price"], cached.is_available)
+        elif event_type == EventType.MENU_ITEM_AVAILABILITY:
+            self._put(dish_id, cached.price, data["new_availability"])
+        logger.info(f"[MenuPrices] Блюдо {dish_id} обновлено по событию {event_type.value}")
@@ -0,0 +1,237 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.database import async_session
+from src.domain.order import InvalidTransition
+from src.infrastructure.models.order import OrderStatus
+from src.infrastructure.models.saga import Saga, SagaStatus, SagaStep
+from src.infrastructure.repositories.order import OrderRepository
+from src.infrastructure.repositories.outbox import OutboxRepository
+from src.infrastructure.repositories.saga import SagaRepository
+from src.rabbitmq import EventType
+
+logger = logging.getLogger(__name__)
+
+SAGA_EVENTS = (
+    EventType.MENU_RESERVED,
+    EventType.MENU_FAILED,
+)
+
+# Результаты оплаты идут отдельной очередью и применяются пачками (handle_payment_batch)
+PAYMENT_RESULT_EVENTS = (
+    EventType.PAYMENT_COMPLETED,
+    EventType.PAYMENT_FAILED,
+)
+
+
+class OrderSagaOrchestrator:
+    def __init__(
+        self,
+        session_factory=async_session,
+        payment_timeout: float = 900.0,
+        sweep_batch_size: int = 100,
+        sweep_interval: float = 1.0,
+        on_cancelled: Optional[Callable[[int], None]] = None
+    ):
+        self.session_factory = session_factory
+        self.payment_timeout = payment_timeout
+        self.sweep_batch_size = sweep_batch_size
+        self.sweep_interval = sweep_interval
+        self.on_cancelled = on_cancelled
+        self._handlers = {
+            EventType.MENU_RESERVED: self._on_menu_reserved,
+            EventType.MENU_FAILED: self._on_menu_failed,
+            EventType.PAYMENT_COMPLETED: self._on_payment_completed,
+            EventType.PAYMENT_FAILED: self._on_payment_failed,
+        }
+        self._compensations = {
+            EventType.MENU_RELEASE.value: self._release_menu,
+        }
+
+    async def handle_event(self, data: Dict[str, Any], event_type: EventType) -> None:
+        handler = self._handlers.get(event_type)
+        order_id = data.get("order_id") or data.get("invoice_id")
+        if handler is None or order_id is None:
+            return
+        async with self.session_factory() as session:
+            async with session.begin():
+                saga = await SagaRepository(session).get_for_update(int(order_id))
+                if saga is None:
+                    logger.warning(f"[Saga] Нет саги для заказа {order_id}, событие {event_type} пропущено")
+                    return
+                was_running = saga.status == SagaStatus.RUNNING.value
+                await handler(session, saga, data)
+                cancelled = was_running and saga.status == SagaStatus.FAILED.value
+        if cancelled:
+            self._notify_cancelled([saga.order_id])
+
+    async def handle_payment_batch(self, events: list[Tuple[Dict[str, Any], EventType]]) -> None:
+        # Одна транзакция на пачку: саги блокируются одним запросом, заказы переводятся
+        # и журналируются несколькими запросами на всю пачку, а не на каждое событие
+        results = {}
+        for data, event_type in events:
+            order_id = data.get("order_id") or data.get("invoice_id")
+            if event_type not in PAYMENT_RESULT_EVENTS or order_id is None:
+                continue
+            # Как и при обработке по одному, первый результат по заказу выигрывает
+            results.setdefault(int(order_id), (event_type, data))
+        if not results:
+            return
+        async with self.session_factory() as session:
+            async with session.begin():
+                sagas = await SagaRepository(session).get_many_for_update(list(results))
+                paid, failed = [], []
+                for order_id, (event_type, data) in results.items():
+                    saga = sagas.get(order_id)
+                    if saga is None:
+                        logger.warning(f"[Saga] Нет саги для заказа {order_id}, событие {event_type} пропущено")
+                        continue
+                    if self._remember_early_payment(session, saga, event_type, data):
+                        continue
+                    if not self._expects(saga, SagaStep.AWAIT_PAYMENT):
+                        continue
+                    if event_type == EventType.PAYMENT_COMPLETED:
+                        paid.append(saga)
+                    else:
+                        failed.append((saga, data.get("reason") or "payment failed"))
+                await self._complete_paid(session, paid)
+                await self._fail_many(session, failed)
+        logger.info(f"[Saga] Пачка оплат из {len(events)} событий: оплачено {len(paid)}, отменено {len(failed)}")
+        self._notify_cancelled([saga.order_id for saga, _ in failed])
+
+    async def _on_menu_reserved(self, session: AsyncSession, saga: Saga, data: Dict[str, Any]) -> None:
+        if saga.status == SagaStatus.FAILED.value and saga.step == SagaStep.RESERVE_MENU.value:
+            # Резерв пришёл после таймаута: сага уже отменена, резерв надо вернуть
+            await self._release_menu(session, saga)
+            return
+        if not self._expects(saga, SagaStep.RESERVE_MENU):
+            return
+        SagaRepository(session).advance(
+            saga,
+            SagaStep.AWAIT_PAYMENT,
+            timeout=self.payment_timeout,
+            compensation=EventType.MENU_RELEASE.value
+        )
+        await self._apply_early_payment(session, saga)
+
+    async def _on_menu_failed(self, session: AsyncSession, saga: Saga, data: Dict[str, Any]) -> None:
+        if self._expects(saga, SagaStep.RESERVE_MENU):
+            await self.fail(session, saga, data.get("reason") or "menu reservation failed")
+
+    async def _on_payment_completed(self, session: AsyncSession, saga: Saga, data: Dict[str, Any]) -> None:
+        if self._remember_early_payment(session, saga, EventType.PAYMENT_COMPLETED, data):
+            return
+        if self._expects(saga, SagaStep.AWAIT_PAYMENT):
+            await self._complete_paid(session, [saga])
+            logger.info(f"[Saga] Заказ {saga.order_id} оплачен, сага завершена")
+
+    async def _on_payment_failed(self, session: AsyncSession, saga: Saga, data: Dict[str, Any]) -> None:
+        if self._remember_early_payment(session, saga, EventType.PAYMENT_FAILED, data):
+            return
+        if self._expects(saga, SagaStep.AWAIT_PAYMENT):
+            await self.fail(session, saga, data.get("reason") or "payment failed")
+
+    def _remember_early_payment(self, session: AsyncSession, saga: Saga, event_type: EventType, data: Dict[str, Any]) -> bool:
+        # Результат оплаты может обогнать подтверждение резерва: сохраняем его в саге
+        # и применяем, когда резерв придёт. Как и в остальных случаях, первый результат выигрывает
+        if saga.status != SagaStatus.RUNNING.value or saga.step != SagaStep.RESERVE_MENU.value:
+            return False
+        if "payment_status" not in saga.payload:
+            SagaRepository(session).remember(saga, payment_status=event_type.value, payment_reason=data.get("reason"))
+            logger.info(f"[Saga] Заказ {saga.order_id}: {event_type.value} пришёл раньше резерва меню, отложен")
+        return True
+
+    async def _apply_early_payment(self, session: AsyncSession, saga: Saga) -> None:
+        payment_status = saga.payload.get("payment_status")
+        if payment_status == EventType.PAYMENT_COMPLETED.value:
+            await self._complete_paid(session, [saga])
+            logger.info(f"[Saga] Заказ {saga.order_id} оплачен до резерва, сага завершена")
+        elif payment_status == EventType.PAYMENT_FAILED.value:
+            await self.fail(session, saga, saga.payload.get("payment_reason") or "payment failed")
+
+    def _expects(self, saga: Saga, step: SagaStep) -> bool:
+        # Повторно доставленные и запоздавшие события не должны сдвигать сагу
+        if saga.status != SagaStatus.RUNNING.value or saga.step != step.value:
+            logger.info(f"[Saga] Заказ {saga.order_id}: событие для шага {step.value} пропущено, сага в {saga.status}/{saga.step}")
+            return False
+        return True
+
+    async def fail(self, session: AsyncSession, saga: Saga, reason: str) -> None:
+        for name in reversed(saga.compensations):
+            await self._compensations[name](session, saga)
+        try:
+            await OrderRepository(session).cancel(saga.order_id, saga.payload.get("user_id"))
+        except InvalidTransition as e:
+            logger.warning(f"[Saga] Заказ {saga.order_id} не отменён: {e}")
+        SagaRepository(session).finish(saga, SagaStatus.FAILED, reason)
+        logger.info(f"[Saga] Заказ {saga.order_id} отменён: {reason}")
+
+    async def _complete_paid(self, session: AsyncSession, sagas: list[Saga]) -> None:
+        if not sagas:
+            return
+        orders = OrderRepository(session)
+        await SagaRepository(session).finish_many([saga.id for saga in sagas], SagaStatus.COMPLETED)
+        moved = await orders.transition_many([saga.order_id for saga in sagas], OrderStatus.PROCESSING)
+        for order_id, user_id, _ in moved:
+            await orders.outbox.publish_event(EventType.ORDER_PAID, {
+                "order_id": order_id,
+                "user_id": user_id
+            })
+        if len(moved) < len(sagas):
+            skipped = {saga.order_id for saga in sagas} - {order_id for order_id, _, _ in moved}
+            logger.warning(f"[Saga] Оплаченные заказы не в статусе {OrderStatus.PENDING.value}, статус не изменён: {sorted(skipped)}")
+
+    async def _fail_many(self, session: AsyncSession, failed: list[Tuple[Saga, str]]) -> None:
+        # Пакетный вариант fail: компенсации по каждой саге, отмена заказов и завершение саг — общими запросами
+        if not failed:
+            return
+        orders = OrderRepository(session)
+        reasons = {}
+        for saga, reason in failed:
+            for name in reversed(saga.compensations):
+                await self._compensations[name](session, saga)
+            reasons.setdefault(reason, []).append(saga.id)
+        cancelled = await orders.transition_many([saga.order_id for saga, _ in failed], OrderStatus.CANCELLED)
+        for order_id, user_id, _ in cancelled:
+            await orders.outbox.publish_event(EventType.ORDER_CANCELLED, {
+                "order_id": order_id,
+                "user_id": user_id
+            })
+        for reason, saga_ids in reasons.items():
+            await SagaRepository(session).finish_many(saga_ids, SagaStatus.FAILED, reason)
+
+    async def _release_menu(self, session: AsyncSession, saga: Saga) -> None:
+        await OutboxRepository(session).publish_event(EventType.MENU_RELEASE, {
+            "order_id": saga.order_id,
+            "items": saga.payload.get("items", [])
+        })
+
+    async def sweep_once(self) -> int:
+        async with self.session_factory() as session:
+            async with session.begin():
+                expired = await SagaRepository(session).fetch_expired(self.sweep_batch_size)
+                for saga in expired:
+                    await self.fail(session, saga, f"timeout on {saga.step}")
+        self._notify_cancelled([saga.order_id for saga in expired])
+        return len(expired)
+
+    def _notify_cancelled(self, order_ids: list[int]) -> None:
+        # Вызывается после коммита, чтобы не трогать кухню при откате транзакции
+        if self.on_cancelled is None:
+            return
+        for order_id in order_ids:
+            self.on_cancelled(order_id)
+
+    async def run_sweeper(self) -> None:
+        logger.info("[Saga] Проверка дедлайнов саг запущена")
+        while True:
+            try:
+                expired = await self.sweep_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Saga] Ошибка обработки просроченных саг: {e}")
+                expired = 0
+            if expired < self.sweep_batch_size:
+                await asyncio.sleep(self.sweep_interval)
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+from src.database import async_session
+from src.rabbitmq import RabbitMQClient, EventType
+from src.infrastructure.repositories.outbox import OutboxRepository
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxRelay:
+    def __init__(
+        self,
+        rabbitmq_client: RabbitMQClient,
+        session_factory=async_session,
+        batch_size: int = 100,
+        poll_interval: float = 0.5
+    ):
+        self.rabbitmq = rabbitmq_client
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+
+    async def drain_once(self) -> int:
+        async with self.session_factory() as session:
+            async with session.begin():
+                repository = OutboxRepository(session)
+                events = await repository.fetch_batch(self.batch_size)
+                if not events:
+                    return 0
+                # Канал открыт с publisher confirms: каждый publish ждёт ack брокера,
+                # строки удаляются только если подтверждена вся пачка
+                await asyncio.gather(*(
+                    self.rabbitmq.publish_event(
+                        EventType(event.event_type),
+                        event.payload,
+                        exchange_name=event.exchange,
+                        routing_key=event.routing_key,
+                        message_id=str(event.id)
+                    )
+                    for event in events
+                ))
+                await repository.delete([event.id for event in events])
+        logger.info(f"[Outbox] Опубликовано событий: {len(events)}")
+        return len(events)
+
+    async def run(self) -> None:
+        logger.info("[Outbox] Relay запущен")
+        while True:
+            try:
+                published = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Outbox] Ошибка публикации пачки: {e}")
+                published = 0
+            if published < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
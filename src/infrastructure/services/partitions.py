@@ -0,0 +1,51 @@
+import asyncio
+import datetime
+import logging
+from src.database import async_session
+from src.infrastructure.repositories.partition import PartitionRepository
+
+logger = logging.getLogger(__name__)
+
+ORDER_TABLES = ("orders.orders", "orders.order_items")
+PAYMENT_TABLES = ("payments.payments",)
+
+
+class PartitionManager:
+    def __init__(
+        self,
+        tables: tuple[str, ...],
+        session_factory=async_session,
+        months_ahead: int = 3,
+        interval: float = 3600.0
+    ):
+        self.tables = tables
+        self.session_factory = session_factory
+        self.months_ahead = months_ahead
+        self.interval = interval
+
+    async def ensure_once(self, today: datetime.date | None = None) -> int:
+        # Секции создаются заранее: пока DEFAULT-секция пуста, новый месяц добавляется без блокировки данных
+        start = (today or datetime.date.today()).replace(day=1)
+        created = 0
+        async with self.session_factory() as session:
+            repository = PartitionRepository(session)
+            for table in self.tables:
+                created += await repository.ensure_monthly(table, start, self.months_ahead + 1)
+                stray = await repository.default_rows(table)
+                if stray:
+                    logger.warning(f"[Partitions] В {table}_default {stray} строк вне помесячных секций")
+            await session.commit()
+        if created:
+            logger.info(f"[Partitions] Создано секций: {created}")
+        return created
+
+    async def run(self) -> None:
+        logger.info(f"[Partitions] Обслуживание секций запущено: {', '.join(self.tables)}")
+        while True:
+            try:
+                await self.ensure_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Partitions] Ошибка создания секций: {e}")
+            await asyncio.sleep(self.interval)
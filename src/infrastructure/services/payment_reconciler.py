@@ -0,0 +1,138 @@
+import asyncio
+import datetime
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+from src.database import async_session
+from src.infrastructure.models.payment import Payment, PaymentStatus
+from src.infrastructure.repositories.outbox import OutboxRepository
+from src.infrastructure.repositories.payment import PaymentRepository
+from src.infrastructure.services.gateway_payment import webhook_status
+from src.infrastructure.services.payment_service import PAYMENT_EVENTS
+from src.infrastructure.services.payment_status import payment_status_waiters
+from src.redis import invalidate_cache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReconcileReport:
+    checked: int = 0
+    corrected: int = 0
+    still_pending: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+    # Образцы расхождений для лога: payment_id -> (статус у нас, статус в шлюзе)
+    discrepancies: Dict[int, tuple[str, str]] = field(default_factory=dict)
+
+
+# Сверяет зависшие PENDING-платежи со шлюзом: keyset-страницы, параллельные запросы статуса
+# под семафором и одно пакетное обновление на страницу
+class PaymentReconciler:
+    def __init__(
+        self,
+        fetch_status: Callable[[str], Awaitable[Dict[str, Any]]],
+        session_factory=async_session,
+        page_size: int = 1000,
+        concurrency: int = 50,
+        stale_after: float = 900.0,
+        interval: float = 300.0,
+        sample_size: int = 20
+    ):
+        self.fetch_status = fetch_status
+        self.session_factory = session_factory
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.stale_after = stale_after
+        self.interval = interval
+        self.sample_size = sample_size
+
+    async def reconcile_once(self, now: Optional[datetime.datetime] = None) -> ReconcileReport:
+        started = time.perf_counter()
+        # Свежие платежи ещё ждут webhook, сверяются только дольше stale_after в PENDING
+        updated_before = (now or datetime.datetime.now(datetime.timezone.utc)) - datetime.timedelta(seconds=self.stale_after)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        report = ReconcileReport()
+        after_id = 0
+        applying = None
+        try:
+            while True:
+                async with self.session_factory() as session:
+                    page = await PaymentRepository(session).get_pending_page(after_id, self.page_size, updated_before)
+                if not page:
+                    break
+                after_id = page[-1].id
+                statuses = await asyncio.gather(*(self._gateway_status(payment, semaphore) for payment in page))
+                corrections = {}
+                for payment, status in zip(page, statuses):
+                    report.checked += 1
+                    if status is None:
+                        report.errors += 1
+                    elif status == PaymentStatus.PENDING:
+                        report.still_pending += 1
+                    else:
+                        corrections[payment.id] = status
+                # Запись страницы идёт параллельно с опросом шлюза по следующей
+                if applying is not None:
+                    report.corrected += await applying
+                applying = asyncio.create_task(self._apply(corrections, report))
+                if len(page) < self.page_size:
+                    break
+        finally:
+            if applying is not None:
+                report.corrected += await applying
+        if report.corrected:
+            await invalidate_cache("get_payment_by_id*")
+        report.elapsed = time.perf_counter() - started
+        if report.checked:
+            logger.info(
+                f"[Reconcile] Проверено {report.checked} платежей за {report.elapsed:.1f}s: "
+                f"исправлено {report.corrected}, в ожидании {report.still_pending}, ошибок {report.errors}"
+            )
+        if report.discrepancies:
+            logger.warning(f"[Reconcile] Расхождения со шлюзом (первые {len(report.discrepancies)}): {report.discrepancies}")
+        return report
+
+    async def _gateway_status(self, payment: Payment, semaphore: asyncio.Semaphore) -> Optional[PaymentStatus]:
+        if not payment.transaction_id:
+            # Платёж не дошёл до шлюза: спрашивать нечего
+            return None
+        async with semaphore:
+            try:
+                result = await self.fetch_status(payment.transaction_id)
+            except Exception as e:
+                logger.warning(f"[Reconcile] Статус платежа {payment.id} в шлюзе не получен: {e}")
+                return None
+        return webhook_status(str(result.get("status", ""))) or PaymentStatus.PENDING
+
+    async def _apply(self, corrections: Dict[int, PaymentStatus], report: ReconcileReport) -> int:
+        if not corrections:
+            return 0
+        async with self.session_factory() as session:
+            outbox = OutboxRepository(session)
+            updated = await PaymentRepository(session).apply_statuses(corrections)
+            for payment_id, invoice_id, status in updated:
+                event_type = PAYMENT_EVENTS.get(status)
+                if event_type is not None:
+                    await outbox.publish_event(event_type, {
+                        "order_id": invoice_id,
+                        "payment_id": payment_id,
+                        "status": status.value
+                    })
+                if len(report.discrepancies) < self.sample_size:
+                    report.discrepancies[payment_id] = (PaymentStatus.PENDING.value, status.value)
+            await session.commit()
+        await payment_status_waiters.publish({payment_id: status for payment_id, _, status in updated})
+        return len(updated)
+
+    async def run(self) -> None:
+        logger.info("[Reconcile] Сверка платежей со шлюзом запущена")
+        while True:
+            try:
+                await self.reconcile_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Reconcile] Ошибка сверки платежей: {e}")
+            await asyncio.sleep(self.interval)
@@ -1,50 +1,59 @@
+import datetime
 import logging
-from typing import Optional
+from typing import Dict, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.infrastructure.repositories.payment import PaymentRepository
-from src.infrastructure.services.gateway_payment import create_payment, handle_cloudpayments_webhook
+from src.infrastructure.repositories.outbox import OutboxRepository
+from src.infrastructure.repositories.archive import ArchiveRepository
+from src.infrastructure.services.gateway_payment import create_payment, webhook_status
+from src.infrastructure.services.payment_status import payment_status_waiters
 from src.schemas.payment_schemas import PaymentCreate, PaymentUpdate, PaymentResponse
-from src.infrastructure.models.payment import PaymentStatus
+from src.infrastructure.models.payment import Payment, PaymentStatus, WebhookInbox
+from src.rabbitmq import EventType
 
 logger = logging.getLogger(__name__)
 
+PAYMENT_EVENTS = {
+    PaymentStatus.COMPLETED: EventType.PAYMENT_COMPLETED,
+    PaymentStatus.FAILED: EventType.PAYMENT_FAILED,
+    PaymentStatus.CANCELLED: EventType.PAYMENT_FAILED,
+}
+
 
 class PaymentService:    
     def __init__(self, session: AsyncSession):
         self.payment_repo = PaymentRepository(session)
+        self.outbox = OutboxRepository(session)
+        self.archive = ArchiveRepository(session)
     
     async def create_payment_for_order(self, invoice_id: int, amount: int, payment_method: str = "CARD") -> PaymentResponse:
         try:
-            print(f"PaymentService: Создание платежа для заказа {invoice_id}")
-            
-            existing_payment = await self.payment_repo.get_payment_by_order_id(invoice_id)
-            if existing_payment:
-                logger.warning(f"Платеж для заказа {invoice_id} уже существует")
-                return PaymentResponse.model_validate(existing_payment)
-            
-            payment_create = PaymentCreate(
-                invoice_id=invoice_id,
-                amount=amount
+            # Время создания запоминается: по нему же потом обновляется строка в своей секции
+            created_at = datetime.datetime.now(datetime.timezone.utc)
+            db_payment = await self.payment_repo.create_payment_once(
+                PaymentCreate(invoice_id=invoice_id, amount=amount),
+                created_at
             )
-            
-            db_payment = await self.payment_repo.create_payment(payment_create)
+            if db_payment is None:
+                logger.warning(f"Платеж для заказа {invoice_id} уже существует")
+                existing_payment = await self.get_payment_by_order_id(invoice_id)
+                if existing_payment is None:
+                    raise ValueError(f"Платеж для заказа {invoice_id} не найден")
+                return existing_payment
 
             gateway_result = await create_payment(amount, invoice_id)
 
             if gateway_result.get("success"):
-                update_data = PaymentUpdate(
-                    status=PaymentStatus.PENDING,
-                    transaction_id=gateway_result.get("transaction_id"),
+                db_payment = await self.payment_repo.apply_gateway_result(
+                    db_payment.id, created_at, PaymentStatus.PENDING, gateway_result.get("transaction_id")
                 )
-                db_payment = await self.payment_repo.update_payment(db_payment.id, update_data)
-                print(f"Платеж создан успешно: ID {db_payment.id}")
+                logger.info(f"Платеж {db_payment.id} зарегистрирован в платежной системе")
             else:
-                update_data = PaymentUpdate(
-                    status=PaymentStatus.FAILED,
+                db_payment = await self.payment_repo.apply_gateway_result(
+                    db_payment.id, created_at, PaymentStatus.FAILED, None
                 )
-                db_payment = await self.payment_repo.update_payment(db_payment.id, update_data)
-                print(f"Ошибка создания платежа в платежной системе")
+                logger.warning(f"Платежная система отклонила платеж {db_payment.id}")
             
             return PaymentResponse.model_validate(db_payment)
             
@@ -54,7 +63,8 @@ class PaymentService:
     
     async def get_payment_by_id(self, payment_id: int) -> Optional[PaymentResponse]:
         try:
-            payment = await self.payment_repo.get_payment_by_id(payment_id)
+            # Кэшированный get_payment_by_id здесь не подходит: нужен актуальный invoice_id
+            payment = await self.payment_repo.session.get(Payment, payment_id)
             if payment:
                 return PaymentResponse.model_validate(payment)
             return None
@@ -67,46 +77,40 @@ class PaymentService:
             payment = await self.payment_repo.get_payment_by_order_id(order_id)
             if payment:
                 return PaymentResponse.model_validate(payment)
+            archived = await self.archive.get_payment_by_order_id(order_id)
+            if archived:
+                return PaymentResponse.model_validate(archived)
             return None
         except Exception as e:
             logger.error(f"Ошибка получения платежа для заказа {order_id}: {e}")
             raise
     
-    async def process_webhook(self, payload: dict) -> dict:
-        try:
-            print(f"PaymentService: Обработка webhook")
-            
-            result = await handle_cloudpayments_webhook(payload)
-            
-            invoice_id = payload.get("order_id")
-            transaction_id = payload.get("transaction_id")
-            status = payload.get("status", "").lower()
-            
-            if invoice_id:
-                payment = await self.payment_repo.get_payment_by_order_id(invoice_id)
-                if payment:
-                    new_status = PaymentStatus.PENDING
-                    if status in ["success", "completed", "paid"]:
-                        new_status = PaymentStatus.COMPLETED
-                    elif status in ["failed", "error", "declined"]:
-                        new_status = PaymentStatus.FAILED
-                    elif status in ["cancelled", "canceled"]:
-                        new_status = PaymentStatus.CANCELLED
-                    
-                    update_data = PaymentUpdate(
-                        status=new_status,
-                        transaction_id=transaction_id
-                    )
-                    await self.payment_repo.update_payment(payment.id, update_data)
-                    print(f"Обновлен статус платежа {payment.id} -> {new_status}")
-                else:
-                    logger.warning(f"Платеж для заказа {invoice_id} не найден при обработке webhook")
-            
-            return result
-            
-        except Exception as e:
-            logger.error(f"Ошибка обработки webhook: {e}")
-            raise
+    async def apply_webhooks(self, entries: list[WebhookInbox]) -> Dict[int, PaymentStatus]:
+        # Статусы пачки webhook применяются в транзакции вызывающего кода вместе с событиями в outbox;
+        # возвращаются изменённые платежи: payment_id -> новый статус
+        payments = await self.payment_repo.get_payments_by_order_ids(
+            {entry.invoice_id for entry in entries if entry.invoice_id is not None}
+        )
+        now = datetime.datetime.now(datetime.timezone.utc)
+        applied = {}
+        for entry in entries:
+            new_status = webhook_status(entry.status)
+            if new_status is None:
+                logger.warning(f"Webhook: неизвестный статус {entry.status} для транзакции {entry.transaction_id}")
+                continue
+            payment = payments.get(entry.invoice_id)
+            if payment is None:
+                logger.warning(f"Платеж для заказа {entry.invoice_id} не найден при обработке webhook {entry.transaction_id}")
+                continue
+            if payment.status == new_status:
+                continue
+            payment.status = new_status
+            payment.transaction_id = entry.transaction_id
+            payment.updated_at = now
+            await self._publish_status(payment.invoice_id, payment.id, new_status)
+            logger.info(f"Webhook: платеж {payment.id} заказа {payment.invoice_id} -> {new_status.value}")
+            applied[payment.id] = new_status
+        return applied
     
     async def update_payment_status(self, payment_id: int, status: PaymentStatus, transaction_id: Optional[str] = None) -> PaymentResponse:
         try:
@@ -114,12 +118,27 @@ class PaymentService:
                 status=status,
                 transaction_id=transaction_id
             )
+            # Кэшированный get_payment_by_id здесь не подходит: нужен актуальный invoice_id
+            payment = await self.payment_repo.session.get(Payment, payment_id)
+            if payment:
+                await self._publish_status(payment.invoice_id, payment.id, status)
             
             updated_payment = await self.payment_repo.update_payment(payment_id, update_data)
-            print(f"Обновлен статус платежа {payment_id} -> {status}")
+            await payment_status_waiters.publish({updated_payment.id: updated_payment.status})
             
             return PaymentResponse.model_validate(updated_payment)
             
         except Exception as e:
             logger.error(f"Ошибка обновления статуса платежа {payment_id}: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    async def _publish_status(self, invoice_id: int, payment_id: int, status: PaymentStatus) -> None:
+        # Событие пишется в outbox и коммитится вместе со статусом платежа
+        event_type = PAYMENT_EVENTS.get(status)
+        if event_type is None:
+            return
+        await self.outbox.publish_event(event_type, {
+            "order_id": invoice_id,
+            "payment_id": payment_id,
+            "status": status.value
+        })
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Set
+from redis.asyncio import Redis
+from src.infrastructure.models.payment import PaymentStatus
+from src.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_STATUS_CHANNEL = "payments:status"
+
+
+# Long-poll статуса платежа: запросы ждут на Future по payment_id в своём процессе, а будит их
+# сообщение в Redis pub/sub от любой реплики, которая закоммитила новый статус
+class PaymentStatusWaiters:
+    def __init__(self, redis: Redis = redis_client, channel: str = PAYMENT_STATUS_CHANNEL, reconnect_delay: float = 1.0):
+        self.redis = redis
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self._waiters: Dict[int, Set[asyncio.Future]] = {}
+
+    @contextmanager
+    def waiter(self, payment_id: int) -> Iterator[asyncio.Future]:
+        # Регистрироваться нужно до чтения статуса из БД, иначе уведомление между чтением и ожиданием потеряется
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(payment_id, set()).add(future)
+        try:
+            yield future
+        finally:
+            waiters = self._waiters.get(payment_id)
+            if waiters is not None:
+                waiters.discard(future)
+                if not waiters:
+                    del self._waiters[payment_id]
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    async def publish(self, statuses: Dict[int, PaymentStatus]) -> None:
+        # Вызывается после коммита; одна публикация на пачку изменённых платежей
+        if not statuses:
+            return
+        message = json.dumps({str(payment_id): status.value for payment_id, status in statuses.items()})
+        try:
+            await self.redis.publish(self.channel, message)
+        except Exception as e:
+            # Ожидающие клиенты всё равно вернутся по таймауту и перечитают статус
+            logger.warning(f"[PaymentStatus] Не удалось опубликовать смену статусов {list(statuses)}: {e}")
+
+    def notify(self, payment_id: int, status: Optional[PaymentStatus]) -> None:
+        for future in self._waiters.pop(payment_id, ()):
+            if not future.done():
+                future.set_result(status)
+
+    def _dispatch(self, data: str) -> None:
+        try:
+            statuses = json.loads(data)
+        except ValueError:
+            logger.warning(f"[PaymentStatus] Некорректное сообщение в {self.channel}: {data!r}")
+            return
+        for payment_id, status in statuses.items():
+            self.notify(int(payment_id), PaymentStatus(status))
+
+    async def run(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                logger.info(f"[PaymentStatus] Подписка на {self.channel} активна")
+                # Пока подписки не было, уведомления могли потеряться: пусть текущие ожидающие перечитают статус
+                for payment_id in list(self._waiters):
+                    self.notify(payment_id, None)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[PaymentStatus] Подписка на {self.channel} прервана: {e}")
+            finally:
+                await pubsub.aclose()
+            await asyncio.sleep(self.reconnect_delay)
+
+
+payment_status_waiters = PaymentStatusWaiters()
@@ -0,0 +1,39 @@
+import asyncio
+import logging
+from src.database import async_session
+from src.infrastructure.repositories.analytics import AnalyticsRepository
+
+logger = logging.getLogger(__name__)
+
+
+class SalesRollupRefresher:
+    def __init__(
+        self,
+        session_factory=async_session,
+        batch_size: int = 5000,
+        interval: float = 5.0
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.interval = interval
+
+    async def refresh_once(self) -> int:
+        async with self.session_factory() as session:
+            async with session.begin():
+                processed = await AnalyticsRepository(session).refresh_sales(self.batch_size)
+        if processed:
+            logger.info(f"[Analytics] Учтено событий заказов: {processed}")
+        return processed
+
+    async def run(self) -> None:
+        logger.info("[Analytics] Обновление агрегатов продаж запущено")
+        while True:
+            try:
+                processed = await self.refresh_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Analytics] Ошибка обновления агрегатов: {e}")
+                processed = 0
+            if processed < self.batch_size:
+                await asyncio.sleep(self.interval)
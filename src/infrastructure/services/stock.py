@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional
+from redis.asyncio import Redis
+from src.database import async_session
+from src.infrastructure.repositories.menu import MenuRepository
+from src.rabbitmq import EventType, RabbitMQClient
+
+logger = logging.getLogger(__name__)
+
+# Все позиции заказа проверяются до первого списания: либо резервируется всё, либо ничего.
+# Блюда без записи в KEYS[1] не ограничены по остатку.
+RESERVE_SCRIPT = """
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    return {1, ''}
+end
+local limited = {}
+for i = 3, #ARGV, 2 do
+    local available = redis.call('HGET', KEYS[1], ARGV[i])
+    if available then
+        if tonumber(available) < tonumber(ARGV[i + 1]) then
+            return {0, ARGV[i]}
+        end
+        limited[#limited + 1] = ARGV[i]
+        limited[#limited + 1] = ARGV[i + 1]
+    end
+end
+for i = 1, #limited, 2 do
+    redis.call('HINCRBY', KEYS[1], limited[i], -tonumber(limited[i + 1]))
+end
+limited[#limited + 1] = '_'
+limited[#limited + 1] = '0'
+redis.call('HSET', KEYS[3], unpack(limited))
+redis.call('ZADD', KEYS[2], ARGV[1], ARGV[2])
+return {1, ''}
+"""
+
+# Возвращает зарезервированное в остаток; повторный вызов ничего не делает
+RELEASE_SCRIPT = """
+local items = redis.call('HGETALL', KEYS[3])
+if #items == 0 then
+    redis.call('ZREM', KEYS[2], ARGV[1])
+    return 0
+end
+for i = 1, #items, 2 do
+    if items[i] ~= '_' and redis.call('HEXISTS', KEYS[1], items[i]) == 1 then
+        redis.call('HINCRBY', KEYS[1], items[i], tonumber(items[i + 1]))
+    end
+end
+redis.call('DEL', KEYS[3])
+redis.call('ZREM', KEYS[2], ARGV[1])
+return 1
+"""
+
+
+def merge_items(items: Iterable[Dict[str, Any]]) -> Dict[int, int]:
+    quantities = Counter()
+    for item in items:
+        quantities[int(item["dish_id"])] += int(item["quantity"])
+    return dict(quantities)
+
+
+class RedisStockStore:
+    LEVELS_KEY = "stock:levels"
+    EXPIRY_KEY = "stock:reservations"
+
+    def __init__(self, redis: Redis, reservation_ttl: float = 960.0):
+        self.redis = redis
+        self.reservation_ttl = reservation_ttl
+        self._reserve = redis.register_script(RESERVE_SCRIPT)
+        self._release = redis.register_script(RELEASE_SCRIPT)
+
+    @staticmethod
+    def reservation_key(order_id: int) -> str:
+        return f"stock:reservation:{order_id}"
+
+    def _keys(self, order_id: int) -> list[str]:
+        return [self.LEVELS_KEY, self.EXPIRY_KEY, self.reservation_key(order_id)]
+
+    async def reserve(self, order_id: int, items: Dict[int, int]) -> Optional[int]:
+        """Возвращает None при успехе или id блюда, которого не хватило."""
+        expires_ms = int((time.time() + self.reservation_ttl) * 1000)
+        args = [expires_ms, order_id]
+        for dish_id, quantity in items.items():
+            args += [dish_id, quantity]
+        reserved, dish_id = await self._reserve(keys=self._keys(order_id), args=args)
+        return None if int(reserved) else int(dish_id)
+
+    async def release(self, order_id: int) -> bool:
+        return bool(await self._release(keys=self._keys(order_id), args=[order_id]))
+
+    async def commit(self, order_id: int) -> bool:
+        # Оплаченный заказ забирает резерв насовсем: остаток уже уменьшен
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self.reservation_key(order_id))
+            pipe.zrem(self.EXPIRY_KEY, order_id)
+            deleted, _ = await pipe.execute()
+        return bool(deleted)
+
+    async def expired(self, limit: int, now: Optional[float] = None) -> list[int]:
+        now_ms = int((now if now is not None else time.time()) * 1000)
+        return [int(order_id) for order_id in await self.redis.zrangebyscore(
+            self.EXPIRY_KEY, "-inf", now_ms, start=0, num=limit
+        )]
+
+    async def set_level(self, dish_id: int, quantity: Optional[int]) -> None:
+        if quantity is None:
+            await self.redis.hdel(self.LEVELS_KEY, dish_id)
+        else:
+            await self.redis.hset(self.LEVELS_KEY, dish_id, quantity)
+
+    async def levels(self) -> Dict[int, int]:
+        return {int(dish_id): int(quantity) for dish_id, quantity in (await self.redis.hgetall(self.LEVELS_KEY)).items()}
+
+    async def load(self, levels: Dict[int, int]) -> int:
+        # HSETNX не затирает остатки, уже изменённые резервами после прошлой сверки
+        if not levels:
+            return 0
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for dish_id, quantity in levels.items():
+                pipe.hsetnx(self.LEVELS_KEY, dish_id, quantity)
+            return sum(await pipe.execute())
+
+
+class StockEventHandler:
+    def __init__(self, store: RedisStockStore, publisher: RabbitMQClient):
+        self.store = store
+        self.publisher = publisher
+
+    async def handle_event(self, data: Dict[str, Any], event_type: EventType) -> None:
+        order_id = data.get("order_id")
+        if order_id is None:
+            return
+        if event_type == EventType.ORDER_CREATED:
+            await self._reserve(int(order_id), data.get("items", []))
+        elif event_type == EventType.MENU_RELEASE:
+            if await self.store.release(int(order_id)):
+                logger.info(f"[Stock] Резерв заказа {order_id} снят")
+        elif event_type == EventType.PAYMENT_COMPLETED:
+            await self.store.commit(int(order_id))
+
+    async def _reserve(self, order_id: int, items: list[Dict[str, Any]]) -> None:
+        missing = await self.store.reserve(order_id, merge_items(items))
+        if missing is None:
+            await self.publisher.publish_event(EventType.MENU_RESERVED, {"order_id": order_id})
+            return
+        logger.info(f"[Stock] Заказ {order_id}: блюда {missing} не хватает")
+        await self.publisher.publish_event(EventType.MENU_FAILED, {
+            "order_id": order_id,
+            "dish_id": missing,
+            "reason": f"dish {missing} is out of stock"
+        })
+
+
+class StockReconciler:
+    def __init__(
+        self,
+        store: RedisStockStore,
+        session_factory=async_session,
+        reap_interval: float = 1.0,
+        reap_batch_size: int = 500,
+        reconcile_interval: float = 30.0
+    ):
+        self.store = store
+        self.session_factory = session_factory
+        self.reap_interval = reap_interval
+        self.reap_batch_size = reap_batch_size
+        self.reconcile_interval = reconcile_interval
+
+    async def reap_once(self) -> int:
+        released = 0
+        for order_id in await self.store.expired(self.reap_batch_size):
+            released += await self.store.release(order_id)
+        if released:
+            logger.info(f"[Stock] Снято просроченных резервов: {released}")
+        return released
+
+    async def reconcile_once(self) -> int:
+        levels = await self.store.levels()
+        if not levels:
+            return 0
+        async with self.session_factory() as session:
+            updated = await MenuRepository(session).sync_stock(levels)
+            await session.commit()
+        return updated
+
+    async def warm_up(self) -> int:
+        async with self.session_factory() as session:
+            levels = await MenuRepository(session).get_stock_levels()
+        return await self.store.load(levels)
+
+    async def run(self) -> None:
+        logger.info("[Stock] Сверка остатков запущена")
+        next_reconcile = time.monotonic() + self.reconcile_interval
+        while True:
+            try:
+                await self.reap_once()
+                if time.monotonic() >= next_reconcile:
+                    await self.reconcile_once()
+                    next_reconcile = time.monotonic() + self.reconcile_interval
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Stock] Ошибка сверки остатков: {e}")
+            await asyncio.sleep(self.reap_interval)
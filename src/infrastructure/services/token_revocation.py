@@ -0,0 +1,134 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Dict
+from redis.asyncio import Redis
+from src.core.config import settings
+from src.core.security import Principal
+from src.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+REVOKED_TOKENS_KEY = "auth:revoked:tokens"
+REVOKED_USERS_KEY = "auth:revoked:users"
+REVOCATION_CHANNEL = "auth:revocations"
+
+
+# Отзыв токенов без обращения к users-service: в Redis два sorted set — jti -> exp (выход из аккаунта)
+# и user_id -> время отзыва (смена роли или пароля, токены выпущенные раньше недействительны).
+# Каждый процесс держит их копию в памяти, загружает при подписке и дополняет по pub/sub,
+# поэтому проверка на запрос — поиск в словаре
+class TokenRevocations:
+    def __init__(
+        self,
+        redis: Redis = redis_client,
+        channel: str = REVOCATION_CHANNEL,
+        token_lifetime: float = settings.ACCESS_TOKEN_EXPIRE * 60,
+        reconnect_delay: float = 1.0
+    ):
+        self.redis = redis
+        self.channel = channel
+        # Отзыв пользователя хранится, пока живы выпущенные до него токены
+        self.token_lifetime = token_lifetime
+        self.reconnect_delay = reconnect_delay
+        self._tokens: Dict[str, float] = {}
+        self._users: Dict[int, float] = {}
+        self.loaded = False
+
+    def _revoked_locally(self, principal: Principal) -> bool:
+        if principal.jti is not None and principal.jti in self._tokens:
+            return True
+        return principal.issued_at < self._users.get(principal.id, 0.0)
+
+    async def is_revoked(self, principal: Principal) -> bool:
+        if self.loaded:
+            return self._revoked_locally(principal)
+        # Копия ещё не загружена: спрашиваем Redis напрямую. Ошибка Redis пробрасывается —
+        # без проверки отзыва токен не принимаем
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zscore(REVOKED_TOKENS_KEY, principal.jti or "")
+            pipe.zscore(REVOKED_USERS_KEY, str(principal.id))
+            token_score, user_score = await pipe.execute()
+        return token_score is not None or (user_score is not None and principal.issued_at < float(user_score))
+
+    async def revoke_token(self, principal: Principal) -> None:
+        if principal.jti is None:
+            # Старый токен без jti отозвать по отдельности нельзя
+            await self.revoke_user(principal.id)
+            return
+        now = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(REVOKED_TOKENS_KEY, {principal.jti: principal.expires_at})
+            pipe.zremrangebyscore(REVOKED_TOKENS_KEY, "-inf", now)
+            pipe.publish(self.channel, json.dumps({"jti": principal.jti, "exp": principal.expires_at}))
+            await pipe.execute()
+        self._tokens[principal.jti] = principal.expires_at
+        logger.info(f"[Revocation] Токен {principal.jti} пользователя {principal.id} отозван")
+
+    async def revoke_user(self, user_id: int) -> None:
+        now = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(REVOKED_USERS_KEY, {str(user_id): now})
+            pipe.zremrangebyscore(REVOKED_USERS_KEY, "-inf", now - self.token_lifetime)
+            pipe.publish(self.channel, json.dumps({"user_id": user_id, "revoked_at": now}))
+            await pipe.execute()
+        self._users[user_id] = now
+        logger.info(f"[Revocation] Токены пользователя {user_id}, выпущенные до {now:.3f}, отозваны")
+
+    def _dispatch(self, data: str) -> None:
+        try:
+            message = json.loads(data)
+            if "jti" in message:
+                self._tokens[message["jti"]] = float(message["exp"])
+            else:
+                user_id = int(message["user_id"])
+                self._users[user_id] = max(self._users.get(user_id, 0.0), float(message["revoked_at"]))
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"[Revocation] Некорректное сообщение в {self.channel}: {data!r}")
+
+    async def load(self) -> None:
+        now = time.time()
+        tokens = await self.redis.zrangebyscore(REVOKED_TOKENS_KEY, now, "+inf", withscores=True)
+        users = await self.redis.zrangebyscore(REVOKED_USERS_KEY, now - self.token_lifetime, "+inf", withscores=True)
+        self._tokens = {jti: exp for jti, exp in tokens}
+        self._users = {int(user_id): revoked_at for user_id, revoked_at in users}
+        self.loaded = True
+
+    def prune(self) -> None:
+        now = time.time()
+        self._tokens = {jti: exp for jti, exp in self._tokens.items() if exp > now}
+        self._users = {
+            user_id: revoked_at for user_id, revoked_at in self._users.items()
+            if revoked_at > now - self.token_lifetime
+        }
+
+    async def run(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                # Сначала подписка, потом снимок: отзыв между ними придёт сообщением, а не потеряется
+                await pubsub.subscribe(self.channel)
+                await self.load()
+                logger.info(
+                    f"[Revocation] Загружено отозванных токенов: {len(self._tokens)}, пользователей: {len(self._users)}"
+                )
+                last_prune = time.monotonic()
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None and message["type"] == "message":
+                        self._dispatch(message["data"])
+                    if time.monotonic() - last_prune > 60:
+                        self.prune()
+                        last_prune = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Загруженная копия остаётся в силе; после переподключения она перечитывается целиком
+                logger.error(f"[Revocation] Подписка на {self.channel} прервана: {e}")
+            finally:
+                await pubsub.aclose()
+            await asyncio.sleep(self.reconnect_delay)
+
+
+token_revocations = TokenRevocations()
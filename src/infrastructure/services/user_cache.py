@@ -0,0 +1,100 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+from redis.asyncio import Redis
+from src.core.config import settings
+from src.core.security import Principal
+from src.infrastructure.models.user import User
+from src.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_FIELDS = ("id", "name", "email", "number_phone", "is_admin", "is_phone_verified", "created_at", "updated_at")
+
+
+# Расшифрованные токены в памяти процесса: sha256(токен) -> Principal. Подпись проверяется
+# один раз, дальше запись живёт до истечения токена или вытеснения самой старой по LRU.
+# Отзыв проверяется отдельно на каждый запрос
+class TokenCache:
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: OrderedDict[bytes, Principal] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Principal]:
+        key = self._key(token)
+        principal = self._entries.get(key)
+        if principal is None:
+            return None
+        if principal.expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return principal
+
+    def put(self, token: str, principal: Principal) -> None:
+        if self.max_size <= 0:
+            return
+        key = self._key(token)
+        self._entries[key] = principal
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+# Запись пользователя в Redis с коротким TTL, общая для всех реплик; хэш пароля не кэшируется.
+# UserRepository сбрасывает запись после изменения пользователя, TTL ограничивает устаревание при гонках
+class UserRecordCache:
+    def __init__(self, redis: Redis = redis_client, ttl: int = 30, prefix: str = "user:record"):
+        self.redis = redis
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.prefix}:{user_id}"
+
+    async def get(self, user_id: int) -> Optional[User]:
+        if self.ttl <= 0:
+            return None
+        try:
+            cached = await self.redis.get(self._key(user_id))
+        except Exception as e:
+            logger.warning(f"[UserCache] Redis недоступен, пользователь {user_id} читается из БД: {e}")
+            return None
+        if cached is None:
+            return None
+        data = json.loads(cached)
+        for field in ("created_at", "updated_at"):
+            if data.get(field):
+                data[field] = datetime.fromisoformat(data[field])
+        # Объект не привязан к сессии: годится для чтения полей, но не для изменения через ORM
+        return User(**data)
+
+    async def set(self, user: User) -> None:
+        if self.ttl <= 0:
+            return
+        data = {field: getattr(user, field) for field in USER_CACHE_FIELDS}
+        try:
+            await self.redis.set(self._key(user.id), json.dumps(data, default=str), ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"[UserCache] Не удалось закэшировать пользователя {user.id}: {e}")
+
+    async def invalidate(self, user_id: int) -> None:
+        try:
+            await self.redis.delete(self._key(user_id))
+        except Exception as e:
+            logger.warning(f"[UserCache] Не удалось сбросить кэш пользователя {user_id}: {e}")
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE)
+user_cache = UserRecordCache(ttl=settings.USER_CACHE_TTL)
@@ -0,0 +1,105 @@
+import asyncio
+import datetime
+import logging
+import time
+from src.database import async_session
+from src.infrastructure.repositories.webhook_inbox import WebhookInboxRepository
+from src.infrastructure.services.payment_service import PaymentService
+from src.infrastructure.services.payment_status import payment_status_waiters
+from src.redis import invalidate_cache
+
+logger = logging.getLogger(__name__)
+
+
+# Применяет webhook из payments.webhook_inbox: маршрут только сохраняет запрос и сразу отвечает шлюзу,
+# несколько воркеров разбирают очередь пачками через SKIP LOCKED
+class WebhookInboxWorker:
+    def __init__(
+        self,
+        session_factory=async_session,
+        batch_size: int = 100,
+        workers: int = 2,
+        poll_interval: float = 0.5,
+        max_attempts: int = 5,
+        retention_days: int = 7,
+        purge_interval: float = 3600.0
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retention_days = retention_days
+        self.purge_interval = purge_interval
+        self._wakeup = asyncio.Event()
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    async def process_batch(self, limit: int | None = None) -> int:
+        limit = limit or self.batch_size
+        async with self.session_factory() as session:
+            repository = WebhookInboxRepository(session)
+            entries = await repository.claim_batch(limit, self.max_attempts)
+            if not entries:
+                return 0
+            transaction_ids = [entry.transaction_id for entry in entries]
+            try:
+                applied = await PaymentService(session).apply_webhooks(entries)
+                await repository.mark_processed(transaction_ids)
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"[Webhooks] Ошибка обработки пачки из {len(entries)}: {e}")
+                failed = e
+            else:
+                failed = None
+        if failed is not None:
+            if limit > 1:
+                # Одна битая запись не должна держать всю пачку: повторяем по одной
+                return sum([await self.process_batch(1) for _ in transaction_ids])
+            await self._record_failure(transaction_ids, str(failed))
+            return 0
+        if applied:
+            await invalidate_cache("get_payment_by_id*")
+            await payment_status_waiters.publish(applied)
+        return len(entries)
+
+    async def _record_failure(self, transaction_ids: list[str], error: str) -> None:
+        async with self.session_factory() as session:
+            await WebhookInboxRepository(session).record_failure(transaction_ids, error, self.max_attempts)
+            await session.commit()
+
+    async def purge_once(self) -> int:
+        before = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=self.retention_days)
+        async with self.session_factory() as session:
+            purged = await WebhookInboxRepository(session).purge_processed(before)
+            await session.commit()
+        if purged:
+            logger.info(f"[Webhooks] Удалено обработанных webhook: {purged}")
+        return purged
+
+    async def _work(self, number: int) -> None:
+        next_purge = time.monotonic()
+        while True:
+            try:
+                processed = await self.process_batch()
+                # Старые записи чистит один воркер: дедупликация нужна, пока шлюз может повторить доставку
+                if number == 0 and time.monotonic() >= next_purge:
+                    await self.purge_once()
+                    next_purge = time.monotonic() + self.purge_interval
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Webhooks] Ошибка воркера {number}: {e}")
+                processed = 0
+            if processed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def run(self) -> None:
+        logger.info(f"[Webhooks] Обработка webhook запущена: воркеров {self.workers}")
+        await asyncio.gather(*(self._work(number) for number in range(self.workers)))
@@ -0,0 +1,81 @@
+from datetime import date, datetime, timedelta
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.dependencies import get_current_admin_user
+from src.database import get_db
+from src.infrastructure.repositories.analytics import AnalyticsRepository
+
+
+class SalesPoint(BaseModel):
+    bucket: datetime
+    orders_count: int
+    revenue: int
+
+
+class DishSales(BaseModel):
+    dish_id: int
+    category_id: int | None
+    quantity: int
+    revenue: int
+
+
+class CategorySales(BaseModel):
+    category_id: int | None
+    quantity: int
+    revenue: int
+
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["analytics"],
+    dependencies=[Depends(get_current_admin_user)]
+)
+
+
+def check_period(start, end):
+    if start >= end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must be before end")
+
+
+@router.get("/sales", response_model=list[SalesPoint])
+async def get_sales(
+    start: datetime = Query(..., description="Начало периода"),
+    end: datetime = Query(..., description="Конец периода (не включая)"),
+    granularity: Literal["hour", "day", "week", "month"] = Query("day"),
+    db: AsyncSession = Depends(get_db)
+):
+    check_period(start, end)
+    rows = await AnalyticsRepository(db).sales_series(start, end, granularity)
+    return [SalesPoint(bucket=bucket, orders_count=count, revenue=revenue) for bucket, count, revenue in rows]
+
+
+@router.get("/dishes/top", response_model=list[DishSales])
+async def get_top_dishes(
+    start: date = Query(..., description="Первый день периода"),
+    end: date = Query(..., description="Последний день периода"),
+    limit: int = Query(10, ge=1, le=100),
+    by: Literal["revenue", "quantity"] = Query("revenue"),
+    db: AsyncSession = Depends(get_db)
+):
+    check_period(start, end + timedelta(days=1))
+    rows = await AnalyticsRepository(db).top_dishes(start, end + timedelta(days=1), limit, by)
+    return [
+        DishSales(dish_id=dish_id, category_id=category_id, quantity=quantity, revenue=revenue)
+        for dish_id, category_id, quantity, revenue in rows
+    ]
+
+
+@router.get("/categories", response_model=list[CategorySales])
+async def get_category_sales(
+    start: date = Query(..., description="Первый день периода"),
+    end: date = Query(..., description="Последний день периода"),
+    db: AsyncSession = Depends(get_db)
+):
+    check_period(start, end + timedelta(days=1))
+    rows = await AnalyticsRepository(db).category_sales(start, end + timedelta(days=1))
+    return [
+        CategorySales(category_id=category_id, quantity=quantity, revenue=revenue)
+        for category_id, quantity, revenue in rows
+    ]
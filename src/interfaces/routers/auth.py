@@ -6,7 +6,10 @@ from src.schemas.user_schemas import PhoneRequest, VerifyRequest, TokenResponse,
 from src.infrastructure.services.sms import SMSService
 from src.infrastructure.repositories.user import UserRepository
 from src.application.auth.auth import AuthService
-from src.core.security import create_access_token, decode_token, verify_password
+from src.core.jwks import key_set
+from src.core.security import Principal, access_token_claims, decode_principal, sign_access_token
+from src.core.dependencies import get_current_principal
+from src.infrastructure.services.token_revocation import token_revocations
 from src.core.config import settings
 from datetime import timedelta
 from src.infrastructure.models.user import User
@@ -42,7 +45,7 @@ async def verify_sms_code(
         user = await service.verification_user(data.number_phone, data.code)
         if not user:
             raise HTTPException(status_code=400, detail="Неверный код подтверждения")
-        token = create_access_token({"sub": str(user.id)})
+        token = await sign_access_token(access_token_claims(user))
         return {"access_token": token, "token_type": "bearer"}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -72,25 +75,40 @@ async def login(
     db: AsyncSession = Depends(get_db)
 ):
     try:
-        user_repository = UserRepository(db)
-        user = await user_repository.get_by_phone(login_data.number_phone)
-        if not user or not verify_password(login_data.password, user.hashed_password):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Неверный номер телефона или пароль",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE)
-        access_token = create_access_token(
-            data={"sub": str(user.id)}, expires_delta=access_token_expires
+        service = AuthService(UserRepository(db), sms_service)
+        user = await service.login(login_data.number_phone, login_data.password)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Неверный номер телефона или пароль",
+            headers={"WWW-Authenticate": "Bearer"},
         )
-        return {"access_token": access_token, "token_type": "bearer"}
     except Exception as e:
         print(f"Ошибка при входе: {str(e)}")
         raise HTTPException(status_code=500, detail="Внутренняя ошибка сервера")
-    
 
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE)
+    access_token = await sign_access_token(access_token_claims(user), access_token_expires)
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.post("/logout", status_code=status.HTTP_200_OK)
+async def logout(principal: Principal = Depends(get_current_principal)):
+    # Токен перестаёт приниматься всеми сервисами сразу, не дожидаясь exp
+    await token_revocations.revoke_token(principal)
+    return {"message": "Токен отозван"}
+
+
+@router.get("/jwks")
+async def jwks():
+    # Открытые ключи для локальной проверки токенов в остальных сервисах. Кэш короче
+    # интервала обновления у потребителей, чтобы новый ключ при ротации расходился быстро
+    if settings.JWT_ALGORITHM.startswith("HS"):
+        raise HTTPException(status_code=404, detail="Токены подписываются общим секретом, JWKS не публикуется")
+    return JSONResponse(content=key_set.jwks, headers={"Cache-Control": "public, max-age=60"})
+
+
+# Оставлен для совместимости: сервисы проверяют токены сами по JWKS, forward-auth не нужен
 @router.get("/verify", status_code=status.HTTP_200_OK)
 async def verify_token(request: Request):
     try:
@@ -102,11 +120,13 @@ async def verify_token(request: Request):
             )
         
         token = auth_header.split(" ")[1]
-        payload = decode_token(token)
+        principal = decode_principal(token)
+        if await token_revocations.is_revoked(principal):
+            raise ValueError("Token has been revoked")
         return JSONResponse(
             status_code=status.HTTP_200_OK,
             content={"status": "ok"},
-            headers={"X-User-Id": payload["sub"]}
+            headers={"X-User-Id": str(principal.id), "X-User-Is-Admin": str(principal.is_admin).lower()}
         )
     except ValueError as e:
         return JSONResponse(
@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel, Field
+from src.core.config import settings
+from src.infrastructure.services.gateway_simulator import GatewaySimulator, Latency
+import logging
+
+logger = logging.getLogger(__name__)
+
+simulator = GatewaySimulator(
+    latency=Latency(settings.GATEWAY_SIM_LATENCY_MEDIAN_MS, settings.GATEWAY_SIM_LATENCY_P99_MS),
+    webhook_delay=Latency(settings.GATEWAY_SIM_WEBHOOK_DELAY_MEDIAN_MS, settings.GATEWAY_SIM_WEBHOOK_DELAY_P99_MS),
+    webhook_url=settings.GATEWAY_SIM_WEBHOOK_URL,
+    error_rate=settings.GATEWAY_SIM_ERROR_RATE,
+    decline_rate=settings.GATEWAY_SIM_DECLINE_RATE,
+    duplicate_webhook_rate=settings.GATEWAY_SIM_DUPLICATE_WEBHOOK_RATE,
+    seed=settings.GATEWAY_SIM_SEED
+)
+
+
+def get_simulator() -> GatewaySimulator:
+    return simulator
+
+
+class GatewayPaymentRequest(BaseModel):
+    invoice_id: int
+    amount: int = Field(..., gt=0)
+
+
+router = APIRouter(prefix="/payments", tags=["gateway-simulator"])
+
+
+@router.post("")
+async def create_payment(
+    payment_request: GatewayPaymentRequest,
+    gateway: GatewaySimulator = Depends(get_simulator)
+):
+    result = await gateway.create_payment(payment_request.amount, payment_request.invoice_id)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Шлюз временно недоступен (симулятор)"
+        )
+    return result
+
+
+@router.get("/{transaction_id}")
+async def get_payment_status(
+    transaction_id: str,
+    gateway: GatewaySimulator = Depends(get_simulator)
+):
+    transaction = await gateway.get_status(transaction_id)
+    if transaction is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Транзакция {transaction_id} не найдена"
+        )
+    return transaction
+
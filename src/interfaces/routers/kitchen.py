@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.config import settings
+from src.core.dependencies import get_current_admin_user
+from src.database import async_session, get_db
+from src.domain.order import InvalidTransition
+from src.infrastructure.models.order import OrderStatus
+from src.infrastructure.repositories.order import OrderRepository
+from src.infrastructure.services.kitchen import KitchenScheduler, TicketStatus, parse_stations
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Тикеты живут в памяти процесса: сервис заказов с кухней должен работать в одном экземпляре,
+# иначе у каждой реплики своя очередь и повара разберут один заказ дважды
+kitchen = KitchenScheduler(
+    parse_stations(settings.KITCHEN_STATIONS),
+    default_station=settings.KITCHEN_DEFAULT_STATION
+)
+
+
+def promised_at(created_at: datetime) -> datetime:
+    return created_at + timedelta(minutes=settings.KITCHEN_PROMISE_MINUTES)
+
+
+async def restore_kitchen(session_factory=async_session) -> int:
+    # После рестарта очереди пересобираются из заказов в processing; тикеты, которые готовились,
+    # снова встают в очередь — кто из поваров их взял, в базе не хранится
+    async with session_factory() as session:
+        backlog = await OrderRepository(session).get_kitchen_backlog()
+    for order_id, (created_at, items) in backlog.items():
+        kitchen.submit_order(order_id, items, promised_at(created_at))
+    return len(backlog)
+
+
+class TicketResponse(BaseModel):
+    id: int
+    order_id: int
+    station: str
+    items: list[dict]
+    promised_at: datetime
+    status: TicketStatus
+    cook_id: str | None = None
+
+
+class KitchenFeedResponse(BaseModel):
+    queued: list[TicketResponse]
+    cooking: list[TicketResponse]
+    queue_sizes: dict[str, int]
+
+
+router = APIRouter(
+    prefix="/kitchen",
+    tags=["kitchen"],
+    dependencies=[Depends(get_current_admin_user)]
+)
+
+
+@router.post("/orders/{order_id}", response_model=list[TicketResponse])
+async def send_order_to_kitchen(
+    order_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    repository = OrderRepository(db)
+    order = await repository.get_order_id(order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    # В processing заказ переводит сага после оплаты; кухня статус не меняет
+    if order.status != OrderStatus.PROCESSING:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Order {order_id} is {order.status.value}, only paid orders go to the kitchen"
+        )
+    items = await repository.get_kitchen_items(order_id)
+
+    tickets = kitchen.submit_order(order_id, items, promised_at(order.created_at))
+    logger.info(f"[Kitchen] Заказ {order_id} разбит на тикеты: {[t.station for t in tickets]}")
+    return [ticket.to_dict() for ticket in tickets]
+
+
+@router.delete("/orders/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def withdraw_order_from_kitchen(order_id: int):
+    kitchen.cancel_order(order_id)
+
+
+@router.put("/cooks/{cook_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def register_cook(
+    cook_id: str,
+    stations: list[str] = Body(..., embed=True)
+):
+    kitchen.register_cook(cook_id, stations)
+
+
+@router.post("/cooks/{cook_id}/next", response_model=TicketResponse | None)
+async def take_next_ticket(cook_id: str):
+    try:
+        ticket = kitchen.next_ticket(cook_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if ticket is None:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    return ticket.to_dict()
+
+
+@router.post("/tickets/{ticket_id}/complete")
+async def complete_ticket(
+    ticket_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        order_id = kitchen.complete(ticket_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if order_id is None:
+        return {"ticket_id": ticket_id, "order_completed": False}
+    try:
+        await OrderRepository(db).transition(order_id, OrderStatus.COMPLETED)
+        await db.commit()
+    except (InvalidTransition, ValueError) as e:
+        logger.warning(f"[Kitchen] Заказ {order_id} приготовлен, но не закрыт: {e}")
+    return {"ticket_id": ticket_id, "order_id": order_id, "order_completed": True}
+
+
+@router.get("/feed", response_model=KitchenFeedResponse)
+async def get_kitchen_feed(
+    station: str | None = Query(None, description="Станция: grill, cold, bar"),
+    limit: int = Query(50, ge=1, le=500)
+):
+    return {**kitchen.feed(station, limit), "queue_sizes": kitchen.queue_sizes()}
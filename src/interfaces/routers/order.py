@@ -1,26 +1,36 @@
+import base64
 from datetime import datetime
 import uuid
-from fastapi import APIRouter, Body, Depends, HTTPException, status, Query
+from typing import Optional
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.infrastructure.models import order
-from src.core.dependencies import get_current_user
-from src.database import get_db
+from src.infrastructure.models.order import Order
+from src.core.dependencies import get_current_principal
+from src.core.idempotency import IDEMPOTENCY_HEADER, fingerprint, idempotency
+from src.database import get_db, async_session
 import httpx
 from dotenv import load_dotenv
 import os
-from src.domain.order import OrderStatus
+from src.domain.order import InvalidTransition, OrderStatus
 from src.schemas.order_schemas import OrderCreate, OrderUpdate, BasketUpdate
 from src.infrastructure.repositories.order import OrderRepository
-from pydantic import BaseModel, ConfigDict
+from src.infrastructure.repositories.outbox import OutboxRepository
+from src.infrastructure.repositories.archive import ArchiveRepository
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field
 from fastapi_limiter.depends import RateLimiter
 from src.infrastructure.services.retry import RetryService
+from src.infrastructure.services.hedging import HedgePolicy
+from src.infrastructure.services.basket_store import RedisBasketStore
+from src.infrastructure.services.menu_prices import MenuDishFetcher, MenuPriceCache
+from src.redis import redis_client
+from src.core.config import settings
 from src.rabbitmq import EventType, RabbitMQClient
 import logging
 from src.schemas.order_schemas import BasketCreate
 
 
 logger = logging.getLogger(__name__)
-rabbit = RabbitMQClient()
 
 load_dotenv()
 MENU_SERVICE_URL = os.getenv("MENU_SERVICE_URL")
@@ -28,6 +38,45 @@ USER_SERVICE_URL = os.getenv("USER_SERVICE_URL")
 PAYMENT_SERVICE_URL = os.getenv("PAYMENT_SERVICE_URL")
 
 
+def _replicas(value: str) -> list[str]:
+    return [url.strip() for url in value.split(",") if url.strip()]
+
+
+hedge_policy = HedgePolicy(
+    replicas={
+        MENU_SERVICE_URL: _replicas(settings.MENU_SERVICE_REPLICAS),
+        USER_SERVICE_URL: _replicas(settings.USER_SERVICE_REPLICAS),
+    },
+    quantile=settings.HEDGE_QUANTILE,
+    budget_ratio=settings.HEDGE_BUDGET_RATIO,
+    default_delay=settings.HEDGE_DEFAULT_DELAY_MS / 1000
+) if settings.HEDGE_REQUESTS_ENABLED else None
+retry_service = RetryService(hedge_policy=hedge_policy)
+basket_store = RedisBasketStore(redis_client, ttl=settings.BASKET_TTL_SECONDS)
+REDIS_BASKETS = settings.BASKET_ENGINE == "redis"
+
+
+menu_fetcher = MenuDishFetcher(
+    MENU_SERVICE_URL,
+    hedge_policy=hedge_policy,
+    timeout=settings.MENU_FETCH_TIMEOUT_SECONDS,
+    retries=settings.MENU_FETCH_RETRIES
+)
+menu_prices = MenuPriceCache(menu_fetcher, ttl=settings.MENU_PRICE_CACHE_TTL_SECONDS)
+
+
+async def price_items(dish_ids) -> dict[int, int]:
+    dish_ids = set(dish_ids)
+    dishes = await menu_prices.get_many(dish_ids)
+    for dish_id in sorted(dish_ids):
+        dish = dishes.get(dish_id)
+        if dish is None:
+            raise ValueError(f"Блюдо {dish_id} не найдено")
+        if not dish.is_available:
+            raise ValueError(f"Блюдо {dish_id} недоступно")
+    return {dish_id: dish.price for dish_id, dish in dishes.items()}
+
+
 class OrderItemResponse(BaseModel):
     model_config = ConfigDict(
         from_attributes=True,
@@ -37,7 +86,7 @@ class OrderItemResponse(BaseModel):
     
     id: int
     order_id: int
-    item_id: int
+    item_id: int = Field(validation_alias=AliasChoices("item_id", "dish_id"))
     quantity: int
     price: int
         
@@ -56,6 +105,30 @@ class OrderResponse(BaseModel):
     updated_at: datetime
     items: list[OrderItemResponse]
         
+class OrderPageResponse(BaseModel):
+    items: list[OrderResponse]
+    next_cursor: str | None = None
+
+
+class OrderStatusResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    order_id: int
+    user_id: int
+    status: OrderStatus
+    updated_at: datetime
+
+
+class OrderEventResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    order_id: int
+    from_status: OrderStatus | None
+    to_status: OrderStatus
+    created_at: datetime
+
+        
 class BasketResponse(BaseModel):
     model_config = ConfigDict(
         from_attributes=True,
@@ -74,44 +147,39 @@ router = APIRouter(
     tags=["order"],
 )
 
-async def process_order(order_id: str, user_id: int, items: list):
-    user_service_ok = await RetryService.check_health(USER_SERVICE_URL)
-    menu_service_ok = await RetryService.check_health(MENU_SERVICE_URL)
-    payment_service_ok = await RetryService.check_health(PAYMENT_SERVICE_URL)
+async def process_order(db: AsyncSession, order_id: str, user_id: int, items: list):
+    outbox = OutboxRepository(db)
+    failed_event = {
+        "user_id": user_id,
+        "order_id": order_id,
+        "items": [item.dish_id for item in items]
+    }
+    user_service_ok = await retry_service.check_health(USER_SERVICE_URL)
+    menu_service_ok = await retry_service.check_health(MENU_SERVICE_URL)
+    payment_service_ok = await retry_service.check_health(PAYMENT_SERVICE_URL)
     if not user_service_ok or not menu_service_ok:
-        await rabbit.publish_event(EventType.ORDER_FAILED, {
-            "user_id": user_id,
-            "order_id": order_id,
-            "items": [item.dish_id for item in items]
-        })
+        await outbox.publish_event(EventType.ORDER_FAILED, failed_event)
+        await db.commit()
         return {"status": "failed"}
     try:
-        user = await RetryService.get(f"{USER_SERVICE_URL}/users/{user_id}")
+        user = await retry_service.get(f"{USER_SERVICE_URL}/users/{user_id}")
     except Exception as e:
-        await rabbit.publish_event(EventType.ORDER_FAILED, {
-            "user_id": user_id,
-            "order_id": order_id,
-            "items": [item.dish_id for item in items]
-        })
+        await outbox.publish_event(EventType.ORDER_FAILED, failed_event)
+        await db.commit()
         return {"status": "failed"}
-    for item in items:
-        try:
-            dish = await RetryService.get(f"{MENU_SERVICE_URL}/dishes/{item.dish_id}")
-            if not dish.get("is_available"):
-                raise HTTPException(status_code=400, detail=f"Item {item.dish_id} is not available")
-        except Exception as e:
-            await rabbit.publish_event(EventType.ORDER_FAILED, {
-                "user_id": user_id,
-                "order_id": order_id,
-                "items": [item.dish_id for item in items]
-            })
-            return {"order_id": order_id, "status": "failed"}
+    try:
+        await price_items(item.dish_id for item in items)
+    except Exception as e:
+        await outbox.publish_event(EventType.ORDER_FAILED, failed_event)
+        await db.commit()
+        return {"order_id": order_id, "status": "failed"}
     
-    await rabbit.publish_event(EventType.ORDER_CREATED, {
+    await outbox.publish_event(EventType.ORDER_CREATED, {
         "order_id": order_id,
         "user_id": user_id,
         "items": [item.dish_id for item in items]
     })
+    await db.commit()
     return {"order_id": order_id, "status": "success"}
 
 
@@ -125,11 +193,74 @@ async def health_check():
 async def get_orders(
     db: AsyncSession = Depends(get_db),
     limit: int = Query(0, ge=0, description="Сдвиг записей"),
-    offset: int = Query(10, ge=0, description="Лимит записей на странице")
+    offset: int = Query(10, ge=0, description="Лимит записей на странице"),
+    created_from: Optional[datetime] = Query(None, description="Заказы не раньше этого момента"),
+    created_to: Optional[datetime] = Query(None, description="Заказы раньше этого момента")
 ):
-    orders = await OrderRepository(db).get_orders(limit, offset)
+    orders = await OrderRepository(db).get_orders(limit, offset, created_from, created_to)
     return orders
 
+def encode_cursor(order) -> str:
+    raw = f"{order.created_at.isoformat()}|{order.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, order_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(order_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+@router.get("/orders/me", response_model=OrderPageResponse)
+async def get_my_orders(
+    user = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+    limit: int = Query(20, ge=1, le=100, description="Лимит записей на странице"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы"),
+    order_status: Optional[OrderStatus] = Query(None, alias="status", description="Фильтр по статусу"),
+    created_from: Optional[datetime] = Query(None, description="Заказы не раньше этого момента"),
+    created_to: Optional[datetime] = Query(None, description="Заказы раньше этого момента")
+):
+    after = decode_cursor(cursor) if cursor else None
+    # Берём на одну запись больше, чтобы понять, есть ли следующая страница
+    orders = await OrderRepository(db).get_user_orders(
+        user.id, limit + 1, after, order_status, created_from, created_to
+    )
+    next_cursor = encode_cursor(orders[limit - 1]) if len(orders) > limit else None
+    return OrderPageResponse(items=orders[:limit], next_cursor=next_cursor)
+
+@router.get("/orders/open", response_model=list[OrderStatusResponse])
+async def get_open_orders(
+    user = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    return await OrderRepository(db).get_open_orders(user.id)
+
+@router.get("/orders/status-counts", response_model=dict[OrderStatus, int])
+async def get_order_status_counts(
+    db: AsyncSession = Depends(get_db)
+):
+    return await OrderRepository(db).get_status_counts()
+
+@router.get("/orders/{order_id}/status", response_model=OrderStatusResponse)
+async def get_order_status(
+    order_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    order_status = await OrderRepository(db).get_order_status(order_id)
+    if not order_status:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order_status
+
+@router.get("/orders/{order_id}/events", response_model=list[OrderEventResponse])
+async def get_order_events(
+    order_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    return await OrderRepository(db).get_order_events(order_id)
+
 @router.get("/orders/{order_id}", response_model=OrderResponse,
             dependencies=[Depends(RateLimiter(times=10, seconds=60))])
 async def get_order(
@@ -137,29 +268,28 @@ async def get_order(
     db: AsyncSession = Depends(get_db)
 ):
     order = await OrderRepository(db).get_order_id(order_id)
+    if order is None:
+        # Старые завершённые заказы переносятся в архив и читаются оттуда
+        order = await ArchiveRepository(db).get_order(order_id)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
     return order
 
-@router.post("/orders", response_model=OrderResponse,
+@router.post("/orders",
              dependencies=[Depends(RateLimiter(times=10, seconds=60))])
 async def create_order(
     order: OrderCreate = Body(...),
-    user_id: int = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    user = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
 ):
-    order_id = str(uuid.uuid4())
-    result = await process_order(order_id, user_id, order.items)
-    return result
-
-@RabbitMQClient.event_handler(EventType.MENU_RESERVED)
-async def handle_menu_reserved(data: dict, event_type: EventType):
-    order_id = data["order_id"]
-    logger.info(f"Order {order_id}: Items reserved successfully")
+    async def create():
+        order_id = str(uuid.uuid4())
+        return await process_order(db, order_id, user.id, order.items)
 
-@RabbitMQClient.event_handler(EventType.MENU_FAILED)
-async def handle_menu_failed(data: dict, event_type: EventType):
-    order_id = data["order_id"]
-    logger.info(f"Order {order_id}: Item reservation failed, initiating rollback")
-    await rabbit.publish_event(EventType.ORDER_FAILED, {"order_id": order_id})
+    return await idempotency.execute(
+        f"orders:create:{user.id}", idempotency_key, fingerprint(order), create
+    )
 
 @RabbitMQClient.event_handler(EventType.ORDER_DELAYED)
 async def handle_delayed_order(data: dict, event_type: EventType):
@@ -167,14 +297,8 @@ async def handle_delayed_order(data: dict, event_type: EventType):
     user_id = data["user_id"]
     items = data["items"]
     logger.info(f"Processing delayed order {order_id}")
-    await process_order(order_id, user_id, items)
-
-@RabbitMQClient.event_handler(EventType.ORDER_FAILED)
-async def handle_order_failed(data: dict, event_type: EventType):
-    order_id = data["order_id"]
-    db = await get_db()
-    await OrderRepository(db).cancel_order(order_id)
-    logger.info(f"Order {order_id} cancelled due to saga failure")
+    async with async_session() as db:
+        await process_order(db, order_id, user_id, items)
 
 @router.put("/orders/{order_id}", response_model=OrderResponse,
             dependencies=[Depends(RateLimiter(times=10, seconds=60))])
@@ -183,7 +307,12 @@ async def update_order(
     order: OrderUpdate,
     db: AsyncSession = Depends(get_db)
 ): 
-    order = await OrderRepository(db).update_order(order_id, order)
+    try:
+        order = await OrderRepository(db).update_order(order_id, order)
+    except InvalidTransition as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
     return order
 
 @router.delete("/orders/{order_id}", status_code=status.HTTP_204_NO_CONTENT,
@@ -219,17 +348,25 @@ async def get_basket(
              dependencies=[Depends(RateLimiter(times=10, seconds=60))])
 async def create_basket(
     db: AsyncSession = Depends(get_db),
-    user = Depends(get_current_user),
+    user = Depends(get_current_principal),
     dish_id: int = Query(..., description="ID блюда"),
     quantity: int = Query(..., description="Количество")
 ):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{MENU_SERVICE_URL}/dishes/{dish_id}")
-        dish = response.json()
-        if not dish:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dish not found")
-        basket_create = BasketCreate(user_id=user.id, dish_id=dish_id, quantity=quantity)
-        basket = await OrderRepository(db).create_basket(basket_create)
+    try:
+        dish = await menu_prices.get(dish_id)
+    except Exception as e:
+        logger.error(f"Не удалось получить блюдо {dish_id} из меню: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Menu service unavailable")
+    if dish is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dish not found")
+    if not dish.is_available:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Dish is not available")
+    if REDIS_BASKETS:
+        # В redis-режиме позиция корзины адресуется id блюда
+        new_quantity = await basket_store.add(user.id, dish_id, quantity, dish.price)
+        return BasketResponse(id=dish_id, user_id=user.id, dish_id=dish_id, quantity=new_quantity)
+    basket_create = BasketCreate(user_id=user.id, dish_id=dish_id, quantity=quantity, price=dish.price)
+    basket = await OrderRepository(db).create_basket(basket_create)
     # Приводим к BasketResponse с dish_id
     return BasketResponse(
         id=basket.id,
@@ -243,8 +380,13 @@ async def create_basket(
 async def update_basket(
     basket_id: int,
     basket: BasketUpdate,
+    user = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
+    if REDIS_BASKETS:
+        if not await basket_store.set_quantity(user.id, basket_id, basket.quantity):
+            raise HTTPException(status_code=404, detail="Basket not found")
+        return BasketResponse(id=basket_id, user_id=user.id, dish_id=basket_id, quantity=basket.quantity)
     basket = await OrderRepository(db).update_basket(basket_id, basket)
     if not basket:
         raise HTTPException(status_code=404, detail="Basket not found")
@@ -259,50 +401,82 @@ async def update_basket(
                dependencies=[Depends(RateLimiter(times=10, seconds=60))])
 async def delete_basket(
     basket_id: int,
+    user = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
+    if REDIS_BASKETS:
+        await basket_store.remove(user.id, basket_id)
+        return {"message": "Basket deleted successfully"}
     await OrderRepository(db).delete_basket(basket_id)
     return {"message": "Basket deleted successfully"}
 
+async def redis_basket_to_order(repository: OrderRepository, user_id: int) -> Order:
+    # Корзина из Redis попадает в Postgres в той же транзакции, что и заказ.
+    # Снимок забирается атомарно, а если заказ не создан — возвращается пользователю
+    items = await basket_store.take(user_id)
+    try:
+        if not items:
+            raise ValueError("Корзина пуста")
+        # Цена фиксируется на момент оформления, а не добавления в корзину
+        prices = await price_items(item.dish_id for item in items)
+        await repository.replace_baskets({user_id: [
+            item.model_copy(update={"price": prices[item.dish_id]}) for item in items
+        ]})
+        created = await repository.basket_to_order(user_id)
+    except BaseException:
+        await basket_store.restore(user_id)
+        raise
+    await basket_store.finish_checkout(user_id)
+    return created
+
+
+async def checkout_basket(db: AsyncSession, user_id: int) -> OrderResponse:
+    repository = OrderRepository(db)
+    if REDIS_BASKETS:
+        order = await redis_basket_to_order(repository, user_id)
+    else:
+        prices = await price_items(await repository.get_basket_dish_ids(user_id))
+        await repository.reprice_basket(user_id, prices)
+        order = await repository.basket_to_order(user_id)
+
+    if PAYMENT_SERVICE_URL:
+        try:
+            # Ключ привязан к заказу: повтор запроса не создаст второй платёж
+            payment_info = await retry_service.post(
+                f"{PAYMENT_SERVICE_URL}/payments/create",
+                headers={IDEMPOTENCY_HEADER: f"order-{order.id}"},
+                json={"invoice_id": order.id, "amount": order.total_price}
+            )
+            logger.info(f"Создан платеж для заказа {order.id}: {payment_info}")
+        except Exception as e:
+            logger.error(f"Ошибка интеграции с Payment Service: {e}")
+
+    return OrderResponse.model_validate(order)
+
+
 @router.post("/baskets/bask-to-order", response_model=OrderResponse,
              dependencies=[Depends(RateLimiter(times=10, seconds=60))])
 async def convert_basket_to_order(
-    user_id: int = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    user = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
 ):
     try:
-        order = await OrderRepository(db).convert_basket_to_order(user_id)
-        
-        if PAYMENT_SERVICE_URL:
-            try:
-                print(f"Создание платежа для заказа {order.id}")
-                async with httpx.AsyncClient() as client:
-                    payment_data = {
-                        "order_id": order.id,
-                        "amount": order.total_price,
-                    }
-                    response = await client.post(
-                        f"{PAYMENT_SERVICE_URL}/payments/create",
-                        json=payment_data
-                    )
-                    if response.status_code == 201:
-                        payment_info = response.json()
-                        print(f"Платеж создан: {payment_info}")
-                        logger.info(f"Создан платеж для заказа {order.id}: {payment_info}")
-                    else:
-                        print(f"Ошибка создания платежа: {response.text}")
-                        logger.warning(f"Не удалось создать платеж для заказа {order.id}")
-            except Exception as e:
-                print(f"Ошибка при обращении к Payment Service: {e}")
-                logger.error(f"Ошибка интеграции с Payment Service: {e}")
-        
-        return order
+        return await idempotency.execute(
+            f"baskets:checkout:{user.id}",
+            idempotency_key,
+            fingerprint({"user_id": user.id}),
+            lambda: checkout_basket(db, user.id)
+        )
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
     except Exception as e:
+        logger.error(f"Ошибка при создании заказа для пользователя {user.id}: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Ошибка при создании заказа"
@@ -316,6 +490,8 @@ async def get_order_payment(
 ):
     try:
         order = await OrderRepository(db).get_order_id(order_id)
+        if not order:
+            order = await ArchiveRepository(db).get_order(order_id)
         if not order:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -1,14 +1,32 @@
+import asyncio
+import json
 import logging
-from typing import List
-from fastapi import APIRouter, HTTPException, Depends, Request, status
+from typing import List, Optional
+from fastapi import APIRouter, Header, HTTPException, Depends, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.core.dependencies import get_db
+from src.core.idempotency import IDEMPOTENCY_HEADER, fingerprint, idempotency
+from src.core.config import settings
+from src.infrastructure.repositories.webhook_inbox import WebhookInboxRepository
+from src.infrastructure.services.gateway_payment import verify_webhook_signature
 from src.infrastructure.services.payment_service import PaymentService
+from src.infrastructure.services.payment_status import payment_status_waiters
+from src.infrastructure.services.webhook_inbox import WebhookInboxWorker
 from src.schemas.payment_schemas import PaymentCreateRequest, PaymentResponse, WebhookPayload
 from src.infrastructure.models.payment import PaymentStatus
 
 logger = logging.getLogger(__name__)
 
+WEBHOOK_SIGNATURE_HEADER = "Content-HMAC"
+
+webhook_worker = WebhookInboxWorker(
+    batch_size=settings.WEBHOOK_BATCH_SIZE,
+    workers=settings.WEBHOOK_WORKERS,
+    poll_interval=settings.WEBHOOK_POLL_INTERVAL,
+    max_attempts=settings.WEBHOOK_MAX_ATTEMPTS,
+    retention_days=settings.WEBHOOK_RETENTION_DAYS
+)
+
 router = APIRouter(prefix="/payments", tags=["payments"])
 
 
@@ -19,17 +37,27 @@ def get_payment_service(db: AsyncSession = Depends(get_db)) -> PaymentService:
 @router.post("/create", response_model=PaymentResponse, status_code=status.HTTP_201_CREATED)
 async def create_payment(
     payment_request: PaymentCreateRequest,
-    payment_service: PaymentService = Depends(get_payment_service)
+    payment_service: PaymentService = Depends(get_payment_service),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
 ):
-    try:        
+    async def create():
         payment = await payment_service.create_payment_for_order(
             invoice_id=payment_request.invoice_id,
             amount=payment_request.amount,
         )
-
         logger.info(f"Создан платеж ID: {payment.id} для заказа {payment_request.invoice_id}")
-        return payment
-        
+        return PaymentResponse.model_validate(payment)
+
+    try:
+        return await idempotency.execute(
+            "payments:create",
+            idempotency_key,
+            fingerprint(payment_request),
+            create,
+            status_code=status.HTTP_201_CREATED
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Ошибка создания платежа: {e}")
         raise HTTPException(
@@ -61,6 +89,35 @@ async def get_payment(
         )
 
 
+@router.get("/status/{payment_id}", response_model=PaymentResponse)
+async def wait_payment_status(
+    payment_id: int,
+    known_status: Optional[PaymentStatus] = None,
+    timeout: float = Query(settings.PAYMENT_STATUS_WAIT_TIMEOUT, ge=0),
+    db: AsyncSession = Depends(get_db),
+    payment_service: PaymentService = Depends(get_payment_service)
+):
+    # Long-poll: если статус совпадает с known_status, запрос ждёт его смены или таймаута
+    # и возвращает платёж как есть — клиент повторяет запрос с тем статусом, что получил
+    timeout = min(timeout, settings.PAYMENT_STATUS_WAIT_TIMEOUT)
+    with payment_status_waiters.waiter(payment_id) as changed:
+        payment = await payment_service.get_payment_by_id(payment_id)
+        if not payment:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Платеж с ID {payment_id} не найден"
+            )
+        if known_status is None or payment.status != known_status:
+            return payment
+        # Соединение с БД не держится, пока запрос ждёт
+        await db.rollback()
+        try:
+            await asyncio.wait_for(changed, timeout)
+        except asyncio.TimeoutError:
+            return payment
+    return await payment_service.get_payment_by_id(payment_id) or payment
+
+
 @router.get("/order/{order_id}", response_model=PaymentResponse)
 async def get_payment_by_order(
     order_id: int,
@@ -88,23 +145,36 @@ async def get_payment_by_order(
 @router.post("/webhook/cloudpayments")
 async def cloudpayments_webhook(
     request: Request,
-    payment_service: PaymentService = Depends(get_payment_service)):
+    db: AsyncSession = Depends(get_db),
+    signature: Optional[str] = Header(None, alias=WEBHOOK_SIGNATURE_HEADER)
+):
+    # Шлюз получает ответ сразу после записи в inbox, статус платежа применит WebhookInboxWorker
+    body = await request.body()
+    if not verify_webhook_signature(body, signature):
+        logger.warning("Webhook CloudPayments с неверной подписью отклонен")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Неверная подпись webhook"
+        )
     try:
-        payload = await request.json()
-        print(f"Получен webhook от CloudPayments")
-        
-        result = await payment_service.process_webhook(payload)
-        
-        logger.info(f"Обработан webhook: {result}")
-        return {"status": "success", "message": "Webhook обработан", "result": result}
-        
-    except Exception as e:
-        logger.error(f"Ошибка обработки webhook: {e}")
+        raw = json.loads(body)
+        payload = WebhookPayload.model_validate(raw)
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Ошибка обработки webhook: {str(e)}"
+            detail=f"Некорректный webhook: {e}"
         )
 
+    accepted = await WebhookInboxRepository(db).append(
+        payload.transaction_id, payload.invoice_id, payload.status, raw
+    )
+    await db.commit()
+    if accepted:
+        webhook_worker.wake()
+    else:
+        logger.info(f"Повторный webhook по транзакции {payload.transaction_id} пропущен")
+    return {"code": 0, "status": "accepted" if accepted else "duplicate"}
+
 
 @router.put("/{payment_id}/status")
 async def update_payment_status(
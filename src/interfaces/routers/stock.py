@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Body, Depends, HTTPException, status
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.config import settings
+from src.core.dependencies import get_current_admin_user
+from src.database import get_db
+from src.infrastructure.repositories.menu import MenuRepository
+from src.infrastructure.services.stock import RedisStockStore, merge_items
+from src.redis import redis_client
+import logging
+
+logger = logging.getLogger(__name__)
+
+stock_store = RedisStockStore(redis_client, reservation_ttl=settings.STOCK_RESERVATION_TTL_SECONDS)
+
+
+class StockLevel(BaseModel):
+    quantity: int | None = Field(None, ge=0)
+
+
+class ReservationItem(BaseModel):
+    dish_id: int
+    quantity: int = Field(..., gt=0)
+
+
+router = APIRouter(
+    prefix="/stock",
+    tags=["stock"],
+    dependencies=[Depends(get_current_admin_user)]
+)
+
+
+@router.get("", response_model=dict[int, int])
+async def get_stock_levels():
+    return await stock_store.levels()
+
+
+@router.put("/{dish_id}", response_model=StockLevel)
+async def set_stock_level(
+    dish_id: int,
+    level: StockLevel,
+    db: AsyncSession = Depends(get_db)
+):
+    if not await MenuRepository(db).set_stock(dish_id, level.quantity):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dish not found")
+    await stock_store.set_level(dish_id, level.quantity)
+    logger.info(f"[Stock] Остаток блюда {dish_id} установлен: {level.quantity}")
+    return level
+
+
+@router.post("/reservations/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def reserve_stock(
+    order_id: int,
+    items: list[ReservationItem] = Body(...)
+):
+    missing = await stock_store.reserve(order_id, merge_items(item.model_dump() for item in items))
+    if missing is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Dish {missing} is out of stock"
+        )
+
+
+@router.delete("/reservations/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def release_stock(order_id: int):
+    if not await stock_store.release(order_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reservation not found")
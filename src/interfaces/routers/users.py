@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.infrastructure.models.user import User
 from src.core.dependencies import get_current_user, get_current_admin_user, get_user_repository
+from src.core.security import Principal
 from src.infrastructure.repositories.user import UserRepository
 from pydantic import BaseModel, ConfigDict
 from typing import Annotated
@@ -39,7 +40,7 @@ async def update_user(
             dependencies=[Depends(RateLimiter(times=10, seconds=60))])
 async def read_user(
     user_id: str,
-    current_user: Annotated[User, Depends(get_current_admin_user)],
+    current_user: Annotated[Principal, Depends(get_current_admin_user)],
     user_repository: Annotated[UserRepository, Depends(get_user_repository)]
 ) -> UserResponse:
     user = await user_repository.get_by_id(user_id)
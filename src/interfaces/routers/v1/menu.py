@@ -3,8 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.database import get_db
 from src.infrastructure.repositories.menu import MenuRepository
-from src.infrastructure.services.menu_events import MenuEventService
-from src.core.dependencies import get_current_admin_user, get_menu_event_service
+from src.core.dependencies import get_current_admin_user
 from pydantic import BaseModel, ConfigDict
 from src.schemas.menu_schemas import CategoryCreate, CategoryUpdate, DishCreate, DishUpdate, TagCreate, TagUpdate
 from fastapi_limiter.depends import RateLimiter
@@ -140,11 +139,9 @@ async def get_dishes_by_category(
              dependencies=[Depends(RateLimiter(times=10, seconds=60)), Depends(get_current_admin_user)])
 async def create_dish(
     dish: DishCreate,
-    db: AsyncSession = Depends(get_db),
-    event_service: MenuEventService = Depends(get_menu_event_service)
+    db: AsyncSession = Depends(get_db)
 ):
     new_dish = await MenuRepository(db).create_dish(dish)
-    await event_service.publish_dish_created(new_dish)
     return DishResponse.model_validate(new_dish)
 
 @router.put("/dishes/{dish_id}", response_model=DishResponse,
@@ -152,20 +149,14 @@ async def create_dish(
 async def update_dish(
     dish_id: int,
     dish: DishUpdate,
-    db: AsyncSession = Depends(get_db),
-    event_service: MenuEventService = Depends(get_menu_event_service)
+    db: AsyncSession = Depends(get_db)
 ):
-    old_dish = await MenuRepository(db).get_dish_id(dish_id)
-    if not old_dish:
+    updated_dish = await MenuRepository(db).update_dish(dish_id, dish)
+    if not updated_dish:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Dish not found"
         )
-    updated_dish = await MenuRepository(db).update_dish(dish_id, dish)
-    if old_dish.price != updated_dish.price:
-        await event_service.publish_price_changed(updated_dish, old_dish.price)
-    if old_dish.is_available != updated_dish.is_available:
-        await event_service.publish_availability_changed(updated_dish, old_dish.is_available)
     return DishResponse.model_validate(updated_dish)
 
 @router.delete("/dishes/{dish_id}", status_code=status.HTTP_204_NO_CONTENT,
@@ -3,8 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.database import get_db
 from src.infrastructure.repositories.menu import MenuRepository
-from src.infrastructure.services.menu_events import MenuEventService
-from src.core.dependencies import get_current_admin_user, get_menu_event_service
+from src.core.dependencies import get_current_admin_user
 from pydantic import BaseModel, ConfigDict
 from src.schemas.menu_schemas import CategoryCreate, CategoryUpdate, DishCreate, DishUpdate, TagCreate, TagUpdate
 from fastapi_limiter.depends import RateLimiter
@@ -22,6 +21,7 @@ class DishResponse(BaseModel):
     description: str
     price: int
     category_id: int
+    is_available: bool = True
     
     class Config:
         from_attributes = True
@@ -140,11 +140,9 @@ async def get_dishes_by_category(
              dependencies=[Depends(RateLimiter(times=10, seconds=60)), Depends(get_current_admin_user)])
 async def create_dish(
     dish: DishCreate,
-    db: AsyncSession = Depends(get_db),
-    event_service: MenuEventService = Depends(get_menu_event_service)
+    db: AsyncSession = Depends(get_db)
 ):
     new_dish = await MenuRepository(db).create_dish(dish)
-    await event_service.publish_dish_created(new_dish)
     return DishResponse.model_validate(new_dish)
 
 @router.put("/dishes/{dish_id}", response_model=DishResponse,
@@ -152,20 +150,14 @@ async def create_dish(
 async def update_dish(
     dish_id: int,
     dish: DishUpdate,
-    db: AsyncSession = Depends(get_db),
-    event_service: MenuEventService = Depends(get_menu_event_service)
+    db: AsyncSession = Depends(get_db)
 ):
-    old_dish = await MenuRepository(db).get_dish_id(dish_id)
-    if not old_dish:
+    updated_dish = await MenuRepository(db).update_dish(dish_id, dish)
+    if not updated_dish:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Dish not found"
         )
-    updated_dish = await MenuRepository(db).update_dish(dish_id, dish)
-    if old_dish.price != updated_dish.price:
-        await event_service.publish_price_changed(updated_dish, old_dish.price)
-    if old_dish.is_available != updated_dish.is_available:
-        await event_service.publish_availability_changed(updated_dish, old_dish.is_available)
     return DishResponse.model_validate(updated_dish)
 
 @router.delete("/dishes/{dish_id}", status_code=status.HTTP_204_NO_CONTENT,
@@ -338,6 +330,21 @@ async def delete_combo(
 # Алиас-роутер для поддержки /dishes/{dish_id} без префикса (для order-service)
 alias_router = APIRouter()
 
+@alias_router.get("/dishes", response_model=list[DishResponse])
+async def get_dishes_by_ids(
+    ids: str = Query(..., description="ID блюд через запятую"),
+    db: AsyncSession = Depends(get_db)
+):
+    # Пакетный запрос для кэша цен order-service: одна выборка вместо запроса на каждое блюдо
+    try:
+        dish_ids = sorted({int(dish_id) for dish_id in ids.split(",") if dish_id.strip()})
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids must be integers")
+    if not dish_ids or len(dish_ids) > 500:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Pass from 1 to 500 ids")
+    dishes = await MenuRepository(db).get_dishes_by_ids(dish_ids)
+    return [DishResponse.model_validate(dish) for dish in dishes]
+
 @alias_router.get("/dishes/{dish_id}", response_model=DishResponse,
                   dependencies=[Depends(RateLimiter(times=10, seconds=60))])
 async def get_dish_by_id_alias(
@@ -9,17 +9,38 @@ from contextlib import asynccontextmanager
 from debug_toolbar.middleware import DebugToolbarMiddleware
 from src.redis import close_redis
 from src.rabbitmq import RabbitMQClient
+from src.infrastructure.services.outbox_relay import OutboxRelay
+from src.core.config import settings
+import asyncio
 from src.interfaces.routers.v1 import menu as menu_v1
 from src.interfaces.routers.v2 import menu as menu_v2
+from src.interfaces.routers.stock import router as stock_router, stock_store
+from src.infrastructure.services.stock import StockEventHandler, StockReconciler
+from src.rabbitmq import EventType
 from src.infrastructure.services.menu_events import MenuEventService
 from src.infrastructure.repositories.order import OrderRepository
 from src.database import get_db
 from src.infrastructure.services.menu_events_service import menu_event_service
+from src.infrastructure.services.token_revocation import token_revocations
+from src.core.dependencies import get_current_principal
+from src.core.jwks import jwks_fetcher
 
 logger = logging.getLogger(__name__)
 
 rabbitmq_client = RabbitMQClient()
 menu_event_service = None
+outbox_relay = OutboxRelay(
+    rabbitmq_client,
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL
+)
+stock_handler = StockEventHandler(stock_store, rabbitmq_client)
+stock_reconciler = StockReconciler(
+    stock_store,
+    reap_interval=settings.STOCK_REAP_INTERVAL,
+    reap_batch_size=settings.STOCK_REAP_BATCH_SIZE,
+    reconcile_interval=settings.STOCK_RECONCILE_INTERVAL
+)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -39,6 +60,17 @@ async def lifespan(app: FastAPI):
         menu_event_service = MenuEventService(rabbitmq_client, order_repository)
         app.state.menu_event_service = menu_event_service
         logger.info("Successfully initialized menu event service")
+
+        loaded = await stock_reconciler.warm_up()
+        logger.info(f"Loaded {loaded} stock levels into Redis")
+        for event_type in (EventType.ORDER_CREATED, EventType.MENU_RELEASE, EventType.PAYMENT_COMPLETED):
+            await rabbitmq_client.bind_queue_to_exchange("menu_stock", "amq.topic", event_type.value)
+        await rabbitmq_client.consume_events(
+            "menu_stock",
+            stock_handler.handle_event,
+            prefetch_count=settings.STOCK_PREFETCH
+        )
+        logger.info("Stock reservation consumer started")
         
         redis_connection = redis.from_url("redis://redis:6379")
         await FastAPILimiter.init(redis_connection)
@@ -47,7 +79,31 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Failed to connect to RabbitMQ: {e}")
         raise
+    outbox_task = asyncio.create_task(outbox_relay.run())
+    logger.info("Outbox relay started")
+    stock_task = asyncio.create_task(stock_reconciler.run())
+    logger.info("Stock reconciler started")
+    revocation_task = asyncio.create_task(token_revocations.run())
+    jwks_task = None
+    if jwks_fetcher is not None:
+        await jwks_fetcher.refresh()
+        jwks_task = asyncio.create_task(jwks_fetcher.run())
+        logger.info("JWKS refresher started")
     yield
+    tasks = [outbox_task, stock_task, revocation_task]
+    if jwks_task is not None:
+        tasks.append(jwks_task)
+    for task in tasks:
+        task.cancel()
+    # Задачи должны завершиться до закрытия соединений, которыми пользуются
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if jwks_task is not None:
+        await jwks_fetcher.close()
+    try:
+        # Последняя сверка, чтобы Postgres не отставал от Redis после остановки
+        await stock_reconciler.reconcile_once()
+    except Exception as e:
+        logger.error(f"Final stock reconciliation failed: {e}")
     await close_redis()
     await rabbitmq_client.close()
     logger.info("Application shutdown complete")
@@ -86,8 +142,11 @@ async def root(request: Request):
 async def health_check():
     return {"status": "healthy"}
 
-app.include_router(menu_v1.router, prefix="/menu1", tags=["menu v1"])
-app.include_router(menu_v2.router, prefix="/menu2", tags=["menu v2"])
+# Токен проверяется здесь по JWKS вместо forward-auth в Traefik; alias_router — внутренний, для order-service
+app.include_router(menu_v1.router, prefix="/menu1", tags=["menu v1"], dependencies=[Depends(get_current_principal)])
+app.include_router(menu_v2.router, prefix="/menu2", tags=["menu v2"], dependencies=[Depends(get_current_principal)])
+app.include_router(stock_router, dependencies=[Depends(get_current_principal)])
+app.include_router(menu_v2.alias_router, tags=["order-service"])
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -13,6 +13,9 @@ from src.infrastructure.models.user import User
 from src.infrastructure.models.menu import *
 from src.infrastructure.models.order import *
 from src.infrastructure.models.payment import *
+from src.infrastructure.models.outbox import *
+from src.infrastructure.models.analytics import *
+from src.infrastructure.models.saga import *
 
 config = context.config
 
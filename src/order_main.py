@@ -1,15 +1,31 @@
 import logging
 logging.basicConfig(level=logging.INFO)
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 from debug_toolbar.middleware import DebugToolbarMiddleware
-from src.redis import close_redis
+from src.redis import close_redis, redis_client
 from src.rabbitmq import RabbitMQClient
-from src.interfaces.routers.order import router as order_router
+from src.infrastructure.services.outbox_relay import OutboxRelay
+from src.core.config import settings
+import asyncio
+import uuid
+from src.interfaces.routers.order import router as order_router, retry_service, basket_store, menu_prices, menu_fetcher
+from src.infrastructure.services.basket_store import BasketWriteBehind
+from src.infrastructure.services.sales_rollup import SalesRollupRefresher
+from src.infrastructure.services.delayed_scheduler import DelayedDispatcher, RedisTimerWheel
+from src.interfaces.routers.analytics import router as analytics_router
+from src.interfaces.routers.kitchen import router as kitchen_router, kitchen, restore_kitchen
+from src.infrastructure.services.order_saga import OrderSagaOrchestrator, PAYMENT_RESULT_EVENTS, SAGA_EVENTS
+from src.infrastructure.services.menu_prices import MENU_PRICE_EVENTS
+from src.infrastructure.services.partitions import ORDER_TABLES, PartitionManager
+from src.infrastructure.services.archiver import ColdDataArchiver, ORDER_ARCHIVE
 from src.infrastructure.services.menu_events import MenuEventService
 from src.infrastructure.repositories.order import OrderRepository
 from src.database import get_db
+from src.infrastructure.services.token_revocation import token_revocations
+from src.core.dependencies import get_current_principal
+from src.core.jwks import jwks_fetcher
 from fastapi_limiter import FastAPILimiter
 from redis.asyncio import Redis
 
@@ -17,6 +33,47 @@ logger = logging.getLogger(__name__)
 
 rabbitmq_client = RabbitMQClient()
 menu_event_service = None
+outbox_relay = OutboxRelay(
+    rabbitmq_client,
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL
+)
+basket_flusher = BasketWriteBehind(
+    basket_store,
+    interval=settings.BASKET_FLUSH_INTERVAL,
+    batch_size=settings.BASKET_FLUSH_BATCH_SIZE
+)
+sales_refresher = SalesRollupRefresher(
+    batch_size=settings.ANALYTICS_BATCH_SIZE,
+    interval=settings.ANALYTICS_REFRESH_INTERVAL
+)
+timer_wheel = RedisTimerWheel(redis_client, lease_seconds=settings.DELAYED_LEASE_SECONDS)
+rabbitmq_client.attach_scheduler(timer_wheel)
+delayed_dispatcher = DelayedDispatcher(
+    timer_wheel,
+    rabbitmq_client,
+    batch_size=settings.DELAYED_BATCH_SIZE,
+    poll_interval=settings.DELAYED_POLL_INTERVAL
+)
+partition_manager = PartitionManager(
+    ORDER_TABLES,
+    months_ahead=settings.PARTITION_MONTHS_AHEAD,
+    interval=settings.PARTITION_CHECK_INTERVAL
+)
+order_archiver = ColdDataArchiver(
+    ORDER_ARCHIVE,
+    archive_after_days=settings.ARCHIVE_AFTER_DAYS,
+    batch_size=settings.ARCHIVE_BATCH_SIZE,
+    batch_pause=settings.ARCHIVE_BATCH_PAUSE,
+    max_replication_lag=settings.ARCHIVE_MAX_REPLICATION_LAG_SECONDS,
+    interval=settings.ARCHIVE_INTERVAL
+)
+saga_orchestrator = OrderSagaOrchestrator(
+    payment_timeout=settings.SAGA_PAYMENT_TIMEOUT_SECONDS,
+    sweep_batch_size=settings.SAGA_SWEEP_BATCH_SIZE,
+    sweep_interval=settings.SAGA_SWEEP_INTERVAL,
+    on_cancelled=kitchen.cancel_order
+)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -31,6 +88,36 @@ async def lifespan(app: FastAPI):
             durable=True
         )
         logger.info("Successfully declared menu_events exchange")
+
+        for event_type in SAGA_EVENTS:
+            await rabbitmq_client.bind_queue_to_exchange("order_saga", "amq.topic", event_type.value)
+        await rabbitmq_client.consume_events(
+            "order_saga",
+            saga_orchestrator.handle_event,
+            prefetch_count=settings.SAGA_PREFETCH
+        )
+        logger.info("Order saga consumer started")
+
+        await rabbitmq_client.declare_queue("order_payments", dead_letter=True)
+        for event_type in PAYMENT_RESULT_EVENTS:
+            # Раньше результаты оплаты шли в order_saga по одному; старый биндинг снимается
+            await rabbitmq_client.unbind_queue_from_exchange("order_saga", "amq.topic", event_type.value)
+            await rabbitmq_client.bind_queue_to_exchange("order_payments", "amq.topic", event_type.value)
+        await rabbitmq_client.consume_batch(
+            "order_payments",
+            saga_orchestrator.handle_payment_batch,
+            batch_size=settings.ORDER_PAYMENT_BATCH_SIZE,
+            max_wait=settings.ORDER_PAYMENT_BATCH_WAIT,
+            max_attempts=settings.ORDER_PAYMENT_MAX_ATTEMPTS
+        )
+        logger.info("Order payment results consumer started")
+
+        prices_queue = f"order_menu_prices.{uuid.uuid4().hex[:8]}"
+        await rabbitmq_client.declare_queue(prices_queue, exclusive=True)
+        for event_type in MENU_PRICE_EVENTS:
+            await rabbitmq_client.bind_queue_to_exchange(prices_queue, "menu_events", event_type.value)
+        await rabbitmq_client.consume_events(prices_queue, menu_prices.handle_event)
+        logger.info("Menu price cache subscribed to menu events")
         
         order_repository = OrderRepository(get_db())
         menu_event_service = MenuEventService(rabbitmq_client, order_repository)
@@ -44,8 +131,46 @@ async def lifespan(app: FastAPI):
         logger.error(f"Failed to connect to RabbitMQ or Redis: {e}")
         raise
         
+    restored = await restore_kitchen()
+    logger.info(f"Kitchen queues restored: {restored} orders")
+    outbox_task = asyncio.create_task(outbox_relay.run())
+    logger.info("Outbox relay started")
+    analytics_task = asyncio.create_task(sales_refresher.run())
+    delayed_task = asyncio.create_task(delayed_dispatcher.run())
+    saga_task = asyncio.create_task(saga_orchestrator.run_sweeper())
+    partition_task = asyncio.create_task(partition_manager.run())
+    archive_task = asyncio.create_task(order_archiver.run())
+    revocation_task = asyncio.create_task(token_revocations.run())
+    jwks_task = None
+    if jwks_fetcher is not None:
+        await jwks_fetcher.refresh()
+        jwks_task = asyncio.create_task(jwks_fetcher.run())
+        logger.info("JWKS refresher started")
+    logger.info("Delayed event dispatcher started")
+    logger.info("Sales rollup refresher started")
+    basket_task = None
+    if settings.BASKET_ENGINE == "redis":
+        basket_task = asyncio.create_task(basket_flusher.run())
+        logger.info("Basket write-behind started")
+
     yield
     
+    tasks = [outbox_task, analytics_task, delayed_task, saga_task, partition_task, archive_task, revocation_task]
+    tasks += [task for task in (jwks_task, basket_task) if task is not None]
+    for task in tasks:
+        task.cancel()
+    # Задачи должны завершиться до закрытия соединений, которыми пользуются
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if jwks_task is not None:
+        await jwks_fetcher.close()
+    if basket_task is not None:
+        try:
+            while await basket_flusher.flush_once():
+                pass
+        except Exception as e:
+            logger.error(f"Failed to flush baskets on shutdown: {e}")
+    await retry_service.close()
+    await menu_fetcher.close()
     await close_redis()
     await rabbitmq_client.close()
     
@@ -53,7 +178,10 @@ app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(DebugToolbarMiddleware)
 
-app.include_router(order_router)
+# Токен проверяется здесь по JWKS вместо forward-auth в Traefik
+app.include_router(order_router, dependencies=[Depends(get_current_principal)])
+app.include_router(analytics_router)
+app.include_router(kitchen_router)
 
 @app.get("/")
 async def root():
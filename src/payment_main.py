@@ -1,17 +1,85 @@
 import logging
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
-from src.interfaces.routers.payment import router as payment_router
+from src.interfaces.routers.payment import router as payment_router, webhook_worker
+from src.rabbitmq import RabbitMQClient
+from src.redis import close_redis
+from src.infrastructure.services.outbox_relay import OutboxRelay
+from src.infrastructure.services.partitions import PAYMENT_TABLES, PartitionManager
+from src.infrastructure.services.archiver import ColdDataArchiver, PAYMENT_ARCHIVE
+from src.infrastructure.services.gateway_payment import gateway_client
+from src.infrastructure.services.payment_reconciler import PaymentReconciler
+from src.infrastructure.services.payment_status import payment_status_waiters
+from src.core.config import settings
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+rabbitmq_client = RabbitMQClient()
+outbox_relay = OutboxRelay(
+    rabbitmq_client,
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL
+)
+partition_manager = PartitionManager(
+    PAYMENT_TABLES,
+    months_ahead=settings.PARTITION_MONTHS_AHEAD,
+    interval=settings.PARTITION_CHECK_INTERVAL
+)
+payment_archiver = ColdDataArchiver(
+    PAYMENT_ARCHIVE,
+    archive_after_days=settings.ARCHIVE_AFTER_DAYS,
+    batch_size=settings.ARCHIVE_BATCH_SIZE,
+    batch_pause=settings.ARCHIVE_BATCH_PAUSE,
+    max_replication_lag=settings.ARCHIVE_MAX_REPLICATION_LAG_SECONDS,
+    interval=settings.ARCHIVE_INTERVAL
+)
+payment_reconciler = PaymentReconciler(
+    gateway_client.fetch,
+    page_size=settings.RECONCILE_PAGE_SIZE,
+    concurrency=settings.RECONCILE_CONCURRENCY,
+    stale_after=settings.RECONCILE_STALE_AFTER_SECONDS,
+    interval=settings.RECONCILE_INTERVAL
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await rabbitmq_client.connect()
+        logger.info("Successfully connected to RabbitMQ")
+    except Exception as e:
+        logger.error(f"Failed to connect to RabbitMQ: {e}")
+        raise
+
+    outbox_task = asyncio.create_task(outbox_relay.run())
+    logger.info("Outbox relay started")
+    partition_task = asyncio.create_task(partition_manager.run())
+    archive_task = asyncio.create_task(payment_archiver.run())
+    webhook_task = asyncio.create_task(webhook_worker.run())
+    reconcile_task = asyncio.create_task(payment_reconciler.run())
+    status_task = asyncio.create_task(payment_status_waiters.run())
+    logger.info("Webhook inbox worker started")
+
+    yield
+
+    tasks = [outbox_task, partition_task, archive_task, webhook_task, reconcile_task, status_task]
+    for task in tasks:
+        task.cancel()
+    # Задачи должны завершиться до закрытия соединений, которыми пользуются
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await gateway_client.close()
+    await close_redis()
+    await rabbitmq_client.close()
+
 
 app = FastAPI(
     title="Payment Service API",
     description="Микросервис для обработки платежей",
-    version="1.0.0")
+    version="1.0.0",
+    lifespan=lifespan)
 
 app.include_router(payment_router)
 
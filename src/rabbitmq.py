@@ -1,4 +1,5 @@
-from typing import Any, Callable, Dict, Optional
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
 import json
 import aio_pika
 from aio_pika.abc import AbstractConnection, AbstractChannel, AbstractQueue, AbstractExchange
@@ -18,8 +19,14 @@ class EventType(str, Enum):
     ORDER_DELAYED = "order.delayed"
     ORDER_CREATED = "order.created"
     ORDER_FAILED = "order.failed"
+    ORDER_CANCELLED = "order.cancelled"
+    ORDER_PAID = "order.paid"
     MENU_RESERVED = "menu.reserved"
     MENU_FAILED = "menu.failed"
+    PAYMENT_CREATED = "payment.created"
+    PAYMENT_COMPLETED = "payment.completed"
+    PAYMENT_FAILED = "payment.failed"
+    MENU_RELEASE = "menu.release"
 
 class RabbitMQClient:
     def __init__(
@@ -40,6 +47,8 @@ class RabbitMQClient:
         self._queues: Dict[str, AbstractQueue] = {}
         self._exchanges: Dict[str, AbstractExchange] = {}
         self._consumers: Dict[str, Callable] = {}
+        self._scheduler = None
+        self._batch_tasks: list[asyncio.Task] = []
         logger.info(f"RabbitMQClient инициализирован: host={host}, port={port}, vhost={virtualhost}")
 
     async def connect(self) -> None:
@@ -69,18 +78,39 @@ class RabbitMQClient:
 
     async def close(self) -> None:
         logger.info("[RabbitMQ] Закрытие соединения...")
+        for task in self._batch_tasks:
+            task.cancel()
+        await asyncio.gather(*self._batch_tasks, return_exceptions=True)
         if self._connection:
             await self._connection.close()
             logger.info("RabbitMQ connection closed")
             logger.info("[RabbitMQ] Соединение закрыто")
 
-    async def declare_queue(self, queue_name: str) -> AbstractQueue:
+    async def declare_queue(
+        self,
+        queue_name: str,
+        exclusive: bool = False,
+        dead_letter: bool = False
+    ) -> AbstractQueue:
         logger.info(f"[RabbitMQ] Объявление очереди: {queue_name}")
         if queue_name not in self._queues:
+            arguments = None
+            if dead_letter:
+                # Отклонённые без возврата сообщения уходят в {queue_name}.dead и лежат там до разбора
+                dead_letter_name = f"{queue_name}.dead"
+                exchange = await self._channel.declare_exchange(
+                    dead_letter_name, aio_pika.ExchangeType.FANOUT, durable=True
+                )
+                dead_queue = await self._channel.declare_queue(dead_letter_name, durable=True)
+                await dead_queue.bind(exchange)
+                arguments = {"x-dead-letter-exchange": dead_letter_name}
+            # Эксклюзивная очередь живёт, пока жив процесс: так каждая реплика получает все события
             queue = await self._channel.declare_queue(
                 queue_name,
-                durable=True,
-                auto_delete=False
+                durable=not exclusive,
+                exclusive=exclusive,
+                auto_delete=exclusive,
+                arguments=arguments
             )
             self._queues[queue_name] = queue
         logger.info(f"[RabbitMQ] Очередь объявлена: {queue_name}")
@@ -114,7 +144,8 @@ class RabbitMQClient:
         event_type: EventType,
         data: Dict[str, Any],
         exchange_name: str = "amq.topic",
-        routing_key: Optional[str] = None
+        routing_key: Optional[str] = None,
+        message_id: Optional[str] = None
     ) -> None:
         logger.info(f"[RabbitMQ] Публикация события {event_type} в exchange {exchange_name} с routing_key {routing_key or event_type} и данными: {data}")
         if not self._channel:
@@ -124,7 +155,8 @@ class RabbitMQClient:
             body=json.dumps(data).encode(),
             delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
             content_type="application/json",
-            headers={"event_type": event_type}
+            headers={"event_type": event_type},
+            message_id=message_id
         )
 
         exchange = await self.get_exchange(exchange_name)
@@ -135,38 +167,47 @@ class RabbitMQClient:
         )
         logger.info(f"[RabbitMQ] Событие опубликовано: {event_type}")
 
+    def attach_scheduler(self, scheduler) -> None:
+        # Планировщик хранит таймеры (RedisTimerWheel) и публикует их через этот клиент
+        self._scheduler = scheduler
+
     async def publish_delayed(
         self,
         data: Dict[str, Any],
         exchange_name: str = "amq.topic",
-        routing_key: str = EventType.ORDER_DELAYED
-    ) -> None:
-        logger.info(f"[RabbitMQ] Публикация отложенного события в exchange {exchange_name} с routing_key {routing_key} и данными: {data}")
-        if not self._channel:
-            raise RuntimeError("RabbitMQ channel is not initialized")
-
-        message = aio_pika.Message(
-            body=json.dumps(data).encode(),
-            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
-            content_type="application/json",
-            headers={"event_type": EventType.ORDER_DELAYED},
-            expiration=3600000 
-        )
+        routing_key: str = EventType.ORDER_DELAYED,
+        delay: Optional[float | timedelta] = None,
+        run_at: Optional[datetime] = None,
+        event_type: EventType = EventType.ORDER_DELAYED
+    ) -> str:
+        logger.info(f"[RabbitMQ] Планирование отложенного события {event_type} с routing_key {routing_key} и данными: {data}")
+        if self._scheduler is None:
+            raise RuntimeError("Delayed message scheduler is not attached")
+        if delay is None and run_at is None:
+            raise ValueError("Either delay or run_at is required")
 
-        exchange = await self.get_exchange(exchange_name)
-        await exchange.publish(
-            message,
-            routing_key=routing_key,
-            mandatory=True
+        timer_id = await self._scheduler.schedule(
+            event_type,
+            data,
+            delay=delay,
+            run_at=run_at,
+            exchange_name=exchange_name,
+            routing_key=routing_key
         )
-        logger.info(f"[RabbitMQ] Отложенное событие опубликовано: {routing_key}")
+        logger.info(f"[RabbitMQ] Отложенное событие запланировано: {routing_key} ({timer_id})")
+        return timer_id
 
     async def consume_events(
         self,
         queue_name: str,
-        callback: Callable[[Dict[str, Any], EventType], None]
+        callback: Callable[[Dict[str, Any], EventType], None],
+        prefetch_count: Optional[int] = None
     ) -> None:
         logger.info(f"[RabbitMQ] Запуск consume для очереди: {queue_name}")
+        if prefetch_count:
+            # Брокер не отдаёт больше prefetch_count неподтверждённых сообщений —
+            # это и есть предел одновременно обрабатываемых событий
+            await self._channel.set_qos(prefetch_count=prefetch_count)
         queue = await self.declare_queue(queue_name)
         
         async def process_message(message: aio_pika.IncomingMessage):
@@ -182,6 +223,130 @@ class RabbitMQClient:
         self._consumers[queue_name] = callback
         logger.info(f"[RabbitMQ] Consume запущен для очереди: {queue_name}")
 
+    async def consume_batch(
+        self,
+        queue_name: str,
+        callback: Callable[[list[tuple[Dict[str, Any], EventType]]], Awaitable[None]],
+        batch_size: int = 100,
+        max_wait: float = 0.05,
+        max_attempts: int = 5
+    ) -> None:
+        # Сообщения копятся до batch_size или max_wait и отдаются callback пачкой.
+        # Отдельный канал: успешная часть пачки подтверждается одним ack(multiple=True), не задевая чужие сообщения
+        logger.info(f"[RabbitMQ] Запуск пакетного consume для очереди: {queue_name} (пачка {batch_size})")
+        await self.declare_queue(queue_name, dead_letter=True)
+        channel = await self._connection.channel()
+        await channel.set_qos(prefetch_count=batch_size * 2)
+        queue = await channel.declare_queue(queue_name, passive=True)
+        buffer: asyncio.Queue[aio_pika.IncomingMessage] = asyncio.Queue()
+
+        async def collect() -> None:
+            loop = asyncio.get_running_loop()
+            while True:
+                messages = [await buffer.get()]
+                deadline = loop.time() + max_wait
+                while len(messages) < batch_size:
+                    try:
+                        messages.append(await asyncio.wait_for(buffer.get(), deadline - loop.time()))
+                    except asyncio.TimeoutError:
+                        break
+                try:
+                    await self._process_batch(queue_name, callback, messages, max_attempts)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"[RabbitMQ] Пачка из {queue_name} не подтверждена: {e}")
+
+        await queue.consume(buffer.put)
+        self._batch_tasks.append(asyncio.create_task(collect()))
+        self._consumers[queue_name] = callback
+        logger.info(f"[RabbitMQ] Пакетный consume запущен для очереди: {queue_name}")
+
+    async def _process_batch(
+        self,
+        queue_name: str,
+        callback: Callable[[list[tuple[Dict[str, Any], EventType]]], Awaitable[None]],
+        messages: list[aio_pika.IncomingMessage],
+        max_attempts: int = 5
+    ) -> None:
+        decoded = []
+        for message in messages:
+            try:
+                decoded.append((message, (json.loads(message.body.decode()), EventType(message.headers.get("event_type")))))
+            except Exception as e:
+                # Повтор не поможет: сообщение отклоняется без возврата (уйдёт в DLX, если он настроен у очереди)
+                logger.error(f"Error decoding message: {e}")
+                await message.reject(requeue=False)
+        if not decoded:
+            return
+
+        failed = set()
+        try:
+            await callback([event for _, event in decoded])
+        except Exception as e:
+            # Одно битое событие не должно ронять всю пачку: повторяем по одному
+            logger.error(f"[RabbitMQ] Ошибка обработки пачки из {len(decoded)} в {queue_name}: {e}")
+            for message, event in decoded:
+                try:
+                    await callback([event])
+                except Exception as e:
+                    logger.error(f"Error processing message: {e}")
+                    failed.add(id(message))
+
+        # Необработанные события разбираются до подтверждения остальных,
+        # иначе ack(multiple=True) подтвердил бы и их
+        dead = 0
+        for message, _ in decoded:
+            if id(message) in failed:
+                dead += await self._retry_or_dead_letter(queue_name, message, max_attempts)
+        processed = [message for message, _ in decoded if id(message) not in failed]
+        if processed:
+            await processed[-1].ack(multiple=True)
+        if failed:
+            logger.warning(
+                f"[RabbitMQ] {len(failed) - dead} из {len(decoded)} событий {queue_name} возвращены в очередь, "
+                f"{dead} отправлены в {queue_name}.dead"
+            )
+
+    async def _retry_or_dead_letter(
+        self,
+        queue_name: str,
+        message: aio_pika.IncomingMessage,
+        max_attempts: int
+    ) -> bool:
+        headers = message.headers or {}
+        # Кворумная очередь сама считает возвраты в x-delivery-count; для классической
+        # счётчик x-attempts едет в заголовке копии, опубликованной в хвост очереди
+        attempt = int(headers.get("x-delivery-count", headers.get("x-attempts", 0))) + 1
+        if attempt >= max_attempts:
+            logger.error(f"[RabbitMQ] Событие из {queue_name} не обработано за {attempt} попыток, отправлено в {queue_name}.dead")
+            await message.reject(requeue=False)
+            return True
+        if "x-delivery-count" in headers:
+            await message.nack(requeue=True)
+            return False
+        retry = aio_pika.Message(
+            body=message.body,
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            content_type=message.content_type,
+            headers={**headers, "x-attempts": attempt},
+            message_id=message.message_id
+        )
+        await self._channel.default_exchange.publish(retry, routing_key=queue_name)
+        await message.ack()
+        return False
+
+    async def unbind_queue_from_exchange(
+        self,
+        queue_name: str,
+        exchange_name: str,
+        routing_key: str
+    ) -> None:
+        queue = await self.declare_queue(queue_name)
+        exchange = await self.get_exchange(exchange_name)
+        await queue.unbind(exchange, routing_key)
+        logger.info(f"[RabbitMQ] Биндинг снят: {queue_name} <-> {exchange_name} [{routing_key}]")
+
     @classmethod
     def event_handler(cls, event_type: EventType):
         def decorator(func: Callable):
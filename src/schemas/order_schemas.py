@@ -49,6 +49,7 @@ class BasketCreate(BaseModel):
     user_id: int
     dish_id: int
     quantity: int
+    price: int = 0
     
 class OrderItem(BaseModel):
     model_config = ConfigDict(from_attributes=True)
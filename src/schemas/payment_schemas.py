@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Optional
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field
 
 from src.infrastructure.models.payment import PaymentStatus
 
@@ -35,7 +35,7 @@ class WebhookPayload(BaseModel):
     transaction_id: str
     amount: int
     status: str
-    invoice_id: Optional[int] = None
+    invoice_id: Optional[int] = Field(None, validation_alias=AliasChoices("invoice_id", "order_id"))
 
 
 class PaymentCreateRequest(BaseModel):
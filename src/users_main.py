@@ -1,11 +1,33 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse
+from src.application.auth.auth import AuthService
+from src.core.config import settings
+from src.core.jwks import get_signing_key
+from src.core.security import password_executor
+from src.infrastructure.services.token_revocation import token_revocations
 from src.interfaces.routers import auth, users
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Хэш пароля администратора считается один раз, а не на каждый запрос
+    await AuthService.init_admin_password()
+    if not settings.JWT_ALGORITHM.startswith("HS"):
+        # Ключ подписи должен быть в JWKS до первого запроса от других сервисов
+        get_signing_key()
+    revocation_task = asyncio.create_task(token_revocations.run())
+    yield
+    revocation_task.cancel()
+    password_executor.shutdown(wait=False, cancel_futures=True)
+
+
 app = FastAPI(
     title="Users Service API",
     description="API для управления пользователями и аутентификацией",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 @app.get("/health")
@@ -0,0 +1,58 @@
+import datetime
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.infrastructure.services.archiver import ArchiveJob, ColdDataArchiver
+
+
+def session_factory(session):
+    factory = MagicMock()
+    factory.return_value.__aenter__ = AsyncMock(return_value=session)
+    factory.return_value.__aexit__ = AsyncMock(return_value=False)
+    return factory
+
+
+@pytest.mark.asyncio
+async def test_archive_once_moves_batches_until_short_one():
+    archive = AsyncMock(side_effect=[100, 100, 37])
+    partitions = AsyncMock()
+    partitions.drop_empty_before.return_value = 1
+    archive_repository = AsyncMock()
+    archive_repository.replication_lag.return_value = 0.0
+    now = datetime.datetime(2026, 10, 19, tzinfo=datetime.timezone.utc)
+
+    with patch("src.infrastructure.services.archiver.ArchiveRepository", return_value=archive_repository), \
+            patch("src.infrastructure.services.archiver.PartitionRepository", return_value=partitions):
+        archiver = ColdDataArchiver(
+            ArchiveJob("orders", archive, ("orders.orders",)),
+            session_factory(AsyncMock()),
+            archive_after_days=180,
+            batch_size=100,
+            batch_pause=0
+        )
+        archived = await archiver.archive_once(now)
+
+    cutoff = now - datetime.timedelta(days=180)
+    assert archived == 237
+    assert archive.await_count == 3
+    assert archive.await_args.args[1:] == (cutoff, 100)
+    partitions.drop_empty_before.assert_awaited_once_with("orders.orders", cutoff)
+
+
+@pytest.mark.asyncio
+async def test_archive_waits_while_replicas_lag():
+    archive = AsyncMock(return_value=0)
+    archive_repository = AsyncMock()
+    archive_repository.replication_lag.side_effect = [12.0, 3.0]
+
+    with patch("src.infrastructure.services.archiver.ArchiveRepository", return_value=archive_repository), \
+            patch("src.infrastructure.services.archiver.PartitionRepository", return_value=AsyncMock()), \
+            patch("src.infrastructure.services.archiver.asyncio.sleep", new=AsyncMock()) as sleep:
+        archiver = ColdDataArchiver(
+            ArchiveJob("payments", archive, ("payments.payments",)),
+            session_factory(AsyncMock()),
+            max_replication_lag=5.0
+        )
+        await archiver.archive_once()
+
+    sleep.assert_awaited_once_with(12.0)
+    archive.assert_awaited_once()
@@ -0,0 +1,100 @@
+import fakeredis
+import pytest
+from unittest.mock import AsyncMock, Mock
+from src.infrastructure.repositories.order import OrderRepository
+from src.infrastructure.services.basket_store import BasketWriteBehind, RedisBasketStore
+
+
+@pytest.fixture
+def store():
+    return RedisBasketStore(fakeredis.FakeAsyncRedis(decode_responses=True), ttl=60)
+
+
+@pytest.fixture
+def written(monkeypatch):
+    batches = []
+
+    async def replace_baskets(self, baskets):
+        batches.append({user_id: [(item.dish_id, item.quantity) for item in items] for user_id, items in baskets.items()})
+
+    monkeypatch.setattr(OrderRepository, "replace_baskets", replace_baskets)
+    return batches
+
+
+def flusher(store) -> BasketWriteBehind:
+    factory = Mock(return_value=AsyncMock(__aenter__=AsyncMock(return_value=AsyncMock())))
+    return BasketWriteBehind(store, session_factory=factory)
+
+
+def quantities(items) -> dict[int, int]:
+    return {item.dish_id: item.quantity for item in items}
+
+
+@pytest.mark.asyncio
+async def test_items_added_during_checkout_stay_in_basket(store):
+    await store.add(5, dish_id=1, quantity=2, price=100)
+
+    taken = await store.take(5)
+    await store.add(5, dish_id=2, quantity=1, price=300)
+    await store.finish_checkout(5)
+
+    assert quantities(taken) == {1: 2}
+    assert quantities(await store.items(5)) == {2: 1}
+
+
+@pytest.mark.asyncio
+async def test_failed_checkout_restores_basket(store):
+    await store.add(5, dish_id=1, quantity=2, price=100)
+    await store.take(5)
+    await store.add(5, dish_id=1, quantity=1, price=100)
+
+    with pytest.raises(ValueError):
+        await store.take(5)
+    await store.restore(5)
+
+    assert quantities(await store.items(5)) == {1: 3}
+    assert await store.redis.exists(store.checkout_key(5)) == 0
+
+
+@pytest.mark.asyncio
+async def test_flusher_skips_basket_being_checked_out(store, written):
+    await store.add(5, dish_id=1, quantity=2, price=100)
+    await store.add(6, dish_id=3, quantity=1, price=50)
+    await store.take(5)
+    await store.mark_dirty([5])
+
+    await flusher(store).flush_once()
+
+    assert written == [{6: [(3, 1)]}]
+
+
+@pytest.mark.asyncio
+async def test_checkout_during_flush_triggers_rewrite(store, written, monkeypatch):
+    await store.add(5, dish_id=1, quantity=2, price=100)
+
+    async def replace_baskets(self, baskets):
+        written.append(list(baskets))
+        # Пользователь оформил заказ, пока write-behind писал старый снимок
+        if len(written) == 1:
+            await store.take(5)
+            await store.finish_checkout(5)
+
+    monkeypatch.setattr(OrderRepository, "replace_baskets", replace_baskets)
+
+    await flusher(store).flush_once()
+    assert await store.pop_dirty(10) == [5]
+
+
+@pytest.mark.asyncio
+async def test_expired_basket_is_deleted_from_postgres(store, written):
+    await store.add(5, dish_id=1, quantity=2, price=100)
+    await store.add(6, dish_id=3, quantity=1, price=50)
+    await flusher(store).flush_once()
+
+    # Корзина 5 истекла по TTL, корзина 6 ещё живёт
+    await store.redis.delete(store.key(5))
+    await store.redis.zadd(store.EXPIRY_KEY, {5: 0})
+    await flusher(store).flush_once()
+
+    assert written[-1] == {5: []}
+    assert await store.redis.zrange(store.EXPIRY_KEY, 0, -1) == ["6"]
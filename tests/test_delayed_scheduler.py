@@ -0,0 +1,77 @@
+import fakeredis
+import time
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, Mock
+from src.infrastructure.services.delayed_scheduler import DelayedDispatcher, RedisTimerWheel
+from src.rabbitmq import EventType
+
+NOW = 1_800_000_000.0
+
+
+@pytest.fixture
+def timers():
+    return RedisTimerWheel(fakeredis.FakeAsyncRedis(decode_responses=True), lease_seconds=30)
+
+
+@pytest.mark.asyncio
+async def test_timer_is_claimed_once_when_due(timers):
+    timer_id = await timers.schedule(
+        EventType.ORDER_DELAYED, {"order_id": 7}, run_at=datetime.fromtimestamp(NOW + 60, timezone.utc)
+    )
+
+    assert await timers.claim_due(now=NOW + 59) == []
+    [(claimed_id, payload)] = await timers.claim_due(now=NOW + 60)
+    assert claimed_id == timer_id
+    assert payload == {
+        "event_type": EventType.ORDER_DELAYED.value, "exchange": "amq.topic",
+        "routing_key": EventType.ORDER_DELAYED.value, "data": {"order_id": 7}
+    }
+    # Пока аренда не истекла, второй диспетчер таймер не получит
+    assert await timers.claim_due(now=NOW + 61) == []
+    assert await timers.pending() == 0
+
+
+@pytest.mark.asyncio
+async def test_claim_respects_limit_and_due_order(timers):
+    for delay in (30, 10, 20):
+        await timers.schedule(EventType.ORDER_DELAYED, {"delay": delay}, run_at=datetime.fromtimestamp(NOW + delay, timezone.utc))
+
+    claimed = await timers.claim_due(limit=2, now=NOW + 60)
+
+    assert [payload["data"]["delay"] for _, payload in claimed] == [10, 20]
+    assert await timers.pending() == 1
+
+
+@pytest.mark.asyncio
+async def test_published_timer_is_acked(timers):
+    await timers.schedule(EventType.ORDER_DELAYED, {"order_id": 7}, delay=0)
+    rabbitmq = Mock(publish_event=AsyncMock())
+
+    assert await DelayedDispatcher(timers, rabbitmq).dispatch_once() == 1
+
+    rabbitmq.publish_event.assert_awaited_once()
+    assert await timers.redis.zcard(timers.INFLIGHT_KEY) == 0
+    assert await timers.redis.hlen(timers.PAYLOAD_KEY) == 0
+
+
+@pytest.mark.asyncio
+async def test_timer_with_failed_publish_is_redelivered_after_lease(timers):
+    timer_id = await timers.schedule(EventType.ORDER_DELAYED, {"order_id": 7}, delay=0)
+    rabbitmq = Mock(publish_event=AsyncMock(side_effect=ConnectionError("nack")))
+
+    await DelayedDispatcher(timers, rabbitmq).dispatch_once()
+
+    # Таймер остался в аренде и до её истечения не выдаётся
+    assert await timers.claim_due(now=time.time() + 1) == []
+    redelivered = await timers.claim_due(now=time.time() + 31)
+    assert [claimed_id for claimed_id, _ in redelivered] == [timer_id]
+    assert rabbitmq.publish_event.await_args.kwargs["message_id"] == timer_id
+
+
+@pytest.mark.asyncio
+async def test_cancelled_timer_is_not_delivered(timers):
+    timer_id = await timers.schedule(EventType.ORDER_DELAYED, {"order_id": 7}, delay=0)
+
+    assert await timers.cancel(timer_id)
+    assert await timers.claim_due(now=time.time() + 1) == []
@@ -0,0 +1,54 @@
+import json
+import random
+import httpx
+import pytest
+from src.infrastructure.services.gateway_payment import GatewayClient, verify_webhook_signature
+from src.infrastructure.services.gateway_simulator import GatewaySimulator, Latency
+
+
+def test_latency_matches_median_and_p99():
+    rng = random.Random(1)
+    samples = sorted(Latency(80, 400).sample(rng) * 1000 for _ in range(20000))
+
+    assert 75 < samples[len(samples) // 2] < 85
+    assert 360 < samples[int(len(samples) * 0.99)] < 440
+    assert Latency(0, 100).sample(rng) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_completed_payment_is_delivered_as_signed_webhook_and_duplicated():
+    delivered = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert verify_webhook_signature(request.content, request.headers["Content-HMAC"])
+        delivered.append(json.loads(request.content))
+        return httpx.Response(200, json={"code": 0})
+
+    simulator = GatewaySimulator(
+        Latency(0, 0), Latency(0, 0), webhook_url="http://payment.local/webhook",
+        duplicate_webhook_rate=1.0, seed=1
+    )
+    simulator._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    created = await simulator.create_payment(1000, 42)
+    await next(iter(simulator._deliveries))
+
+    assert created["success"] and created["status"] == "pending"
+    assert delivered == [
+        {"transaction_id": created["transaction_id"], "order_id": 42, "amount": 1000, "status": "completed"}
+    ] * 2
+    assert (await simulator.get_status(created["transaction_id"]))["status"] == "completed"
+    await simulator.close()
+
+
+@pytest.mark.asyncio
+async def test_gateway_errors_become_unsuccessful_result():
+    simulator = GatewaySimulator(Latency(0, 0), Latency(0, 0), error_rate=1.0)
+    assert await simulator.create_payment(1000, 42) is None
+
+    client = GatewayClient("http://gateway.local")
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+    result = await client.create_payment(1000, 42)
+
+    assert result["success"] is False
+    await client.close()
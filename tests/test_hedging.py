@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+import httpx
+from src.infrastructure.services.hedging import HedgeBudget, HedgePolicy, LatencyTracker
+from src.infrastructure.services.retry import RetryService
+
+
+def make_client(latencies: dict[str, float]) -> httpx.AsyncClient:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latencies[request.url.host])
+        return httpx.Response(200, json={"host": request.url.host})
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_latency_tracker_uses_quantile():
+    tracker = LatencyTracker(quantile=0.95, min_samples=10, default_delay=1.0, min_delay=0.0)
+    assert tracker.threshold() == 1.0
+    for i in range(100):
+        tracker.record(i / 1000)
+    assert tracker.threshold() == pytest.approx(0.095)
+
+
+def test_budget_limits_hedges():
+    budget = HedgeBudget(ratio=0.1, max_tokens=1)
+    assert budget.try_acquire()
+    assert not budget.try_acquire()
+    for _ in range(11):
+        budget.on_request()
+    assert budget.try_acquire()
+
+
+@pytest.mark.asyncio
+async def test_hedge_wins_when_primary_is_slow():
+    client = make_client({"primary.local": 0.5, "replica.local": 0.01})
+    policy = HedgePolicy(
+        replicas={"http://primary.local": ["http://replica.local"]},
+        default_delay=0.02
+    )
+    service = RetryService(client=client, hedge_policy=policy)
+
+    result = await asyncio.wait_for(service.get("http://primary.local/dishes/1"), timeout=0.3)
+
+    assert result == {"host": "replica.local"}
+    assert policy.hedges_sent == 1
+    assert policy.hedges_won == 1
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_for_fast_primary_or_foreign_url():
+    client = make_client({"primary.local": 0.001, "other.local": 0.001})
+    policy = HedgePolicy(
+        replicas={"http://primary.local": ["http://replica.local"]},
+        default_delay=0.1
+    )
+    service = RetryService(client=client, hedge_policy=policy)
+
+    assert await service.get("http://primary.local/users/1") == {"host": "primary.local"}
+    assert await service.get("http://other.local/users/1") == {"host": "other.local"}
+    assert policy.hedges_sent == 0
+    await service.close()
+
+
+def test_threshold_is_refreshed_once_enough_samples_arrive():
+    tracker = LatencyTracker(quantile=0.5, min_samples=4, default_delay=0.05, min_delay=0.0, refresh_every=100)
+    for _ in range(4):
+        tracker.record(0.05)
+    # Квантиль совпал с default_delay — это не повод пересчитывать его на каждом запросе
+    assert tracker.threshold() == 0.05
+    for _ in range(5):
+        tracker.record(1.0)
+    assert tracker.threshold() == 0.05
+
+
+@pytest.mark.asyncio
+async def test_cancelled_attempt_is_recorded_as_lower_bound():
+    client = make_client({"primary.local": 0.5, "replica.local": 0.01})
+    policy = HedgePolicy(
+        replicas={"http://primary.local": ["http://replica.local"]},
+        default_delay=0.02
+    )
+    tracker = policy._trackers["http://primary.local"]
+
+    response = await policy.get(client, "http://primary.local/dishes/1")
+
+    assert response.json() == {"host": "replica.local"}
+    # Проигравший primary отменён, но учтён временем до отмены — оно не меньше задержки хеджа
+    replica, primary = tracker._samples
+    assert replica < 0.1
+    assert 0.02 <= primary < 0.5
+    await client.aclose()
@@ -0,0 +1,68 @@
+import asyncio
+import fakeredis
+import json
+import pytest
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from src.core.idempotency import REPLAY_HEADER, IdempotencyStore, fingerprint
+
+
+@pytest.fixture
+def store():
+    return IdempotencyStore(fakeredis.FakeAsyncRedis(decode_responses=True), lock_ttl=0.3, poll_interval=0.01)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicate_runs_handler_once(store):
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        # Дольше lock_ttl: без продления маркер истёк бы и дубль выполнился повторно
+        await asyncio.sleep(0.5)
+        return {"order_id": 1}
+
+    first, second = await asyncio.gather(
+        store.execute("checkout", "key-1", fingerprint({"user_id": 5}), handler),
+        store.execute("checkout", "key-1", fingerprint({"user_id": 5}), handler)
+    )
+
+    assert len(calls) == 1
+    assert first == {"order_id": 1}
+    assert isinstance(second, JSONResponse) and second.headers[REPLAY_HEADER] == "true"
+    assert json.loads(second.body) == {"order_id": 1}
+
+
+@pytest.mark.asyncio
+async def test_reused_key_with_other_request_is_rejected(store):
+    async def handler():
+        return {"order_id": 1}
+
+    await store.execute("checkout", "key-1", fingerprint({"user_id": 5}), handler)
+
+    with pytest.raises(HTTPException) as error:
+        await store.execute("checkout", "key-1", fingerprint({"user_id": 6}), handler)
+    assert error.value.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_result_does_not_overwrite_lock_taken_by_another_request(store):
+    key = store.key("checkout", "key-1")
+
+    async def handler():
+        # Маркер потерян и занят другим запросом
+        await store.redis.set(key, json.dumps({"state": "pending", "token": "other", "fingerprint": "x"}))
+        return {"order_id": 1}
+
+    assert await store.execute("checkout", "key-1", fingerprint({"user_id": 5}), handler) == {"order_id": 1}
+    assert json.loads(await store.redis.get(key))["token"] == "other"
+
+
+@pytest.mark.asyncio
+async def test_failed_request_releases_lock(store):
+    async def handler():
+        raise RuntimeError("db down")
+
+    with pytest.raises(RuntimeError):
+        await store.execute("checkout", "key-1", fingerprint({"user_id": 5}), handler)
+    assert await store.redis.get(store.key("checkout", "key-1")) is None
@@ -0,0 +1,121 @@
+import asyncio
+import time
+import httpx
+import pytest
+import rsa
+from jose import jwt
+from unittest.mock import AsyncMock, patch
+from src.core.config import settings
+from src.core.jwks import JWKSFetcher, KeySet, SigningKey, UnknownKeyError
+from src.core.security import decode_token
+
+JWKS_URL = "http://users-service/auth/jwks"
+
+
+def new_signing_key() -> SigningKey:
+    _, private_key = rsa.newkeys(1024)
+    return SigningKey(private_key.save_pkcs1().decode())
+
+
+def sign(signing_key: SigningKey, **claims) -> str:
+    claims.setdefault("sub", "5")
+    claims.setdefault("exp", time.time() + 300)
+    return jwt.encode(claims, signing_key.key, algorithm=settings.JWT_ALGORITHM, headers={"kid": signing_key.kid})
+
+
+def jwks_response(*signing_keys: SigningKey) -> httpx.Response:
+    return httpx.Response(
+        200, json={"keys": [key.public for key in signing_keys]}, request=httpx.Request("GET", JWKS_URL)
+    )
+
+
+def fetcher_with(key_set: KeySet, *responses) -> JWKSFetcher:
+    pending = list(responses)
+
+    async def get(url):
+        # Как настоящий запрос: отдаёт управление, пока ждёт ответа
+        await asyncio.sleep(0.01)
+        response = pending.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    fetcher = JWKSFetcher(key_set, JWKS_URL, min_refresh_interval=10)
+    fetcher._client.get = AsyncMock(side_effect=get)
+    return fetcher
+
+
+@pytest.fixture(scope="module")
+def old_key():
+    return new_signing_key()
+
+
+@pytest.fixture(scope="module")
+def new_key():
+    return new_signing_key()
+
+
+def test_token_verifies_with_published_public_key(old_key):
+    key_set = KeySet()
+    assert key_set.load({"keys": [old_key.public]}) == 1
+    assert "d" not in old_key.public
+
+    with patch("src.core.security.key_set", key_set):
+        assert decode_token(sign(old_key))["sub"] == "5"
+
+
+def test_token_signed_with_shared_secret_is_rejected(old_key):
+    key_set = KeySet()
+    key_set.load({"keys": [old_key.public]})
+    forged = jwt.encode({"sub": "1", "exp": time.time() + 300}, "secret", algorithm="HS256", headers={"kid": old_key.kid})
+
+    with patch("src.core.security.key_set", key_set), pytest.raises(ValueError):
+        decode_token(forged)
+
+
+@pytest.mark.asyncio
+async def test_rotation_picks_up_new_key_without_rejecting_old_tokens(old_key, new_key):
+    key_set = KeySet()
+    fetcher = fetcher_with(key_set, jwks_response(old_key), jwks_response(new_key, old_key))
+    await fetcher.refresh()
+    # Ротация происходит спустя время после последнего обновления
+    fetcher._last_refresh -= 60
+    new_token = sign(new_key)
+
+    with patch("src.core.security.key_set", key_set):
+        with pytest.raises(UnknownKeyError):
+            decode_token(new_token)
+        assert await fetcher.refresh_for_unknown_key()
+        assert decode_token(new_token)["sub"] == "5"
+        assert decode_token(sign(old_key))["sub"] == "5"
+
+
+@pytest.mark.asyncio
+async def test_failed_or_empty_refresh_keeps_current_keys(old_key):
+    key_set = KeySet()
+    fetcher = fetcher_with(
+        key_set,
+        jwks_response(old_key),
+        httpx.ConnectError("users-service down"),
+        httpx.Response(200, json={"keys": []}, request=httpx.Request("GET", JWKS_URL))
+    )
+    assert await fetcher.refresh()
+
+    assert not await fetcher.refresh()
+    assert not await fetcher.refresh()
+    assert not fetcher.healthy
+    assert key_set.get(old_key.kid)
+
+
+@pytest.mark.asyncio
+async def test_unknown_key_refreshes_are_coalesced_and_rate_limited(old_key):
+    key_set = KeySet()
+    fetcher = fetcher_with(key_set, jwks_response(old_key))
+
+    results = await asyncio.gather(*(fetcher.refresh_for_unknown_key() for _ in range(5)))
+    assert all(results)
+    assert fetcher._client.get.await_count == 1
+
+    # Сразу после обновления незнакомый kid не заставляет снова ходить в users-service
+    assert not await fetcher.refresh_for_unknown_key()
+    assert fetcher._client.get.await_count == 1
@@ -0,0 +1,191 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import HTTPException
+from unittest.mock import AsyncMock, Mock, patch
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.infrastructure.models.menu import Dish
+from src.infrastructure.models.order import Order, OrderItem, OrderStatus
+from src.infrastructure.models.saga import Saga, SagaStatus, SagaStep
+from src.infrastructure.repositories.order import OrderRepository
+from src.infrastructure.repositories.outbox import OutboxRepository
+from src.infrastructure.repositories.saga import SagaRepository
+from src.infrastructure.services.kitchen import KitchenScheduler, TicketStatus, parse_stations
+from src.infrastructure.services.order_saga import OrderSagaOrchestrator
+from src.infrastructure.models.user import User
+from src.interfaces.routers.kitchen import restore_kitchen, send_order_to_kitchen
+from src.rabbitmq import EventType
+
+NOW = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def kitchen():
+    scheduler = KitchenScheduler(parse_stations("1:grill,2:bar,3:cold"))
+    scheduler.register_cook("ivan", ["grill"])
+    scheduler.register_cook("olga", ["bar", "cold"])
+    return scheduler
+
+
+def test_parse_stations():
+    assert parse_stations("1:grill, 2:bar,") == {1: "grill", 2: "bar"}
+
+
+def test_order_is_split_by_station(kitchen):
+    tickets = kitchen.submit_order(1, [
+        {"dish_id": 10, "quantity": 1, "category_id": 1},
+        {"dish_id": 11, "quantity": 2, "category_id": 2},
+        {"dish_id": 12, "quantity": 1, "category_id": 1},
+        {"dish_id": 13, "quantity": 1, "category_id": None},
+    ], NOW)
+
+    by_station = {ticket.station: len(ticket.items) for ticket in tickets}
+    assert by_station == {"grill": 3, "bar": 1}
+
+
+def test_cook_gets_earliest_promised_ticket(kitchen):
+    kitchen.submit_order(1, [{"dish_id": 1, "category_id": 2}], NOW + timedelta(minutes=30))
+    kitchen.submit_order(2, [{"dish_id": 2, "category_id": 3}], NOW + timedelta(minutes=10))
+    kitchen.submit_order(3, [{"dish_id": 3, "category_id": 2}], NOW + timedelta(minutes=20))
+
+    assert [kitchen.next_ticket("olga").order_id for _ in range(3)] == [2, 3, 1]
+    assert kitchen.next_ticket("olga") is None
+
+
+def test_reprioritize_and_cancel_skip_stale_entries(kitchen):
+    kitchen.submit_order(1, [{"dish_id": 1, "category_id": 1}], NOW + timedelta(minutes=10))
+    kitchen.submit_order(2, [{"dish_id": 2, "category_id": 1}], NOW + timedelta(minutes=20))
+    kitchen.submit_order(3, [{"dish_id": 3, "category_id": 1}], NOW + timedelta(minutes=30))
+
+    kitchen.reprioritize(3, NOW)
+    kitchen.cancel_order(1)
+
+    assert kitchen.next_ticket("ivan").order_id == 3
+    assert kitchen.next_ticket("ivan").order_id == 2
+    assert kitchen.next_ticket("ivan") is None
+
+
+def test_order_completes_when_all_stations_done(kitchen):
+    kitchen.submit_order(1, [
+        {"dish_id": 1, "category_id": 1},
+        {"dish_id": 2, "category_id": 2},
+    ], NOW)
+    grill = kitchen.next_ticket("ivan")
+    bar = kitchen.next_ticket("olga")
+    assert grill.status == TicketStatus.COOKING
+
+    assert kitchen.complete(grill.id) is None
+    assert kitchen.complete(bar.id) == 1
+    with pytest.raises(ValueError):
+        kitchen.complete(bar.id)
+
+
+def test_feed_lists_queued_and_cooking(kitchen):
+    for order_id in range(1, 6):
+        kitchen.submit_order(order_id, [{"dish_id": order_id, "category_id": 1}], NOW + timedelta(minutes=order_id))
+    kitchen.next_ticket("ivan")
+
+    feed = kitchen.feed("grill", limit=2)
+
+    assert [ticket["order_id"] for ticket in feed["queued"]] == [2, 3]
+    assert [ticket["order_id"] for ticket in feed["cooking"]] == [1]
+    assert kitchen.queue_sizes() == {"grill": 4}
+
+
+@pytest.fixture
+def paid_flow(monkeypatch, kitchen):
+    order = Order(id=7, user_id=1, total_price=500, status=OrderStatus.PENDING, created_at=NOW)
+    saga = Saga(id=70, order_id=7, step=SagaStep.AWAIT_PAYMENT.value, status=SagaStatus.RUNNING.value,
+                compensations=[], payload={"user_id": 1, "items": []})
+
+    async def transition_many(self, order_ids, new_status):
+        if order.id in order_ids and order.status == OrderStatus.PENDING:
+            order.status = new_status
+            return [(order.id, order.user_id, OrderStatus.PENDING)]
+        return []
+
+    monkeypatch.setattr(SagaRepository, "get_many_for_update", AsyncMock(return_value={7: saga}))
+    monkeypatch.setattr(SagaRepository, "finish_many", AsyncMock())
+    monkeypatch.setattr(OrderRepository, "transition_many", transition_many)
+    monkeypatch.setattr(OrderRepository, "transition", AsyncMock())
+    monkeypatch.setattr(OrderRepository, "get_order_id", AsyncMock(return_value=order))
+    monkeypatch.setattr(OrderRepository, "get_kitchen_items", AsyncMock(return_value=[
+        {"dish_id": 10, "quantity": 1, "category_id": 1}
+    ]))
+    monkeypatch.setattr(OutboxRepository, "publish_event", AsyncMock())
+    session = AsyncMock(spec=AsyncSession)
+    session.begin = Mock(return_value=AsyncMock())
+    factory = Mock(return_value=AsyncMock(__aenter__=AsyncMock(return_value=session)))
+    return order, OrderSagaOrchestrator(session_factory=factory)
+
+
+@pytest.mark.asyncio
+async def test_paid_order_goes_to_kitchen_without_another_transition(paid_flow, kitchen):
+    order, orchestrator = paid_flow
+
+    await orchestrator.handle_payment_batch([({"order_id": 7}, EventType.PAYMENT_COMPLETED)])
+    assert order.status == OrderStatus.PROCESSING
+
+    with patch("src.interfaces.routers.kitchen.kitchen", kitchen):
+        tickets = await send_order_to_kitchen(7, AsyncMock(spec=AsyncSession))
+
+    assert [ticket["station"] for ticket in tickets] == ["grill"]
+    assert order.status == OrderStatus.PROCESSING
+    OrderRepository.transition.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_unpaid_order_is_not_sent_to_kitchen(paid_flow, kitchen):
+    order, _ = paid_flow
+
+    with patch("src.interfaces.routers.kitchen.kitchen", kitchen), pytest.raises(HTTPException) as error:
+        await send_order_to_kitchen(7, AsyncMock(spec=AsyncSession))
+
+    assert error.value.status_code == 409
+    assert order.status == OrderStatus.PENDING
+    assert kitchen.queue_sizes() == {}
+
+
+@pytest.mark.asyncio
+async def test_queues_are_restored_from_processing_orders(monkeypatch, kitchen):
+    monkeypatch.setattr(OrderRepository, "get_kitchen_backlog", AsyncMock(return_value={
+        8: (NOW + timedelta(minutes=5), [{"dish_id": 10, "quantity": 1, "category_id": 1}]),
+        7: (NOW, [{"dish_id": 11, "quantity": 2, "category_id": 1}, {"dish_id": 12, "quantity": 1, "category_id": 2}]),
+    }))
+    factory = Mock(return_value=AsyncMock(__aenter__=AsyncMock(return_value=AsyncMock(spec=AsyncSession))))
+
+    with patch("src.interfaces.routers.kitchen.kitchen", kitchen):
+        assert await restore_kitchen(factory) == 2
+        # Повторное восстановление не дублирует тикеты
+        await restore_kitchen(factory)
+
+    assert kitchen.queue_sizes() == {"grill": 2, "bar": 1}
+    assert kitchen.next_ticket("ivan").order_id == 7
+    assert kitchen.next_ticket("ivan").order_id == 8
+
+
+@pytest.mark.asyncio
+async def test_kitchen_backlog_has_only_processing_orders(pg_session):
+    user = User(number_phone="+70000000034", hashed_password="x")
+    dishes = [Dish(name="Стейк", price=50), Dish(name="Лимонад", price=50)]
+    pg_session.add_all([user, *dishes])
+    await pg_session.flush()
+    orders = {
+        status: Order(user_id=user.id, total_price=100, status=status, created_at=NOW, updated_at=NOW)
+        for status in (OrderStatus.PENDING, OrderStatus.PROCESSING, OrderStatus.COMPLETED)
+    }
+    pg_session.add_all(orders.values())
+    await pg_session.flush()
+    pg_session.add_all(
+        OrderItem(order_id=order.id, dish_id=dish_id, quantity=1, price=50, created_at=NOW)
+        for order in orders.values() for dish_id in (dishes[0].id, dishes[1].id)
+    )
+    await pg_session.flush()
+
+    backlog = await OrderRepository(pg_session).get_kitchen_backlog()
+
+    processing = orders[OrderStatus.PROCESSING].id
+    assert processing in backlog
+    assert not {orders[OrderStatus.PENDING].id, orders[OrderStatus.COMPLETED].id} & set(backlog)
+    created_at, items = backlog[processing]
+    assert created_at == NOW
+    assert [(item["dish_id"], item["name"]) for item in items] == [(dishes[0].id, "Стейк"), (dishes[1].id, "Лимонад")]
@@ -0,0 +1,143 @@
+import asyncio
+import httpx
+import pytest
+from unittest.mock import AsyncMock
+from src.infrastructure.services.menu_prices import MenuDishFetcher, MenuPriceCache
+from src.rabbitmq import EventType
+
+
+def menu(*dishes):
+    return AsyncMock(return_value=[
+        {"id": dish_id, "price": price, "is_available": available} for dish_id, price, available in dishes
+    ])
+
+
+@pytest.mark.asyncio
+async def test_misses_are_fetched_in_one_batch():
+    fetcher = menu((1, 100, True), (2, 200, False))
+    cache = MenuPriceCache(fetcher)
+
+    dishes = await cache.get_many([2, 1, 3])
+    await cache.get_many([1, 2])
+
+    fetcher.assert_awaited_once_with([1, 2, 3])
+    assert dishes[1].price == 100
+    assert dishes[2].is_available is False
+    assert 3 not in dishes
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_fetch():
+    fetcher = menu((1, 100, True))
+    cache = MenuPriceCache(fetcher)
+
+    await asyncio.gather(*(cache.get(1) for _ in range(10)))
+
+    assert fetcher.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_events_update_cached_dishes_without_fetch():
+    fetcher = menu((1, 100, True))
+    cache = MenuPriceCache(fetcher)
+    await cache.get(1)
+
+    await cache.handle_event({"dish_id": 1, "new_price": 150}, EventType.MENU_PRICE_CHANGED)
+    await cache.handle_event({"dish_id": 1, "new_availability": False}, EventType.MENU_ITEM_AVAILABILITY)
+    await cache.handle_event({"dish_id": 5, "price": 70, "is_available": True}, EventType.MENU_DISH_CREATED)
+
+    assert tuple(await cache.get(1))[:2] == (150, False)
+    assert (await cache.get(5)).price == 70
+    assert fetcher.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_entries_are_refetched():
+    fetcher = menu((1, 100, True))
+    cache = MenuPriceCache(fetcher, ttl=0)
+    await cache.get(1)
+    await asyncio.sleep(0.01)
+
+    await cache.get(1)
+
+    assert fetcher.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_slow_miss_does_not_block_other_dishes():
+    release = asyncio.Event()
+
+    async def fetcher(dish_ids):
+        if 1 in dish_ids:
+            await release.wait()
+        return [{"id": dish_id, "price": dish_id * 100} for dish_id in dish_ids]
+
+    cache = MenuPriceCache(fetcher)
+    slow = asyncio.create_task(cache.get(1))
+    waiting = asyncio.create_task(cache.get(1))
+    await asyncio.sleep(0)
+
+    assert (await asyncio.wait_for(cache.get(2), timeout=0.1)).price == 200
+    release.set()
+    assert (await slow).price == (await waiting).price == 100
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_reaches_waiters_and_is_not_cached():
+    fetcher = AsyncMock(side_effect=[httpx.ConnectError("menu down"), [{"id": 1, "price": 100}]])
+
+    async def slow_failure(dish_ids):
+        await asyncio.sleep(0.01)
+        return await fetcher(dish_ids)
+
+    cache = MenuPriceCache(slow_failure)
+    results = await asyncio.gather(cache.get(1), cache.get(1), return_exceptions=True)
+
+    assert all(isinstance(result, httpx.ConnectError) for result in results)
+    assert (await cache.get(1)).price == 100
+
+
+def menu_service(handler) -> MenuDishFetcher:
+    fetcher = MenuDishFetcher("http://menu", retries=1, retry_delay=0)
+    fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return fetcher
+
+
+@pytest.mark.asyncio
+async def test_fetcher_does_not_retry_client_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url)
+        return httpx.Response(400, json={"detail": "too many ids"})
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await menu_service(handler)([1, 2])
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_fetcher_retries_server_errors_once():
+    responses = [httpx.Response(503), httpx.Response(200, json=[{"id": 1, "price": 100}])]
+    fetcher = menu_service(lambda request: responses.pop(0))
+
+    assert await fetcher([1]) == [{"id": 1, "price": 100}]
+
+    responses = [httpx.Response(503), httpx.Response(503), httpx.Response(200, json=[])]
+    with pytest.raises(httpx.HTTPStatusError):
+        await fetcher([1])
+
+
+@pytest.mark.asyncio
+async def test_fetcher_splits_requests_by_500_ids():
+    sizes = []
+
+    def handler(request):
+        ids = [int(dish_id) for dish_id in request.url.params["ids"].split(",")]
+        sizes.append(len(ids))
+        return httpx.Response(200, json=[{"id": dish_id, "price": 1} for dish_id in ids])
+
+    dishes = await menu_service(handler)(list(range(1, 1202)))
+
+    assert sorted(sizes) == [201, 500, 500]
+    assert len(dishes) == 1201
@@ -0,0 +1,124 @@
+import datetime
+import pytest
+from unittest.mock import AsyncMock, Mock
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.domain.order import ORDER_TRANSITIONS, InvalidTransition, ensure_transition
+from src.infrastructure.models.order import Order, OrderEvent, OrderStatus
+from src.infrastructure.models.user import User
+from src.infrastructure.repositories import order as order_repository
+from src.infrastructure.repositories.order import OrderRepository
+
+
+def test_every_status_has_transitions():
+    assert set(ORDER_TRANSITIONS) == set(OrderStatus)
+
+
+@pytest.mark.parametrize("current, new", [
+    (OrderStatus.PENDING, OrderStatus.PROCESSING),
+    (OrderStatus.PENDING, OrderStatus.CANCELLED),
+    (OrderStatus.PROCESSING, OrderStatus.COMPLETED),
+    (OrderStatus.PROCESSING, OrderStatus.CANCELLED),
+])
+def test_allowed_transitions(current, new):
+    ensure_transition(current, new)
+
+
+@pytest.mark.parametrize("current, new", [
+    (OrderStatus.PENDING, OrderStatus.COMPLETED),
+    (OrderStatus.COMPLETED, OrderStatus.CANCELLED),
+    (OrderStatus.CANCELLED, OrderStatus.PENDING),
+    (OrderStatus.PROCESSING, OrderStatus.PROCESSING),
+])
+def test_forbidden_transitions(current, new):
+    with pytest.raises(InvalidTransition):
+        ensure_transition(current, new)
+
+
+@pytest.mark.asyncio
+async def test_transition_rejected_without_writes():
+    session = AsyncMock(spec=AsyncSession)
+    result = Mock()
+    result.one_or_none.return_value = (1, OrderStatus.COMPLETED)
+    session.execute.return_value = result
+
+    with pytest.raises(InvalidTransition):
+        await OrderRepository(session).transition(10, OrderStatus.CANCELLED)
+
+    # Выполнен только SELECT ... FOR UPDATE, журнал и проекции не тронуты
+    assert session.execute.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_transition_appends_event_and_projections():
+    session = AsyncMock(spec=AsyncSession)
+    result = Mock()
+    result.one_or_none.return_value = (1, OrderStatus.PENDING)
+    session.execute.return_value = result
+
+    previous = await OrderRepository(session).transition(10, OrderStatus.PROCESSING)
+
+    assert previous == OrderStatus.PENDING
+    # SELECT, UPDATE заказа, событие, текущий статус, счётчики
+    assert session.execute.await_count == 5
+
+
+@pytest.mark.asyncio
+async def test_transition_many_uses_fixed_number_of_statements():
+    session = AsyncMock(spec=AsyncSession)
+    result = Mock()
+    result.all.return_value = [(order_id, 1, OrderStatus.PENDING) for order_id in range(1, 201)]
+    session.execute.return_value = result
+
+    moved = await OrderRepository(session).transition_many(list(range(1, 201)), OrderStatus.PROCESSING)
+
+    assert len(moved) == 200
+    # UPDATE с блокировкой, событие, текущий статус, счётчики — независимо от размера пачки
+    assert session.execute.await_count == 4
+
+
+@pytest.mark.asyncio
+async def test_order_total_counts_rows_added_after_lock(monkeypatch):
+    session = AsyncMock(spec=AsyncSession)
+    locked, order_id, moved = Mock(), Mock(), Mock()
+    locked.one.return_value = (1, 200)
+    order_id.scalar_one.return_value = 10
+    # Пока корзина была заблокирована, в неё добавили ещё одну строку: DELETE её тоже перенёс
+    moved.all.return_value = [Mock(dish_id=1, quantity=2, price=100), Mock(dish_id=2, quantity=1, price=300)]
+    session.execute.side_effect = [locked, order_id, moved, Mock()]
+    monkeypatch.setattr(OrderRepository, "append_event", AsyncMock())
+    monkeypatch.setattr(OrderRepository, "get_order_id", AsyncMock())
+    start = AsyncMock()
+    monkeypatch.setattr("src.infrastructure.repositories.order.SagaRepository.start", start)
+    monkeypatch.setattr("src.infrastructure.repositories.order.OutboxRepository.publish_event", AsyncMock())
+
+    await OrderRepository(session).basket_to_order(5)
+
+    update_order = session.execute.await_args_list[3].args[0]
+    assert update_order.compile().params["total_price"] == 500
+    assert start.await_args.args[1]["total_price"] == 500
+
+
+@pytest.mark.asyncio
+async def test_delete_order_removes_events_and_projections(pg_session, monkeypatch):
+    monkeypatch.setattr(order_repository, "invalidate_cache", AsyncMock())
+    repository = OrderRepository(pg_session)
+    user = User(number_phone="+70000000031", hashed_password="x")
+    pg_session.add(user)
+    await pg_session.flush()
+    now = datetime.datetime.now(datetime.timezone.utc)
+    order = Order(user_id=user.id, total_price=100, status=OrderStatus.PENDING, created_at=now, updated_at=now)
+    pg_session.add(order)
+    await pg_session.flush()
+    await repository.append_event(order.id, user.id, None, OrderStatus.PENDING, now)
+    await repository.transition(order.id, OrderStatus.PROCESSING)
+    before = await repository.get_status_counts()
+
+    assert await repository.delete_order(order.id)
+
+    assert await repository.get_order_status(order.id) is None
+    events = await pg_session.scalar(select(func.count()).select_from(OrderEvent).where(OrderEvent.order_id == order.id))
+    assert events == 0
+    after = await repository.get_status_counts()
+    assert after[OrderStatus.PROCESSING] == before[OrderStatus.PROCESSING] - 1
+    assert after[OrderStatus.PENDING] == before[OrderStatus.PENDING]
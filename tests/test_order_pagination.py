@@ -0,0 +1,53 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from fastapi import HTTPException
+from src.infrastructure.models.order import Order, OrderStatus
+from src.infrastructure.models.user import User
+from src.interfaces.routers.order import decode_cursor, encode_cursor, get_my_orders
+
+CREATED_AT = datetime(2026, 10, 5, 10, 15, 30, 123456, tzinfo=timezone.utc)
+
+
+def test_cursor_round_trips_created_at_and_id():
+    cursor = encode_cursor(SimpleNamespace(created_at=CREATED_AT, id=42))
+
+    assert decode_cursor(cursor) == (CREATED_AT, 42)
+
+
+def test_malformed_cursor_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("bm90LWEtY3Vyc29y")
+    assert error.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_pages_cover_orders_with_equal_created_at_once(pg_session):
+    user = User(number_phone="+70000000042", hashed_password="x")
+    pg_session.add(user)
+    await pg_session.flush()
+    user_id = user.id
+    # Три заказа с одинаковым created_at: порядок между ними задаёт только id
+    moments = [CREATED_AT + timedelta(hours=1), CREATED_AT, CREATED_AT, CREATED_AT, CREATED_AT - timedelta(hours=1)]
+    orders = [
+        Order(user_id=user_id, total_price=100, status=OrderStatus.PENDING, created_at=moment, updated_at=moment)
+        for moment in moments
+    ]
+    pg_session.add_all(orders)
+    await pg_session.flush()
+    expected = [order.id for order in sorted(orders, key=lambda order: (order.created_at, order.id), reverse=True)]
+    # Страницы читаются из базы, как в отдельных запросах, а не из identity map
+    pg_session.expunge_all()
+
+    seen, cursor = [], None
+    while True:
+        page = await get_my_orders(
+            user=SimpleNamespace(id=user_id), db=pg_session, limit=2, cursor=cursor,
+            order_status=None, created_from=None, created_to=None
+        )
+        seen.extend(order.id for order in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert seen == expected
@@ -0,0 +1,187 @@
+import pytest
+from unittest.mock import AsyncMock, Mock
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.infrastructure.models.order import OrderStatus
+from src.infrastructure.models.saga import Saga, SagaStatus, SagaStep
+from src.infrastructure.repositories.order import OrderRepository
+from src.infrastructure.repositories.outbox import OutboxRepository
+from src.infrastructure.repositories.saga import SagaRepository
+from src.infrastructure.services.order_saga import OrderSagaOrchestrator
+from src.rabbitmq import EventType
+
+
+def make_saga(step=SagaStep.RESERVE_MENU, status=SagaStatus.RUNNING, compensations=None):
+    return Saga(
+        order_id=7,
+        step=step.value,
+        status=status.value,
+        compensations=compensations or [],
+        payload={"user_id": 1, "items": [{"dish_id": 1, "quantity": 2}]}
+    )
+
+
+@pytest.fixture
+def published(monkeypatch):
+    events = []
+
+    async def publish_event(self, event_type, data, **kwargs):
+        events.append(event_type)
+
+    monkeypatch.setattr(OutboxRepository, "publish_event", publish_event)
+    monkeypatch.setattr(OrderRepository, "cancel", AsyncMock())
+    return events
+
+
+@pytest.mark.asyncio
+async def test_menu_reserved_moves_to_payment_with_compensation(published):
+    saga = make_saga()
+
+    await OrderSagaOrchestrator()._on_menu_reserved(AsyncMock(spec=AsyncSession), saga, {})
+
+    assert saga.step == SagaStep.AWAIT_PAYMENT.value
+    assert saga.compensations == [EventType.MENU_RELEASE.value]
+    assert saga.deadline_at is not None
+    assert published == []
+
+
+@pytest.mark.asyncio
+async def test_duplicate_event_does_not_advance(published):
+    saga = make_saga(step=SagaStep.AWAIT_PAYMENT, compensations=[EventType.MENU_RELEASE.value])
+
+    await OrderSagaOrchestrator()._on_menu_reserved(AsyncMock(spec=AsyncSession), saga, {})
+
+    assert saga.compensations == [EventType.MENU_RELEASE.value]
+    assert published == []
+
+
+@pytest.mark.asyncio
+async def test_payment_failed_runs_compensations_and_cancels(published):
+    saga = make_saga(step=SagaStep.AWAIT_PAYMENT, compensations=[EventType.MENU_RELEASE.value])
+
+    await OrderSagaOrchestrator()._on_payment_failed(AsyncMock(spec=AsyncSession), saga, {})
+
+    assert saga.status == SagaStatus.FAILED.value
+    assert saga.error == "payment failed"
+    assert published == [EventType.MENU_RELEASE]
+    OrderRepository.cancel.assert_awaited_once_with(7, 1)
+
+
+@pytest.mark.asyncio
+async def test_late_reservation_after_timeout_is_released(published):
+    saga = make_saga(status=SagaStatus.FAILED)
+
+    await OrderSagaOrchestrator()._on_menu_reserved(AsyncMock(spec=AsyncSession), saga, {})
+
+    assert saga.status == SagaStatus.FAILED.value
+    assert published == [EventType.MENU_RELEASE]
+
+
+@pytest.mark.asyncio
+async def test_handle_event_notifies_after_commit(published):
+    saga = make_saga(step=SagaStep.AWAIT_PAYMENT)
+    session = AsyncMock(spec=AsyncSession)
+    session.begin = Mock(return_value=AsyncMock())
+    result = Mock()
+    result.scalar_one_or_none.return_value = saga
+    session.execute.return_value = result
+    factory = Mock(return_value=AsyncMock(__aenter__=AsyncMock(return_value=session)))
+    cancelled = []
+
+    orchestrator = OrderSagaOrchestrator(session_factory=factory, on_cancelled=cancelled.append)
+    await orchestrator.handle_event({"order_id": 7}, EventType.PAYMENT_FAILED)
+    await orchestrator.handle_event({"order_id": 7}, EventType.PAYMENT_FAILED)
+
+    # Повторное событие по уже отменённой саге кухню не трогает
+    assert cancelled == [7]
+
+
+@pytest.mark.asyncio
+async def test_payment_batch_applies_results_with_bulk_statements(monkeypatch):
+    sagas = {
+        order_id: Saga(id=order_id * 10, order_id=order_id, step=step.value, status=status.value,
+                       compensations=[EventType.MENU_RELEASE.value], payload={"user_id": 1, "items": []})
+        for order_id, step, status in (
+            (1, SagaStep.AWAIT_PAYMENT, SagaStatus.RUNNING),
+            (2, SagaStep.AWAIT_PAYMENT, SagaStatus.RUNNING),
+            (3, SagaStep.DONE, SagaStatus.COMPLETED),
+        )
+    }
+    monkeypatch.setattr(SagaRepository, "get_many_for_update", AsyncMock(return_value=sagas))
+    monkeypatch.setattr(SagaRepository, "finish_many", AsyncMock())
+    monkeypatch.setattr(OrderRepository, "transition_many", AsyncMock(side_effect=lambda ids, status: [
+        (order_id, 1, OrderStatus.PENDING) for order_id in ids
+    ]))
+    published = []
+
+    async def publish_event(self, event_type, data, **kwargs):
+        published.append((event_type, data["order_id"]))
+
+    monkeypatch.setattr(OutboxRepository, "publish_event", publish_event)
+    session = AsyncMock(spec=AsyncSession)
+    session.begin = Mock(return_value=AsyncMock())
+    factory = Mock(return_value=AsyncMock(__aenter__=AsyncMock(return_value=session)))
+    cancelled = []
+
+    await OrderSagaOrchestrator(session_factory=factory, on_cancelled=cancelled.append).handle_payment_batch([
+        ({"order_id": 1}, EventType.PAYMENT_COMPLETED),
+        ({"order_id": 1}, EventType.PAYMENT_FAILED),
+        ({"order_id": 2}, EventType.PAYMENT_FAILED),
+        ({"order_id": 3}, EventType.PAYMENT_COMPLETED),
+        ({"order_id": 4}, EventType.PAYMENT_COMPLETED),
+    ])
+
+    SagaRepository.get_many_for_update.assert_awaited_once_with([1, 2, 3, 4])
+    assert [call.args for call in OrderRepository.transition_many.await_args_list] == [
+        ([1], OrderStatus.PROCESSING), ([2], OrderStatus.CANCELLED)
+    ]
+    assert [call.args for call in SagaRepository.finish_many.await_args_list] == [
+        ([10], SagaStatus.COMPLETED), ([20], SagaStatus.FAILED, "payment failed")
+    ]
+    assert published == [(EventType.ORDER_PAID, 1), (EventType.MENU_RELEASE, 2), (EventType.ORDER_CANCELLED, 2)]
+    assert cancelled == [2]
+
+
+@pytest.mark.asyncio
+async def test_payment_before_reservation_is_applied_after_it(published, monkeypatch):
+    monkeypatch.setattr(SagaRepository, "finish_many", AsyncMock())
+    monkeypatch.setattr(OrderRepository, "transition_many", AsyncMock(return_value=[(7, 1, OrderStatus.PENDING)]))
+    saga = make_saga()
+    saga.id = 70
+    orchestrator = OrderSagaOrchestrator()
+    session = AsyncMock(spec=AsyncSession)
+
+    await orchestrator._on_payment_completed(session, saga, {})
+    # Повтор результата до резерва ничего не меняет
+    await orchestrator._on_payment_failed(session, saga, {"reason": "late duplicate"})
+
+    assert saga.step == SagaStep.RESERVE_MENU.value
+    assert saga.payload["payment_status"] == EventType.PAYMENT_COMPLETED.value
+    OrderRepository.transition_many.assert_not_awaited()
+
+    await orchestrator._on_menu_reserved(session, saga, {})
+
+    OrderRepository.transition_many.assert_awaited_once_with([7], OrderStatus.PROCESSING)
+    SagaRepository.finish_many.assert_awaited_once_with([70], SagaStatus.COMPLETED)
+
+
+@pytest.mark.asyncio
+async def test_failed_payment_in_batch_before_reservation_cancels_after_it(published, monkeypatch):
+    saga = make_saga()
+    monkeypatch.setattr(SagaRepository, "get_many_for_update", AsyncMock(return_value={7: saga}))
+    session = AsyncMock(spec=AsyncSession)
+    session.begin = Mock(return_value=AsyncMock())
+    factory = Mock(return_value=AsyncMock(__aenter__=AsyncMock(return_value=session)))
+    orchestrator = OrderSagaOrchestrator(session_factory=factory)
+
+    await orchestrator.handle_payment_batch([({"order_id": 7, "reason": "card declined"}, EventType.PAYMENT_FAILED)])
+
+    assert saga.status == SagaStatus.RUNNING.value
+    assert saga.payload["payment_status"] == EventType.PAYMENT_FAILED.value
+
+    await orchestrator._on_menu_reserved(session, saga, {})
+
+    assert saga.status == SagaStatus.FAILED.value
+    assert saga.error == "card declined"
+    # Резерв уже взят, поэтому отмена возвращает его
+    assert published == [EventType.MENU_RELEASE]
+    OrderRepository.cancel.assert_awaited_once_with(7, 1)
@@ -0,0 +1,82 @@
+import pytest
+from unittest.mock import AsyncMock, Mock
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.infrastructure.models.outbox import OutboxEvent
+from src.infrastructure.repositories.outbox import OutboxRepository
+from src.infrastructure.services.outbox_relay import OutboxRelay
+from src.rabbitmq import EventType
+
+
+def outbox_rows(count: int) -> list[OutboxEvent]:
+    return [
+        OutboxEvent(id=event_id, exchange="amq.topic", routing_key=EventType.ORDER_CREATED.value,
+                    event_type=EventType.ORDER_CREATED.value, payload={"order_id": event_id})
+        for event_id in range(1, count + 1)
+    ]
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    rows = outbox_rows(3)
+
+    async def fetch_batch(self, limit=100):
+        return rows[:limit]
+
+    async def delete(self, event_ids):
+        rows[:] = [row for row in rows if row.id not in event_ids]
+
+    monkeypatch.setattr(OutboxRepository, "fetch_batch", fetch_batch)
+    monkeypatch.setattr(OutboxRepository, "delete", delete)
+    return rows
+
+
+def relay_with(rabbitmq, batch_size=100) -> OutboxRelay:
+    session = AsyncMock(spec=AsyncSession)
+    session.begin = Mock(return_value=AsyncMock())
+    factory = Mock(return_value=AsyncMock(__aenter__=AsyncMock(return_value=session)))
+    return OutboxRelay(rabbitmq, session_factory=factory, batch_size=batch_size)
+
+
+@pytest.mark.asyncio
+async def test_batch_is_claimed_with_skip_locked():
+    session = AsyncMock(spec=AsyncSession)
+    session.execute.return_value = Mock()
+
+    await OutboxRepository(session).fetch_batch(50)
+
+    sql = str(session.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+    # Несколько реплик relay разбирают outbox параллельно, не дожидаясь чужих блокировок
+    assert "ORDER BY" in sql and "LIMIT" in sql
+    assert sql.endswith("FOR UPDATE SKIP LOCKED")
+
+
+@pytest.mark.asyncio
+async def test_rows_are_deleted_only_after_every_publish_is_confirmed(outbox):
+    confirmed = []
+
+    async def publish_event(event_type, data, **kwargs):
+        # Строки ещё на месте, пока брокер не подтвердил публикацию
+        assert len(outbox) == 3
+        confirmed.append(kwargs["message_id"])
+
+    relay = relay_with(Mock(publish_event=AsyncMock(side_effect=publish_event)), batch_size=2)
+
+    assert await relay.drain_once() == 2
+    assert confirmed == ["1", "2"]
+    assert [row.id for row in outbox] == [3]
+
+
+@pytest.mark.asyncio
+async def test_failed_publish_keeps_batch_for_retry(outbox):
+    rabbitmq = Mock(publish_event=AsyncMock(side_effect=[None, ConnectionError("nack"), None, None, None, None]))
+    relay = relay_with(rabbitmq)
+
+    with pytest.raises(ConnectionError):
+        await relay.drain_once()
+    assert [row.id for row in outbox] == [1, 2, 3]
+
+    assert await relay.drain_once() == 3
+    assert outbox == []
+    # Повтор публикует пачку заново с теми же message_id: потребители отбрасывают дубли
+    assert [call.kwargs["message_id"] for call in rabbitmq.publish_event.await_args_list[3:]] == ["1", "2", "3"]
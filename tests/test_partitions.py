@@ -0,0 +1,40 @@
+import datetime
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.infrastructure.services.partitions import PartitionManager
+
+
+def session_factory(session):
+    factory = MagicMock()
+    factory.return_value.__aenter__ = AsyncMock(return_value=session)
+    factory.return_value.__aexit__ = AsyncMock(return_value=False)
+    return factory
+
+
+@pytest.mark.asyncio
+async def test_ensure_once_creates_months_ahead_for_every_table():
+    session = AsyncMock()
+    repository = AsyncMock()
+    repository.ensure_monthly.side_effect = [2, 0]
+    repository.default_rows.return_value = 0
+
+    with patch("src.infrastructure.services.partitions.PartitionRepository", return_value=repository):
+        manager = PartitionManager(("orders.orders", "orders.order_items"), session_factory(session), months_ahead=3)
+        created = await manager.ensure_once(datetime.date(2026, 10, 19))
+
+    assert created == 2
+    repository.ensure_monthly.assert_any_await("orders.orders", datetime.date(2026, 10, 1), 4)
+    repository.ensure_monthly.assert_any_await("orders.order_items", datetime.date(2026, 10, 1), 4)
+    session.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_ensure_once_warns_about_rows_in_default_partition(caplog):
+    repository = AsyncMock()
+    repository.ensure_monthly.return_value = 0
+    repository.default_rows.return_value = 12
+
+    with patch("src.infrastructure.services.partitions.PartitionRepository", return_value=repository):
+        await PartitionManager(("payments.payments",), session_factory(AsyncMock())).ensure_once()
+
+    assert "payments.payments_default" in caplog.text
@@ -0,0 +1,77 @@
+import asyncio
+import time
+import bcrypt
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from src.application.auth.auth import AuthService
+from src.core.security import check_password, hash_password
+
+
+def legacy_bcrypt_hash(password: str) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=4)).decode()
+
+
+@pytest.mark.asyncio
+async def test_new_hashes_use_argon2id_and_verify():
+    hashed = await hash_password("secret")
+
+    assert hashed.startswith("$argon2id$")
+    assert await check_password("secret", hashed) == (True, None)
+    assert await check_password("wrong", hashed) == (False, None)
+
+
+@pytest.mark.asyncio
+async def test_legacy_bcrypt_hash_is_verified_and_upgraded():
+    valid, new_hash = await check_password("secret", legacy_bcrypt_hash("secret"))
+
+    assert valid
+    assert new_hash.startswith("$argon2id$")
+    assert await check_password("wrong", legacy_bcrypt_hash("secret")) == (False, None)
+
+
+@pytest.mark.asyncio
+async def test_unknown_hash_format_is_rejected():
+    assert await check_password("secret", "") == (False, None)
+    assert await check_password("secret", "not-a-hash") == (False, None)
+
+
+@pytest.mark.asyncio
+async def test_hashing_does_not_block_event_loop():
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.005)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.gather(*(hash_password("secret") for _ in range(4)))
+    task.cancel()
+
+    gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+    assert gaps and max(gaps) < 0.1
+
+
+@pytest.mark.asyncio
+async def test_login_persists_upgraded_hash():
+    repository = AsyncMock()
+    repository.get_by_phone.return_value = SimpleNamespace(id=5, hashed_password=legacy_bcrypt_hash("secret"))
+    service = AuthService(repository, sms_service=None)
+
+    user = await service.login("+79990000000", "secret")
+
+    assert user.id == 5
+    user_id, new_hash = repository.update_password_hash.await_args.args
+    assert user_id == 5 and new_hash.startswith("$argon2id$")
+
+
+@pytest.mark.asyncio
+async def test_login_with_wrong_password_does_not_touch_hash():
+    repository = AsyncMock()
+    repository.get_by_phone.return_value = SimpleNamespace(id=5, hashed_password=legacy_bcrypt_hash("secret"))
+    service = AuthService(repository, sms_service=None)
+
+    with pytest.raises(ValueError):
+        await service.login("+79990000000", "wrong")
+    repository.update_password_hash.assert_not_awaited()
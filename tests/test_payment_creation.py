@@ -0,0 +1,45 @@
+import datetime
+import pytest
+from unittest.mock import AsyncMock, patch
+from src.infrastructure.models.payment import PaymentStatus
+from src.infrastructure.services.payment_service import PaymentService
+from src.schemas.payment_schemas import PaymentResponse
+
+
+def payment(status=PaymentStatus.PENDING, transaction_id=None):
+    now = datetime.datetime(2026, 10, 19, 12, 0)
+    return PaymentResponse(
+        id=7, invoice_id=42, amount=500, status=status,
+        transaction_id=transaction_id, created_at=now, updated_at=now
+    )
+
+
+@pytest.mark.asyncio
+async def test_new_payment_is_created_once_and_updated_with_gateway_result():
+    service = PaymentService(AsyncMock())
+    service.payment_repo.create_payment_once = AsyncMock(return_value=payment())
+    service.payment_repo.apply_gateway_result = AsyncMock(return_value=payment(transaction_id="tx-42"))
+
+    with patch(
+        "src.infrastructure.services.payment_service.create_payment",
+        new=AsyncMock(return_value={"success": True, "transaction_id": "tx-42"})
+    ):
+        result = await service.create_payment_for_order(42, 500)
+
+    assert result.transaction_id == "tx-42"
+    created_at = service.payment_repo.create_payment_once.await_args.args[1]
+    service.payment_repo.apply_gateway_result.assert_awaited_once_with(7, created_at, PaymentStatus.PENDING, "tx-42")
+
+
+@pytest.mark.asyncio
+async def test_second_request_for_invoice_returns_existing_payment_without_gateway_call():
+    service = PaymentService(AsyncMock())
+    service.payment_repo.create_payment_once = AsyncMock(return_value=None)
+    service.get_payment_by_order_id = AsyncMock(return_value=payment(transaction_id="tx-42"))
+    gateway = AsyncMock()
+
+    with patch("src.infrastructure.services.payment_service.create_payment", new=gateway):
+        result = await service.create_payment_for_order(42, 500)
+
+    assert result.id == 7
+    gateway.assert_not_awaited()
@@ -0,0 +1,78 @@
+import datetime
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.infrastructure.models.payment import PaymentStatus
+from src.infrastructure.services.payment_reconciler import PaymentReconciler
+from src.rabbitmq import EventType
+
+
+def session_factory():
+    factory = MagicMock()
+    factory.return_value.__aenter__ = AsyncMock(return_value=AsyncMock())
+    factory.return_value.__aexit__ = AsyncMock(return_value=False)
+    return factory
+
+
+@pytest.mark.asyncio
+async def test_reconcile_pages_by_id_and_applies_gateway_statuses():
+    pages = [
+        [SimpleNamespace(id=1, transaction_id="tx-1"), SimpleNamespace(id=2, transaction_id="tx-2")],
+        [SimpleNamespace(id=5, transaction_id="tx-5"), SimpleNamespace(id=6, transaction_id=None)],
+        [],
+    ]
+    gateway = {"tx-1": "completed", "tx-2": "pending", "tx-5": "declined"}
+    repository = AsyncMock()
+    repository.get_pending_page.side_effect = pages
+    repository.apply_statuses.side_effect = [
+        [(1, 10, PaymentStatus.COMPLETED)],
+        [(5, 50, PaymentStatus.FAILED)],
+    ]
+    outbox = AsyncMock()
+
+    async def fetch(transaction_id):
+        return {"status": gateway[transaction_id]}
+
+    with patch("src.infrastructure.services.payment_reconciler.PaymentRepository", return_value=repository), \
+            patch("src.infrastructure.services.payment_reconciler.OutboxRepository", return_value=outbox), \
+            patch("src.infrastructure.services.payment_reconciler.invalidate_cache", new=AsyncMock()), \
+            patch("src.infrastructure.services.payment_reconciler.payment_status_waiters") as waiters:
+        waiters.publish = AsyncMock()
+        report = await PaymentReconciler(fetch, session_factory(), page_size=2).reconcile_once()
+
+    assert [call.args[0] for call in repository.get_pending_page.await_args_list] == [0, 2, 6]
+    assert repository.apply_statuses.await_args_list[0].args[0] == {1: PaymentStatus.COMPLETED}
+    assert repository.apply_statuses.await_args_list[1].args[0] == {5: PaymentStatus.FAILED}
+    assert (report.checked, report.corrected, report.still_pending, report.errors) == (4, 2, 1, 1)
+    assert report.discrepancies == {1: ("PENDING", "COMPLETED"), 5: ("PENDING", "FAILED")}
+    outbox.publish_event.assert_any_await(EventType.PAYMENT_FAILED, {"order_id": 50, "payment_id": 5, "status": "FAILED"})
+    waiters.publish.assert_any_await({5: PaymentStatus.FAILED})
+
+
+@pytest.mark.asyncio
+async def test_gateway_errors_are_counted_not_corrected():
+    repository = AsyncMock()
+    repository.get_pending_page.side_effect = [[SimpleNamespace(id=1, transaction_id="tx-1")]]
+
+    with patch("src.infrastructure.services.payment_reconciler.PaymentRepository", return_value=repository):
+        report = await PaymentReconciler(
+            AsyncMock(side_effect=TimeoutError()), session_factory(), page_size=10
+        ).reconcile_once()
+
+    assert report.errors == 1
+    repository.apply_statuses.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_stale_cutoff_is_timezone_aware():
+    repository = AsyncMock()
+    repository.get_pending_page.return_value = []
+
+    with patch("src.infrastructure.services.payment_reconciler.PaymentRepository", return_value=repository):
+        before = datetime.datetime.now(datetime.timezone.utc)
+        await PaymentReconciler(AsyncMock(), session_factory(), stale_after=600).reconcile_once()
+
+    # updated_at хранится в timestamptz: граница в UTC не зависит от часового пояса сервера
+    updated_before = repository.get_pending_page.await_args.args[2]
+    assert updated_before.tzinfo is not None
+    assert updated_before >= before - datetime.timedelta(seconds=600)
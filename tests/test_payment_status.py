@@ -0,0 +1,42 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock
+from src.infrastructure.models.payment import PaymentStatus
+from src.infrastructure.services.payment_status import PaymentStatusWaiters
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_woken_by_status_message():
+    waiters = PaymentStatusWaiters(AsyncMock())
+
+    with waiters.waiter(1) as first, waiters.waiter(1) as second, waiters.waiter(2) as other:
+        waiters._dispatch(json.dumps({"1": "COMPLETED"}))
+        assert await asyncio.wait_for(first, 1) == PaymentStatus.COMPLETED
+        assert await asyncio.wait_for(second, 1) == PaymentStatus.COMPLETED
+        assert not other.done()
+
+    assert waiters.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_timed_out_waiter_is_unregistered():
+    waiters = PaymentStatusWaiters(AsyncMock())
+
+    with waiters.waiter(1) as changed:
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(changed, 0.01)
+
+    assert waiters.waiting == 0
+    waiters.notify(1, PaymentStatus.FAILED)
+
+
+@pytest.mark.asyncio
+async def test_batch_is_published_as_one_message():
+    redis = AsyncMock()
+    waiters = PaymentStatusWaiters(redis, channel="test:status")
+
+    await waiters.publish({})
+    await waiters.publish({1: PaymentStatus.COMPLETED, 2: PaymentStatus.FAILED})
+
+    redis.publish.assert_awaited_once_with("test:status", json.dumps({"1": "COMPLETED", "2": "FAILED"}))
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, Mock
+from src.rabbitmq import EventType, RabbitMQClient
+
+
+def message(order_id, event_type=EventType.PAYMENT_COMPLETED):
+    incoming = Mock()
+    incoming.body = json.dumps({"order_id": order_id}).encode()
+    incoming.headers = {"event_type": event_type.value}
+    incoming.ack, incoming.nack, incoming.reject = AsyncMock(), AsyncMock(), AsyncMock()
+    return incoming
+
+
+def client():
+    rabbitmq = RabbitMQClient()
+    rabbitmq._channel = Mock()
+    rabbitmq._channel.default_exchange.publish = AsyncMock()
+    return rabbitmq
+
+
+def broken_message():
+    incoming = message(0)
+    incoming.body = b"not json"
+    return incoming
+
+
+@pytest.mark.asyncio
+async def test_successful_batch_is_acked_once():
+    messages = [message(1), message(2)]
+    callback = AsyncMock()
+
+    await client()._process_batch("order_payments", callback, messages)
+
+    callback.assert_awaited_once_with([
+        ({"order_id": 1}, EventType.PAYMENT_COMPLETED), ({"order_id": 2}, EventType.PAYMENT_COMPLETED)
+    ])
+    messages[-1].ack.assert_awaited_once_with(multiple=True)
+    messages[0].ack.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_failed_events_are_requeued_before_ack():
+    messages = [message(1), message(2), message(3)]
+    rabbitmq = client()
+    settled = []
+    rabbitmq._channel.default_exchange.publish.side_effect = lambda retry, routing_key: settled.append(("publish", retry))
+    for incoming in messages:
+        incoming.ack.side_effect = lambda multiple=False, m=incoming: settled.append(("ack", m, multiple))
+
+    async def callback(events):
+        if any(data["order_id"] == 3 for data, _ in events):
+            raise RuntimeError("db down")
+
+    await rabbitmq._process_batch("order_payments", callback, messages)
+
+    retry = settled[0][1]
+    assert json.loads(retry.body) == {"order_id": 3}
+    assert retry.headers["x-attempts"] == 1
+    rabbitmq._channel.default_exchange.publish.assert_awaited_once_with(retry, routing_key="order_payments")
+    # Копия публикуется и оригинал подтверждается до ack(multiple=True), который иначе захватил бы и его
+    assert settled == [("publish", retry), ("ack", messages[2], False), ("ack", messages[1], True)]
+
+
+@pytest.mark.asyncio
+async def test_nothing_is_acked_when_whole_batch_fails():
+    messages = [message(1), message(2)]
+    rabbitmq = client()
+
+    await rabbitmq._process_batch("order_payments", AsyncMock(side_effect=RuntimeError("db down")), messages)
+
+    assert rabbitmq._channel.default_exchange.publish.await_count == 2
+    for incoming in messages:
+        incoming.ack.assert_awaited_once_with()
+
+
+@pytest.mark.asyncio
+async def test_message_failing_every_time_is_dead_lettered():
+    rabbitmq = client()
+    callback = AsyncMock(side_effect=RuntimeError("poison"))
+    deliveries = [message(1)]
+
+    # Каждая повторная копия снова приходит из очереди, пока сообщение не отклонят
+    while not deliveries[-1].reject.await_count:
+        await rabbitmq._process_batch("order_payments", callback, deliveries[-1:], max_attempts=3)
+        if not deliveries[-1].reject.await_count:
+            retry = rabbitmq._channel.default_exchange.publish.await_args.args[0]
+            deliveries.append(message(1))
+            deliveries[-1].headers = retry.headers
+
+    assert len(deliveries) == 3
+    incoming = deliveries[-1]
+    incoming.reject.assert_awaited_once_with(requeue=False)
+    incoming.ack.assert_not_awaited()
+    assert rabbitmq._channel.default_exchange.publish.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_quorum_delivery_count_is_used_without_republishing():
+    rabbitmq = client()
+    requeued, poison = message(1), message(2)
+    requeued.headers["x-delivery-count"] = 1
+    poison.headers["x-delivery-count"] = 4
+
+    await rabbitmq._process_batch("order_payments", AsyncMock(side_effect=RuntimeError("db down")), [requeued, poison])
+
+    requeued.nack.assert_awaited_once_with(requeue=True)
+    poison.reject.assert_awaited_once_with(requeue=False)
+    rabbitmq._channel.default_exchange.publish.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_undecodable_message_is_rejected_not_acked():
+    messages = [message(1), broken_message()]
+    callback = AsyncMock()
+
+    await client()._process_batch("order_payments", callback, messages)
+
+    callback.assert_awaited_once_with([({"order_id": 1}, EventType.PAYMENT_COMPLETED)])
+    messages[1].reject.assert_awaited_once_with(requeue=False)
+    messages[1].ack.assert_not_awaited()
+    messages[0].ack.assert_awaited_once_with(multiple=True)
+
+
+@pytest.mark.asyncio
+async def test_close_waits_for_batch_consumers_before_closing_connection():
+    rabbitmq = RabbitMQClient()
+    finished = []
+
+    async def consumer():
+        try:
+            await asyncio.sleep(60)
+        finally:
+            # Пачка дорабатывает отмену, пока соединение ещё открыто
+            await asyncio.sleep(0)
+            finished.append(rabbitmq._connection.close.await_count)
+
+    rabbitmq._connection = Mock(close=AsyncMock())
+    rabbitmq._batch_tasks.append(asyncio.create_task(consumer()))
+    await asyncio.sleep(0)
+
+    await rabbitmq.close()
+
+    assert finished == [0]
+    rabbitmq._connection.close.assert_awaited_once()
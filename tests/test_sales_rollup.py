@@ -0,0 +1,122 @@
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import delete, func, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.infrastructure.models.analytics import SalesDailyDish, SalesHourly, Watermark
+from src.infrastructure.models.menu import Dish
+from src.infrastructure.models.order import Order, OrderEvent, OrderItem, OrderStatus
+from src.infrastructure.models.user import User
+from src.infrastructure.repositories.analytics import AnalyticsRepository
+
+HOUR = datetime(2026, 10, 5, 10, 0, tzinfo=timezone.utc)
+DAY = date(2026, 10, 5)
+
+
+async def committed_txid(session):
+    # Транзакция заведомо старше фронта: её события считаются закоммиченными
+    return await session.scalar(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")) - 1
+
+
+async def place_order(session, user_id, created_at, txid, items, *statuses):
+    order = Order(
+        user_id=user_id, total_price=sum(price * quantity for _, quantity, price in items),
+        status=statuses[-1] if statuses else OrderStatus.PENDING, created_at=created_at, updated_at=created_at
+    )
+    session.add(order)
+    await session.flush()
+    session.add_all(
+        OrderItem(order_id=order.id, dish_id=dish_id, quantity=quantity, price=price, created_at=created_at)
+        for dish_id, quantity, price in items
+    )
+    previous = None
+    for status in (OrderStatus.PENDING, *statuses):
+        session.add(OrderEvent(
+            order_id=order.id, user_id=user_id, from_status=previous, to_status=status, created_at=created_at, txid=txid
+        ))
+        previous = status
+    await session.flush()
+    return order
+
+
+@pytest.mark.asyncio
+async def test_refresh_merges_new_events_into_existing_rollups(pg_session):
+    session = pg_session
+    user = User(number_phone="+70000000043", hashed_password="x")
+    soup, salad = Dish(name="Суп", price=100), Dish(name="Салат", price=300)
+    session.add_all([user, soup, salad])
+    await session.flush()
+    # Уже учтённые события не трогаем: отсчёт с текущего конца журнала
+    txid = await committed_txid(session)
+    last_id = (await session.execute(select(func.coalesce(func.max(OrderEvent.id), 0)))).scalar_one()
+    await session.execute(
+        update(Watermark)
+        .where(Watermark.name == AnalyticsRepository.SALES_WATERMARK)
+        .values(last_txid=txid, last_id=last_id)
+    )
+    session.add_all([
+        SalesHourly(bucket=HOUR, orders_count=2, revenue=1000),
+        SalesDailyDish(day=DAY, dish_id=soup.id, category_id=None, quantity=5, revenue=500)
+    ])
+    await session.flush()
+
+    await place_order(session, user.id, HOUR + timedelta(minutes=15), txid,
+                      [(soup.id, 2, 100), (salad.id, 1, 300)], OrderStatus.PROCESSING)
+    await place_order(session, user.id, HOUR + timedelta(minutes=20), txid, [(soup.id, 2, 100)], OrderStatus.CANCELLED)
+    await place_order(session, user.id, HOUR + timedelta(hours=1, minutes=5), txid, [(salad.id, 1, 300)])
+    # Событие незавершённой транзакции (этой же) ждёт следующего прохода
+    session.add(OrderEvent(order_id=0, user_id=user.id, from_status=None, to_status=OrderStatus.PENDING))
+    await session.flush()
+
+    processed = await AnalyticsRepository(session).refresh_sales()
+
+    assert processed == 5
+    hourly = (await session.execute(
+        select(SalesHourly.bucket, SalesHourly.orders_count, SalesHourly.revenue)
+        .where(SalesHourly.bucket.in_([HOUR, HOUR + timedelta(hours=1)]))
+        .order_by(SalesHourly.bucket)
+    )).all()
+    assert [(count, revenue) for _, count, revenue in hourly] == [(3, 1500), (1, 300)]
+    daily = dict((await session.execute(
+        select(SalesDailyDish.dish_id, SalesDailyDish.quantity)
+        .where(SalesDailyDish.day == DAY, SalesDailyDish.dish_id.in_([soup.id, salad.id]))
+    )).all())
+    assert daily == {soup.id: 7, salad.id: 2}
+    # Повторный проход ничего не добавляет
+    assert await AnalyticsRepository(session).refresh_sales() == 0
+
+
+@pytest.mark.asyncio
+async def test_event_committed_after_a_newer_id_is_not_skipped(pg_engine, monkeypatch):
+    # Транзакции коммитятся по-настоящему, поэтому у теста свой водяной знак и своя уборка за собой
+    monkeypatch.setattr(AnalyticsRepository, "SALES_WATERMARK", "sales_out_of_order_test")
+    event = {"order_id": 0, "user_id": 0, "from_status": OrderStatus.PENDING, "to_status": OrderStatus.PROCESSING}
+
+    async def refresh():
+        async with AsyncSession(pg_engine) as session, session.begin():
+            return await AnalyticsRepository(session).refresh_sales()
+
+    async with AsyncSession(pg_engine) as session, session.begin():
+        last_id = await session.scalar(select(func.coalesce(func.max(OrderEvent.id), 0)))
+        session.add(Watermark(name=AnalyticsRepository.SALES_WATERMARK, last_txid=await committed_txid(session), last_id=last_id))
+
+    ids = []
+    async with pg_engine.connect() as newer, pg_engine.connect() as older:
+        try:
+            # newer получает транзакцию раньше, а id события — позже, чем older
+            await newer.begin()
+            await newer.execute(text("SELECT pg_current_xact_id()"))
+            await older.begin()
+            ids.append(await older.scalar(insert(OrderEvent).values(**event).returning(OrderEvent.id)))
+            ids.append(await newer.scalar(insert(OrderEvent).values(**event).returning(OrderEvent.id)))
+            await newer.commit()
+            assert ids[0] < ids[1]
+
+            assert await refresh() == 1
+            # Событие с меньшим id закоммичено после того, как водяной знак прошёл больший id
+            await older.commit()
+            assert await refresh() == 1
+            assert await refresh() == 0
+        finally:
+            async with AsyncSession(pg_engine) as session, session.begin():
+                await session.execute(delete(OrderEvent).where(OrderEvent.id.in_(ids)))
+                await session.execute(delete(Watermark).where(Watermark.name == AnalyticsRepository.SALES_WATERMARK))
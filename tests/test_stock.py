@@ -0,0 +1,58 @@
+import pytest
+from unittest.mock import AsyncMock
+from src.infrastructure.services.stock import RedisStockStore, StockEventHandler, merge_items
+from src.rabbitmq import EventType
+
+
+def test_merge_items_sums_duplicate_dishes():
+    items = [
+        {"dish_id": 1, "quantity": 2},
+        {"dish_id": "1", "quantity": 1},
+        {"dish_id": 3, "quantity": 4},
+    ]
+    assert merge_items(items) == {1: 3, 3: 4}
+
+
+@pytest.mark.asyncio
+async def test_order_created_reserves_and_confirms():
+    store = AsyncMock(spec=RedisStockStore)
+    store.reserve.return_value = None
+    publisher = AsyncMock()
+
+    await StockEventHandler(store, publisher).handle_event(
+        {"order_id": 5, "items": [{"dish_id": 1, "quantity": 1}, {"dish_id": 1, "quantity": 1}]},
+        EventType.ORDER_CREATED
+    )
+
+    store.reserve.assert_awaited_once_with(5, {1: 2})
+    publisher.publish_event.assert_awaited_once_with(EventType.MENU_RESERVED, {"order_id": 5})
+
+
+@pytest.mark.asyncio
+async def test_order_created_reports_missing_dish():
+    store = AsyncMock(spec=RedisStockStore)
+    store.reserve.return_value = 7
+    publisher = AsyncMock()
+
+    await StockEventHandler(store, publisher).handle_event(
+        {"order_id": 5, "items": [{"dish_id": 7, "quantity": 3}]},
+        EventType.ORDER_CREATED
+    )
+
+    event_type, data = publisher.publish_event.await_args.args
+    assert event_type == EventType.MENU_FAILED
+    assert data["dish_id"] == 7
+
+
+@pytest.mark.asyncio
+async def test_release_and_payment_do_not_publish():
+    store = AsyncMock(spec=RedisStockStore)
+    publisher = AsyncMock()
+    handler = StockEventHandler(store, publisher)
+
+    await handler.handle_event({"order_id": 5}, EventType.MENU_RELEASE)
+    await handler.handle_event({"order_id": 5}, EventType.PAYMENT_COMPLETED)
+
+    store.release.assert_awaited_once_with(5)
+    store.commit.assert_awaited_once_with(5)
+    publisher.publish_event.assert_not_awaited()
@@ -0,0 +1,84 @@
+import json
+import time
+import pytest
+from datetime import timedelta
+from fastapi import HTTPException
+from jose import jwt
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from src.core.config import settings
+from src.core.dependencies import get_current_admin_user
+from src.core.jwks import get_signing_key
+from src.core.security import Principal, access_token_claims, create_access_token, decode_principal
+from src.infrastructure.services.token_revocation import TokenRevocations
+
+
+def loaded_revocations() -> TokenRevocations:
+    revocations = TokenRevocations(AsyncMock(), token_lifetime=1800)
+    revocations.loaded = True
+    return revocations
+
+
+def test_token_carries_role_and_token_id():
+    user = SimpleNamespace(id=5, is_admin=True)
+    first = decode_principal(create_access_token(access_token_claims(user), timedelta(minutes=5)))
+    second = decode_principal(create_access_token(access_token_claims(user), timedelta(minutes=5)))
+
+    assert first.id == 5 and first.is_admin
+    assert first.jti and first.jti != second.jti
+    assert first.issued_at <= time.time() < first.expires_at
+
+
+def test_legacy_token_without_claims_is_regular_user():
+    signing_key = get_signing_key()
+    token = jwt.encode(
+        {"sub": "5", "exp": time.time() + 300}, signing_key.key,
+        algorithm=settings.JWT_ALGORITHM, headers={"kid": signing_key.kid}
+    )
+    principal = decode_principal(token)
+
+    assert principal.id == 5 and not principal.is_admin and principal.jti is None
+
+
+@pytest.mark.asyncio
+async def test_logout_message_revokes_only_that_token():
+    revocations = loaded_revocations()
+    token = decode_principal(create_access_token({"sub": "5"}))
+    other = decode_principal(create_access_token({"sub": "5"}))
+
+    revocations._dispatch(json.dumps({"jti": token.jti, "exp": token.expires_at}))
+
+    assert await revocations.is_revoked(token)
+    assert not await revocations.is_revoked(other)
+
+
+@pytest.mark.asyncio
+async def test_user_revocation_rejects_only_earlier_tokens():
+    revocations = loaded_revocations()
+    before = decode_principal(create_access_token({"sub": "5"}))
+    revocations._dispatch(json.dumps({"user_id": 5, "revoked_at": time.time()}))
+    after = decode_principal(create_access_token({"sub": "5"}))
+
+    assert await revocations.is_revoked(before)
+    assert not await revocations.is_revoked(after)
+    assert not await revocations.is_revoked(decode_principal(create_access_token({"sub": "6"})))
+
+
+@pytest.mark.asyncio
+async def test_revoking_legacy_token_revokes_user():
+    revocations = loaded_revocations()
+    revocations.revoke_user = AsyncMock()
+
+    await revocations.revoke_token(Principal(id=5, is_admin=False, jti=None, issued_at=0, expires_at=time.time() + 60))
+
+    revocations.revoke_user.assert_awaited_once_with(5)
+
+
+@pytest.mark.asyncio
+async def test_admin_check_uses_token_claims():
+    admin = Principal(id=1, is_admin=True, jti="a", issued_at=0, expires_at=time.time() + 60)
+    assert await get_current_admin_user(admin) is admin
+
+    with pytest.raises(HTTPException) as error:
+        await get_current_admin_user(Principal(id=2, is_admin=False, jti="b", issued_at=0, expires_at=time.time() + 60))
+    assert error.value.status_code == 403
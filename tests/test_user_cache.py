@@ -0,0 +1,97 @@
+import time
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+from src.core.dependencies import get_current_principal, get_current_user
+from src.core.security import Principal, create_access_token, decode_principal
+from src.infrastructure.models.user import User
+from src.infrastructure.repositories.user import UserRepository
+from src.infrastructure.services.user_cache import TokenCache, UserRecordCache
+
+
+def dict_redis():
+    storage = {}
+    redis = AsyncMock()
+    redis.get.side_effect = lambda key: storage.get(key)
+    redis.set.side_effect = lambda key, value, ex=None: storage.__setitem__(key, value)
+    redis.delete.side_effect = lambda key: storage.pop(key, None)
+    return redis, storage
+
+
+def db_user():
+    return User(
+        id=5, name="Анна", email=None, number_phone="+79990000000", hashed_password="hash",
+        is_admin=False, is_phone_verified=True,
+        created_at=datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc), updated_at=None
+    )
+
+
+def principal(user_id: int, expires_in: float = 60) -> Principal:
+    return Principal(id=user_id, is_admin=False, jti=None, issued_at=time.time(), expires_at=time.time() + expires_in)
+
+
+def test_token_cache_expires_and_evicts_least_recently_used():
+    cache = TokenCache(max_size=2)
+    cache.put("expired", principal(3, expires_in=-1))
+    assert cache.get("expired") is None
+
+    cache.put("a", principal(1))
+    cache.put("b", principal(2))
+    assert cache.get("a").id == 1
+    cache.put("c", principal(3))
+    assert cache.get("b") is None
+    assert cache.get("a").id == 1 and cache.get("c").id == 3
+
+
+@pytest.mark.asyncio
+async def test_user_record_round_trip_without_password_hash():
+    redis, storage = dict_redis()
+    cache = UserRecordCache(redis, ttl=30)
+
+    await cache.set(db_user())
+    cached = await cache.get(5)
+
+    assert "hash" not in storage["user:record:5"]
+    assert cached.id == 5 and cached.number_phone == "+79990000000" and cached.is_admin is False
+    assert cached.created_at == db_user().created_at
+    await cache.invalidate(5)
+    assert await cache.get(5) is None
+
+
+@pytest.mark.asyncio
+async def test_hot_user_is_authenticated_without_database():
+    redis, _ = dict_redis()
+    token = create_access_token({"sub": "5"}, timedelta(minutes=5))
+    repository = AsyncMock()
+    repository.get_by_id.return_value = db_user()
+    revocations = AsyncMock()
+    revocations.is_revoked.return_value = False
+
+    with patch("src.core.dependencies.token_cache", TokenCache()), \
+            patch("src.core.dependencies.user_cache", UserRecordCache(redis, ttl=30)), \
+            patch("src.core.dependencies.token_revocations", revocations), \
+            patch("src.core.dependencies.decode_principal", wraps=decode_principal) as decode:
+        first = await get_current_user(await get_current_principal(token), repository)
+        second = await get_current_user(await get_current_principal(token), repository)
+
+    assert first.id == second.id == 5
+    assert repository.get_by_id.await_count == 1
+    assert decode.call_count == 1
+    assert revocations.is_revoked.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_make_admin_invalidates_cached_record():
+    session = AsyncMock()
+    repository = UserRepository(session)
+    repository.get_by_phone = AsyncMock(return_value=db_user())
+
+    with patch("src.infrastructure.repositories.user.user_cache") as cache, \
+            patch("src.infrastructure.repositories.user.token_revocations") as revocations:
+        cache.invalidate = AsyncMock()
+        revocations.revoke_user = AsyncMock()
+        user = await repository.make_admin("+79990000000")
+
+    assert user.is_admin
+    cache.invalidate.assert_awaited_once_with(5)
+    revocations.revoke_user.assert_awaited_once_with(5)
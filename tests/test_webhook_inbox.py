@@ -0,0 +1,64 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.infrastructure.models.payment import PaymentStatus
+from src.infrastructure.services.gateway_payment import sign_webhook, verify_webhook_signature
+from src.infrastructure.services.payment_service import PaymentService
+from src.infrastructure.services.webhook_inbox import WebhookInboxWorker
+from src.rabbitmq import EventType
+
+
+def test_webhook_signature_covers_raw_body():
+    body = b'{"transaction_id": "tx-1", "amount": 100, "status": "Completed"}'
+    assert verify_webhook_signature(body, sign_webhook(body))
+    assert not verify_webhook_signature(body + b" ", sign_webhook(body))
+    assert not verify_webhook_signature(body, None)
+
+
+@pytest.mark.asyncio
+async def test_apply_webhooks_skips_repeated_and_unknown_statuses():
+    payment = SimpleNamespace(id=1, invoice_id=10, status=PaymentStatus.PENDING, transaction_id=None, updated_at=None)
+    service = PaymentService(AsyncMock())
+    service.payment_repo.get_payments_by_order_ids = AsyncMock(return_value={10: payment})
+    service.outbox.publish_event = AsyncMock()
+    entries = [
+        SimpleNamespace(transaction_id="tx-1", invoice_id=10, status="Completed"),
+        SimpleNamespace(transaction_id="tx-2", invoice_id=10, status="paid"),
+        SimpleNamespace(transaction_id="tx-3", invoice_id=10, status="refunding"),
+        SimpleNamespace(transaction_id="tx-4", invoice_id=99, status="failed"),
+    ]
+
+    applied = await service.apply_webhooks(entries)
+
+    assert applied == {1: PaymentStatus.COMPLETED}
+    assert payment.status == PaymentStatus.COMPLETED
+    assert payment.transaction_id == "tx-1"
+    service.outbox.publish_event.assert_awaited_once_with(EventType.PAYMENT_COMPLETED, {
+        "order_id": 10, "payment_id": 1, "status": "COMPLETED"
+    })
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_retried_entry_by_entry():
+    factory = MagicMock()
+    factory.return_value.__aenter__ = AsyncMock(return_value=AsyncMock())
+    factory.return_value.__aexit__ = AsyncMock(return_value=False)
+    repository = AsyncMock()
+    repository.claim_batch.side_effect = [
+        [SimpleNamespace(transaction_id="tx-1"), SimpleNamespace(transaction_id="tx-2")],
+        [SimpleNamespace(transaction_id="tx-1")],
+        [SimpleNamespace(transaction_id="tx-2")],
+    ]
+    apply_webhooks = AsyncMock(side_effect=[RuntimeError("boom"), RuntimeError("boom"), {2: PaymentStatus.COMPLETED}])
+
+    with patch("src.infrastructure.services.webhook_inbox.WebhookInboxRepository", return_value=repository), \
+            patch.object(PaymentService, "apply_webhooks", apply_webhooks), \
+            patch("src.infrastructure.services.webhook_inbox.invalidate_cache", new=AsyncMock()), \
+            patch("src.infrastructure.services.webhook_inbox.payment_status_waiters") as waiters:
+        waiters.publish = AsyncMock()
+        processed = await WebhookInboxWorker(factory, batch_size=2, max_attempts=3).process_batch()
+
+    assert processed == 1
+    repository.record_failure.assert_awaited_once_with(["tx-1"], "boom", 3)
+    repository.mark_processed.assert_awaited_once_with(["tx-2"])
+    waiters.publish.assert_awaited_once_with({2: PaymentStatus.COMPLETED})